@@ -0,0 +1,1596 @@
+# -*- coding: utf-8 -*-
+"""
+パフォーマンスベンチマークスクリプト
+
+各処理の実行時間・メモリ使用量を計測
+結果は docs/PERFORMANCE.md に記録する
+
+使い方:
+    python scripts/benchmark.py sparkline --items 1000
+    python scripts/benchmark.py export --rows 300000
+    python scripts/benchmark.py storage --days 365
+    python scripts/benchmark.py history --days 730
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# プロジェクトルート
+PROJECT_ROOT = Path(__file__).parent.parent
+SRC_DIR = PROJECT_ROOT / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+
+def timed(label: str, func, repeat: int = 5):
+    """関数を複数回実行し、最良値を表示"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label}: {best * 1000:.2f}ms (best of {repeat})")
+    return result
+
+
+def measured(label: str, func, memory: bool = True):
+    """
+    関数の所要時間とピークメモリを表示
+
+    tracemallocは実行を大幅に遅くするため、時間計測とメモリ計測は別々に実行する
+    """
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    message = f"{label}: {elapsed:.2f}s"
+    if memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        message += f", peak {peak / 1024 / 1024:.1f}MB"
+    print(message)
+    return result
+
+
+def write_synthetic_raw(data_dir: Path, rows: int, days: int = 30) -> None:
+    """生データ形式の合成CSVを日別に書き出す"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    per_day = rows // days
+    for day in range(days):
+        ts = pd.Timestamp("2026-01-01") + pd.Timedelta(days=day)
+        df = pd.DataFrame(
+            {
+                "asin": [f"B{i:09d}" for i in range(per_day)],
+                "name": [f"商品{i}" for i in range(per_day)],
+                "category": rng.choice(["家電", "ゲーム", "本", "おもちゃ"], per_day),
+                "current_rank": rng.integers(1, 1000, per_day),
+                "rank_change_percent": rng.normal(0, 20, per_day).round(2),
+                "price": rng.integers(500, 50000, per_day),
+                "review_count": rng.integers(0, 5000, per_day),
+                "rating": rng.uniform(1, 5, per_day).round(1),
+                "timestamp": ts.isoformat(),
+            }
+        )
+        df.to_csv(data_dir / f"products_{ts:%Y%m%d}_100000.csv", index=False, encoding="utf-8-sig")
+
+
+def bench_export(rows: int, memory: bool = True):
+    """履歴エクスポート（CSV一括生成 vs CSV/xlsxストリーミング）"""
+    import csv
+    import io
+
+    from exporter import EXPORT_COLUMNS, iter_history_rows, stream_csv, stream_xlsx
+
+    print(f"=== 履歴エクスポート ({rows:,}行) ===")
+    with tempfile.TemporaryDirectory() as td:
+        data_dir = Path(td)
+        write_synthetic_raw(data_dir, rows)
+
+        def csv_in_memory():
+            output = io.StringIO()
+            writer = csv.DictWriter(output, fieldnames=EXPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(iter_history_rows(data_dir))
+            return len(output.getvalue().encode("utf-8"))
+
+        def csv_streaming():
+            return sum(len(chunk) for chunk in stream_csv(iter_history_rows(data_dir)))
+
+        def xlsx_streaming():
+            return sum(len(chunk) for chunk in stream_xlsx(iter_history_rows(data_dir)))
+
+        def first_rows(stream):
+            # ヘッダーの次の、最初のデータチャンクまでの時間
+            start = time.perf_counter()
+            chunks = stream(iter_history_rows(data_dir))
+            next(chunks)
+            next(chunks)
+            return (time.perf_counter() - start) * 1000
+
+        size = measured("csv (StringIO一括)", csv_in_memory, memory)
+        print(f"  出力サイズ: {size / 1024 / 1024:.1f}MB")
+        size = measured("csv (ストリーミング)", csv_streaming, memory)
+        print(
+            f"  出力サイズ: {size / 1024 / 1024:.1f}MB, 最初のデータ送出: {first_rows(stream_csv):.1f}ms"
+        )
+        size = measured("xlsx (constant_memory)", xlsx_streaming, memory)
+        print(f"  出力サイズ: {size / 1024 / 1024:.1f}MB")
+
+        bench_columnar_export(data_dir, memory)
+
+
+def bench_columnar_export(data_dir: Path, memory: bool = True):
+    """JSON一括 vs NDJSON / Arrow / Parquet（事前生成スナップショット）"""
+    import json
+
+    from exporter import (
+        PYARROW_AVAILABLE,
+        _json_row,
+        build_columnar_snapshots,
+        cached_parquet,
+        iter_arrow_tables,
+        iter_history_rows,
+        stream_arrow,
+        stream_ndjson,
+    )
+
+    def json_document():
+        data = [_json_row(row) for row in iter_history_rows(data_dir)]
+        return len(
+            json.dumps({"count": len(data), "data": data}, ensure_ascii=False).encode("utf-8")
+        )
+
+    def ndjson_streaming():
+        return sum(len(chunk) for chunk in stream_ndjson(iter_history_rows(data_dir)))
+
+    size = measured("json (1ドキュメント)", json_document, memory)
+    print(f"  出力サイズ: {size / 1024 / 1024:.1f}MB")
+    size = measured("ndjson (ストリーミング)", ndjson_streaming, memory)
+    print(f"  出力サイズ: {size / 1024 / 1024:.1f}MB")
+
+    if not PYARROW_AVAILABLE:
+        print("pyarrow未インストールのため Arrow / Parquet はスキップ")
+        return
+
+    export_dir = data_dir / "export"
+    measured(
+        "スナップショット生成（収集時）",
+        lambda: build_columnar_snapshots(data_dir, export_dir),
+        False,
+    )
+
+    size = measured(
+        "arrow (スナップショット結合)",
+        lambda: sum(map(len, stream_arrow(iter_arrow_tables(export_dir)))),
+        memory,
+    )
+    print(f"  出力サイズ: {size / 1024 / 1024:.1f}MB")
+    path = measured(
+        "parquet (スナップショット結合、初回)", lambda: cached_parquet(export_dir), False
+    )
+    print(f"  出力サイズ: {path.stat().st_size / 1024 / 1024:.1f}MB")
+    measured(
+        "parquet (スナップショット結合、キャッシュ済み)", lambda: cached_parquet(export_dir), memory
+    )
+
+
+def bench_storage(days: int, rows_per_day: int):
+    """生データ読み込み（CSV vs 列指向パーティション）"""
+    from datetime import date, datetime, timedelta
+
+    import numpy as np
+    import pandas as pd
+
+    from analyzer import TrendAnalyzer
+    from storage import RAW_COLUMNS, ColumnarStore, convert_csv_dir
+
+    categories = ["家電&カメラ", "ゲーム", "本", "おもちゃ", "ホーム&キッチン"]
+    print(f"=== 生データ読み込み ({days}日 × {rows_per_day:,}行 = {days * rows_per_day:,}行) ===")
+
+    with tempfile.TemporaryDirectory() as td:
+        raw_dir = Path(td) / "raw"
+        raw_dir.mkdir()
+        rng = np.random.default_rng(0)
+        start = datetime(2025, 1, 1, 10, 0, 0)
+        for day in range(days):
+            run_at = start + timedelta(days=day)
+            df = pd.DataFrame(
+                {
+                    "asin": [f"B{i:09d}" for i in range(rows_per_day)],
+                    "name": [f"商品{i}" for i in range(rows_per_day)],
+                    "category": rng.choice(categories, rows_per_day),
+                    "current_rank": rng.integers(1, 1000, rows_per_day),
+                    "previous_rank": rng.integers(1, 1000, rows_per_day),
+                    "rank_change": rng.integers(-500, 500, rows_per_day),
+                    "rank_change_percent": rng.normal(0, 20, rows_per_day).round(2),
+                    "price": rng.integers(500, 50000, rows_per_day).astype(float),
+                    "currency": "JPY",
+                    "review_count": rng.integers(0, 5000, rows_per_day),
+                    "rating": rng.uniform(1, 5, rows_per_day).round(1),
+                    "affiliate_url": [
+                        f"https://amazon.co.jp/dp/B{i:09d}?tag=ecomtrend-20"
+                        for i in range(rows_per_day)
+                    ],
+                    "timestamp": run_at.isoformat(),
+                    "source": "benchmark",
+                },
+                columns=RAW_COLUMNS,
+            )
+            df.to_csv(
+                raw_dir / f"products_{run_at:%Y%m%d_%H%M%S}.csv", index=False, encoding="utf-8-sig"
+            )
+
+        def csv_load():
+            return TrendAnalyzer(data_dir=raw_dir).load_historical_data(days=days)
+
+        csv_size = sum(p.stat().st_size for p in raw_dir.glob("*.csv"))
+        print(f"CSV: {csv_size / 1024 / 1024:.1f}MB")
+        df = measured("  全期間読み込み", csv_load)
+        print(f"  DataFrame: {df.memory_usage(deep=True).sum() / 1024 / 1024:.1f}MB")
+
+        last_month = (start + timedelta(days=days - 30)).date()
+        for file_format in ("parquet", "feather"):
+            store = ColumnarStore(root=Path(td) / file_format, file_format=file_format)
+            measured(
+                f"{file_format}: CSVから変換", lambda: convert_csv_dir(store, raw_dir), memory=False
+            )
+            size = sum(p.stat().st_size for p in store.root.rglob(f"*{store.suffix}"))
+            print(f"  サイズ: {size / 1024 / 1024:.1f}MB")
+
+            df = measured(
+                "  全期間読み込み",
+                lambda: TrendAnalyzer(store=store).load_historical_data(days=days),
+            )
+            print(f"  DataFrame: {df.memory_usage(deep=True).sum() / 1024 / 1024:.1f}MB")
+            df = measured(
+                "  直近30日・1カテゴリ・3列",
+                lambda: store.read(
+                    columns=["asin", "current_rank", "timestamp"],
+                    date_from=last_month,
+                    categories=["ゲーム"],
+                ),
+            )
+            print(f"  行数: {len(df):,}")
+
+
+def bench_history(days: int, rows_per_day: int):
+    """ASIN履歴の検索（CSV全読み込み vs 履歴ストア）"""
+    from datetime import date, datetime, timedelta
+
+    import numpy as np
+    import pandas as pd
+
+    from analyzer import TrendAnalyzer
+    from history import HistoryStore
+    from storage import RAW_COLUMNS
+
+    categories = ["家電&カメラ", "ゲーム", "本", "おもちゃ", "ホーム&キッチン"]
+    print(f"=== ASIN履歴の検索 ({days}日 × {rows_per_day:,}行 = {days * rows_per_day:,}行) ===")
+
+    with tempfile.TemporaryDirectory() as td:
+        raw_dir = Path(td) / "raw"
+        raw_dir.mkdir()
+        rng = np.random.default_rng(0)
+        asin_category = rng.choice(categories, rows_per_day)
+        start = datetime(2025, 1, 1, 10, 0, 0)
+        for day in range(days):
+            run_at = start + timedelta(days=day)
+            pd.DataFrame(
+                {
+                    "asin": [f"B{i:09d}" for i in range(rows_per_day)],
+                    "name": [f"商品{i}" for i in range(rows_per_day)],
+                    "category": asin_category,
+                    "current_rank": rng.integers(1, 1000, rows_per_day),
+                    "rank_change_percent": rng.normal(0, 20, rows_per_day).round(2),
+                    "price": rng.integers(500, 50000, rows_per_day).astype(float),
+                    "currency": "JPY",
+                    "review_count": rng.integers(0, 5000, rows_per_day),
+                    "rating": rng.uniform(1, 5, rows_per_day).round(1),
+                    "timestamp": run_at.isoformat(),
+                    "source": "benchmark",
+                },
+                columns=RAW_COLUMNS,
+            ).to_csv(
+                raw_dir / f"products_{run_at:%Y%m%d_%H%M%S}.csv", index=False, encoding="utf-8-sig"
+            )
+
+        store = HistoryStore(Path(td) / "history.db")
+        measured("初回取り込み", lambda: store.sync(raw_dir), memory=False)
+        print(f"  DBサイズ: {store.db_path.stat().st_size / 1024 / 1024:.1f}MB")
+        measured("差分取り込み（新規なし）", lambda: store.sync(raw_dir), memory=False)
+
+        asins = [f"B{i:09d}" for i in rng.integers(0, rows_per_day, 100)]
+
+        def csv_lookup():
+            df = TrendAnalyzer(data_dir=raw_dir).load_historical_data(days=days)
+            return df[df["asin"] == asins[0]]
+
+        measured("CSV: ASIN 1件の全履歴", csv_lookup, memory=False)
+        timed("履歴ストア: ASIN 1件の全履歴", lambda: store.asin_history(asins[0]), repeat=20)
+        timed(
+            "履歴ストア: ASIN 100件の直近30日",
+            lambda: [
+                store.asin_history(a, start=date(2025, 1, 1) + timedelta(days=days - 30))
+                for a in asins
+            ],
+        )
+        timed("履歴ストア: 最新値", lambda: store.latest(asins[0]), repeat=20)
+        last_week = date(2025, 1, 1) + timedelta(days=days - 7)
+        rows = timed(
+            "履歴ストア: 1カテゴリの直近7日",
+            lambda: list(store.iter_rows(start=last_week, category="ゲーム")),
+        )
+        print(f"  行数: {len(rows):,}")
+
+
+def bench_ingest(known: int, rows: int):
+    """前回ランクの補完（CSV全読み込み vs 最新ランク索引）"""
+    from datetime import datetime, timedelta
+
+    import numpy as np
+    import pandas as pd
+
+    from ingest import LatestRankIndex, compute_rank_changes
+
+    categories = ["家電&カメラ", "ゲーム", "本", "おもちゃ", "ホーム&キッチン"]
+    print(f"=== 前回ランクの補完 (既知 {known:,}商品 / 今回 {rows:,}行) ===")
+
+    rng = np.random.default_rng(0)
+    start = datetime(2025, 1, 1, 10, 0, 0)
+    state = pd.DataFrame(
+        {
+            "asin": [f"B{i:09d}" for i in range(known)],
+            "category": rng.choice(categories, known),
+            "current_rank": rng.integers(1, 1000, known),
+            "timestamp": start.isoformat(),
+        }
+    )
+    picked = rng.choice(known, rows, replace=False)
+    current = (
+        state.iloc[picked]
+        .reset_index(drop=True)
+        .assign(
+            current_rank=rng.integers(1, 1000, rows),
+            rank_change_percent=rng.normal(0, 20, rows).round(2),
+            timestamp=(start + timedelta(days=1)).isoformat(),
+        )
+    )
+
+    with tempfile.TemporaryDirectory() as td:
+        index = LatestRankIndex(Path(td) / "latest_ranks.csv")
+        index.update(state)
+        measured("索引の保存", index.save, memory=False)
+        print(f"  索引サイズ: {index.path.stat().st_size / 1024 / 1024:.1f}MB")
+        measured("索引の読み込み", lambda: LatestRankIndex(index.path), memory=False)
+        timed("索引: 差分計算", lambda: compute_rank_changes(current, index))
+        timed("索引: 更新", lambda: index.update(current))
+
+        # 比較: 過去の全観測値から直前のランクを探す（30日分を想定）
+        history = pd.concat(
+            [state.assign(timestamp=(start - timedelta(days=d)).isoformat()) for d in range(30)]
+        )
+
+        def full_scan():
+            latest = history.sort_values("timestamp").drop_duplicates(
+                ["asin", "category"], keep="last"
+            )
+            return current.merge(
+                latest, on=["asin", "category"], how="left", suffixes=("", "_prev")
+            )
+
+        timed("全履歴（30日分）から検索", full_scan, repeat=3)
+
+
+def bench_momentum(known: int, rows: int, days: int):
+    """モメンタム特徴量の更新（状態表 vs 履歴からの再計算）"""
+    from datetime import datetime, timedelta
+
+    import numpy as np
+    import pandas as pd
+
+    from analyzer import MomentumState
+
+    print(f"=== モメンタム特徴量 (既知 {known:,}ASIN / 今回 {rows:,}行 / 履歴 {days}日) ===")
+
+    rng = np.random.default_rng(0)
+    asins = np.array([f"B{i:09d}" for i in range(known)])
+    start = datetime(2025, 1, 1, 10, 0, 0)
+    history = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "asin": asins[rng.choice(known, rows, replace=False)],
+                    "current_rank": rng.integers(1, 1000, rows),
+                    "timestamp": (start + timedelta(days=day)).isoformat(),
+                }
+            )
+            for day in range(days)
+        ],
+        ignore_index=True,
+    )
+    current = pd.DataFrame(
+        {
+            "asin": asins[rng.choice(known, rows, replace=False)],
+            "current_rank": rng.integers(1, 1000, rows),
+            "timestamp": (start + timedelta(days=days)).isoformat(),
+        }
+    )
+
+    state = MomentumState(capacity=known)
+    state.update(pd.DataFrame({"asin": asins, "current_rank": 500, "timestamp": start.isoformat()}))
+    for _, run in history.groupby("timestamp", sort=True):
+        state.update(run)
+
+    counter = iter(range(1, 10_000))
+
+    def update():
+        # 毎回新しい時刻の収集として更新
+        run_at = start + timedelta(days=days, hours=next(counter))
+        return state.update(current.assign(timestamp=run_at.isoformat()))
+
+    timed("状態表: 1回分の更新", update)
+    timed("状態表: 特徴量の取得", lambda: state.features(current["asin"].to_numpy()))
+
+    with tempfile.TemporaryDirectory() as td:
+        path = Path(td) / "momentum_state.npz"
+        measured("状態表: 保存", lambda: state.save(path), memory=False)
+        print(f"  ファイルサイズ: {path.stat().st_size / 1024 / 1024:.1f}MB")
+        measured("状態表: 読み込み", lambda: MomentumState.load(path), memory=False)
+
+    def recompute():
+        df = pd.concat([history, current], ignore_index=True).sort_values(
+            ["asin", "timestamp"], kind="stable"
+        )
+        t = pd.to_datetime(df["timestamp"], format="ISO8601")
+        group = df.groupby("asin", sort=False)
+        elapsed = t.groupby(df["asin"]).diff().dt.total_seconds() / 86400
+        velocity = -group["current_rank"].diff() / elapsed
+        acceleration = velocity.groupby(df["asin"]).diff() / elapsed
+        ewma = group["current_rank"].ewm(halflife=1).mean()
+        return velocity, acceleration, ewma
+
+    timed(f"比較: 履歴（{days}日分）から再計算", recompute, repeat=3)
+
+
+def bench_anomaly(asins: int, rows: int, runs: int):
+    """急上昇の逐次検知（イベント数に対するスループット）"""
+    import numpy as np
+    import pandas as pd
+
+    from anomaly import AnomalyDetector
+
+    categories = [f"カテゴリ{i}" for i in range(50)]
+    print(
+        f"=== 急上昇の逐次検知 ({asins:,}ASIN / {rows:,}行 × {runs:,}回 = {rows * runs:,}イベント) ==="
+    )
+
+    rng = np.random.default_rng(0)
+    asin_ids = np.array([f"B{i:09d}" for i in range(asins)])
+    asin_category = rng.choice(categories, asins)
+
+    def make_run(day: int) -> pd.DataFrame:
+        picked = rng.choice(asins, rows, replace=False)
+        # 通常の変動率は対数正規（中央値 約20%）、0.1%を急上昇（5,000〜50,000%）にする
+        changes = rng.lognormal(3, 0.8, rows)
+        spikes = rng.random(rows) < 0.001
+        changes[spikes] = rng.uniform(5000, 50000, spikes.sum())
+        return pd.DataFrame(
+            {
+                "asin": asin_ids[picked],
+                "category": asin_category[picked],
+                "current_rank": rng.integers(1, 1000, rows),
+                "rank_change_percent": changes,
+                "timestamp": day,
+            }
+        )
+
+    batches = [make_run(day) for day in range(min(runs, 50))]
+    detector = AnomalyDetector()
+
+    def process_all():
+        flagged = 0
+        for i in range(runs):
+            flagged += len(detector.process(batches[i % len(batches)]))
+        return flagged
+
+    flagged = measured("全イベントの判定・更新", process_all)
+    print(
+        f"  検出: {flagged:,}件 / 追跡ASIN: {len(detector.asin_stats):,} / カテゴリ: {len(detector.category_stats)}"
+    )
+    timed("1回分の判定・更新", lambda: detector.process(batches[0]))
+
+    with tempfile.TemporaryDirectory() as td:
+        path = detector.save(Path(td) / "anomaly_state.npz")
+        print(f"  状態ファイル: {path.stat().st_size / 1024 / 1024:.1f}MB")
+
+
+def bench_analyze(categories: int, rows: int):
+    """カテゴリ別上位N件（カテゴリごとの絞り込み vs 一括ソート + groupby）"""
+    import numpy as np
+    import pandas as pd
+
+    from analyzer import TrendAnalyzer, TrendItem
+
+    print(f"=== カテゴリ別トレンド分析 ({categories}カテゴリ × {rows:,}行) ===")
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "asin": [f"B{i:09d}" for i in range(rows)],
+            "name": [f"商品{i}" for i in range(rows)],
+            "category": rng.choice([f"カテゴリ{i}" for i in range(categories)], rows),
+            "current_rank": rng.integers(1, 1000, rows),
+            "rank_change_percent": rng.normal(50, 40, rows).round(1),
+            "price": rng.integers(500, 50000, rows).astype(float),
+            "review_count": rng.integers(0, 5000, rows),
+            "rating": rng.uniform(1, 5, rows).round(1),
+            "affiliate_url": "https://www.amazon.co.jp/dp/B000000000?tag=test",
+        }
+    )
+    analyzer = TrendAnalyzer(data_dir=Path(tempfile.gettempdir()))
+
+    def legacy(top_n: int = 10):
+        # 変更前の実装（1行ずつのスコア計算、カテゴリごとの絞り込み、iterrows）
+        data = df.copy()
+        data["trend_score"] = data.apply(analyzer.calculate_trend_score, axis=1)
+        result = {}
+        for category in data["category"].unique():
+            category_df = (
+                data[data["category"] == category]
+                .sort_values("trend_score", ascending=False)
+                .head(top_n)
+            )
+            result[category] = [
+                TrendItem(
+                    asin=row["asin"],
+                    name=row["name"],
+                    category=row["category"],
+                    rank_change_percent=row.get("rank_change_percent", 0) or 0,
+                    current_rank=row["current_rank"],
+                    price=row.get("price"),
+                    review_count=row.get("review_count"),
+                    rating=row.get("rating"),
+                    affiliate_url=row["affiliate_url"],
+                    trend_score=row["trend_score"],
+                )
+                for _, row in category_df.iterrows()
+            ]
+        return result
+
+    def legacy_grouping(top_n: int = 10):
+        # 変更前のグループ化部分のみ（スコアは計算済み）
+        result = {}
+        for category in scored["category"].unique():
+            category_df = (
+                scored[scored["category"] == category]
+                .sort_values("trend_score", ascending=False)
+                .head(top_n)
+            )
+            result[category] = [row["asin"] for _, row in category_df.iterrows()]
+        return result
+
+    scored = df.assign(trend_score=analyzer.calculate_trend_scores(df))
+
+    measured("変更前: apply + カテゴリごとの絞り込み + iterrows", legacy, memory=False)
+    timed("変更前: グループ化 + iterrows のみ", legacy_grouping, repeat=3)
+    timed("一括スコア計算", lambda: analyzer.calculate_trend_scores(df))
+    result = timed(
+        "analyze_dataframe_by_category", lambda: analyzer.analyze_dataframe_by_category(df)
+    )
+    print(f"  カテゴリ: {len(result)} / アイテム: {sum(len(v) for v in result.values()):,}")
+
+
+def bench_trend_items(rows: int):
+    """TrendItemの生成（iterrows vs 一括生成、属性辞書 vs __slots__）"""
+    from dataclasses import MISSING, field, fields, make_dataclass
+
+    import numpy as np
+    import pandas as pd
+
+    from analyzer import TrendItem
+
+    print(f"=== TrendItemの生成 ({rows:,}件) ===")
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "asin": [f"B{i:09d}" for i in range(rows)],
+            "name": [f"商品{i}" for i in range(rows)],
+            "category": rng.choice(["家電", "ゲーム", "本"], rows),
+            "current_rank": rng.integers(1, 1000, rows),
+            "rank_change_percent": rng.normal(50, 40, rows).round(1),
+            "price": rng.integers(500, 50000, rows).astype(float),
+            "review_count": rng.integers(0, 5000, rows),
+            "rating": rng.uniform(1, 5, rows).round(1),
+            "affiliate_url": "https://www.amazon.co.jp/dp/B000000000?tag=test",
+            "trend_score": rng.uniform(0, 100, rows).round(2),
+        }
+    )
+
+    # 比較用: __slots__ なしの同じフィールド構成
+    DictTrendItem = make_dataclass(
+        "DictTrendItem",
+        [
+            (f.name, f.type) if f.default is MISSING else (f.name, f.type, field(default=f.default))
+            for f in fields(TrendItem)
+        ],
+    )
+
+    def legacy(cls):
+        return [
+            cls(
+                asin=row["asin"],
+                name=row["name"],
+                category=row["category"],
+                rank_change_percent=row.get("rank_change_percent", 0) or 0,
+                current_rank=row["current_rank"],
+                price=row.get("price"),
+                review_count=row.get("review_count"),
+                rating=row.get("rating"),
+                affiliate_url=row["affiliate_url"],
+                trend_score=row["trend_score"],
+            )
+            for _, row in df.iterrows()
+        ]
+
+    def retained(label: str, func) -> None:
+        # 生成後も保持されるメモリ（DataFrameと共有する文字列を除く）
+        tracemalloc.start()
+        items = func()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"  {label}: 保持 {current / 1024 / 1024:.1f}MB（1件あたり {current / len(items):.0f}バイト）"
+        )
+
+    measured("変更前: iterrows + 属性辞書", lambda: legacy(DictTrendItem), memory=False)
+    measured("TrendItem.from_dataframe", lambda: TrendItem.from_dataframe(df))
+    retained("属性辞書", lambda: legacy(DictTrendItem))
+    retained("__slots__", lambda: TrendItem.from_dataframe(df))
+
+
+def bench_dtypes(days: int, rows_per_day: int):
+    """生データCSVの読み込み型（既定の型推論 vs 明示スキーマ）"""
+    from datetime import datetime, timedelta
+
+    import numpy as np
+    import pandas as pd
+
+    from analyzer import TrendAnalyzer
+
+    categories = ["家電&カメラ", "ゲーム", "本", "おもちゃ", "ホーム&キッチン"]
+    print(
+        f"=== 生データの読み込み型 ({days}日 × {rows_per_day:,}行 = {days * rows_per_day:,}行) ==="
+    )
+
+    with tempfile.TemporaryDirectory() as td:
+        raw_dir = Path(td) / "raw"
+        raw_dir.mkdir()
+        rng = np.random.default_rng(0)
+        start = datetime(2025, 1, 1, 10, 0, 0)
+        for day in range(days):
+            run_at = start + timedelta(days=day)
+            # 変更前の形式（affiliate_url 列あり）
+            pd.DataFrame(
+                {
+                    "asin": [f"B{i:09d}" for i in range(rows_per_day)],
+                    "name": [
+                        f"商品{i} ワイヤレスイヤホン Bluetooth 5.3" for i in range(rows_per_day)
+                    ],
+                    "category": rng.choice(categories, rows_per_day),
+                    "current_rank": rng.integers(1, 1000, rows_per_day),
+                    "previous_rank": rng.integers(1, 1000, rows_per_day),
+                    "rank_change": rng.integers(-500, 500, rows_per_day),
+                    "rank_change_percent": rng.normal(0, 20, rows_per_day).round(2),
+                    "price": rng.integers(500, 50000, rows_per_day).astype(float),
+                    "currency": "JPY",
+                    "review_count": rng.integers(0, 5000, rows_per_day),
+                    "rating": rng.uniform(1, 5, rows_per_day).round(1),
+                    "affiliate_url": [
+                        f"https://amazon.co.jp/dp/B{i:09d}?tag=ecomtrend-20"
+                        for i in range(rows_per_day)
+                    ],
+                    "timestamp": run_at.isoformat(),
+                    "source": "amazon_movers_shakers",
+                }
+            ).to_csv(
+                raw_dir / f"products_{run_at:%Y%m%d_%H%M%S}.csv", index=False, encoding="utf-8-sig"
+            )
+
+        def default_load():
+            files = sorted(raw_dir.glob("products_*.csv"))
+            return pd.concat(
+                [pd.read_csv(f, encoding="utf-8-sig") for f in files], ignore_index=True
+            )
+
+        for label, func in [
+            ("変更前: 既定の型推論（全列）", default_load),
+            (
+                "明示スキーマ（load_historical_data）",
+                lambda: TrendAnalyzer(data_dir=raw_dir).load_historical_data(days=days),
+            ),
+        ]:
+            df = measured(label, func)
+            usage = df.memory_usage(deep=True)
+            print(f"  DataFrame: {usage.sum() / 1024 / 1024:.1f}MB")
+            for name in ("asin", "name", "category", "current_rank", "affiliate_url", "timestamp"):
+                if name in usage:
+                    print(f"    {name} ({df[name].dtype}): {usage[name] / 1024 / 1024:.1f}MB")
+
+
+def _peak_rss_child(func, queue):
+    import resource
+
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    func()
+    queue.put((base, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def peak_rss(label: str, func) -> None:
+    """
+    関数を子プロセスで実行し、最大RSSの増分を表示
+
+    pyarrowのメモリプールはtracemallocで追跡できないため、プロセスの最大RSSで計測する
+    """
+    import multiprocessing
+
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    start = time.perf_counter()
+    process = context.Process(target=_peak_rss_child, args=(func, queue))
+    process.start()
+    base, peak = queue.get()
+    process.join()
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed:.2f}s, peak RSS +{(peak - base) / 1024:.1f}MB")
+
+
+def bench_history_chunks(days: int, rows_per_day: int, budgets: list[float]):
+    """履歴のトレンド分析（結合 vs 分割読み込み）"""
+    from datetime import datetime, timedelta
+
+    import numpy as np
+    import pandas as pd
+
+    from analyzer import TrendAnalyzer
+
+    categories = [f"カテゴリ{i}" for i in range(30)]
+    print(f"=== 履歴のトレンド分析 ({days}日 × {rows_per_day:,}行 = {days * rows_per_day:,}行) ===")
+
+    with tempfile.TemporaryDirectory() as td:
+        raw_dir = Path(td) / "raw"
+        raw_dir.mkdir()
+        rng = np.random.default_rng(0)
+        start = datetime(2025, 1, 1, 10, 0, 0)
+        for day in range(days):
+            run_at = start + timedelta(days=day)
+            pd.DataFrame(
+                {
+                    "asin": [f"B{i:09d}" for i in range(rows_per_day)],
+                    "name": [
+                        f"商品{i} ワイヤレスイヤホン Bluetooth 5.3" for i in range(rows_per_day)
+                    ],
+                    "category": rng.choice(categories, rows_per_day),
+                    "current_rank": rng.integers(1, 1000, rows_per_day),
+                    "rank_change_percent": rng.normal(0, 20, rows_per_day).round(2),
+                    "price": rng.integers(500, 50000, rows_per_day).astype(float),
+                    "review_count": rng.integers(0, 5000, rows_per_day),
+                    "rating": rng.uniform(1, 5, rows_per_day).round(1),
+                    "timestamp": run_at.isoformat(),
+                }
+            ).to_csv(
+                raw_dir / f"products_{run_at:%Y%m%d_%H%M%S}.csv", index=False, encoding="utf-8-sig"
+            )
+
+        analyzer = TrendAnalyzer(data_dir=raw_dir)
+
+        def in_memory():
+            df = analyzer.load_historical_data(days=days)
+            return analyzer.analyze_dataframe(df, top_n=20), analyzer.analyze_dataframe_by_category(
+                df, top_n=10
+            )
+
+        expected = in_memory()
+        peak_rss("結合して分析（load_historical_data）", in_memory)
+        for budget in budgets:
+            peak_rss(
+                f"analyze_history（予算 {budget:g}MB）",
+                lambda: analyzer.analyze_history(days=days, memory_budget_mb=budget),
+            )
+            assert analyzer.analyze_history(days=days, memory_budget_mb=budget) == expected
+        print("結果一致: OK")
+
+
+def bench_backfill(days: int, rows_per_day: int, workers: list[int]):
+    """過去データの再スコアリング（ワーカープロセス数別）"""
+    import os
+
+    from backfill import run_backfill
+
+    print(f"=== バックフィル ({days}日 × {rows_per_day:,}行, CPU {os.cpu_count()}) ===")
+    with tempfile.TemporaryDirectory() as td:
+        raw_dir = Path(td) / "raw"
+        raw_dir.mkdir()
+        write_synthetic_raw(raw_dir, rows=days * rows_per_day, days=days)
+
+        baseline = None
+        for count in workers:
+            result = run_backfill(raw_dir, Path(td) / f"out{count}", workers=count)
+            baseline = baseline or result.seconds
+            print(
+                f"{count}プロセス: {result.seconds:.2f}s, {result.rows_per_second:,.0f}行/s, "
+                f"{baseline / result.seconds:.2f}倍"
+            )
+
+
+def bench_backtest(days: int, rows_per_day: int, levels: int, workers: int):
+    """トレンドスコアのバックテスト（重みのグリッド）"""
+    import numpy as np
+
+    from backtest import (
+        build_windows,
+        evaluate_window,
+        load_daily_snapshots,
+        run_backtest,
+        weight_grid,
+    )
+
+    values = list(np.linspace(0.5, 1.5, levels))
+    grid = weight_grid(rank_change=values, reviews=values, rating=values, momentum=values)
+    print(
+        f"=== バックテスト ({days}日 × {rows_per_day:,}行, 重み{len(grid)}通り × ホライズン3) ==="
+    )
+
+    with tempfile.TemporaryDirectory() as td:
+        raw_dir = Path(td) / "raw"
+        raw_dir.mkdir()
+        write_synthetic_raw(raw_dir, rows=days * rows_per_day, days=days)
+
+        snapshots = measured(
+            "load_daily_snapshots", lambda: load_daily_snapshots(raw_dir), memory=False
+        )
+        windows = measured(
+            "build_windows（モメンタム再生込み）", lambda: build_windows(snapshots, 3), memory=False
+        )
+
+        # 比較: 重みごとに1通りずつ評価（全日は時間がかかるため一部の日から推定）
+        sample = windows[: max(1, len(windows) // 10)]
+        start = time.perf_counter()
+        for weights in grid:
+            for window in sample:
+                evaluate_window(window, weights[None, :], 20)
+        elapsed = (time.perf_counter() - start) * len(windows) / len(sample)
+        print(f"重みごとに1通りずつ評価（{len(sample)}日から推定）: {elapsed:.2f}s")
+        result = measured(
+            "run_backtest（行列で一括）",
+            lambda: run_backtest(windows, grid, workers=workers),
+            memory=False,
+        )
+        print(f"最良の重み（ホライズン1、precision@20）: {result.best().to_dict()}")
+
+
+def bench_scoring(rows: int, scores: int):
+    """スコア計算（既定のみ vs カスタムスコアをまとめて計算 vs 1つずつ計算）"""
+    import numpy as np
+    import pandas as pd
+
+    from analyzer import trend_score_components
+    from scoring import ScoreDefinition, ScoreRegistry
+
+    print(f"=== スコア計算 ({rows:,}行, カスタムスコア{scores}件) ===")
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "rank_change_percent": rng.normal(50, 40, rows).round(1),
+            "price": rng.integers(500, 50000, rows).astype(float),
+            "review_count": rng.integers(0, 5000, rows),
+            "rating": rng.uniform(1, 5, rows).round(1),
+            "velocity": rng.normal(0, 5, rows),
+            "ewma_rank": rng.uniform(1, 1000, rows),
+        }
+    )
+    registry = ScoreRegistry()
+    for i in range(scores):
+        registry.register(
+            ScoreDefinition.from_dict(
+                {
+                    "name": f"custom{i}",
+                    "terms": [
+                        {
+                            "name": "rank",
+                            "expr": "minimum(rank_change_percent / 2, 50)",
+                            "weight": 1.0 + i / 10,
+                        },
+                        {
+                            "name": "cheap",
+                            "expr": f"where(price > 0, 20 - minimum(log10(price + 1) * {i + 2}, 20), 0)",
+                        },
+                        {
+                            "name": "rating",
+                            "expr": "where(rating >= 4.0, (rating - 4.0) * 20, 0)",
+                            "weight": 0.5,
+                        },
+                    ],
+                }
+            )
+        )
+
+    def legacy():
+        # 変更前の計算方法（構成要素を求めてから合計）
+        components = trend_score_components(df)
+        return (
+            components["rank_change"]
+            + components["reviews"]
+            + components["rating"]
+            + components["momentum"]
+        ).round(2)
+
+    def separately():
+        return [registry.compute(df, [name]) for name in registry.names()]
+
+    timed("変更前: 構成要素の合計", legacy)
+    timed("既定のスコアのみ", lambda: registry.compute(df, ["default"]))
+    timed(f"全{len(registry.names())}スコアを1つずつ計算", separately)
+    timed(f"全{len(registry.names())}スコアをまとめて計算", lambda: registry.compute(df))
+
+
+def bench_forecast(asins: int, days: int):
+    """ランク予測（系列ごとの最小二乗 vs 行列での一括当てはめ）"""
+    import numpy as np
+    import pandas as pd
+
+    from forecast import RankForecaster, RankSeries
+
+    print(f"=== ランク予測 ({asins:,}系列 × {days}日) ===")
+
+    rng = np.random.default_rng(0)
+    level = rng.normal(6, 1.5, (asins, 1))
+    slope = rng.normal(0, 0.02, (asins, 1))
+    ranks = np.exp(level + slope * np.arange(days) + rng.normal(0, 0.2, (asins, days)))
+    ranks[rng.random(ranks.shape) < 0.3] = np.nan
+    series = RankSeries(
+        np.array([f"B{i:09d}" for i in range(asins)], dtype=object),
+        pd.date_range("2026-01-01", periods=days),
+        ranks,
+    )
+    forecaster = RankForecaster()
+    design = forecaster.design(np.arange(days, dtype=float), days)
+
+    # 生データ形式（1日1回の収集、未掲載の日は行なし）からの行列化
+    observed = ~np.isnan(ranks)
+    rows, cols = np.nonzero(observed)
+    df = pd.DataFrame(
+        {
+            "asin": pd.array(series.asins[rows], dtype="string"),
+            "current_rank": ranks[observed].round().astype("float32"),
+            "timestamp": pd.Categorical(series.days.strftime("%Y-%m-%dT10:00:00")[cols]),
+        }
+    )
+    timed(
+        f"RankSeries.from_dataframe（{len(df):,}行）",
+        lambda: RankSeries.from_dataframe(df),
+        repeat=3,
+    )
+
+    def per_series(count: int):
+        # 比較: 1系列ずつ最小二乗（一部の系列から推定）
+        for i in range(count):
+            observed = ~np.isnan(ranks[i])
+            np.linalg.lstsq(design[observed], np.log(ranks[i, observed]), rcond=None)
+
+    sample = min(asins, 5000)
+    start = time.perf_counter()
+    per_series(sample)
+    elapsed = (time.perf_counter() - start) * asins / sample
+    print(f"系列ごとの最小二乗（{sample:,}系列から推定）: {elapsed:.2f}s")
+
+    fitted = measured("RankForecaster.fit（一括）", lambda: forecaster.fit(series))
+    timed("予測 + 結果の表", lambda: fitted.to_frame(horizon=3), repeat=3)
+
+
+def bench_seasonality(asins: int, rows: int, runs: int):
+    """季節性プロファイル（収集1回分の更新・季節成分の計算）"""
+    import numpy as np
+    import pandas as pd
+
+    from seasonality import SeasonalProfiles
+
+    print(f"=== 季節性プロファイル ({asins:,}ASIN, {rows:,}行/回 × {runs}回) ===")
+
+    rng = np.random.default_rng(0)
+    categories = np.array(
+        [
+            "家電&カメラ",
+            "パソコン・周辺機器",
+            "ゲーム",
+            "おもちゃ",
+            "スポーツ&アウトドア",
+            "ホーム&キッチン",
+            "ファッション",
+            "ビューティー",
+        ]
+    )
+    start = pd.Timestamp("2026-01-05 10:00")
+
+    def make_run(i: int) -> tuple[pd.DataFrame, np.ndarray]:
+        picked = rng.choice(asins, rows, replace=False)
+        df = pd.DataFrame(
+            {
+                "asin": pd.array([f"B{a:09d}" for a in picked], dtype="string"),
+                "category": pd.Categorical(categories[picked % len(categories)]),
+                "timestamp": (start + pd.Timedelta(hours=8 * i)).strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+        )
+        return df, rng.normal(40, 15, rows)
+
+    batches = [make_run(i) for i in range(runs)]
+    profiles = SeasonalProfiles()
+
+    def update_all():
+        for df, scores in batches:
+            profiles.update(df, scores)
+
+    measured("全収集分の更新", update_all)
+    print(f"  ASIN: {len(profiles):,} / カテゴリ: {len(profiles.tables['category'])}")
+    timed("収集1回分の更新", lambda: profiles.update(*batches[0]))
+    df, scores = batches[-1]
+    timed(f"季節成分（{len(df):,}行）", lambda: profiles.offsets(df))
+    timed("季節性の強さ（ASIN）", lambda: profiles.strength("asin"), repeat=3)
+
+    with tempfile.TemporaryDirectory() as td:
+        path = profiles.save(Path(td) / "seasonality.npz")
+        print(f"  状態ファイル: {path.stat().st_size / 1024 / 1024:.1f}MB")
+        timed("読み込み", lambda: SeasonalProfiles.load(path), repeat=3)
+
+
+def bench_prices(asins: int, rows: int, runs: int):
+    """価格履歴（収集1回分の値下がり判定・更新）"""
+    import numpy as np
+    import pandas as pd
+
+    from prices import PriceIndex
+
+    print(f"=== 価格履歴の値下がり判定 ({asins:,}ASIN, {rows:,}行/回 × {runs}回) ===")
+
+    rng = np.random.default_rng(0)
+    base = rng.integers(500, 50_000, asins).astype(float)
+    start = pd.Timestamp("2026-01-01 10:00")
+
+    def make_run(i: int) -> pd.DataFrame:
+        picked = rng.choice(asins, rows, replace=False)
+        # 通常は±5%で揺らぎ、1%を20〜50%の値下がりにする
+        prices = base[picked] * rng.uniform(0.95, 1.05, rows)
+        sale = rng.random(rows) < 0.01
+        prices[sale] *= rng.uniform(0.5, 0.8, sale.sum())
+        return pd.DataFrame(
+            {
+                "asin": pd.array([f"B{a:09d}" for a in picked], dtype="string"),
+                "name": "商品",
+                "category": "家電",
+                "price": prices.round(),
+                "timestamp": (start + pd.Timedelta(hours=8 * i)).strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+        )
+
+    batches = [make_run(i) for i in range(runs)]
+    index = PriceIndex()
+
+    def update_all():
+        return sum(len(index.update(df)) for df in batches)
+
+    flagged = measured("全収集分の判定・更新", update_all)
+    print(f"  検出: {flagged:,}件 / 追跡ASIN: {len(index):,}")
+    later = [make_run(runs + i) for i in range(5)]
+    runs_iter = iter(later)
+    timed("収集1回分の判定・更新", lambda: index.update(next(runs_iter)))
+    timed(f"要約（{rows:,}ASIN）", lambda: index.summary(batches[0]["asin"]))
+
+    with tempfile.TemporaryDirectory() as td:
+        path = index.save(Path(td) / "price_index.npz")
+        print(f"  状態ファイル: {path.stat().st_size / 1024 / 1024:.1f}MB")
+        timed("読み込み", lambda: PriceIndex.load(path), repeat=3)
+
+
+def bench_dedup(asins: int, new: int):
+    """重複商品のクラスタリング（MinHash署名・LSH）"""
+    import numpy as np
+    import pandas as pd
+
+    from dedup import MinHasher, ProductClusters
+
+    print(f"=== 重複商品のクラスタリング ({asins:,}ASIN、新規{new:,}件/回) ===")
+
+    rng = np.random.default_rng(0)
+    words = np.array(
+        [f"{kana}{i}" for i, kana in enumerate("アイウエオカキクケコサシスセソタチツテト" * 50)]
+    )
+    colors = np.array(["ブラック", "ホワイト", "レッド", "ブルー"])
+    # 半数はいずれかの商品の色違い
+    base = [" ".join(rng.choice(words, 8)) for _ in range(asins // 2)]
+    names = base + [f"{name} {rng.choice(colors)}" for name in base]
+    df = pd.DataFrame({"asin": [f"B{i:09d}" for i in range(len(names))], "name": names})
+
+    def all_pairs(n: int):
+        # 比較: 全ペアの署名一致率（n件の標本）
+        signatures = MinHasher().signatures(names[:n])
+        return (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2) >= 0.6
+
+    timed("比較: 全ペアの一致率（2,000件）", lambda: all_pairs(2000), repeat=1)
+    clusters = ProductClusters()
+    measured(f"署名（{len(df):,}件）", lambda: clusters.update(df))
+    labels = measured("LSHクラスタリング", clusters.labels)
+    print(f"  クラスタ: {len(np.unique(labels)):,} / ASIN: {len(labels):,}")
+
+    batch = pd.DataFrame(
+        {"asin": [f"N{i:09d}" for i in range(new)], "name": rng.choice(names, new)}
+    )
+    timed(f"収集1回分の署名（新規{new:,}件）", lambda: ProductClusters().update(batch))
+
+    with tempfile.TemporaryDirectory() as td:
+        path = clusters.save(Path(td) / "product_clusters.npz")
+        print(f"  状態ファイル: {path.stat().st_size / 1024 / 1024:.1f}MB")
+        timed("読み込み", lambda: ProductClusters.load(path), repeat=3)
+
+
+def bench_search(names: int, queries: int):
+    """商品名の全文検索（n-gram転置索引）"""
+    import numpy as np
+    import pandas as pd
+
+    from search import ProductSearchIndex
+
+    print(f"=== 商品名の全文検索 ({names:,}件) ===")
+
+    rng = np.random.default_rng(0)
+    # よく出る語3つ + 型番2つ（よく出る語のn-gramは転置リストが数十万件になる）
+    words = np.array(
+        [
+            "ワイヤレス",
+            "イヤホン",
+            "ノイズキャンセリング",
+            "充電器",
+            "モバイルバッテリー",
+            "スマートウォッチ",
+            "キーボード",
+            "マウス",
+            "ケーブル",
+            "スピーカー",
+            "電動歯ブラシ",
+            "加湿器",
+            "ドライヤー",
+            "炊飯器",
+            "水筒",
+            "リュック",
+            "財布",
+            "Bluetooth",
+            "USB",
+            "Type-C",
+            "防水",
+            "大容量",
+            "軽量",
+            "折りたたみ",
+            "ブラック",
+            "ホワイト",
+            "レッド",
+            "ブルー",
+            "日本製",
+            "国内正規品",
+            "2026年モデル",
+            "ギフト",
+        ]
+    )
+    models = np.array(
+        [f"{prefix}-{i:05d}" for prefix in ("AX", "KB", "ZR", "MT") for i in range(25_000)]
+    )
+
+    def product_names(count: int) -> list[str]:
+        common, model = rng.choice(words, (count, 3)), rng.choice(models, (count, 2))
+        return [" ".join(row) for row in np.hstack([common, model])]
+
+    categories = np.array(["electronics", "computers", "home", "kitchen", "fashion"])
+    batch = 100_000
+    index = ProductSearchIndex()
+
+    def build():
+        for start in range(0, names, batch):
+            count = min(batch, names - start)
+            index.update(
+                pd.DataFrame(
+                    {
+                        "asin": [f"B{i:09d}" for i in range(start, start + count)],
+                        "name": product_names(count),
+                        "category": rng.choice(categories, count),
+                        "price": rng.integers(500, 50_000, count),
+                        "rating": rng.uniform(1, 5, count).round(1),
+                        "current_rank": rng.integers(1, 100_000, count),
+                    }
+                )
+            )
+        index.compact()
+
+    measured("索引の作成（10万件ずつ追加→まとめ直し）", build, memory=False)
+    print(f"  n-gram: {len(index.keys):,}種類 / 転置リスト: {len(index.postings):,}件")
+
+    patterns = [
+        "ワイヤレス イヤホン",
+        "財布",
+        "モバイルバッテリー 大容量",
+        "kb-01234",
+        "防水 スピーカー ブルー",
+    ]
+
+    filters = {"category": "electronics", "max_price": 10_000, "min_rating": 4.0}
+    for pattern in patterns:
+        timed(f"検索: {pattern}", lambda: index.search(pattern), repeat=queries)
+        timed(
+            f"検索: {pattern}（カテゴリ・価格・評価で絞り込み）",
+            lambda: index.search(pattern, **filters),
+            repeat=queries,
+        )
+
+    added = pd.DataFrame(
+        {
+            "asin": [f"N{i:09d}" for i in range(2000)],
+            "name": product_names(2000),
+        }
+    )
+    timed("収集1回分の追加（新規2,000件）", lambda: ProductSearchIndex().update(added))
+
+    with tempfile.TemporaryDirectory() as td:
+        path = measured("保存", lambda: index.save(Path(td) / "search_index.npz"), memory=False)
+        print(f"  状態ファイル: {path.stat().st_size / 1024 / 1024:.1f}MB")
+        timed("読み込み", lambda: ProductSearchIndex.load(path), repeat=1)
+
+
+def bench_products(asins: int, days: int, runs_per_day: int):
+    """商品ごとの時系列（ASIN別の列指向索引 vs 履歴ストア）"""
+    import json
+    from datetime import date, datetime, timedelta
+
+    import numpy as np
+    import pandas as pd
+
+    from history import HistoryStore
+    from products import ProductSeriesIndex
+
+    runs = days * runs_per_day
+    print(f"=== 商品ごとの時系列 ({asins:,}件 × {runs:,}回 = {asins * runs:,}点) ===")
+
+    rng = np.random.default_rng(0)
+    categories = np.array(["electronics", "computers", "home", "kitchen", "fashion"])
+    asin_list = [f"B{i:09d}" for i in range(asins)]
+    frame = pd.DataFrame(
+        {
+            "asin": asin_list,
+            "name": [f"商品{i}" for i in range(asins)],
+            "category": rng.choice(categories, asins),
+        }
+    )
+    start = datetime(2024, 1, 1, 4, 0, 0)
+    step = timedelta(hours=24 / runs_per_day)
+
+    def scrape(run: int, count: int = asins) -> pd.DataFrame:
+        return frame.head(count).assign(
+            current_rank=rng.integers(1, 1000, count),
+            price=rng.integers(500, 50_000, count).astype(float),
+            rating=rng.uniform(1, 5, count).round(1),
+            review_count=rng.integers(0, 5000, count),
+            timestamp=(start + step * run).isoformat(),
+        )
+
+    index = ProductSeriesIndex()
+
+    def build():
+        for run in range(runs):
+            df = scrape(run)
+            index.update(df, pd.Series(rng.normal(0, 10, asins), index=df.index))
+        index.compact()
+
+    measured(f"索引の作成（収集{runs:,}回分を追加→まとめ直し）", build, memory=False)
+    print(f"  1商品あたり: {index.size // asins:,}点")
+
+    asin = asin_list[asins // 2]
+    last = start + step * (runs - 1)
+    month_ago = (last - timedelta(days=30)).date()
+    series = timed("時系列: 全期間", lambda: index.history(asin), repeat=20)
+    print(f"  {len(series['timestamp']):,}点 / JSON: {len(json.dumps(series)) / 1024:.0f}KB")
+    timed("時系列: 直近30日", lambda: index.history(asin, start=month_ago), repeat=20)
+    timed(
+        "時系列: 1年・カテゴリ指定",
+        lambda: index.history(
+            asin, date(2025, 1, 1), date(2025, 12, 31), str(frame.loc[asins // 2, "category"])
+        ),
+        repeat=20,
+    )
+    timed("詳細（最新値・全期間の要約）", lambda: index.detail(asin), repeat=20)
+
+    added = scrape(runs)
+    measured("収集1回分の追加", lambda: index.update(added), memory=False)
+    timed("時系列: 全期間（差分あり）", lambda: index.history(asin), repeat=20)
+
+    with tempfile.TemporaryDirectory() as td:
+        path = measured("保存", lambda: index.save(Path(td) / "product_series.npz"), memory=False)
+        print(f"  状態ファイル: {path.stat().st_size / 1024 / 1024:.1f}MB")
+        timed("読み込み", lambda: ProductSeriesIndex.load(path), repeat=1)
+
+        # 比較: 同じ点数の履歴ストア（ASINは主キーの先頭のため、1商品の検索は件数に比例）
+        sample = min(asins, 20)
+        store = HistoryStore(Path(td) / "history.db")
+        measured(
+            f"履歴ストアの作成（{sample}件分）",
+            lambda: [store.add_rows(scrape(run, sample).to_dict("records")) for run in range(runs)],
+            memory=False,
+        )
+        timed(
+            "履歴ストア: 全期間",
+            lambda: store.asin_history(asin_list[sample // 2], limit=None),
+            repeat=5,
+        )
+
+
+def bench_watchlist(users: int, keywords: int, products: int):
+    """ウォッチリストの照合（Aho-Corasick vs ユーザーごとの部分文字列検索）"""
+    import numpy as np
+    import pandas as pd
+
+    from dedup import normalize_name
+    from watchlist import Watchlist, WatchlistMatcher
+
+    print(
+        f"=== ウォッチリストの照合 ({users:,}人 × ASIN10件・キーワード{keywords}件、1%がカテゴリも登録"
+        f" / 商品{products:,}件) ==="
+    )
+
+    rng = np.random.default_rng(0)
+    syllables = np.array(
+        list(
+            "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン"
+        )
+    )
+    vocabulary = np.array(
+        ["".join(rng.choice(syllables, rng.integers(4, 8))) for _ in range(50_000)]
+    )
+    categories = np.array(["electronics", "computers", "home", "kitchen", "fashion"])
+    watchlists = [
+        Watchlist(
+            f"user{u}",
+            asins=[f"B{i:09d}" for i in rng.integers(0, 100_000, 10)],
+            keywords=rng.choice(vocabulary, keywords, replace=False).tolist(),
+            categories=rng.choice(categories, 1).tolist() if u % 100 == 0 else [],
+        )
+        for u in range(users)
+    ]
+    df = pd.DataFrame(
+        {
+            "asin": [f"B{i:09d}" for i in rng.integers(0, 100_000, products)],
+            "name": [" ".join(rng.choice(vocabulary, 8)) for _ in range(products)],
+            "category": rng.choice(categories, products),
+            "current_rank": rng.integers(1, 100, products),
+            "previous_rank": np.where(
+                rng.random(products) < 0.1, np.nan, rng.integers(1, 100, products)
+            ),
+            "timestamp": "2026-01-01T10:00:00",
+        }
+    )
+
+    matcher = measured(
+        "照合器の作成（全ユーザー分）", lambda: WatchlistMatcher(watchlists), memory=False
+    )
+    print(f"  キーワード: {len(matcher.automaton):,}種類 / 状態数: {len(matcher.automaton.goto):,}")
+    alerts = timed("収集1回分の照合", lambda: matcher.match(df), repeat=3)
+    print(f"  一致: {len(alerts):,}件")
+
+    # 比較: ユーザーごとにキーワードを部分文字列検索（一部のユーザーで測り、全ユーザー分に換算）
+    sample = min(users, 200)
+    names = [normalize_name(name) for name in df["name"].tolist()]
+
+    def naive():
+        for watchlist in watchlists[:sample]:
+            for keyword in watchlist.keywords:
+                [name for name in names if keyword in name]
+
+    start = time.perf_counter()
+    naive()
+    elapsed = time.perf_counter() - start
+    print(
+        f"比較: ユーザーごとの部分文字列検索（{sample}人）: {elapsed * 1000:.0f}ms"
+        f" → {users:,}人で約{elapsed * users / sample:.1f}s"
+    )
+
+
+def bench_sparkline(items: int, points: int):
+    """スパークライン一括生成"""
+    import numpy as np
+
+    from sparkline import render_sparklines
+
+    print(f"=== スパークライン生成 ({items}件 × {points}点) ===")
+    rng = np.random.default_rng(0)
+    matrix = rng.integers(1, 100, size=(items, points)).astype(float)
+    matrix[rng.random(matrix.shape) < 0.05] = np.nan
+
+    svgs = timed("render_sparklines", lambda: render_sparklines(matrix))
+    print(f"平均SVGサイズ: {sum(map(len, svgs)) / len(svgs):.0f} bytes")
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="EcomTrendAI ベンチマーク")
+
+    subparsers = parser.add_subparsers(dest="command", help="コマンド")
+
+    # sparkline
+    sparkline_parser = subparsers.add_parser("sparkline", help="スパークライン生成")
+    sparkline_parser.add_argument("--items", type=int, default=1000)
+    sparkline_parser.add_argument("--points", type=int, default=30)
+
+    # export
+    export_parser = subparsers.add_parser("export", help="履歴エクスポート")
+    export_parser.add_argument("--rows", type=int, default=300_000)
+    export_parser.add_argument("--no-memory", action="store_true", help="メモリ計測を省略")
+
+    # storage
+    storage_parser = subparsers.add_parser("storage", help="生データ読み込み（CSV vs 列指向）")
+    storage_parser.add_argument("--days", type=int, default=365)
+    storage_parser.add_argument("--rows-per-day", type=int, default=2000)
+
+    # history
+    history_parser = subparsers.add_parser("history", help="ASIN履歴の検索")
+    history_parser.add_argument("--days", type=int, default=730)
+    history_parser.add_argument("--rows-per-day", type=int, default=2000)
+
+    # ingest
+    ingest_parser = subparsers.add_parser("ingest", help="前回ランクの補完")
+    ingest_parser.add_argument("--known", type=int, default=100_000)
+    ingest_parser.add_argument("--rows", type=int, default=2000)
+
+    # momentum
+    momentum_parser = subparsers.add_parser("momentum", help="モメンタム特徴量の更新")
+    momentum_parser.add_argument("--known", type=int, default=100_000)
+    momentum_parser.add_argument("--rows", type=int, default=2000)
+    momentum_parser.add_argument("--days", type=int, default=30)
+
+    # anomaly
+    anomaly_parser = subparsers.add_parser("anomaly", help="急上昇の逐次検知")
+    anomaly_parser.add_argument("--asins", type=int, default=100_000)
+    anomaly_parser.add_argument("--rows", type=int, default=2000)
+    anomaly_parser.add_argument("--runs", type=int, default=1000)
+
+    # analyze
+    analyze_parser = subparsers.add_parser("analyze", help="カテゴリ別トレンド分析")
+    analyze_parser.add_argument("--categories", type=int, default=100)
+    analyze_parser.add_argument("--rows", type=int, default=100_000)
+
+    # items
+    items_parser = subparsers.add_parser("items", help="TrendItemの生成")
+    items_parser.add_argument("--rows", type=int, default=100_000)
+
+    # dtypes
+    dtypes_parser = subparsers.add_parser("dtypes", help="生データの読み込み型")
+    dtypes_parser.add_argument("--days", type=int, default=365)
+    dtypes_parser.add_argument("--rows-per-day", type=int, default=2000)
+
+    # history-chunks
+    chunks_parser = subparsers.add_parser(
+        "history-chunks", help="履歴のトレンド分析（分割読み込み）"
+    )
+    chunks_parser.add_argument("--days", type=int, default=365)
+    chunks_parser.add_argument("--rows-per-day", type=int, default=10_000)
+    chunks_parser.add_argument("--budgets", type=float, nargs="+", default=[16, 64, 256])
+
+    # backfill
+    backfill_parser = subparsers.add_parser("backfill", help="過去データの再スコアリング")
+    backfill_parser.add_argument("--days", type=int, default=60)
+    backfill_parser.add_argument("--rows-per-day", type=int, default=20_000)
+    backfill_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+
+    # backtest
+    backtest_parser = subparsers.add_parser("backtest", help="トレンドスコアのバックテスト")
+    backtest_parser.add_argument("--days", type=int, default=365)
+    backtest_parser.add_argument("--rows-per-day", type=int, default=2000)
+    backtest_parser.add_argument("--levels", type=int, default=3, help="構成要素ごとの重みの候補数")
+    backtest_parser.add_argument("--workers", type=int, default=None)
+
+    # scoring
+    scoring_parser = subparsers.add_parser("scoring", help="スコア定義による一括計算")
+    scoring_parser.add_argument("--rows", type=int, default=100_000)
+    scoring_parser.add_argument("--scores", type=int, default=5, help="カスタムスコアの件数")
+
+    # forecast
+    forecast_parser = subparsers.add_parser("forecast", help="ランク予測")
+    forecast_parser.add_argument("--asins", type=int, default=100_000)
+    forecast_parser.add_argument("--days", type=int, default=28)
+
+    # seasonality
+    seasonality_parser = subparsers.add_parser("seasonality", help="季節性プロファイル")
+    seasonality_parser.add_argument("--asins", type=int, default=100_000)
+    seasonality_parser.add_argument("--rows", type=int, default=20_000)
+    seasonality_parser.add_argument("--runs", type=int, default=90)
+
+    # prices
+    prices_parser = subparsers.add_parser("prices", help="価格履歴の値下がり判定")
+    prices_parser.add_argument("--asins", type=int, default=100_000)
+    prices_parser.add_argument("--rows", type=int, default=20_000)
+    prices_parser.add_argument("--runs", type=int, default=90)
+
+    # dedup
+    dedup_parser = subparsers.add_parser("dedup", help="重複商品のクラスタリング")
+    dedup_parser.add_argument("--asins", type=int, default=100_000)
+    dedup_parser.add_argument("--new", type=int, default=2000)
+
+    # search
+    search_parser = subparsers.add_parser("search", help="商品名の全文検索")
+    search_parser.add_argument("--names", type=int, default=1_000_000)
+    search_parser.add_argument("--queries", type=int, default=20)
+
+    # products
+    products_parser = subparsers.add_parser("products", help="商品ごとの時系列")
+    products_parser.add_argument("--asins", type=int, default=2000)
+    products_parser.add_argument("--days", type=int, default=1095)
+    products_parser.add_argument("--runs-per-day", type=int, default=4)
+
+    # watchlist
+    watchlist_parser = subparsers.add_parser("watchlist", help="ウォッチリストの照合")
+    watchlist_parser.add_argument("--users", type=int, default=10_000)
+    watchlist_parser.add_argument("--keywords", type=int, default=10)
+    watchlist_parser.add_argument("--products", type=int, default=2000)
+
+    args = parser.parse_args()
+
+    if args.command == "sparkline":
+        bench_sparkline(args.items, args.points)
+    elif args.command == "export":
+        bench_export(args.rows, memory=not args.no_memory)
+    elif args.command == "storage":
+        bench_storage(args.days, args.rows_per_day)
+    elif args.command == "history":
+        bench_history(args.days, args.rows_per_day)
+    elif args.command == "ingest":
+        bench_ingest(args.known, args.rows)
+    elif args.command == "momentum":
+        bench_momentum(args.known, args.rows, args.days)
+    elif args.command == "anomaly":
+        bench_anomaly(args.asins, args.rows, args.runs)
+    elif args.command == "analyze":
+        bench_analyze(args.categories, args.rows)
+    elif args.command == "items":
+        bench_trend_items(args.rows)
+    elif args.command == "dtypes":
+        bench_dtypes(args.days, args.rows_per_day)
+    elif args.command == "history-chunks":
+        bench_history_chunks(args.days, args.rows_per_day, args.budgets)
+    elif args.command == "backfill":
+        bench_backfill(args.days, args.rows_per_day, args.workers)
+    elif args.command == "backtest":
+        bench_backtest(args.days, args.rows_per_day, args.levels, args.workers)
+    elif args.command == "scoring":
+        bench_scoring(args.rows, args.scores)
+    elif args.command == "forecast":
+        bench_forecast(args.asins, args.days)
+    elif args.command == "seasonality":
+        bench_seasonality(args.asins, args.rows, args.runs)
+    elif args.command == "prices":
+        bench_prices(args.asins, args.rows, args.runs)
+    elif args.command == "dedup":
+        bench_dedup(args.asins, args.new)
+    elif args.command == "search":
+        bench_search(args.names, args.queries)
+    elif args.command == "products":
+        bench_products(args.asins, args.days, args.runs_per_day)
+    elif args.command == "watchlist":
+        bench_watchlist(args.users, args.keywords, args.products)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,21 +5,158 @@
 収集したデータからトレンドを検出・分析
 """
 
+import heapq
 import math
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Generator, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 from loguru import logger
 
-from config import config
+from config import config, get_affiliate_url
+from forecast import FORECAST_COLUMNS, RankForecaster, forecast_ranks
+from reporter import ReportView, build_report_view
+from scoring import BUILTIN_SCORES, DEFAULT_SCORE, DEFAULT_TERMS, ScoreRegistry, default_scores_path
+
+# pyarrowが利用可能かチェック（文字列列をArrow形式で保持）
+try:
+    import pyarrow  # noqa: F401
+
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# 文字列列の型（pyarrowがあればArrow形式、なければpandasの文字列型）
+STRING_DTYPE = pd.StringDtype("pyarrow") if PYARROW_AVAILABLE else pd.StringDtype()
+
+# 生データCSVの読み込み型
+# - 繰り返しの多い文字列はカテゴリ型
+# - 数値はfloat32（順位・件数も欠損値を持てるようfloat32。1,600万までの整数は正確に表せる。
+#   nullable整数型（Int32）はCSVのパースが1列あたり約2ms/2,000行遅い）
+RAW_DTYPES = {
+    "asin": STRING_DTYPE,
+    "name": STRING_DTYPE,
+    "category": "category",
+    "current_rank": "float32",
+    "previous_rank": "float32",
+    "rank_change": "float32",
+    "rank_change_percent": "float32",
+    "price": "float32",
+    "currency": "category",
+    "review_count": "float32",
+    "rating": "float32",
+    "timestamp": "category",  # 1回の収集で同じ値
+    "source": "category",
+}
+
+# 分析で読み込む列（affiliate_url はASINから生成するため読み込まない）
+ANALYSIS_COLUMNS = [
+    "asin",
+    "name",
+    "category",
+    "current_rank",
+    "previous_rank",
+    "rank_change",
+    "rank_change_percent",
+    "price",
+    "review_count",
+    "rating",
+    "timestamp",
+]
+
+
+def read_raw_csv(path: Path, columns: Optional[list[str]] = None) -> pd.DataFrame:
+    """
+    生データCSVを型を指定して読み込み
+
+    Args:
+        path: CSVファイル
+        columns: 読み込む列（省略時はANALYSIS_COLUMNS、ファイルにない列は無視）
+
+    Returns:
+        DataFrame（RAW_DTYPESの型）
+    """
+    wanted = set(columns or ANALYSIS_COLUMNS)
+    return pd.read_csv(
+        path,
+        encoding="utf-8-sig",
+        usecols=lambda name: name in wanted,
+        dtype={name: dtype for name, dtype in RAW_DTYPES.items() if name in wanted},
+    )
+
+
+def iter_raw_csv(
+    path: Path, chunk_rows: int, columns: Optional[list[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    生データCSVを最大chunk_rows行ずつ読み込み（型・列は read_raw_csv と同じ）
+
+    Args:
+        path: CSVファイル
+        chunk_rows: 1回に返す最大行数
+        columns: 読み込む列（省略時はANALYSIS_COLUMNS）
+    """
+    wanted = set(columns or ANALYSIS_COLUMNS)
+    with pd.read_csv(
+        path,
+        encoding="utf-8-sig",
+        usecols=lambda name: name in wanted,
+        dtype={name: dtype for name, dtype in RAW_DTYPES.items() if name in wanted},
+        chunksize=chunk_rows,
+    ) as reader:
+        yield from reader
+
+
+def concat_raw_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    read_raw_csv の結果を結合（カテゴリ型を保ったまま）
+
+    カテゴリの集合が異なるとobject型に戻るため、先に和集合へ揃える
+    """
+    if len(frames) == 1:
+        return frames[0]
+    for name in frames[0].columns:
+        if not isinstance(frames[0][name].dtype, pd.CategoricalDtype):
+            continue
+        categories = pd.api.types.union_categoricals(
+            [f[name] for f in frames if name in f.columns]
+        ).categories
+        for frame in frames:
+            if name in frame.columns:
+                frame[name] = frame[name].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_raw_files(files: list[Path], columns: Optional[list[str]] = None) -> pd.DataFrame:
+    """
+    生データファイルをまとめて読み込み（時刻順）
+
+    CSVのほか、列指向ストア（storage.ColumnarStore）のパーティションファイルも読み込める
+
+    Args:
+        files: 生データCSV、またはパーティションファイル（archive.group_raw_files_by_day の1日分など）
+        columns: 読み込む列（省略時はANALYSIS_COLUMNS）
+    """
+    if files and files[0].suffix != ".csv":
+        from storage import open_part_store
+
+        return open_part_store(files[0]).read_files(files, columns or ANALYSIS_COLUMNS)
+    return concat_raw_frames([read_raw_csv(f, columns) for f in files])
+
+
+@dataclass(slots=True)
+class TrendItem:
+    """
+    トレンド分析結果
 
+    __slots__ により1件あたりの属性辞書を持たない（大量件数のエクスポート向け）。
+    DataFrameからの一括生成は from_dataframe を使う。
+    """
 
-@dataclass
-class TrendItem:
-    """トレンド分析結果"""
     asin: str
     name: str
     category: str
@@ -30,21 +167,522 @@ class TrendItem:
     rating: Optional[float]
     affiliate_url: str
     trend_score: float  # 総合トレンドスコア
+    previous_rank: Optional[int] = None  # 前回の観測ランク
+    rank_change: Optional[int] = None  # 前回ランク - 現在ランク（正=上昇）
+    velocity: Optional[float] = None  # ランク上昇速度（位/日、正=上昇）
+    acceleration: Optional[float] = None  # 上昇速度の変化（位/日²）
+    ewma_rank: Optional[float] = None  # 指数平滑化ランク
+    days_in_chart: Optional[int] = None  # ランキング掲載日数
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> list["TrendItem"]:
+        """
+        スコア計算済みのDataFrameから一括生成
+
+        行ごとの Series を作らず、列単位でPythonのリストに変換してから組み立てる
+
+        Args:
+            df: asin, name, category, current_rank, trend_score を含むDataFrame
+                （その他の列は省略可、欠損値はNone。affiliate_url がなければASINから生成）
+
+        Returns:
+            dfと同順のTrendItemリスト
+        """
+        if df.empty:
+            return []
+        asins = df["asin"].tolist()
+
+        # カテゴリ名は種類が少ないため、同じ文字列オブジェクトを共有する
+        categories = df["category"].astype("category")
+        names = categories.cat.categories.tolist()
+
+        # アフィリエイトURLは保存せず、返す件数分だけASINから生成する
+        if "affiliate_url" in df.columns:
+            urls = [
+                url if isinstance(url, str) and url else get_affiliate_url(asin)
+                for asin, url in zip(asins, df["affiliate_url"].tolist())
+            ]
+        else:
+            urls = [get_affiliate_url(asin) for asin in asins]
+
+        columns = zip(
+            asins,
+            df["name"].tolist(),
+            [names[code] if code >= 0 else None for code in categories.cat.codes.tolist()],
+            _numeric(df, "rank_change_percent").fillna(0).round(2).tolist(),
+            df["current_rank"].astype(int).tolist(),
+            _optional_column(df, "price", float),
+            _optional_column(df, "review_count", int),
+            _optional_column(df, "rating", float),
+            urls,
+            df["trend_score"].astype(float).tolist(),
+            _optional_column(df, "previous_rank", int),
+            _optional_column(df, "rank_change", int),
+            _optional_column(df, "velocity", float),
+            _optional_column(df, "acceleration", float),
+            _optional_column(df, "ewma_rank", float),
+            _optional_column(df, "days_in_chart", int),
+        )
+        return [cls(*values) for values in columns]
+
+
+def _numeric(df: pd.DataFrame, name: str) -> pd.Series:
+    """数値列をfloat64で取得（列がない場合・欠損値はNaN）"""
+    if name not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[name], errors="coerce").astype(float)
+
+
+def _optional_column(df: pd.DataFrame, name: str, kind: type) -> list:
+    """
+    列をPythonのリストに一括変換（列がない・欠損値はNone）
+
+    Args:
+        kind: int または float（floatは小数第2位まで）
+    """
+    if name not in df.columns:
+        return [None] * len(df)
+    values = _numeric(df, name)
+    values = values.round().astype("Int64") if kind is int else values.round(2)
+    converted: list = values.astype(object).where(values.notna(), None).tolist()
+    return converted
+
+
+# 分割分析でチャンクの行数を見積もる際の標本の行数
+_SAMPLE_ROWS = 1000
+
+# 読み込んだチャンクに対するスコア計算中の作業メモリの倍率（コピー・特徴量列・ソート）
+_WORKING_SET_FACTOR = 4
+
+
+def estimate_chunk_rows(sample: pd.DataFrame, memory_budget_mb: float) -> int:
+    """
+    メモリ予算に収まる1チャンクの行数を見積もり
+
+    Args:
+        sample: 読み込み済みの標本（RAW_DTYPESの型）
+        memory_budget_mb: 1チャンクに使うメモリの目安（MB）
+
+    Returns:
+        行数（最低 _SAMPLE_ROWS 行）
+    """
+    bytes_per_row = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    rows = memory_budget_mb * 1024 * 1024 / (bytes_per_row * _WORKING_SET_FACTOR)
+    return max(int(rows), _SAMPLE_ROWS)
+
+
+def iter_whole_runs(chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """
+    チャンクの末尾の収集回を次のチャンクに回し、収集1回分が複数のチャンクに分かれないようにする
+
+    行順は変えない（順に結合すると入力を結合した場合と同じ）
+
+    Args:
+        chunks: 時刻順のチャンク
+    """
+    pending: Optional[pd.DataFrame] = None
+    for chunk in chunks:
+        if pending is not None:
+            chunk = concat_raw_frames([pending, chunk])
+        timestamps = chunk["timestamp"].astype(object).to_numpy()
+        last = timestamps[-1]
+        start = len(chunk)
+        while start > 0 and timestamps[start - 1] == last:
+            start -= 1
+        if start > 0:
+            yield chunk.iloc[:start].reset_index(drop=True)
+        pending = chunk.iloc[start:].reset_index(drop=True)
+    if pending is not None:
+        yield pending
+
+
+# 重複を除く分析で、クラスタを引く候補の行数（上位件数の倍率）
+_DEDUP_CANDIDATE_FACTOR = 10
+
+
+# トレンドスコアの構成要素（scoring.DEFAULT_TERMS、既定のスコアは重み付きの合計）
+TREND_SCORE_COMPONENTS = list(DEFAULT_TERMS)
+
+
+class StreamingTopK:
+    """
+    キーごとのスコア上位K件
+
+    全行を保持せずに、安定ソート + head(K) と同じ結果（同点は先に来た行が上位）を得る。
+    キーごとのヒープは (スコア, -通し番号) が最小の行を先頭に持ち、
+    K件を超えたら先頭と入れ替える。
+    """
+
+    def __init__(self, k: int):
+        """
+        Args:
+            k: キーごとに保持する件数
+        """
+        self.k = k
+        self.heaps: dict = {}
+
+    def push(self, key, score: float, seq: int, row: dict) -> None:
+        """
+        行を追加
+
+        Args:
+            key: 集計キー（カテゴリなど）
+            score: スコア
+            seq: 全体での通し番号（同点の順序）
+            row: 行の値
+        """
+        if self.k <= 0:
+            return
+        heap = self.heaps.setdefault(key, [])
+        entry = (score, -seq, row)
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def push_frame(self, df: pd.DataFrame, keys, seqs) -> None:
+        """
+        DataFrameの各行を追加
+
+        Args:
+            df: trend_score を含むDataFrame
+            keys: 行ごとの集計キー
+            seqs: 行ごとの通し番号
+        """
+        for key, score, seq, row in zip(
+            keys, df["trend_score"].tolist(), seqs, df.to_dict("records")
+        ):
+            self.push(key, score, seq, row)
+
+    def top(self, key) -> list[dict]:
+        """キーの上位行（スコア降順、同点は通し番号順）"""
+        return [
+            row for _, _, row in sorted(self.heaps.get(key, []), key=lambda e: e[:2], reverse=True)
+        ]
+
+
+# モメンタム特徴量の列
+MOMENTUM_COLUMNS = ["velocity", "acceleration", "ewma_rank", "days_in_chart"]
+
+# 状態配列: 名前 → (dtype, 初期値)
+_MOMENTUM_ARRAYS = {
+    "last_rank": (np.float32, np.nan),
+    "last_seen": (np.float64, np.nan),  # エポック秒
+    "last_day": (np.int32, -1),  # エポック日
+    "observations": (np.int32, 0),
+    "velocity": (np.float32, 0.0),
+    "acceleration": (np.float32, 0.0),
+    "ewma_rank": (np.float32, np.nan),
+    "days_in_chart": (np.int32, 0),
+}
+
+
+def default_momentum_path() -> Path:
+    """モメンタム状態ファイルの既定パス"""
+    return Path(config.paths.data_dir) / "momentum_state.npz"
+
+
+class MomentumState:
+    """
+    ASINごとのモメンタム特徴量の状態表
+
+    ASIN → 配列の位置を辞書で引き、状態は列ごとのNumPy配列に持つ。
+    収集1回分の更新は今回掲載された商品数に比例し、過去の履歴は読み直さない。
+
+    - velocity: (前回ランク - 今回ランク) / 経過日数
+    - acceleration: velocity の変化 / 経過日数（3回目の観測から）
+    - ewma_rank: 半減期 half_life_hours の指数平滑化ランク（観測間隔を考慮）
+    - days_in_chart: 掲載された日数（同日の複数回収集は1日）
+
+    同じASINが複数カテゴリに掲載されている場合は最上位のランクを使う。
+    """
+
+    def __init__(self, half_life_hours: float = 24.0, capacity: int = 1024):
+        """
+        Args:
+            half_life_hours: EWMAの半減期（時間）
+            capacity: 配列の初期容量
+        """
+        self.half_life_hours = half_life_hours
+        self.asins: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.arrays = {
+            name: np.full(capacity, fill, dtype=dtype)
+            for name, (dtype, fill) in _MOMENTUM_ARRAYS.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.asins)
+
+    def _reserve(self, size: int) -> None:
+        """容量が足りなければ倍に拡張"""
+        capacity = len(self.arrays["last_rank"])
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name, (dtype, fill) in _MOMENTUM_ARRAYS.items():
+            grown = np.full(capacity, fill, dtype=dtype)
+            grown[: len(self.asins)] = self.arrays[name][: len(self.asins)]
+            self.arrays[name] = grown
+
+    def _position(self, asin: str) -> int:
+        position = self.positions.get(asin)
+        if position is None:
+            position = len(self.asins)
+            self._reserve(position + 1)
+            self.asins.append(asin)
+            self.positions[asin] = position
+        return position
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        収集1回分で状態を更新
+
+        前回の観測以前の時刻の行は無視する（再取り込みで状態は変わらない）
+
+        Args:
+            df: asin, current_rank, timestamp を含むDataFrame
+
+        Returns:
+            更新したASIN数
+        """
+        df = df[["asin", "current_rank", "timestamp"]].dropna()
+        if df.empty:
+            return 0
+
+        timestamps = pd.to_datetime(df["timestamp"], format="ISO8601").to_numpy()
+        observed = (
+            pd.DataFrame(
+                {
+                    "asin": df["asin"].astype(str).to_numpy(),
+                    "rank": df["current_rank"].to_numpy(dtype=float),
+                    "t": timestamps.astype("datetime64[s]").astype(np.int64),
+                }
+            )
+            .groupby("asin", sort=False)
+            .agg(rank=("rank", "min"), t=("t", "max"))
+        )
+        idx = np.fromiter(
+            (self._position(a) for a in observed.index), dtype=np.int64, count=len(observed)
+        )
+        rank = observed["rank"].to_numpy()
+        t = observed["t"].to_numpy(dtype=np.float64)
+
+        a = self.arrays
+        last_seen = a["last_seen"][idx]
+        newer = np.isnan(last_seen) | (t > last_seen)
+        idx, rank, t, last_seen = idx[newer], rank[newer], t[newer], last_seen[newer]
+
+        count = a["observations"][idx]
+        first = count == 0
+        elapsed_days = np.where(first, 1.0, (t - np.where(first, t, last_seen)) / 86400)
+
+        velocity = np.where(first, 0.0, (a["last_rank"][idx] - rank) / elapsed_days)
+        acceleration = np.where(count >= 2, (velocity - a["velocity"][idx]) / elapsed_days, 0.0)
+        alpha = 1 - 0.5 ** (elapsed_days * 24 / self.half_life_hours)
+        ewma = np.where(first, rank, a["ewma_rank"][idx] + alpha * (rank - a["ewma_rank"][idx]))
+        day = (t // 86400).astype(np.int32)
+
+        a["days_in_chart"][idx] += (day != a["last_day"][idx]).astype(np.int32)
+        a["last_day"][idx] = day
+        a["velocity"][idx] = velocity
+        a["acceleration"][idx] = acceleration
+        a["ewma_rank"][idx] = ewma
+        a["last_rank"][idx] = rank
+        a["last_seen"][idx] = t
+        a["observations"][idx] = count + 1
+        return len(idx)
+
+    def features(self, asins) -> pd.DataFrame:
+        """
+        指定ASINの特徴量（未観測のASINは欠損値）
+
+        Returns:
+            MOMENTUM_COLUMNS の列を持つDataFrame（asinsと同順）
+        """
+        positions = np.fromiter(
+            (self.positions.get(str(a), -1) for a in asins), dtype=np.int64, count=len(asins)
+        )
+        known = positions >= 0
+        result = {}
+        for name in MOMENTUM_COLUMNS:
+            values = np.full(len(positions), np.nan)
+            values[known] = self.arrays[name][positions[known]]
+            result[name] = values
+        return pd.DataFrame(result)
+
+    def add_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        dfの asin 列に対応する特徴量の列（MOMENTUM_COLUMNS）を追加して返す
+
+        Args:
+            df: asin 列を含むDataFrame（直接変更する）
+        """
+        features = self.features(df["asin"].to_numpy())
+        for name in MOMENTUM_COLUMNS:
+            df[name] = features[name].to_numpy()
+        return df
+
+    def replay(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        dfの収集回を順に反映し、各行にその回の時点の特徴量の列を追加して返す
+
+        現在の状態（後の収集回の値）を過去の行に付けないよう、履歴の分析で使う。
+        収集1回分はひとつのdfにまとめて渡す（iter_whole_runs）
+
+        Args:
+            df: asin, current_rank, timestamp を含む時刻順のDataFrame（直接変更する）
+        """
+        values = np.full((len(df), len(MOMENTUM_COLUMNS)), np.nan)
+        for _, run in df.groupby("timestamp", sort=False, observed=True):
+            self.update(run)
+            rows = df.index.get_indexer(run.index)
+            values[rows] = self.features(run["asin"].to_numpy())[MOMENTUM_COLUMNS].to_numpy()
+        for i, name in enumerate(MOMENTUM_COLUMNS):
+            df[name] = values[:, i]
+        return df
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """状態を .npz に書き出し（一時ファイル経由）"""
+        path = path or default_momentum_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        size = len(self.asins)
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                allow_pickle=False,
+                asins=np.array(self.asins, dtype=str),
+                half_life_hours=self.half_life_hours,
+                **{name: values[:size] for name, values in self.arrays.items()},
+            )
+        tmp_path.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "MomentumState":
+        """状態を読み込み（ファイルがなければ空の状態）"""
+        path = path or default_momentum_path()
+        if not path.exists():
+            return cls()
+        with np.load(path) as data:
+            asins = data["asins"].tolist()
+            state = cls(float(data["half_life_hours"]), capacity=max(len(asins), 1024))
+            for name in _MOMENTUM_ARRAYS:
+                state.arrays[name][: len(asins)] = data[name]
+        state.asins = asins
+        state.positions = {asin: i for i, asin in enumerate(asins)}
+        return state
+
+    @classmethod
+    def from_history(cls, store, half_life_hours: float = 24.0) -> "MomentumState":
+        """
+        履歴ストアの全観測値から状態を再構築（初回のみ）
+
+        Args:
+            store: history.HistoryStore
+        """
+        state = cls(half_life_hours)
+        rows = pd.DataFrame(store.iter_rows(), columns=["asin", "current_rank", "timestamp"])
+        for _, run in rows.groupby("timestamp", sort=True):
+            state.update(run)
+        return state
+
+    @classmethod
+    def open(cls, path: Optional[Path] = None) -> "MomentumState":
+        """
+        状態を開く
+
+        状態ファイルがなく履歴ストアがある場合は、履歴ストアから初期化する
+        """
+        from history import HistoryStore, default_db_path
+
+        path = path or default_momentum_path()
+        if not path.exists() and default_db_path().exists():
+            state = cls.from_history(HistoryStore())
+            logger.info(f"モメンタム状態を履歴ストアから初期化: {len(state)}件")
+            return state
+        return cls.load(path)
 
 
 class TrendAnalyzer:
     """トレンド分析エンジン"""
 
-    def __init__(self, data_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        data_dir: Optional[Path] = None,
+        store=None,
+        momentum: Optional[MomentumState] = None,
+        scoring: Optional[ScoreRegistry] = None,
+        seasonality=None,
+        clusters=None,
+        anomaly_log: Optional[Path] = None,
+    ):
+        """
+        Args:
+            data_dir: 生データCSVのディレクトリ
+            store: 列指向ストア（storage.ColumnarStore）。省略時は
+                RAW_STORAGE_FORMAT が列指向で、data_dir未指定の場合に使用
+            momentum: モメンタム状態。省略時は data_dir未指定で
+                data/momentum_state.npz がある場合に読み込む
+            scoring: スコア定義。省略時は data_dir未指定で
+                data/scores.json がある場合に読み込み、なければ既定のスコアのみ
+            seasonality: 季節性プロファイル（seasonality.SeasonalProfiles）。省略時は
+                data_dir未指定で data/seasonality.npz がある場合に読み込む
+            clusters: 重複商品のクラスタ（dedup.ProductClusters）。省略時は data_dir未指定で
+                data/product_clusters.npz がある場合に、重複を除く分析で初めて読み込む
+            anomaly_log: 収集時の異常検知の検出結果（anomaly.AnomalyDetector）。省略時は
+                data_dir未指定で data/anomalies.csv がある場合に使用
+        """
         self.data_dir = data_dir or config.paths.raw_data_dir
+        if store is None and data_dir is None and config.storage.is_columnar:
+            from storage import ColumnarStore
+
+            store = ColumnarStore(file_format=config.storage.raw_format)
+        self.store = store
+        if momentum is None and data_dir is None and default_momentum_path().exists():
+            momentum = MomentumState.load()
+        self.momentum = momentum
+        if scoring is None:
+            scoring = (
+                ScoreRegistry.load()
+                if data_dir is None and default_scores_path().exists()
+                else BUILTIN_SCORES
+            )
+        self.scoring = scoring
+        if seasonality is None and data_dir is None:
+            from seasonality import SeasonalProfiles, default_seasonality_path
+
+            if default_seasonality_path().exists():
+                seasonality = SeasonalProfiles.load()
+        self.seasonality = seasonality
+        self.clusters = clusters
+        self._load_clusters = clusters is None and data_dir is None
+        if anomaly_log is None and data_dir is None:
+            from anomaly import default_log_path
+
+            if default_log_path().exists():
+                anomaly_log = default_log_path()
+        self.anomaly_log = anomaly_log
 
     def load_latest_data(self) -> Optional[pd.DataFrame]:
         """
         最新のデータファイルを読み込み
 
+        ANALYSIS_COLUMNS のみを RAW_DTYPES の型で読み込む
+
         Returns:
             DataFrameまたはNone
         """
+        if self.store is not None:
+            df = self.store.read_latest_runs(1, columns=ANALYSIS_COLUMNS)
+            if df.empty:
+                logger.warning("データファイルが見つかりません")
+                return None
+            logger.info(f"データ読み込み: {self.store.root}")
+            return df
+
         csv_files = list(self.data_dir.glob("products_*.csv"))
         if not csv_files:
             logger.warning("データファイルが見つかりません")
@@ -53,8 +691,7 @@ class TrendAnalyzer:
         latest_file = max(csv_files, key=lambda f: f.stat().st_mtime)
         logger.info(f"データ読み込み: {latest_file}")
 
-        df = pd.read_csv(latest_file, encoding="utf-8-sig")
-        return df
+        return read_raw_csv(latest_file)
 
     def load_historical_data(self, days: int = 7) -> Optional[pd.DataFrame]:
         """
@@ -66,53 +703,167 @@ class TrendAnalyzer:
         Returns:
             結合されたDataFrame
         """
-        csv_files = sorted(self.data_dir.glob("products_*.csv"))
-        if not csv_files:
+        if self.store is not None:
+            df = self.store.read_latest_runs(days, columns=ANALYSIS_COLUMNS)
+            return None if df.empty else df
+
+        recent_files = self._recent_files(days)
+        if not recent_files:
+            return None
+
+        return concat_raw_frames([read_raw_csv(f) for f in recent_files])
+
+    def load_recent_days(
+        self, days: int, columns: Optional[list[str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        最新の収集日から遡ってN日分のデータを読み込み
+
+        load_historical_data は最新N回分を読む（1日に複数回収集すると N 日に満たない）。
+        こちらは収集日でファイルを選ぶ
+
+        Args:
+            days: 最新の収集日を含めて遡る日数
+            columns: 読み込む列（省略時はANALYSIS_COLUMNS）
+
+        Returns:
+            結合されたDataFrame（データがなければ None）
+        """
+        from archive import group_raw_files_by_day
+
+        files_by_day = group_raw_files_by_day(
+            self.store.root if self.store is not None else self.data_dir
+        )
+        if not files_by_day:
             return None
+        latest = datetime.strptime(max(files_by_day), "%Y%m%d")
+        start = (latest - timedelta(days=days - 1)).strftime("%Y%m%d")
+        files = [path for day in sorted(files_by_day) if day >= start for path in files_by_day[day]]
+        df = read_raw_files(files, columns)
+        return None if df.empty else df
+
+    def _recent_files(self, days: int) -> list[Path]:
+        """最新N件の生データCSV（日次実行想定、古い順）"""
+        csv_files = sorted(self.data_dir.glob("products_*.csv"))
+        return csv_files[-days:] if len(csv_files) >= days else csv_files
 
-        # 最新N件を取得（日次実行想定）
-        recent_files = csv_files[-days:] if len(csv_files) >= days else csv_files
+    def iter_historical_chunks(
+        self, days: int = 7, chunk_rows: int = 100_000
+    ) -> Generator[pd.DataFrame, None, None]:
+        """
+        過去N日分のデータを最大chunk_rows行ずつ読み込み
 
-        dfs = []
-        for f in recent_files:
-            df = pd.read_csv(f, encoding="utf-8-sig")
-            dfs.append(df)
+        チャンクを順に結合すると load_historical_data と同じ行順になる
+
+        Args:
+            days: 遡る日数
+            chunk_rows: 1回に返す最大行数
+        """
+        if self.store is not None:
+            runs = self.store.list_runs()[-days:]
+            yield from self.store.iter_runs(runs, columns=ANALYSIS_COLUMNS, batch_rows=chunk_rows)
+            return
 
-        return pd.concat(dfs, ignore_index=True) if dfs else None
+        for path in self._recent_files(days):
+            yield from iter_raw_csv(path, chunk_rows)
 
     def calculate_trend_score(self, row: pd.Series) -> float:
         """
-        トレンドスコアを計算
+        トレンドスコアを計算（1行分）
 
-        重み付け:
-        - ランク変動率: 50%
-        - レビュー数: 30%
-        - 評価: 20%
+        計算式は calculate_trend_scores の既定の重み（すべて1.0）と同じ。欠損値は0として扱う
         """
+
+        def value(name: str) -> float:
+            v = row.get(name)
+            return 0.0 if v is None or pd.isna(v) else float(v)
+
         score = 0.0
 
         # ランク変動（正規化: 0-100%を0-50ポイントに）
-        rank_change = row.get("rank_change_percent", 0) or 0
-        score += min(rank_change / 2, 50)  # 最大50ポイント
+        score += min(value("rank_change_percent") / 2, 50)  # 最大50ポイント
 
         # レビュー数（対数スケール）
-        review_count = row.get("review_count", 0) or 0
+        review_count = value("review_count")
         if review_count > 0:
             score += min(math.log10(review_count) * 10, 30)  # 最大30ポイント
 
         # 評価（4.0以上で加点）
-        rating = row.get("rating", 0) or 0
+        rating = value("rating")
         if rating >= 4.0:
             score += (rating - 4.0) * 20  # 4.5なら+10, 5.0なら+20
 
+        # モメンタム（1日あたりの上昇率10%ごとに1ポイント）
+        velocity, ewma_rank = value("velocity"), value("ewma_rank")
+        if velocity > 0 and ewma_rank > 0:
+            score += min(velocity / ewma_rank * 10, 10)  # 最大10ポイント
+
         return round(score, 2)
 
-    def analyze_trends(self, top_n: int = 20) -> list[TrendItem]:
+    def calculate_trend_scores(self, df: pd.DataFrame) -> pd.Series:
+        """
+        トレンドスコアを列単位で一括計算
+
+        重み付け:
+        - ランク変動率: 50%
+        - レビュー数: 30%
+        - 評価: 20%
+
+        モメンタム特徴量（velocity, ewma_rank）がある場合は、
+        平滑化ランクに対する上昇速度で最大10ポイント加点する。
+        欠損値は0として扱う。構成要素の重みは data/scores.json で変更できる。
+        季節性プロファイルがある場合は、カテゴリ・ASINの曜日・時間帯による
+        季節成分を除く（timestamp 列の時刻で判定）。
+
+        Returns:
+            dfと同じインデックスのスコア
+        """
+        scores = self.scoring.compute(df, [DEFAULT_SCORE])[DEFAULT_SCORE]
+        if self.seasonality is not None and "timestamp" in df.columns:
+            scores = self.seasonality.deseasonalize(df, scores)
+        return scores
+
+    def calculate_scores(self, df: pd.DataFrame, names: Optional[list[str]] = None) -> pd.DataFrame:
+        """
+        既定のスコアとカスタムスコアを1回の計算でまとめて求める
+
+        Args:
+            df: 商品データ
+            names: スコア名（省略時は登録済みの全スコア）
+
+        Returns:
+            スコア名の列を持つDataFrame（dfと同じインデックス）
+        """
+        return self.scoring.compute(df, names)
+
+    def with_momentum(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        モメンタム特徴量の列を付与（状態がない場合はそのまま返す）
+
+        Args:
+            df: 商品データ（コピー済み）
+        """
+        if self.momentum is None:
+            return df
+        return self.momentum.add_features(df)
+
+    def score_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        モメンタム特徴量と trend_score 列を付与したコピーを返す
+
+        analyze_dataframe / analyze_dataframe_by_category に scored=True で渡すと再計算しない
+        """
+        df = self.with_momentum(df.copy())
+        df["trend_score"] = self.calculate_trend_scores(df)
+        return df
+
+    def analyze_trends(self, top_n: int = 20, collapse_duplicates: bool = False) -> list[TrendItem]:
         """
         トレンド分析を実行
 
         Args:
             top_n: 上位N件を返す
+            collapse_duplicates: 重複商品（別カテゴリ・色違いなど）をスコア最上位の1件にまとめる
 
         Returns:
             トレンドアイテムリスト
@@ -122,36 +873,78 @@ class TrendAnalyzer:
             logger.warning("分析対象データがありません")
             return []
 
-        # トレンドスコア計算
-        df["trend_score"] = df.apply(self.calculate_trend_score, axis=1)
-
-        # スコア順にソート
-        df_sorted = df.sort_values("trend_score", ascending=False).head(top_n)
-
-        # TrendItemリストに変換
-        trends = []
-        for _, row in df_sorted.iterrows():
-            trend = TrendItem(
-                asin=row["asin"],
-                name=row["name"],
-                category=row["category"],
-                rank_change_percent=row.get("rank_change_percent", 0) or 0,
-                current_rank=row["current_rank"],
-                price=row.get("price"),
-                review_count=row.get("review_count"),
-                rating=row.get("rating"),
-                affiliate_url=row["affiliate_url"],
-                trend_score=row["trend_score"],
-            )
-            trends.append(trend)
-
+        trends = self.analyze_dataframe(df, top_n=top_n, collapse_duplicates=collapse_duplicates)
         logger.info(f"トレンド分析完了: {len(trends)}件")
         return trends
 
-    def analyze_by_category(self) -> dict[str, list[TrendItem]]:
+    def analyze_dataframe(
+        self,
+        df: pd.DataFrame,
+        top_n: int = 20,
+        collapse_duplicates: bool = False,
+        scored: bool = False,
+    ) -> list[TrendItem]:
+        """
+        指定DataFrameのトレンド分析を実行
+
+        Args:
+            df: 商品データ
+            top_n: 上位N件を返す
+            collapse_duplicates: 重複商品をスコア最上位の1件にまとめる
+            scored: dfが score_dataframe の結果ならスコアを再計算しない
+
+        Returns:
+            トレンドアイテムリスト
+        """
+        if df.empty:
+            return []
+
+        # トレンドスコア計算
+        if not scored:
+            df = self.score_dataframe(df)
+
+        # スコア順（同点は元の順序）に上位N件
+        df_sorted = df.sort_values("trend_score", ascending=False, kind="stable")
+        if collapse_duplicates:
+            df_sorted = self.collapse_duplicates(df_sorted.head(top_n * _DEDUP_CANDIDATE_FACTOR))
+        df_sorted = df_sorted.head(top_n)
+
+        return TrendItem.from_dataframe(df_sorted)
+
+    def analyze_scores(
+        self, score: str = DEFAULT_SCORE, names: Optional[list[str]] = None, top_n: int = 20
+    ) -> tuple[list[TrendItem], pd.DataFrame]:
+        """
+        最新データを指定スコアの順に分析（他のスコアも同じ計算でまとめて求める）
+
+        Args:
+            score: 並べ替えに使うスコア名
+            names: 求めるスコア名（省略時は全スコア、scoreと既定のスコアは常に含む）
+            top_n: 上位N件を返す
+
+        Returns:
+            (トレンドアイテムリスト, アイテムと同順のスコア名の列を持つDataFrame)
+        """
+        names = list(dict.fromkeys([DEFAULT_SCORE, score, *(names or self.scoring.names())]))
+        df = self.load_latest_data()
+        if df is None or df.empty:
+            return [], pd.DataFrame(columns=names)
+
+        df = self.with_momentum(df.copy())
+        scores = self.calculate_scores(df, names)
+        if self.seasonality is not None and "timestamp" in df.columns:
+            scores[DEFAULT_SCORE] = self.seasonality.deseasonalize(df, scores[DEFAULT_SCORE])
+        df["trend_score"] = scores[DEFAULT_SCORE]
+        order = scores[score].sort_values(ascending=False, kind="stable").index[:top_n]
+        return TrendItem.from_dataframe(df.loc[order]), scores.loc[order].reset_index(drop=True)
+
+    def analyze_by_category(self, collapse_duplicates: bool = False) -> dict[str, list[TrendItem]]:
         """
         カテゴリ別トレンド分析
 
+        Args:
+            collapse_duplicates: カテゴリ内の重複商品（色違いなど）をスコア最上位の1件にまとめる
+
         Returns:
             カテゴリ名 -> トレンドリストの辞書
         """
@@ -159,45 +952,234 @@ class TrendAnalyzer:
         if df is None or df.empty:
             return {}
 
-        df["trend_score"] = df.apply(self.calculate_trend_score, axis=1)
+        return self.analyze_dataframe_by_category(df, collapse_duplicates=collapse_duplicates)
 
-        result = {}
-        for category in df["category"].unique():
-            category_df = df[df["category"] == category]
-            category_df = category_df.sort_values("trend_score", ascending=False).head(10)
-
-            trends = []
-            for _, row in category_df.iterrows():
-                trend = TrendItem(
-                    asin=row["asin"],
-                    name=row["name"],
-                    category=row["category"],
-                    rank_change_percent=row.get("rank_change_percent", 0) or 0,
-                    current_rank=row["current_rank"],
-                    price=row.get("price"),
-                    review_count=row.get("review_count"),
-                    rating=row.get("rating"),
-                    affiliate_url=row["affiliate_url"],
-                    trend_score=row["trend_score"],
-                )
-                trends.append(trend)
+    def analyze_dataframe_by_category(
+        self,
+        df: pd.DataFrame,
+        top_n: int = 10,
+        collapse_duplicates: bool = False,
+        scored: bool = False,
+    ) -> dict[str, list[TrendItem]]:
+        """
+        指定DataFrameのカテゴリ別トレンド分析
+
+        Args:
+            df: 商品データ
+            top_n: カテゴリごとの上位件数
+            collapse_duplicates: カテゴリ内の重複商品をスコア最上位の1件にまとめる
+            scored: dfが score_dataframe の結果ならスコアを再計算しない
+
+        Returns:
+            カテゴリ名 -> トレンドリストの辞書
+        """
+        if df.empty:
+            return {}
+
+        if not scored:
+            df = self.score_dataframe(df)
+
+        # 1回の安定ソートの後、カテゴリごとに先頭N件（同点は元の順序）
+        top = df.sort_values("trend_score", ascending=False, kind="stable").groupby(
+            "category", sort=False, observed=True
+        )
+        if collapse_duplicates:
+            candidates = top.head(top_n * _DEDUP_CANDIDATE_FACTOR)
+            top = self.collapse_duplicates(candidates, by="category").groupby(
+                "category", sort=False, observed=True
+            )
+        top = top.head(top_n)
 
-            result[category] = trends
+        # カテゴリは元データでの出現順
+        result: dict[str, list] = {category: [] for category in df["category"].dropna().unique()}
+        for trend in TrendItem.from_dataframe(top):
+            result[trend.category].append(trend)
 
         return result
 
-    def detect_significant_movers(self, threshold: float = 50.0) -> list[TrendItem]:
+    def collapse_duplicates(self, df: pd.DataFrame, by: Optional[str] = None) -> pd.DataFrame:
+        """
+        重複商品のクラスタごとに先頭の行だけを残す
+
+        保存済みのクラスタがなければ、dfの商品名からその場でクラスタを作る
+
+        Args:
+            df: 良い順に並べた商品データ
+            by: クラスタに加えて重複判定に使う列
+
+        Returns:
+            重複を除いたDataFrame
+        """
+        from dedup import ProductClusters, collapse_duplicates, default_clusters_path
+
+        if self._load_clusters:
+            self._load_clusters = False
+            if default_clusters_path().exists():
+                self.clusters = ProductClusters.load()
+        collapsed = collapse_duplicates(df, self.clusters, by)
+        if len(collapsed) < len(df):
+            logger.info(f"重複商品をまとめました: {len(df)} → {len(collapsed)}件")
+        return collapsed
+
+    def analyze_history(
+        self,
+        days: int = 7,
+        top_n: int = 20,
+        category_top_n: int = 10,
+        memory_budget_mb: Optional[float] = None,
+    ) -> tuple[list[TrendItem], dict[str, list[TrendItem]]]:
+        """
+        過去N日分の全体・カテゴリ別トレンド分析（分割読み込み）
+
+        履歴を結合せずにチャンクごとにスコアを計算し、上位行だけをヒープに残す。
+        モメンタム状態がある場合、特徴量は現在の状態ではなく、期間の先頭から収集順に
+        積み上げた各回の時点の値を使う（後の収集回の値で過去の行を採点しない）。
+        モメンタムを除けば、結果は load_historical_data の結果に analyze_dataframe /
+        analyze_dataframe_by_category を適用した場合と同じ。
+
+        Args:
+            days: 遡る日数
+            top_n: 全体の上位件数
+            category_top_n: カテゴリごとの上位件数
+            memory_budget_mb: 1チャンクに使うメモリの目安（省略時は ANALYSIS_MEMORY_BUDGET_MB）
+
+        Returns:
+            (全体のトレンドリスト, カテゴリ名 -> トレンドリストの辞書)
+        """
+        if memory_budget_mb is None:
+            memory_budget_mb = config.analysis.memory_budget_mb
+
+        # 先頭の標本から1行あたりのメモリを見積もる
+        samples = self.iter_historical_chunks(days, _SAMPLE_ROWS)
+        sample = next(samples, None)
+        samples.close()
+        if sample is None:
+            logger.warning("分析対象データがありません")
+            return [], {}
+        chunk_rows = estimate_chunk_rows(sample, memory_budget_mb)
+        del sample
+
+        overall, by_category = StreamingTopK(top_n), StreamingTopK(category_top_n)
+        categories: dict = {}
+        offset = 0
+        momentum = (
+            MomentumState(self.momentum.half_life_hours) if self.momentum is not None else None
+        )
+        for chunk in iter_whole_runs(self.iter_historical_chunks(days, chunk_rows)):
+            if momentum is not None:
+                chunk = momentum.replay(chunk)
+            chunk["trend_score"] = self.calculate_trend_scores(chunk)
+            for category in chunk["category"].dropna().unique():
+                categories.setdefault(category, None)
+
+            # チャンク内の上位だけをヒープに渡す（通し番号で同点の順序を保つ）
+            ranked = chunk.sort_values("trend_score", ascending=False, kind="stable")
+            top = ranked.head(top_n)
+            overall.push_frame(top, [None] * len(top), (top.index + offset).tolist())
+            top = (
+                ranked[ranked["category"].notna()]
+                .groupby("category", sort=False, observed=True)
+                .head(category_top_n)
+            )
+            by_category.push_frame(top, top["category"].tolist(), (top.index + offset).tolist())
+            offset += len(chunk)
+
+        trends = TrendItem.from_dataframe(pd.DataFrame(overall.top(None)))
+        result = {
+            category: TrendItem.from_dataframe(pd.DataFrame(by_category.top(category)))
+            for category in categories
+        }
+        logger.info(f"履歴のトレンド分析完了: {offset}行, {chunk_rows}行/チャンク")
+        return trends, result
+
+    def forecast(
+        self,
+        days: int = 28,
+        horizon: int = 1,
+        top_n: Optional[int] = None,
+        min_observations: int = 3,
+        forecaster: Optional[RankForecaster] = None,
+    ) -> pd.DataFrame:
+        """
+        過去N日分のランク推移から全ASINのランクを予測
+
+        Args:
+            days: 当てはめに使う日数（最新の収集日から遡る）
+            horizon: 最終日から何日後を予測するか
+            top_n: 予測上昇率の上位N件に絞る（省略時は全件）
+            min_observations: 予測に必要な最小観測日数
+            forecaster: 予測モデル（省略時は既定の設定）
+
+        Returns:
+            FORECAST_COLUMNS に name, category を加えたDataFrame（予測上昇率の高い順）
+        """
+        df = self.load_recent_days(days)
+        if df is None:
+            logger.warning("予測対象データがありません")
+            return pd.DataFrame(columns=["name", "category", *FORECAST_COLUMNS])
+
+        result = forecast_ranks(df, horizon, forecaster)
+        result = result[result["observations"] >= min_observations]
+        latest = df.drop_duplicates("asin", keep="last").set_index("asin")
+        asins = result["asin"].to_numpy()
+        result.insert(1, "name", latest["name"].reindex(asins).to_numpy())
+        result.insert(2, "category", latest["category"].reindex(asins).to_numpy())
+        result = result.sort_values("forecast_change_percent", ascending=False, kind="stable")
+        if top_n is not None:
+            result = result.head(top_n)
+        logger.info(f"ランク予測完了: {len(result)}件（{horizon}日後）")
+        return result.reset_index(drop=True)
+
+    def detect_significant_movers(self, threshold: Optional[float] = None) -> list[TrendItem]:
         """
         大幅変動商品を検出
 
+        収集時の異常検知の検出結果（anomaly_log）がある場合は、最新データのうち
+        ASIN・カテゴリの通常の変動幅から外れた商品を、zスコアの高い順に返す。
+        検出結果がない場合は、スコア上位100件からランク変動率が閾値以上の商品を返す
+
         Args:
-            threshold: ランク変動率の閾値（%）
+            threshold: ランク変動率の閾値（%）。検出結果を使う場合は省略時に絞り込まず、
+                使わない場合の既定は50%
 
         Returns:
-            閾値を超える変動があった商品リスト
+            大幅変動があった商品リスト
         """
-        trends = self.analyze_trends(top_n=100)
-        return [t for t in trends if t.rank_change_percent >= threshold]
+        if self.anomaly_log is None:
+            trends = self.analyze_trends(top_n=100)
+            threshold = 50.0 if threshold is None else threshold
+            return [t for t in trends if t.rank_change_percent >= threshold]
+
+        df = self.load_latest_data()
+        if df is None or df.empty:
+            return []
+        flagged = self._flagged_rows(df)
+        if threshold is not None:
+            flagged = flagged[flagged["rank_change_percent"] >= threshold]
+        return TrendItem.from_dataframe(self.score_dataframe(flagged)) if not flagged.empty else []
+
+    def _flagged_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """dfのうち異常検知で検出された行（ASIN・カテゴリのzスコアの大きい方の降順）"""
+        from anomaly import load_anomalies
+
+        anomalies = load_anomalies(self.anomaly_log)
+        if anomalies.empty:
+            return df.iloc[:0]
+
+        def keys(frame: pd.DataFrame) -> pd.MultiIndex:
+            return pd.MultiIndex.from_arrays(
+                [
+                    frame["asin"].astype(str).to_numpy(),
+                    frame["category"].astype(str).to_numpy(),
+                    pd.to_datetime(frame["timestamp"].astype(str), format="ISO8601").to_numpy(),
+                ]
+            )
+
+        zscore = anomalies[["asin_zscore", "category_zscore"]].max(axis=1).fillna(0.0).to_numpy()
+        zscores = pd.Series(zscore, index=keys(anomalies)).groupby(level=[0, 1, 2]).max()
+        matched = zscores.reindex(keys(df)).to_numpy()
+        order = np.argsort(-np.nan_to_num(matched, nan=-np.inf), kind="stable")
+        return df.iloc[order[~np.isnan(matched[order])]]
 
 
 class ReportGenerator:
@@ -220,14 +1202,24 @@ class ReportGenerator:
         Returns:
             レポートファイルパス
         """
-        date_str = datetime.now().strftime("%Y%m%d")
-        filename = f"trends_{date_str}.md"
-        filepath = self.output_dir / filename
+        return self.write_markdown(build_report_view(trends, category_trends))
+
+    def write_markdown(self, view: ReportView) -> Path:
+        """
+        フォーマット済みビューからMarkdownレポートを書き出し
+
+        Args:
+            view: レポートビュー
+
+        Returns:
+            レポートファイルパス
+        """
+        filepath = self.output_dir / f"trends_{view.date_str}.md"
 
         lines = [
             f"# EcomTrendAI トレンドレポート",
             f"",
-            f"**生成日時**: {datetime.now().strftime('%Y年%m月%d日 %H:%M')}",
+            f"**生成日時**: {view.generated_at.strftime('%Y年%m月%d日 %H:%M')}",
             f"",
             f"---",
             f"",
@@ -235,44 +1227,59 @@ class ReportGenerator:
             f"",
         ]
 
-        for i, trend in enumerate(trends[:10], 1):
-            price_str = f"¥{trend.price:,.0f}" if trend.price else "価格不明"
-            rating_str = f"★{trend.rating:.1f}" if trend.rating else ""
-            lines.append(
-                f"{i}. **[{trend.name[:40]}]({trend.affiliate_url})**  "
-            )
+        for i, trend in enumerate(view.trends[:10], 1):
+            price_str = trend.price_label or "価格不明"
+            lines.append(f"{i}. **[{trend.name[:40]}]({trend.affiliate_url})**  ")
             lines.append(
-                f"   - ランク変動: +{trend.rank_change_percent:.0f}% | "
-                f"スコア: {trend.trend_score} | {price_str} {rating_str}"
+                f"   - ランク変動: {trend.change_label} | "
+                f"スコア: {trend.trend_score} | {price_str} {trend.rating_label}"
             )
             lines.append(f"   - カテゴリ: {trend.category}")
             lines.append("")
 
         # カテゴリ別セクション
-        if category_trends:
+        if view.category_trends:
             lines.append("---")
             lines.append("")
             lines.append("## カテゴリ別トレンド")
             lines.append("")
 
-            for category, items in category_trends.items():
+            for category, items in view.category_trends.items():
                 lines.append(f"### {category}")
                 lines.append("")
                 for i, trend in enumerate(items[:5], 1):
                     lines.append(
                         f"{i}. [{trend.name[:30]}...]({trend.affiliate_url}) "
-                        f"(+{trend.rank_change_percent:.0f}%)"
+                        f"({trend.change_label})"
                     )
                 lines.append("")
 
+        # 値下がりセクション
+        if view.price_drops:
+            lines.append("---")
+            lines.append("")
+            lines.append("## 値下がり商品")
+            lines.append("")
+            for i, drop in enumerate(view.price_drops, 1):
+                previous = f"（前回 {drop.previous_label}）" if drop.previous_label else ""
+                lowest = " | 最安値" if drop.is_lowest else ""
+                lines.append(f"{i}. **[{drop.name[:40]}]({drop.affiliate_url})**  ")
+                lines.append(
+                    f"   - {drop.price_label}{previous} | 下落率: {drop.drop_label}{lowest}"
+                )
+                lines.append(f"   - カテゴリ: {drop.category}")
+                lines.append("")
+
         # フッター
-        lines.extend([
-            "---",
-            "",
-            "*このレポートは EcomTrendAI によって自動生成されました。*",
-            "",
-            "*商品リンクにはアフィリエイトIDが含まれています。*",
-        ])
+        lines.extend(
+            [
+                "---",
+                "",
+                "*このレポートは EcomTrendAI によって自動生成されました。*",
+                "",
+                "*商品リンクにはアフィリエイトIDが含まれています。*",
+            ]
+        )
 
         with open(filepath, "w", encoding="utf-8") as f:
             f.write("\n".join(lines))
@@ -292,7 +1299,9 @@ class ReportGenerator:
             name_display = trend.name[:35] + "..." if len(trend.name) > 35 else trend.name
             price_str = f"¥{trend.price:,.0f}" if trend.price else ""
             print(f"{i:2}. {name_display}")
-            print(f"    +{trend.rank_change_percent:.0f}% | スコア: {trend.trend_score} | {price_str}")
+            print(
+                f"    {trend.rank_change_percent:+.0f}% | スコア: {trend.trend_score} | {price_str}"
+            )
             print(f"    カテゴリ: {trend.category}")
             print()
 
@@ -319,7 +1328,7 @@ def main():
     category_trends = analyzer.analyze_by_category()
 
     # 大幅変動検出
-    significant = analyzer.detect_significant_movers(threshold=80.0)
+    significant = analyzer.detect_significant_movers()
     if significant:
         logger.info(f"大幅変動商品を {len(significant)} 件検出")
 
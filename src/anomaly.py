@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+異常検知モジュール
+
+収集のたびにランク変動率の統計量をASIN別・カテゴリ別に逐次更新し、
+通常の変動幅から外れた急上昇を検出する
+
+- 統計量はWelford法（平均・分散）で、1キーあたり3つの数値のみ保持
+- 判定には更新前の統計量を使う（外れ値自身で基準がぶれない）
+- 変動率は対称対数変換（sign(x)·log(1+|x|)）してから扱う
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# 検出結果の列
+ANOMALY_COLUMNS = [
+    "timestamp",
+    "asin",
+    "name",
+    "category",
+    "current_rank",
+    "rank_change_percent",
+    "asin_zscore",
+    "category_zscore",
+]
+
+
+def default_state_path() -> Path:
+    """検知器の状態ファイルの既定パス"""
+    return Path(config.paths.data_dir) / "anomaly_state.npz"
+
+
+def default_log_path() -> Path:
+    """検出結果の追記先の既定パス"""
+    return Path(config.paths.data_dir) / "anomalies.csv"
+
+
+def symlog(values: np.ndarray) -> np.ndarray:
+    """対称対数変換（裾の重い変動率を正規分布に近づける）"""
+    transformed: np.ndarray = np.sign(values) * np.log1p(np.abs(values))
+    return transformed
+
+
+class RunningStats:
+    """
+    キーごとの平均・分散（Welford法）
+
+    キー → 配列位置を辞書で引き、件数・平均・偏差平方和を配列に持つ。
+    件数は max_count で頭打ちにするため、古い観測値の重みは徐々に下がる。
+    """
+
+    def __init__(self, max_count: int = 100, capacity: int = 1024):
+        """
+        Args:
+            max_count: 件数の上限（おおよそ直近何回分を重視するか）
+            capacity: 配列の初期容量
+        """
+        self.max_count = max_count
+        self.keys: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.count = np.zeros(capacity)
+        self.mean = np.zeros(capacity)
+        self.m2 = np.zeros(capacity)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self.count)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("count", "mean", "m2"):
+            grown = np.zeros(capacity)
+            grown[: len(self.keys)] = getattr(self, name)[: len(self.keys)]
+            setattr(self, name, grown)
+
+    def _position(self, key: str) -> int:
+        position = self.positions.get(key)
+        if position is None:
+            position = len(self.keys)
+            self._reserve(position + 1)
+            self.keys.append(key)
+            self.positions[key] = position
+        return position
+
+    def lookup(self, keys) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        キーごとの (件数, 平均, 標準偏差)。未登録のキーは件数0
+
+        Args:
+            keys: キーの配列
+        """
+        positions = np.fromiter(
+            (self.positions.get(k, -1) for k in keys), dtype=np.int64, count=len(keys)
+        )
+        known = positions >= 0
+        count, mean, std = np.zeros(len(keys)), np.zeros(len(keys)), np.zeros(len(keys))
+        p = positions[known]
+        count[known] = self.count[p]
+        mean[known] = self.mean[p]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std[known] = np.sqrt(np.where(self.count[p] > 1, self.m2[p] / (self.count[p] - 1), 0.0))
+        return count, mean, std
+
+    def merge(self, keys, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+        """
+        バッチの統計量を合成（Chanらの並列版Welford法）
+
+        Args:
+            keys: 重複のないキーの配列
+            count, mean, m2: キーごとのバッチの件数・平均・偏差平方和
+        """
+        idx = np.fromiter((self._position(k) for k in keys), dtype=np.int64, count=len(keys))
+        n_a, mean_a, m2_a = self.count[idx], self.mean[idx], self.m2[idx]
+        n = n_a + count
+        delta = mean - mean_a
+        new_mean = mean_a + delta * count / n
+        new_m2 = m2_a + m2 + delta**2 * n_a * count / n
+
+        # 件数の上限を超えた分は分散を保ったまま件数を縮める
+        scale = np.minimum(1.0, self.max_count / n)
+        self.count[idx] = n * scale
+        self.mean[idx] = new_mean
+        self.m2[idx] = new_m2 * scale
+
+    def state(self, prefix: str) -> dict:
+        """npz保存用の配列"""
+        size = len(self.keys)
+        return {
+            f"{prefix}_keys": np.array(self.keys, dtype=str),
+            f"{prefix}_count": self.count[:size],
+            f"{prefix}_mean": self.mean[:size],
+            f"{prefix}_m2": self.m2[:size],
+        }
+
+    @classmethod
+    def from_state(cls, data, prefix: str, max_count: int) -> "RunningStats":
+        keys = data[f"{prefix}_keys"].tolist()
+        stats = cls(max_count, capacity=max(len(keys), 1024))
+        for name in ("count", "mean", "m2"):
+            getattr(stats, name)[: len(keys)] = data[f"{prefix}_{name}"]
+        stats.keys = keys
+        stats.positions = {key: i for i, key in enumerate(keys)}
+        return stats
+
+
+class AnomalyDetector:
+    """
+    ランク急上昇の逐次検知器
+
+    ASIN自身の過去の変動幅、またはカテゴリ全体の変動幅に対して
+    zスコアが threshold 以上の上昇を異常とみなす
+    """
+
+    def __init__(
+        self,
+        threshold: float = 4.0,
+        min_count: int = 5,
+        max_count: int = 100,
+        min_std: float = 0.1,
+    ):
+        """
+        Args:
+            threshold: 異常とみなすzスコア
+            min_count: 判定に必要な過去の観測数（これ未満のキーは判定しない）
+            max_count: 統計量の件数の上限
+            min_std: 標準偏差の下限（変動のほぼない系列での誤検知を防ぐ）
+        """
+        self.threshold = threshold
+        self.min_count = min_count
+        self.max_count = max_count
+        self.min_std = min_std
+        self.asin_stats = RunningStats(max_count)
+        self.category_stats = RunningStats(max_count)
+
+    def _zscores(self, stats: RunningStats, keys, values: np.ndarray) -> np.ndarray:
+        count, mean, std = stats.lookup(keys)
+        zscores = (values - mean) / np.maximum(std, self.min_std)
+        return np.where(count >= self.min_count, zscores, np.nan)
+
+    def process(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        収集1回分を判定し、統計量を更新
+
+        Args:
+            df: asin, category, rank_change_percent を含むDataFrame
+
+        Returns:
+            異常と判定した行（ANOMALY_COLUMNSのうちdfにある列 + zスコア）
+        """
+        df = df[df["rank_change_percent"].notna()]
+        if df.empty:
+            return pd.DataFrame(columns=ANOMALY_COLUMNS)
+
+        values = symlog(df["rank_change_percent"].to_numpy(dtype=float))
+        asins = df["asin"].astype(str).to_numpy()
+        categories = df["category"].fillna("").astype(str).to_numpy()
+
+        asin_z = self._zscores(self.asin_stats, asins, values)
+        category_z = self._zscores(self.category_stats, categories, values)
+
+        self._update(self.asin_stats, asins, values)
+        self._update(self.category_stats, categories, values)
+
+        flagged = (asin_z >= self.threshold) | (category_z >= self.threshold)
+        result = df[flagged].assign(
+            asin_zscore=np.round(asin_z[flagged], 2),
+            category_zscore=np.round(category_z[flagged], 2),
+        )
+        return result[[c for c in ANOMALY_COLUMNS if c in result.columns]].reset_index(drop=True)
+
+    @staticmethod
+    def _update(stats: RunningStats, keys: np.ndarray, values: np.ndarray) -> None:
+        grouped = pd.DataFrame({"key": keys, "value": values}).groupby("key", sort=False)["value"]
+        batch = grouped.agg(["count", "mean", "var"])
+        m2 = batch["var"].fillna(0.0).to_numpy() * (batch["count"].to_numpy() - 1)
+        stats.merge(
+            batch.index.to_numpy(),
+            batch["count"].to_numpy(dtype=float),
+            batch["mean"].to_numpy(),
+            m2,
+        )
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """状態を .npz に書き出し（一時ファイル経由）"""
+        path = path or default_state_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                params=np.array([self.threshold, self.min_count, self.max_count, self.min_std]),
+                **self.asin_stats.state("asin"),
+                **self.category_stats.state("category"),
+            )
+        tmp_path.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "AnomalyDetector":
+        """状態を読み込み（ファイルがなければ既定値の検知器）"""
+        path = path or default_state_path()
+        if not path.exists():
+            return cls()
+        with np.load(path) as data:
+            threshold, min_count, max_count, min_std = data["params"].tolist()
+            detector = cls(threshold, int(min_count), int(max_count), min_std)
+            detector.asin_stats = RunningStats.from_state(data, "asin", int(max_count))
+            detector.category_stats = RunningStats.from_state(data, "category", int(max_count))
+        return detector
+
+
+def append_anomalies(anomalies: pd.DataFrame, path: Optional[Path] = None) -> None:
+    """検出結果をCSVに追記"""
+    if anomalies.empty:
+        return
+    path = path or default_log_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    anomalies.reindex(columns=ANOMALY_COLUMNS).to_csv(
+        path, mode="a", header=not path.exists(), index=False, encoding="utf-8"
+    )
+
+
+def load_anomalies(path: Optional[Path] = None, limit: Optional[int] = None) -> pd.DataFrame:
+    """
+    検出結果を読み込み
+
+    Args:
+        limit: 直近の件数
+    """
+    path = path or default_log_path()
+    if not path.exists():
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+    df = pd.read_csv(path, encoding="utf-8")
+    return df.tail(limit).reset_index(drop=True) if limit else df
+
+
+def main():
+    """メイン実行（直近の検出結果を表示）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI 急上昇の検出結果")
+    parser.add_argument("--limit", type=int, default=20, help="表示件数")
+    args = parser.parse_args()
+
+    df = load_anomalies(limit=args.limit)
+    if df.empty:
+        logger.info("検出結果はありません")
+        return
+    print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
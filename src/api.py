@@ -19,24 +19,48 @@ load_dotenv()
 
 # FastAPIが利用可能かチェック
 try:
-    from fastapi import Depends, FastAPI, Header, HTTPException, Request, status
+    from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, status
     from fastapi.middleware.cors import CORSMiddleware
     from fastapi.responses import JSONResponse
     from pydantic import BaseModel, EmailStr
+
     FASTAPI_AVAILABLE = True
 except ImportError:
     FASTAPI_AVAILABLE = False
     logger.warning("FastAPIがインストールされていません。pip install fastapi uvicorn")
 
 from auth import AuthService, BillingManager, StripeService, SubscriptionPlan, User
+from config import get_affiliate_url
 from referral import ReferralService, ReferralStatus
 
+# トレンドAPI・JSONエクスポートのレコードに含める TrendItem の属性
+TREND_RECORD_FIELDS = (
+    "name",
+    "asin",
+    "category",
+    "current_rank",
+    "rank_change_percent",
+    "price",
+    "trend_score",
+)
+EXPORT_RECORD_FIELDS = (
+    "name",
+    "asin",
+    "category",
+    "current_rank",
+    "previous_rank",
+    "rank_change",
+    "rank_change_percent",
+    "price",
+)
 
 # === Pydanticモデル ===
 
 if FASTAPI_AVAILABLE:
+
     class ContactRequest(BaseModel):
         """お問い合わせリクエスト"""
+
         name: str
         email: EmailStr
         category: str
@@ -44,14 +68,17 @@ if FASTAPI_AVAILABLE:
 
     class NewsletterSubscribeRequest(BaseModel):
         """ニュースレター購読リクエスト"""
+
         email: EmailStr
 
     class UserRegisterRequest(BaseModel):
         """ユーザー登録リクエスト"""
+
         email: EmailStr
 
     class ClickTrackRequest(BaseModel):
         """クリック追跡リクエスト"""
+
         asin: str
         product_name: str
         category: Optional[str] = None
@@ -61,19 +88,30 @@ if FASTAPI_AVAILABLE:
 
     class ReferralCodeRequest(BaseModel):
         """紹介コード生成リクエスト"""
+
         expires_days: Optional[int] = None
         max_uses: int = -1
 
     class ApplyReferralRequest(BaseModel):
         """紹介適用リクエスト"""
+
         referral_code: str
 
     class UseCreditRequest(BaseModel):
         """クレジット使用リクエスト"""
+
         amount: int
 
+    class WatchlistRequest(BaseModel):
+        """ウォッチリスト登録リクエスト"""
+
+        asins: list[str] = []
+        keywords: list[str] = []
+        categories: list[str] = []
+
     class UserResponse(BaseModel):
         """ユーザーレスポンス"""
+
         user_id: str
         email: str
         plan: str
@@ -84,10 +122,12 @@ if FASTAPI_AVAILABLE:
 
     class APIKeyRequest(BaseModel):
         """APIキー生成リクエスト"""
+
         name: str = "default"
 
     class APIKeyResponse(BaseModel):
         """APIキーレスポンス"""
+
         key_id: str
         key: str
         name: str
@@ -95,12 +135,14 @@ if FASTAPI_AVAILABLE:
 
     class UpgradeRequest(BaseModel):
         """アップグレードリクエスト"""
+
         plan: str
         success_url: str = "https://ecomtrend.ai/success"
         cancel_url: str = "https://ecomtrend.ai/cancel"
 
     class TrendItem(BaseModel):
         """トレンドアイテム"""
+
         name: str
         asin: str
         category: str
@@ -112,12 +154,14 @@ if FASTAPI_AVAILABLE:
 
     class TrendsResponse(BaseModel):
         """トレンドレスポンス"""
+
         date: str
         count: int
         trends: list[TrendItem]
 
     class StatusResponse(BaseModel):
         """ステータスレスポンス"""
+
         status: str
         version: str
         timestamp: str
@@ -125,6 +169,7 @@ if FASTAPI_AVAILABLE:
 
 # === アプリケーション ===
 
+
 def create_app() -> "FastAPI":
     """FastAPIアプリケーションを作成"""
     if not FASTAPI_AVAILABLE:
@@ -148,7 +193,7 @@ def create_app() -> "FastAPI":
     )
 
     # セキュリティミドルウェア（レート制限・ヘッダー・ログ）
-    from middleware import add_security_middleware, RateLimitConfig, RateLimiter
+    from middleware import RateLimitConfig, RateLimiter, add_security_middleware
 
     # 環境変数からレート制限設定を読み込み
     rate_config = RateLimitConfig(
@@ -215,6 +260,7 @@ def create_app() -> "FastAPI":
 
     def require_plan(*plans: SubscriptionPlan):
         """特定プラン以上が必要"""
+
         def decorator(func):
             @wraps(func)
             async def wrapper(*args, user: User = Depends(get_current_user), **kwargs):
@@ -225,7 +271,9 @@ def create_app() -> "FastAPI":
                         detail=f"この機能には {', '.join(plan_names)} プラン以上が必要です",
                     )
                 return await func(*args, user=user, **kwargs)
+
             return wrapper
+
         return decorator
 
     # === エンドポイント: 公開 ===
@@ -252,8 +300,8 @@ def create_app() -> "FastAPI":
         各コンポーネントの状態を確認し、監視システム用の情報を返します。
         """
         import json
-        from pathlib import Path
         import sys
+        from pathlib import Path
 
         checks = {}
         overall_status = "healthy"
@@ -360,6 +408,7 @@ def create_app() -> "FastAPI":
         lines.append("ecomtrend_api_up 1")
 
         from fastapi.responses import PlainTextResponse
+
         return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain")
 
     # === エンドポイント: お問い合わせ ===
@@ -628,8 +677,8 @@ https://ecomtrend.ai
         管理者向けのクリック統計情報を返します。
         """
         import json
-        from pathlib import Path
         from collections import Counter
+        from pathlib import Path
 
         clicks_file = Path("data/clicks.json")
         if not clicks_file.exists():
@@ -672,6 +721,7 @@ https://ecomtrend.ai
 
     class UserRegisterWithReferralRequest(BaseModel):
         """紹介コード付きユーザー登録リクエスト"""
+
         email: EmailStr
         referral_code: Optional[str] = None
 
@@ -811,7 +861,9 @@ https://ecomtrend.ai
                 detail="キャンセル処理に失敗しました",
             )
 
-        return {"message": "サブスクリプションをキャンセルしました。期間終了後にFREEプランに戻ります。"}
+        return {
+            "message": "サブスクリプションをキャンセルしました。期間終了後にFREEプランに戻ります。"
+        }
 
     @app.get("/billing/plans", tags=["Billing"])
     async def get_plans():
@@ -820,24 +872,26 @@ https://ecomtrend.ai
 
         plans = []
         for plan, limits in PLAN_LIMITS.items():
-            plans.append({
-                "id": plan.value,
-                "name": {
-                    SubscriptionPlan.FREE: "Free",
-                    SubscriptionPlan.PRO: "Pro",
-                    SubscriptionPlan.ENTERPRISE: "Enterprise",
-                }[plan],
-                "price_jpy": limits.price_jpy,
-                "features": {
-                    "daily_reports": limits.daily_reports,
-                    "categories": limits.categories,
-                    "api_calls_per_day": limits.api_calls_per_day,
-                    "realtime_alerts": limits.realtime_alerts,
-                    "custom_dashboard": limits.custom_dashboard,
-                    "export_formats": limits.export_formats,
-                    "support_level": limits.support_level,
-                },
-            })
+            plans.append(
+                {
+                    "id": plan.value,
+                    "name": {
+                        SubscriptionPlan.FREE: "Free",
+                        SubscriptionPlan.PRO: "Pro",
+                        SubscriptionPlan.ENTERPRISE: "Enterprise",
+                    }[plan],
+                    "price_jpy": limits.price_jpy,
+                    "features": {
+                        "daily_reports": limits.daily_reports,
+                        "categories": limits.categories,
+                        "api_calls_per_day": limits.api_calls_per_day,
+                        "realtime_alerts": limits.realtime_alerts,
+                        "custom_dashboard": limits.custom_dashboard,
+                        "export_formats": limits.export_formats,
+                        "support_level": limits.support_level,
+                    },
+                }
+            )
         return {"plans": plans}
 
     # === エンドポイント: 紹介プログラム ===
@@ -977,10 +1031,28 @@ https://ecomtrend.ai
 
     # === エンドポイント: トレンドAPI ===
 
+    def affiliate_records(rows, fields: Optional[tuple[str, ...]] = None) -> list[dict]:
+        """
+        各行に affiliate_url を付けたレコードのリスト
+
+        Args:
+            rows: DataFrame（欠損値は None にする）、辞書のリスト、または TrendItem のリスト
+            fields: TrendItem から取り出す属性名（TrendItem のリストの場合に指定）
+
+        Returns:
+            入力と同順のレコード（affiliate_url は末尾）
+        """
+        if fields is not None:
+            rows = [{name: getattr(t, name) for name in fields} for t in rows]
+        elif hasattr(rows, "to_dict"):
+            rows = rows.astype(object).where(rows.notna(), None).to_dict("records")
+        return [{**row, "affiliate_url": get_affiliate_url(row["asin"])} for row in rows]
+
     @app.get("/trends", response_model=TrendsResponse, tags=["Trends"])
     async def get_trends(
         limit: int = 20,
         category: Optional[str] = None,
+        collapse: bool = False,
         user: User = Depends(check_api_limit),
     ):
         """
@@ -988,9 +1060,9 @@ https://ecomtrend.ai
 
         - **limit**: 取得件数（デフォルト20、FREEプランは10まで）
         - **category**: カテゴリフィルタ
+        - **collapse**: 重複商品（別カテゴリ・色違いなど）を1件にまとめる
         """
         from analyzer import TrendAnalyzer
-        from config import get_affiliate_url
 
         limits = user.get_limits()
 
@@ -999,13 +1071,13 @@ https://ecomtrend.ai
             limit = min(limit, limits.daily_reports)
 
         analyzer = TrendAnalyzer()
-        trends = analyzer.analyze_trends(top_n=limit)
+        trends = analyzer.analyze_trends(top_n=limit, collapse_duplicates=collapse)
 
         # カテゴリフィルタ
         if category:
             # プランによるカテゴリ制限
             if limits.categories != -1:
-                allowed_categories = ["electronics", "computers"][:limits.categories]
+                allowed_categories = ["electronics", "computers"][: limits.categories]
                 if category not in allowed_categories:
                     raise HTTPException(
                         status_code=status.HTTP_403_FORBIDDEN,
@@ -1013,18 +1085,7 @@ https://ecomtrend.ai
                     )
             trends = [t for t in trends if t.category == category]
 
-        items = []
-        for t in trends:
-            items.append({
-                "name": t.name,
-                "asin": t.asin,
-                "category": t.category,
-                "current_rank": t.current_rank,
-                "rank_change_percent": t.rank_change_percent,
-                "price": t.price,
-                "trend_score": t.trend_score,
-                "affiliate_url": get_affiliate_url(t.asin),
-            })
+        items = affiliate_records(trends, TREND_RECORD_FIELDS)
 
         return {
             "date": datetime.now().strftime("%Y-%m-%d"),
@@ -1074,16 +1135,18 @@ https://ecomtrend.ai
     @app.get("/trends/significant", tags=["Trends"])
     @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
     async def get_significant_movers(
-        threshold: float = 80.0,
+        threshold: Optional[float] = None,
         user: User = Depends(check_api_limit),
     ):
         """
         大幅変動商品を取得（PRO以上）
 
-        - **threshold**: 変動率閾値（デフォルト80%）
+        収集時の異常検知でASIN・カテゴリの通常の変動幅から外れた商品を返します
+        （検出結果がない場合は変動率の閾値で判定）。
+
+        - **threshold**: 変動率閾値（%、指定時はさらに絞り込み）
         """
         from analyzer import TrendAnalyzer
-        from config import get_affiliate_url
 
         analyzer = TrendAnalyzer()
         significant = analyzer.detect_significant_movers(threshold=threshold)
@@ -1091,45 +1154,324 @@ https://ecomtrend.ai
         return {
             "threshold": threshold,
             "count": len(significant),
+            "items": affiliate_records(
+                significant, ("name", "asin", "category", "rank_change_percent")
+            ),
+        }
+
+    @app.get("/trends/scores", tags=["Trends"])
+    @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
+    async def get_custom_scores(
+        score: str = "default",
+        limit: int = 20,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        カスタムスコア順のトレンドを取得（PRO以上）
+
+        プランで利用できる全スコアを既定のスコアと同じ計算でまとめて求める
+
+        - **score**: 並べ替えに使うスコア名（data/scores.json で定義）
+        - **limit**: 取得件数
+        """
+        from analyzer import TrendAnalyzer
+
+        analyzer = TrendAnalyzer()
+        names = analyzer.scoring.available_for(user.plan.value)
+        if score not in names:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"利用できないスコアです: {score}（利用可能: {', '.join(names)}）",
+            )
+
+        trends, scores = analyzer.analyze_scores(score, names, top_n=limit)
+        return {
+            "score": score,
+            "scores": names,
+            "count": len(trends),
             "items": [
-                {
-                    "name": t.name,
-                    "asin": t.asin,
-                    "category": t.category,
-                    "rank_change_percent": t.rank_change_percent,
-                    "affiliate_url": get_affiliate_url(t.asin),
-                }
-                for t in significant
+                {**item, "scores": row}
+                for item, row in zip(
+                    affiliate_records(trends, TREND_RECORD_FIELDS),
+                    scores[names].to_dict("records"),
+                )
             ],
         }
 
-    # === エンドポイント: エクスポート ===
-
-    @app.get("/export/csv", tags=["Export"])
+    @app.get("/trends/forecast", tags=["Trends"])
     @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
-    async def export_csv(user: User = Depends(check_api_limit)):
-        """トレンドデータをCSVでエクスポート（PRO以上）"""
-        from fastapi.responses import StreamingResponse
-        import io
-        import csv
+    async def get_rank_forecast(
+        horizon: int = 1,
+        days: int = 28,
+        limit: int = 20,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        ランク予測を取得（PRO以上）
 
+        全ASINの日次ランク推移に傾き・曜日の周期を当てはめ、予測上昇率の高い順に返す
+
+        - **horizon**: 何日後を予測するか（1〜14）
+        - **days**: 当てはめに使う日数（7〜90）
+        - **limit**: 取得件数
+        """
         from analyzer import TrendAnalyzer
 
+        if not 1 <= horizon <= 14 or not 7 <= days <= 90:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="horizonは1〜14、daysは7〜90の範囲で指定してください",
+            )
+
         analyzer = TrendAnalyzer()
-        trends = analyzer.analyze_trends(top_n=100)
+        forecast = analyzer.forecast(days=days, horizon=horizon, top_n=limit)
+        return {
+            "horizon": horizon,
+            "days": days,
+            "count": len(forecast),
+            "items": affiliate_records(forecast),
+        }
+
+    @app.get("/trends/price-drops", tags=["Trends"])
+    @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
+    async def get_price_drops(
+        hours: int = 24,
+        min_percent: float = 0.0,
+        category: Optional[str] = None,
+        limit: int = 20,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        値下がり商品を取得（PRO以上）
+
+        収集時に前回価格・直近の中央値から閾値以上下がった商品を、下落率の大きい順に返す
+
+        - **hours**: 対象期間（1〜168時間、最新の検出時刻から数える）
+        - **min_percent**: 下落率の下限（%）
+        - **category**: カテゴリで絞り込み
+        - **limit**: 取得件数
+        """
+        from prices import recent_price_drops
+
+        if not 1 <= hours <= 168:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="hoursは1〜168の範囲で指定してください",
+            )
+
+        drops = recent_price_drops(hours, min_percent, category).head(limit)
+        return {
+            "hours": hours,
+            "count": len(drops),
+            "items": affiliate_records(drops),
+        }
+
+    # === エンドポイント: 商品 ===
+
+    def parse_date_range(date_from: Optional[str], date_to: Optional[str]):
+        """from/toクエリをパース（不正な形式は400）"""
+        from exporter import parse_date
+
+        try:
+            return parse_date(date_from), parse_date(date_to)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    @app.get("/products/search", tags=["Products"])
+    async def search_products(
+        q: str,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        limit: int = 20,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        商品名で検索
+
+        商品名の文字2-gram・3-gramの索引で、空白区切りの語をすべて含む商品を一致度の高い順に返す
+
+        - **q**: 検索語（1文字の語だけの場合は全商品名を確かめる）
+        - **category**: カテゴリで絞り込み（そのカテゴリに掲載されたことのある商品）
+        - **min_price** / **max_price**: 価格の範囲
+        - **min_rating**: 評価の下限
+        - **limit**: 取得件数（1〜100）
+        """
+        from search import search_products as search
+        from search import split_query
+
+        if not split_query(q):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="qに検索語を指定してください",
+            )
+        if not 1 <= limit <= 100:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="limitは1〜100の範囲で指定してください",
+            )
+
+        results = search(q, category, min_price, max_price, min_rating, limit)
+        return {
+            "query": q,
+            "count": len(results),
+            "items": affiliate_records(results),
+        }
+
+    @app.get("/products/{asin}", tags=["Products"])
+    async def get_product(
+        asin: str,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        商品の最新の観測値と全期間の要約を取得
+
+        - **asin**: 商品ID
+        """
+        from products import product_detail
+
+        detail = product_detail(asin)
+        if detail is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"商品が見つかりません: {asin}",
+            )
+        return {**detail, "affiliate_url": get_affiliate_url(asin)}
+
+    @app.get("/products/{asin}/history", tags=["Products"])
+    async def get_product_history(
+        asin: str,
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        category: Optional[str] = None,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        商品のランク・価格・評価・スコアの時系列を取得
 
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["name", "asin", "category", "current_rank", "rank_change_percent", "price"])
+        収集時に更新するASIN別の時系列索引から返すため、数年分でも履歴ファイルは読みません。
 
-        for t in trends:
-            writer.writerow([t.name, t.asin, t.category, t.current_rank, t.rank_change_percent, t.price])
+        - **asin**: 商品ID
+        - **from**: 開始日（YYYY-MM-DD、省略時は全期間）
+        - **to**: 終了日（YYYY-MM-DD）
+        - **category**: カテゴリで絞り込み
+        """
+        from products import product_history
+
+        start, end = parse_date_range(date_from, date_to)
+        series = product_history(asin, start, end, category)
+        if series is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"商品が見つかりません: {asin}",
+            )
+        # 値はJSONの型に変換済みのため、数万点の検査・変換（jsonable_encoder）を省く
+        return JSONResponse(
+            {
+                "asin": asin,
+                "from": start.isoformat() if start else None,
+                "to": end.isoformat() if end else None,
+                "count": len(series["timestamp"]),
+                "series": series,
+            }
+        )
 
-        output.seek(0)
+    # === エンドポイント: ウォッチリスト ===
+
+    @app.get("/watchlist", tags=["Watchlist"])
+    @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
+    async def get_watchlist(user: User = Depends(check_api_limit)):
+        """ウォッチリストを取得（PRO以上）"""
+        from watchlist import WatchlistStore
+
+        return WatchlistStore().get(user.user_id).to_dict()
+
+    @app.put("/watchlist", tags=["Watchlist"])
+    @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
+    async def update_watchlist(
+        request: WatchlistRequest,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        ウォッチリストを置き換え（PRO以上）
+
+        収集のたびに全ユーザーのウォッチリストとまとめて照合し、一致した商品を通知します。
+        ASINは毎回、キーワード・カテゴリはランキングに新しく入った商品だけが対象です。
+
+        - **asins**: 商品ID
+        - **keywords**: 商品名に含まれる語（全角・半角、大文字・小文字、空白・記号は区別しない）
+        - **categories**: カテゴリ
+        """
+        from watchlist import WatchlistStore
+
+        try:
+            watchlist = WatchlistStore().set(
+                user.user_id, request.asins, request.keywords, request.categories
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return watchlist.to_dict()
+
+    @app.get("/watchlist/alerts", tags=["Watchlist"])
+    @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
+    async def get_watchlist_alerts(
+        hours: int = 24,
+        limit: int = 50,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        ウォッチリストの通知を取得（PRO以上）
+
+        - **hours**: 対象期間（1〜168時間、最新の通知時刻から数える）
+        - **limit**: 取得件数
+        """
+        from watchlist import recent_alerts
+
+        if not 1 <= hours <= 168:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="hoursは1〜168の範囲で指定してください",
+            )
+
+        alerts = recent_alerts(user.user_id, hours).drop(columns="user_id").head(limit)
+        return {
+            "hours": hours,
+            "count": len(alerts),
+            "items": affiliate_records(alerts),
+        }
+
+    # === エンドポイント: エクスポート ===
+
+    @app.get("/export/csv", tags=["Export"])
+    @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
+    async def export_csv(
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        category: Optional[str] = None,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        履歴データをCSVでエクスポート（PRO以上）
+
+        - **from**: 開始日（YYYY-MM-DD、省略時は全期間）
+        - **to**: 終了日（YYYY-MM-DD）
+        - **category**: カテゴリフィルタ
+
+        行を逐次書き出すため、長期間でも即座に送信が始まります。
+        """
+        from fastapi.responses import StreamingResponse
+
+        from exporter import CSV_MEDIA_TYPE, iter_history_rows, stream_csv
+
+        start, end = parse_date_range(date_from, date_to)
+        rows = iter_history_rows(date_from=start, date_to=end, category=category)
         return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=trends_{datetime.now().strftime('%Y%m%d')}.csv"},
+            stream_csv(rows),
+            media_type=CSV_MEDIA_TYPE,
+            headers={
+                "Content-Disposition": f"attachment; filename=trends_{datetime.now().strftime('%Y%m%d')}.csv"
+            },
         )
 
     @app.get("/export/json", tags=["Export"])
@@ -1137,7 +1479,6 @@ https://ecomtrend.ai
     async def export_json(user: User = Depends(check_api_limit)):
         """トレンドデータをJSONでエクスポート（PRO以上）"""
         from analyzer import TrendAnalyzer
-        from config import get_affiliate_url
 
         analyzer = TrendAnalyzer()
         trends = analyzer.analyze_trends(top_n=100)
@@ -1145,27 +1486,208 @@ https://ecomtrend.ai
         return {
             "exported_at": datetime.now().isoformat(),
             "count": len(trends),
-            "data": [
-                {
-                    "name": t.name,
-                    "asin": t.asin,
-                    "category": t.category,
-                    "current_rank": t.current_rank,
-                    "previous_rank": t.previous_rank,
-                    "rank_change": t.rank_change,
-                    "rank_change_percent": t.rank_change_percent,
-                    "price": t.price,
-                    "affiliate_url": get_affiliate_url(t.asin),
-                }
-                for t in trends
-            ],
+            "data": affiliate_records(trends, EXPORT_RECORD_FIELDS),
         }
 
+    @app.get("/export/xlsx", tags=["Export"])
+    @require_plan(SubscriptionPlan.ENTERPRISE)
+    async def export_xlsx(
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        category: Optional[str] = None,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        履歴データをExcel（xlsx）でエクスポート（ENTERPRISE）
+
+        - **from**: 開始日（YYYY-MM-DD、省略時は全期間）
+        - **to**: 終了日（YYYY-MM-DD）
+        - **category**: カテゴリフィルタ
+
+        constant_memoryモードで書き出すため、全履歴でもメモリ使用量は一定です。
+        """
+        from fastapi.responses import StreamingResponse
+
+        from exporter import (
+            XLSX_MEDIA_TYPE,
+            XLSXWRITER_AVAILABLE,
+            iter_history_rows,
+            stream_xlsx,
+        )
+
+        if not XLSXWRITER_AVAILABLE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Excelエクスポートが利用できません",
+            )
+        start, end = parse_date_range(date_from, date_to)
+        rows = iter_history_rows(date_from=start, date_to=end, category=category)
+        return StreamingResponse(
+            stream_xlsx(rows),
+            media_type=XLSX_MEDIA_TYPE,
+            headers={
+                "Content-Disposition": f"attachment; filename=trends_{datetime.now().strftime('%Y%m%d')}.xlsx"
+            },
+        )
+
+    @app.get("/export/ndjson", tags=["Export"])
+    @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
+    async def export_ndjson(
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        category: Optional[str] = None,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        履歴データをNDJSON（1行1レコード）でエクスポート（PRO以上）
+
+        レスポンス全体を1つのJSONにせず、行ごとに逐次送信します。
+        """
+        from fastapi.responses import StreamingResponse
+
+        from exporter import NDJSON_MEDIA_TYPE, iter_history_rows, stream_ndjson
+
+        start, end = parse_date_range(date_from, date_to)
+        rows = iter_history_rows(date_from=start, date_to=end, category=category)
+        return StreamingResponse(
+            stream_ndjson(rows),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={
+                "Content-Disposition": f"attachment; filename=trends_{datetime.now().strftime('%Y%m%d')}.ndjson"
+            },
+        )
+
+    def columnar_response(
+        fmt: str, date_from: Optional[str], date_to: Optional[str], category: Optional[str]
+    ):
+        """事前生成スナップショットからParquet / Arrowのレスポンスを作成"""
+        from fastapi.responses import FileResponse, StreamingResponse
+
+        from exporter import (
+            ARROW_MEDIA_TYPE,
+            ARROW_SUFFIX,
+            PARQUET_MEDIA_TYPE,
+            PARQUET_SUFFIX,
+            PYARROW_AVAILABLE,
+            cached_parquet,
+            default_export_dir,
+            iter_arrow_tables,
+            list_raw_files,
+            stream_arrow,
+        )
+
+        if not PYARROW_AVAILABLE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="列指向フォーマットのエクスポートが利用できません",
+            )
+
+        start, end = parse_date_range(date_from, date_to)
+        export_dir = default_export_dir()
+        not_found = HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="エクスポートデータがありません",
+        )
+
+        # Parquetは保存済みのスナップショット（結合・絞り込みはスナップショットの版ごとのキャッシュ）を送信
+        if fmt == "parquet":
+            path = cached_parquet(export_dir, start, end, category)
+            if path is None:
+                raise not_found
+            filename = f"trends_{datetime.now().strftime('%Y%m%d')}{PARQUET_SUFFIX}"
+            return FileResponse(path, media_type=PARQUET_MEDIA_TYPE, filename=filename)
+
+        files = (
+            list_raw_files(export_dir, start, end, suffix=ARROW_SUFFIX)
+            if export_dir.exists()
+            else []
+        )
+        if not files:
+            raise not_found
+
+        filename = f"trends_{datetime.now().strftime('%Y%m%d')}{ARROW_SUFFIX}"
+        # 1スナップショットそのままならファイルを直接送信（変換なし）
+        if len(files) == 1 and not category:
+            return FileResponse(files[0], media_type=ARROW_MEDIA_TYPE, filename=filename)
+
+        # Arrow IPCストリームはメモリマップしたスナップショットのバッチを順に送るだけ（再エンコードなし）
+        return StreamingResponse(
+            stream_arrow(iter_arrow_tables(export_dir, start, end, category)),
+            media_type=ARROW_MEDIA_TYPE,
+            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        )
+
+    @app.get("/export/parquet", tags=["Export"])
+    @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
+    async def export_parquet(
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        category: Optional[str] = None,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        履歴データをParquetでエクスポート（PRO以上）
+
+        収集時に生成済みのスナップショットを配信します。
+        """
+        return columnar_response("parquet", date_from, date_to, category)
+
+    @app.get("/export/arrow", tags=["Export"])
+    @require_plan(SubscriptionPlan.PRO, SubscriptionPlan.ENTERPRISE)
+    async def export_arrow(
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        category: Optional[str] = None,
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        履歴データをArrow IPCストリームでエクスポート（PRO以上）
+
+        収集時に生成済みのスナップショットをメモリマップで読み出して配信します。
+        """
+        return columnar_response("arrow", date_from, date_to, category)
+
+    @app.get("/export", tags=["Export"])
+    async def export_negotiated(
+        date_from: Optional[str] = Query(None, alias="from"),
+        date_to: Optional[str] = Query(None, alias="to"),
+        category: Optional[str] = None,
+        accept: Optional[str] = Header(None),
+        user: User = Depends(check_api_limit),
+    ):
+        """
+        Acceptヘッダーでフォーマットを選択してエクスポート
+
+        text/csv, application/json, application/x-ndjson,
+        application/vnd.apache.parquet, application/vnd.apache.arrow.stream,
+        xlsx に対応（プラン制限は各フォーマットのエンドポイントと同じ）
+        """
+        from exporter import negotiate_format
+
+        fmt = negotiate_format(accept)
+        if fmt is None:
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail="対応していないフォーマットです",
+            )
+        if fmt == "json":
+            return await export_json(user=user)
+
+        handler = {
+            "csv": export_csv,
+            "ndjson": export_ndjson,
+            "parquet": export_parquet,
+            "arrow": export_arrow,
+            "xlsx": export_xlsx,
+        }[fmt]
+        return await handler(date_from=date_from, date_to=date_to, category=category, user=user)
+
     return app
 
 
 # === エントリポイント ===
 
+
 def run_server(host: str = "0.0.0.0", port: int = 8000):  # nosec B104 - Docker環境での標準設定
     """APIサーバーを起動"""
     if not FASTAPI_AVAILABLE:
@@ -1174,6 +1696,7 @@ def run_server(host: str = "0.0.0.0", port: int = 8000):  # nosec B104 - Docker
 
     try:
         import uvicorn
+
         app = create_app()
         uvicorn.run(app, host=host, port=port)
     except ImportError:
@@ -1184,7 +1707,9 @@ if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="EcomTrendAI API Server")
-    parser.add_argument("--host", default="0.0.0.0", help="ホスト（デフォルト: 0.0.0.0）")  # nosec B104
+    parser.add_argument(
+        "--host", default="0.0.0.0", help="ホスト（デフォルト: 0.0.0.0）"
+    )  # nosec B104
     parser.add_argument("--port", type=int, default=8000, help="ポート（デフォルト: 8000）")
 
     args = parser.parse_args()
@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+"""
+レポートアーカイブモジュール
+
+日次レポートを静的サイトとして蓄積し、インデックスページで相互リンクする
+- ソースデータのコンテンツハッシュをマニフェストに記録
+- 変更のあった日のみ再生成（インクリメンタルビルド）
+- ページ番号を古い順に固定し、日が増えても既存ページを書き換えない
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from html import escape
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from config import config
+from exporter import RAW_FILE_PATTERN
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class ArchiveBuildResult:
+    """アーカイブビルド結果"""
+
+    rebuilt_days: list[str] = field(default_factory=list)
+    skipped_days: list[str] = field(default_factory=list)
+    removed_days: list[str] = field(default_factory=list)
+    pages_written: int = 0
+    pages_unchanged: int = 0
+
+
+def default_raw_dir() -> Path:
+    """生データの既定ディレクトリ（RAW_STORAGE_FORMAT が列指向なら列指向ストアのルート）"""
+    if config.storage.is_columnar:
+        return Path(config.paths.columnar_data_dir)
+    return Path(config.paths.raw_data_dir)
+
+
+def group_raw_files_by_day(data_dir: Path) -> dict[str, list[Path]]:
+    """
+    生データファイルを日付ごとにグループ化
+
+    CSV（products_YYYYMMDD_HHMMSS.csv）のほか、列指向ストアのルートを渡すと
+    パーティションファイル（date=*/category=*/part-*）をグループ化する
+
+    Args:
+        data_dir: 生データディレクトリ、または列指向ストアのルート
+
+    Returns:
+        YYYYMMDD -> ファイルパスリスト（時刻順）
+    """
+    days: dict[str, list[Path]] = {}
+    for path in sorted(data_dir.glob("products_*.csv")):
+        match = RAW_FILE_PATTERN.search(path.name)
+        if match:
+            days.setdefault(match.group(1), []).append(path)
+    if not days and any(data_dir.glob("date=*")):
+        from storage import STORAGE_FORMATS, ColumnarStore
+
+        for file_format in STORAGE_FORMATS:
+            days = ColumnarStore(root=data_dir, file_format=file_format).files_by_day()
+            if days:
+                break
+    return days
+
+
+def category_slug(category: str) -> str:
+    """カテゴリ名をファイル名用スラッグに変換"""
+    from scraper import AmazonScraper
+
+    for slug, name in AmazonScraper.CATEGORIES.items():
+        if name == category or slug == category:
+            return str(slug)
+    if re.fullmatch(r"[A-Za-z0-9_-]+", category):
+        return category.lower()
+    return "cat-" + hashlib.sha1(category.encode("utf-8")).hexdigest()[:10]
+
+
+def _atomic_write(path: Path, content: str) -> None:
+    """一時ファイル経由でアトミックに書き込み"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class ReportArchiveBuilder:
+    """
+    インクリメンタル静的レポートアーカイブ
+
+    出力構成:
+        archive/index.html              最新ページ
+        archive/pages/page-N.html       日付一覧（古い順に固定番号）
+        archive/days/trends_YYYYMMDD.html
+        archive/category/<slug>/page-N.html
+        archive/manifest.json
+    """
+
+    def __init__(
+        self,
+        data_dir: Optional[Path] = None,
+        archive_dir: Optional[Path] = None,
+        per_page: int = 30,
+        top_n: int = 20,
+        scores_path: Optional[Path] = None,
+    ):
+        """
+        Args:
+            data_dir: 生データディレクトリ（省略時は default_raw_dir）
+            archive_dir: 出力先（省略時は reports/archive）
+            per_page: 一覧ページあたりの日数
+            top_n: 日別ページに載せるトレンド件数
+            scores_path: スコア定義ファイル（省略時は data/scores.json、なければ既定のスコア）
+        """
+        from scoring import default_scores_path
+
+        self.data_dir = data_dir or default_raw_dir()
+        self.archive_dir = archive_dir or config.paths.reports_dir / "archive"
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.archive_dir / "manifest.json"
+        self.per_page = per_page
+        self.top_n = top_n
+        self.scores_path = scores_path or default_scores_path()
+        self.scoring = None
+
+    # === マニフェスト ===
+
+    def load_manifest(self) -> dict:
+        """マニフェストを読み込み"""
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    manifest: dict = json.load(f)
+                if manifest.get("version") == MANIFEST_VERSION:
+                    return manifest
+                logger.info("マニフェストのバージョンが異なるため全再生成します")
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning(f"マニフェスト読み込みエラー: {e}")
+        return {"version": MANIFEST_VERSION, "files": {}, "days": {}, "pages": {}}
+
+    def save_manifest(self, manifest: dict) -> None:
+        """マニフェストを保存"""
+        _atomic_write(self.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1))
+
+    def _file_key(self, path: Path) -> str:
+        """マニフェストでのファイルのキー（データディレクトリからの相対パス）"""
+        return path.relative_to(self.data_dir).as_posix()
+
+    def _file_hash(self, path: Path, file_cache: dict) -> str:
+        """
+        ファイルのコンテンツハッシュを取得
+
+        サイズと更新時刻が前回と同じならキャッシュ済みハッシュを再利用する
+        """
+        stat = path.stat()
+        cached = file_cache.get(self._file_key(path))
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return str(cached["sha256"])
+
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        file_cache[self._file_key(path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+        }
+        return digest
+
+    def _scores_hash(self) -> str:
+        """スコア定義ファイルの内容ハッシュ（ファイルがなければ既定のスコアを表す空文字）"""
+        if not self.scores_path.exists():
+            return ""
+        return hashlib.sha256(self.scores_path.read_bytes()).hexdigest()
+
+    def _day_hash(self, files: list[Path], file_cache: dict, scores_hash: str = "") -> str:
+        """日単位のハッシュ（スコア定義 + ファイル名 + 内容ハッシュ）"""
+        h = hashlib.sha256(scores_hash.encode("ascii"))
+        for path in files:
+            h.update(self._file_key(path).encode("utf-8"))
+            h.update(self._file_hash(path, file_cache).encode("ascii"))
+        return h.hexdigest()
+
+    # === ビルド ===
+
+    def build(self, force: bool = False) -> ArchiveBuildResult:
+        """
+        アーカイブをビルド
+
+        Args:
+            force: Trueなら全日を再生成
+
+        Returns:
+            ArchiveBuildResult
+        """
+        from scoring import ScoreRegistry
+
+        result = ArchiveBuildResult()
+        # スコア定義が変わったら全日を再生成する（日単位のハッシュに含める）
+        self.scoring = ScoreRegistry.load(self.scores_path)
+        scores_hash = self._scores_hash()
+        manifest = self.load_manifest()
+        file_cache = manifest["files"]
+        days_meta = manifest["days"]
+
+        sources = group_raw_files_by_day(self.data_dir)
+
+        # 削除された日
+        for day in sorted(set(days_meta) - set(sources)):
+            (self.archive_dir / "days" / f"trends_{day}.html").unlink(missing_ok=True)
+            del days_meta[day]
+            result.removed_days.append(day)
+        live_files = {self._file_key(p) for files in sources.values() for p in files}
+        for name in list(file_cache):
+            if name not in live_files:
+                del file_cache[name]
+
+        for day, files in sorted(sources.items()):
+            day_hash = self._day_hash(files, file_cache, scores_hash)
+            meta = days_meta.get(day)
+            day_page = self.archive_dir / "days" / f"trends_{day}.html"
+            if not force and meta and meta["hash"] == day_hash and day_page.exists():
+                result.skipped_days.append(day)
+                continue
+
+            summary = self._build_day(day, files)
+            summary["hash"] = day_hash
+            days_meta[day] = summary
+            result.rebuilt_days.append(day)
+
+        self._write_indexes(manifest, result)
+        self.save_manifest(manifest)
+
+        logger.info(
+            f"アーカイブビルド完了: 再生成{len(result.rebuilt_days)}日 / "
+            f"スキップ{len(result.skipped_days)}日 / ページ書込{result.pages_written}件"
+        )
+        return result
+
+    def _build_day(self, day: str, files: list[Path]) -> dict:
+        """
+        1日分のレポートページを生成し、インデックス用サマリーを返す
+        """
+        from analyzer import TrendAnalyzer, read_raw_files
+        from reporter import HTMLReportGenerator, build_report_view
+
+        df = read_raw_files(files)
+        # 同日に複数回収集した場合は最後の値を採用
+        df = df.drop_duplicates(subset=["asin", "category"], keep="last")
+
+        analyzer = TrendAnalyzer(data_dir=self.data_dir, scoring=self.scoring)
+        trends = analyzer.analyze_dataframe(df, top_n=self.top_n)
+        category_trends = analyzer.analyze_dataframe_by_category(df)
+
+        generated_at = datetime.strptime(day, "%Y%m%d")
+        view = build_report_view(trends, category_trends, generated_at)
+        HTMLReportGenerator(output_dir=self.archive_dir / "days").write(view)
+
+        def _summary(items: list, n: int) -> list[dict]:
+            return [
+                {
+                    "asin": t.asin,
+                    "name": t.name,
+                    "change_label": t.change_label,
+                    "affiliate_url": t.affiliate_url,
+                }
+                for t in items[:n]
+            ]
+
+        return {
+            "count": int(len(df)),
+            "top": _summary(view.trends, 3),
+            "categories": {
+                category: _summary(items, 3) for category, items in view.category_trends.items()
+            },
+        }
+
+    # === インデックス ===
+
+    def _paginate(self, items: list) -> list[list]:
+        """古い順に固定サイズでページ分割"""
+        return [items[i : i + self.per_page] for i in range(0, len(items), self.per_page)] or [[]]
+
+    def _write_page(
+        self, manifest: dict, rel_path: str, html: str, result: ArchiveBuildResult
+    ) -> None:
+        """内容が変わったページのみ書き込み"""
+        digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        path = self.archive_dir / rel_path
+        if manifest["pages"].get(rel_path) == digest and path.exists():
+            result.pages_unchanged += 1
+            return
+        _atomic_write(path, html)
+        manifest["pages"][rel_path] = digest
+        result.pages_written += 1
+
+    def _write_indexes(self, manifest: dict, result: ArchiveBuildResult) -> None:
+        """日付インデックスとカテゴリ別アーカイブを生成"""
+        days_meta = manifest["days"]
+        days = sorted(days_meta)
+        live_pages: set[str] = set()
+
+        # 日付インデックス
+        pages = self._paginate(days)
+        for number, page_days in enumerate(pages, 1):
+            rel = f"pages/page-{number}.html"
+            html = self._render_index_page(
+                "EcomTrendAI レポートアーカイブ",
+                [(day, days_meta[day]["top"], f"../days/trends_{day}.html") for day in page_days],
+                prev_href=f"page-{number - 1}.html" if number > 1 else None,
+                next_href=f"page-{number + 1}.html" if number < len(pages) else None,
+                categories=self._category_links(days_meta, "../"),
+            )
+            self._write_page(manifest, rel, html, result)
+            live_pages.add(rel)
+
+        latest = len(pages)
+        index_html = self._render_index_page(
+            "EcomTrendAI レポートアーカイブ",
+            [(day, days_meta[day]["top"], f"days/trends_{day}.html") for day in pages[-1]],
+            prev_href=f"pages/page-{latest - 1}.html" if latest > 1 else None,
+            next_href=None,
+            categories=self._category_links(days_meta, ""),
+        )
+        self._write_page(manifest, "index.html", index_html, result)
+        live_pages.add("index.html")
+
+        # カテゴリ別アーカイブ
+        by_category: dict[str, list[str]] = {}
+        for day in days:
+            for category in days_meta[day]["categories"]:
+                by_category.setdefault(category, []).append(day)
+
+        for category, category_days in sorted(by_category.items()):
+            slug = category_slug(category)
+            cat_pages = self._paginate(category_days)
+            for number, page_days in enumerate(cat_pages, 1):
+                rel = f"category/{slug}/page-{number}.html"
+                html = self._render_index_page(
+                    f"{category} のトレンドアーカイブ",
+                    [
+                        (
+                            day,
+                            days_meta[day]["categories"][category],
+                            f"../../days/trends_{day}.html",
+                        )
+                        for day in page_days
+                    ],
+                    prev_href=f"page-{number - 1}.html" if number > 1 else None,
+                    next_href=f"page-{number + 1}.html" if number < len(cat_pages) else None,
+                    home_href="../../index.html",
+                )
+                self._write_page(manifest, rel, html, result)
+                live_pages.add(rel)
+
+        # 不要になったページを削除
+        for rel in set(manifest["pages"]) - live_pages:
+            (self.archive_dir / rel).unlink(missing_ok=True)
+            del manifest["pages"][rel]
+
+    def _category_links(self, days_meta: dict, prefix: str) -> list[tuple[str, str]]:
+        """カテゴリ別アーカイブへのリンク一覧"""
+        categories = sorted({c for meta in days_meta.values() for c in meta["categories"]})
+        return [(c, f"{prefix}category/{category_slug(c)}/page-1.html") for c in categories]
+
+    def _render_index_page(
+        self,
+        title: str,
+        entries: list[tuple[str, list[dict], str]],
+        prev_href: Optional[str],
+        next_href: Optional[str],
+        categories: Optional[list[tuple[str, str]]] = None,
+        home_href: Optional[str] = None,
+    ) -> str:
+        """インデックスページHTMLを構築（新しい日付を上に表示）"""
+        rows = ""
+        for day, items, href in reversed(entries):
+            label = datetime.strptime(day, "%Y%m%d").strftime("%Y/%m/%d")
+            items_html = "".join(
+                f'<li><a href="{escape(i["affiliate_url"])}" target="_blank">'
+                f'{escape(i["name"][:40])}</a> <span class="change">{i["change_label"]}</span></li>'
+                for i in items
+            )
+            rows += f"""
+            <div class="day">
+                <h3><a href="{href}">{label}</a></h3>
+                <ol>{items_html}</ol>
+            </div>"""
+
+        nav = ""
+        if home_href:
+            nav += f'<a href="{home_href}">アーカイブトップ</a> '
+        if next_href:
+            nav += f'<a href="{next_href}">&laquo; 新しい日付</a> '
+        if prev_href:
+            nav += f'<a href="{prev_href}">古い日付 &raquo;</a>'
+
+        category_nav = ""
+        if categories:
+            links = " | ".join(f'<a href="{href}">{escape(name)}</a>' for name, href in categories)
+            category_nav = f'<p class="categories">カテゴリ: {links}</p>'
+
+        return f"""<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{escape(title)}</title>
+    <style>
+        body {{ font-family: 'Segoe UI', Tahoma, sans-serif; background: #f5f5f5; color: #333; }}
+        .container {{ max-width: 960px; margin: 0 auto; padding: 20px; }}
+        h1 {{ color: #667eea; }}
+        .day {{ background: white; border-radius: 10px; padding: 15px 20px; margin-bottom: 15px; }}
+        a {{ color: #667eea; text-decoration: none; }}
+        .change {{ color: #22c55e; font-size: 0.9em; }}
+        nav {{ margin: 20px 0; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>{escape(title)}</h1>
+        {category_nav}
+        {rows}
+        <nav>{nav}</nav>
+    </div>
+</body>
+</html>
+"""
+
+
+def main():
+    """メイン実行"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI レポートアーカイブ生成")
+    parser.add_argument("--force", action="store_true", help="全日を再生成")
+    parser.add_argument("--per-page", type=int, default=30, help="1ページあたりの日数")
+    parser.add_argument(
+        "--scores", type=Path, default=None, help="スコア定義ファイル（既定: data/scores.json）"
+    )
+    args = parser.parse_args()
+
+    builder = ReportArchiveBuilder(per_page=args.per_page, scores_path=args.scores)
+    result = builder.build(force=args.force)
+    print(f"再生成: {len(result.rebuilt_days)}日 / スキップ: {len(result.skipped_days)}日")
+    print(f"アーカイブ: {builder.archive_dir / 'index.html'}")
+
+
+if __name__ == "__main__":
+    main()
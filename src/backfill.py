@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+バックフィルモジュール
+
+スコアの計算式を変更した際に、過去の生データを日単位で再スコアリングし
+日別のスコア付きデータとレポートを再生成する
+
+- 日ごとに独立しているため、プロセスプールで日単位に並列実行
+- 出力は一時ファイル・一時ディレクトリ経由で置き換え（途中で止まっても壊れたファイルを残さない）
+- 完了した日ごとに進捗とスループットをログ出力
+"""
+
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from config import config
+
+
+@dataclass
+class BackfillDayResult:
+    """1日分の再生成結果"""
+
+    day: str  # YYYYMMDD
+    rows: int
+    paths: list[Path]
+    seconds: float
+
+
+@dataclass
+class BackfillResult:
+    """バックフィル全体の結果"""
+
+    days: list[BackfillDayResult] = field(default_factory=list)
+    workers: int = 1
+    seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return sum(d.rows for d in self.days)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def default_output_dir() -> Path:
+    """バックフィル出力の既定ディレクトリ"""
+    return Path(config.paths.reports_dir) / "backfill"
+
+
+def backfill_day(
+    day: str,
+    files: list[Path],
+    output_dir: Path,
+    formats: tuple[str, ...] = ("md", "html"),
+    top_n: int = 20,
+    scores_path: Optional[Path] = None,
+) -> BackfillDayResult:
+    """
+    1日分を再スコアリングし、スコア付きデータとレポートを書き出し
+
+    ワーカープロセスで実行するため、モジュールの関数として定義する。
+    スコア付きデータとレポートは同じスコア計算の結果から作る
+
+    Args:
+        day: 日付（YYYYMMDD）
+        files: その日の生データCSV、または列指向ストアのパーティションファイル（時刻順）
+        output_dir: 出力ディレクトリ
+        formats: レポート形式（reporter.REPORT_FORMATS）
+        top_n: 全体の上位件数
+        scores_path: スコア定義ファイル（省略時は data/scores.json、なければ既定のスコア）
+
+    Returns:
+        BackfillDayResult
+    """
+    from analyzer import TrendAnalyzer, read_raw_files
+    from reporter import ReportPipeline
+    from scoring import ScoreRegistry
+
+    start = time.perf_counter()
+    df = read_raw_files(files)
+    # 同日に複数回収集した場合は最後の値を採用
+    df = df.drop_duplicates(subset=["asin", "category"], keep="last")
+
+    # 計算式の変更を反映するため、スコア定義は明示的に読み込む
+    analyzer = TrendAnalyzer(data_dir=files[0].parent, scoring=ScoreRegistry.load(scores_path))
+    scored = analyzer.score_dataframe(df)
+    trends = analyzer.analyze_dataframe(scored, top_n=top_n, scored=True)
+    category_trends = analyzer.analyze_dataframe_by_category(scored, scored=True)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    scored_path = output_dir / "scored" / f"scored_{day}.csv"
+    scored_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = scored_path.with_name(scored_path.name + ".tmp")
+    scored.to_csv(tmp_path, index=False, encoding="utf-8-sig")
+    os.replace(tmp_path, scored_path)
+
+    # レポートは一時ディレクトリに書き出してから置き換え
+    paths = [scored_path]
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=f".{day}-") as tmp_dir:
+        result = ReportPipeline(output_dir=Path(tmp_dir), formats=list(formats), max_workers=1).run(
+            trends, category_trends, generated_at=datetime.strptime(day, "%Y%m%d")
+        )
+        for path in result.paths.values():
+            target = output_dir / path.name
+            os.replace(path, target)
+            paths.append(target)
+
+    return BackfillDayResult(
+        day=day, rows=len(df), paths=paths, seconds=time.perf_counter() - start
+    )
+
+
+def run_backfill(
+    data_dir: Optional[Path] = None,
+    output_dir: Optional[Path] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    workers: Optional[int] = None,
+    formats: tuple[str, ...] = ("md", "html"),
+    top_n: int = 20,
+    scores_path: Optional[Path] = None,
+) -> BackfillResult:
+    """
+    期間内の全日をプロセスプールで再生成
+
+    Args:
+        data_dir: 生データCSVのディレクトリ、または列指向ストアのルート
+            （省略時は RAW_STORAGE_FORMAT に応じた保存先）
+        output_dir: 出力ディレクトリ（省略時は reports/backfill）
+        date_from: 開始日（YYYYMMDD、含む）
+        date_to: 終了日（YYYYMMDD、含む）
+        workers: ワーカープロセス数（省略時はCPU数、1ならプロセスを起動しない）
+        formats: レポート形式
+        top_n: 全体の上位件数
+        scores_path: スコア定義ファイル（省略時は data/scores.json、なければ既定のスコア）
+
+    Returns:
+        BackfillResult（日付順）
+    """
+    from archive import default_raw_dir, group_raw_files_by_day
+    from scoring import ScoreRegistry, default_scores_path
+
+    data_dir = data_dir or default_raw_dir()
+    # コンパイル済みの式はプロセス間で渡せないため、ワーカーにはパスを渡す。
+    # 式の誤りはワーカーを起動する前に検出する
+    scores_path = scores_path or default_scores_path()
+    ScoreRegistry.load(scores_path)
+    output_dir = output_dir or default_output_dir()
+    sources = {
+        day: files
+        for day, files in group_raw_files_by_day(data_dir).items()
+        if (not date_from or day >= date_from) and (not date_to or day <= date_to)
+    }
+    workers = max(1, min(workers or os.cpu_count() or 1, len(sources) or 1))
+    result = BackfillResult(workers=workers)
+    if not sources:
+        logger.warning("バックフィル対象の生データがありません")
+        return result
+
+    logger.info(f"バックフィル開始: {len(sources)}日 / {workers}プロセス")
+    start = time.perf_counter()
+
+    def _progress(day_result: BackfillDayResult) -> None:
+        result.days.append(day_result)
+        elapsed = time.perf_counter() - start
+        rows = sum(d.rows for d in result.days)
+        logger.info(
+            f"[{len(result.days)}/{len(sources)}] {day_result.day}: {day_result.rows:,}行 "
+            f"{day_result.seconds:.2f}s（累計 {rows / elapsed:,.0f}行/s, {len(result.days) / elapsed:.2f}日/s）"
+        )
+
+    if workers == 1:
+        for day, files in sources.items():
+            _progress(backfill_day(day, files, output_dir, formats, top_n, scores_path))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(backfill_day, day, files, output_dir, formats, top_n, scores_path)
+                for day, files in sources.items()
+            ]
+            for future in as_completed(futures):
+                _progress(future.result())
+
+    result.days.sort(key=lambda d: d.day)
+    result.seconds = time.perf_counter() - start
+    logger.info(
+        f"バックフィル完了: {len(result.days)}日 / {result.rows:,}行 / {result.seconds:.2f}s "
+        f"（{result.rows_per_second:,.0f}行/s）"
+    )
+    return result
+
+
+def main():
+    """メイン実行"""
+    import argparse
+
+    from reporter import REPORT_FORMATS
+
+    parser = argparse.ArgumentParser(
+        description="EcomTrendAI 過去データの再スコアリング・レポート再生成"
+    )
+    parser.add_argument("--from", dest="date_from", help="開始日（YYYYMMDD）")
+    parser.add_argument("--to", dest="date_to", help="終了日（YYYYMMDD）")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="ワーカープロセス数（既定: CPU数）"
+    )
+    parser.add_argument(
+        "--formats", nargs="+", default=["md", "html"], choices=REPORT_FORMATS, help="レポート形式"
+    )
+    parser.add_argument("--top-n", type=int, default=20, help="全体の上位件数")
+    parser.add_argument(
+        "--output-dir", type=Path, default=None, help="出力ディレクトリ（既定: reports/backfill）"
+    )
+    parser.add_argument(
+        "--scores", type=Path, default=None, help="スコア定義ファイル（既定: data/scores.json）"
+    )
+    args = parser.parse_args()
+
+    result = run_backfill(
+        output_dir=args.output_dir,
+        date_from=args.date_from,
+        date_to=args.date_to,
+        workers=args.workers,
+        formats=tuple(args.formats),
+        top_n=args.top_n,
+        scores_path=args.scores,
+    )
+    print(
+        f"再生成: {len(result.days)}日 / {result.rows:,}行 / {result.seconds:.2f}s（{result.workers}プロセス）"
+    )
+
+
+if __name__ == "__main__":
+    main()
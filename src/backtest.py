@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""
+バックテストモジュール
+
+過去の収集データを日付順に再生し、t日のトレンドスコアが
+t+1〜t+k日のランク上昇・掲載継続をどれだけ予測できたかを測る
+
+- 指標: precision@K（上位K件のうちランクが上がった割合）、
+  persistence@K（上位K件のうち掲載が続いた割合）、
+  スコアとランク上昇幅の順位相関（Spearman）
+- スコアの構成要素（analyzer.TREND_SCORE_COMPONENTS）は1日1回だけ計算し、
+  重みの組み合わせ（グリッド）は行列積でまとめて評価する
+- 日ごとの評価はプロセスプールで並列実行
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# 評価指標
+METRICS = ["precision_at_k", "persistence_at_k", "spearman"]
+
+
+@dataclass
+class BacktestWindow:
+    """1日分の評価データ"""
+
+    day: pd.Timestamp
+    components: np.ndarray  # 商品数 × 構成要素数
+    rank: np.ndarray  # t日のランク
+    future_rank: (
+        np.ndarray
+    )  # 商品数 × ホライズン（掲載がなければNaN、その日の収集がなければ列ごとNaN）
+    observed: np.ndarray  # ホライズンごとに t+h 日の収集があるか
+
+
+@dataclass
+class BacktestResult:
+    """バックテスト結果"""
+
+    summary: pd.DataFrame  # 重み・ホライズンごとの平均指標
+    windows: int
+    seconds: float
+
+    def best(self, metric: str = "precision_at_k", horizon: int = 1) -> pd.Series:
+        """指定ホライズンで指標が最も高い重みの行"""
+        rows = self.summary[self.summary["horizon"] == horizon]
+        return rows.loc[rows[metric].idxmax()]
+
+
+def default_output_dir() -> Path:
+    """バックテスト結果の既定の出力先"""
+    return Path(config.paths.reports_dir) / "backtest"
+
+
+def load_scoring():
+    """現在のスコア定義（data/scores.json があれば読み込み、なければ既定のスコア）"""
+    from scoring import BUILTIN_SCORES, ScoreRegistry, default_scores_path
+
+    return ScoreRegistry.load() if default_scores_path().exists() else BUILTIN_SCORES
+
+
+def current_weights(scoring=None) -> dict[str, float]:
+    """
+    現在のトレンドスコアの構成要素ごとの重み
+
+    Args:
+        scoring: スコア定義（省略時は load_scoring の結果）
+    """
+    from scoring import DEFAULT_SCORE
+
+    scoring = scoring or load_scoring()
+    return dict(scoring.definitions[DEFAULT_SCORE].weights)
+
+
+def weight_grid(base: Optional[dict[str, float]] = None, **values: list[float]) -> np.ndarray:
+    """
+    構成要素ごとの重みの候補から全組み合わせを作成
+
+    指定しない構成要素の重みは現在のスコアと同じ（data/scores.json の default.weights、なければ1.0）
+
+    Args:
+        base: 指定しない構成要素の重み（省略時は current_weights の結果）
+        **values: 構成要素名 → 重みの候補（例: rank_change=[0.5, 1.0, 2.0]）
+
+    Returns:
+        組み合わせ数 × 構成要素数 の配列
+    """
+    from analyzer import TREND_SCORE_COMPONENTS
+
+    unknown = set(values) - set(TREND_SCORE_COMPONENTS)
+    if unknown:
+        raise ValueError(f"未対応の構成要素: {', '.join(sorted(unknown))}")
+    base = current_weights() if base is None else base
+    axes = [values.get(name, [base.get(name, 1.0)]) for name in TREND_SCORE_COMPONENTS]
+    return np.array(list(itertools.product(*axes)), dtype=float)
+
+
+def load_daily_snapshots(
+    data_dir: Optional[Path] = None, days: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    生データを日別のスナップショットとして読み込み
+
+    同日に複数回収集した場合は最後の値を採用する
+
+    Args:
+        data_dir: 生データCSVのディレクトリ、または列指向ストアのルート
+            （省略時は RAW_STORAGE_FORMAT に応じた保存先）
+        days: 直近の日数（省略時は全期間）
+
+    Returns:
+        day 列（日付）を加えたDataFrame（日付順）
+    """
+    from analyzer import read_raw_files
+    from archive import default_raw_dir, group_raw_files_by_day
+
+    sources = group_raw_files_by_day(data_dir or default_raw_dir())
+    selected = list(sources.items())[-days:] if days else list(sources.items())
+    frames = []
+    for day, files in selected:
+        df = read_raw_files(files)
+        df = df.drop_duplicates(subset=["asin", "category"], keep="last")
+        frames.append(df.assign(day=pd.Timestamp(day)))
+    if not frames:
+        return pd.DataFrame(columns=["day"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_windows(
+    snapshots: pd.DataFrame, horizon: int = 3, momentum: bool = True, scoring=None
+) -> list[BacktestWindow]:
+    """
+    日ごとの評価データを作成
+
+    モメンタム特徴量はその日までのデータだけで更新した状態から取る（先読みしない）
+
+    Args:
+        snapshots: load_daily_snapshots の結果
+        horizon: 何日先まで評価するか
+        momentum: モメンタム特徴量をスコアに含めるか
+        scoring: 構成要素の式を取るスコア定義（省略時は load_scoring の結果）
+
+    Returns:
+        BacktestWindowのリスト（日付順、最終日など翌日以降の収集がない日は除く）
+    """
+    from analyzer import MOMENTUM_COLUMNS, TREND_SCORE_COMPONENTS, MomentumState
+    from scoring import DEFAULT_SCORE
+
+    if snapshots.empty:
+        return []
+    keys = pd.Series(
+        snapshots["asin"].astype(str).to_numpy()
+        + "\x1f"
+        + snapshots["category"].astype(str).to_numpy()
+    )
+    codes = pd.factorize(keys)[0]
+    groups = {day: idx for day, idx in snapshots.groupby("day", sort=True).indices.items()}
+    # 日付 → (キーの索引, その日のランク)
+    lookups = {
+        day: (pd.Index(codes[idx]), snapshots["current_rank"].to_numpy(dtype=float)[idx])
+        for day, idx in groups.items()
+    }
+
+    scoring = scoring or load_scoring()
+    state = MomentumState() if momentum else None
+    windows = []
+    for day, idx in groups.items():
+        df = snapshots.iloc[idx]
+        if state is not None:
+            state.update(df)
+            features = state.features(df["asin"].to_numpy())
+            df = df.assign(**{name: features[name].to_numpy() for name in MOMENTUM_COLUMNS})
+
+        future_rank = np.full((len(idx), horizon), np.nan)
+        observed = np.zeros(horizon, dtype=bool)
+        for h in range(1, horizon + 1):
+            future = lookups.get(pd.Timestamp(day) + pd.Timedelta(days=h))
+            if future is None:
+                continue
+            index, ranks = future
+            positions = index.get_indexer(codes[idx])
+            future_rank[:, h - 1] = np.where(positions >= 0, ranks[positions], np.nan)
+            observed[h - 1] = True
+        if not observed.any():
+            continue
+
+        terms = scoring.terms(df, [DEFAULT_SCORE])[DEFAULT_SCORE]
+        windows.append(
+            BacktestWindow(
+                day=pd.Timestamp(day),
+                components=np.column_stack([terms[name] for name in TREND_SCORE_COMPONENTS]),
+                rank=df["current_rank"].to_numpy(dtype=float),
+                future_rank=future_rank,
+                observed=observed,
+            )
+        )
+    return windows
+
+
+def _column_ranks(values: np.ndarray) -> np.ndarray:
+    """列ごとの順位（同順位は平均）"""
+    return np.asarray(pd.DataFrame(values).rank(method="average"), dtype=float)
+
+
+def evaluate_window(window: BacktestWindow, weights: np.ndarray, top_k: int = 20) -> np.ndarray:
+    """
+    1日分を全ての重みで評価
+
+    Args:
+        window: 評価データ
+        weights: 組み合わせ数 × 構成要素数
+        top_k: 上位件数
+
+    Returns:
+        組み合わせ数 × ホライズン × len(METRICS) の配列（評価できない値はNaN）
+    """
+    scores = np.round(window.components @ weights.T, 2)  # 商品数 × 組み合わせ数
+    n_items, n_weights = scores.shape
+    horizon = window.future_rank.shape[1]
+    result = np.full((n_weights, horizon, len(METRICS)), np.nan)
+
+    # スコア順（同点は元の順序）の上位K件
+    # スコアは小数第2位までのため、(スコア降順, 行番号) を一意な整数キーにして部分ソートする
+    k = min(top_k, n_items)
+    keys = -np.rint(scores * 100).astype(np.int64) * n_items + np.arange(n_items)[:, None]
+    top = np.argpartition(keys, k - 1, axis=0)[:k]
+    top = np.take_along_axis(
+        top, np.argsort(np.take_along_axis(keys, top, axis=0), axis=0), axis=0
+    )  # K × 組み合わせ数
+    improvement = window.rank[:, None] - window.future_rank  # 正=上昇、掲載なし=NaN
+
+    for h in np.flatnonzero(window.observed):
+        top_improvement = improvement[top, h]  # K × 組み合わせ数
+        result[:, h, 0] = (top_improvement > 0).mean(axis=0)
+        result[:, h, 1] = (~np.isnan(top_improvement)).mean(axis=0)
+
+        # 掲載が続いた商品でのスコアとランク上昇幅の順位相関
+        present = ~np.isnan(improvement[:, h])
+        if present.sum() < 3:
+            continue
+        x = _column_ranks(scores[present])
+        x = x - x.mean(axis=0)
+        y = _column_ranks(improvement[present, h][:, None])[:, 0]
+        y = y - y.mean()
+        denominator = np.sqrt((x**2).sum(axis=0) * (y**2).sum())
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[:, h, 2] = np.where(
+                denominator > 0, (x * y[:, None]).sum(axis=0) / denominator, np.nan
+            )
+    return result
+
+
+def _evaluate_windows(
+    windows: list[BacktestWindow], weights: np.ndarray, top_k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """複数日分を評価し、(指標の合計, 評価できた日数) を返す（ワーカープロセスで実行）"""
+    total = np.zeros((len(weights), windows[0].future_rank.shape[1], len(METRICS)))
+    count = np.zeros_like(total)
+    for window in windows:
+        values = evaluate_window(window, weights, top_k)
+        valid = ~np.isnan(values)
+        total[valid] += values[valid]
+        count += valid
+    return total, count
+
+
+def run_backtest(
+    windows: list[BacktestWindow],
+    weights: Optional[np.ndarray] = None,
+    top_k: int = 20,
+    workers: Optional[int] = None,
+) -> BacktestResult:
+    """
+    重みの組み合わせごとに全日を評価
+
+    Args:
+        windows: build_windows の結果
+        weights: 組み合わせ数 × 構成要素数（省略時は現在のスコアの重みのみ）
+        top_k: 上位件数
+        workers: ワーカープロセス数（省略時はCPU数、1ならプロセスを起動しない）
+
+    Returns:
+        BacktestResult
+    """
+    from analyzer import TREND_SCORE_COMPONENTS
+
+    weights = weight_grid() if weights is None else np.atleast_2d(np.asarray(weights, dtype=float))
+    start = time.perf_counter()
+    if not windows:
+        columns = TREND_SCORE_COMPONENTS + ["horizon"] + METRICS + ["days"]
+        return BacktestResult(summary=pd.DataFrame(columns=columns), windows=0, seconds=0.0)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(windows)))
+    batches = [windows[i::workers] for i in range(workers)]
+    if workers == 1:
+        parts = [_evaluate_windows(windows, weights, top_k)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(
+                executor.map(_evaluate_windows, batches, [weights] * workers, [top_k] * workers)
+            )
+
+    total = np.sum([p[0] for p in parts], axis=0)
+    count = np.sum([p[1] for p in parts], axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / count, np.nan)
+
+    n_weights, horizon, _ = mean.shape
+    summary = pd.DataFrame(np.repeat(weights, horizon, axis=0), columns=TREND_SCORE_COMPONENTS)
+    summary["horizon"] = np.tile(np.arange(1, horizon + 1), n_weights)
+    for i, metric in enumerate(METRICS):
+        summary[metric] = mean[:, :, i].reshape(-1).round(4)
+    summary["days"] = count[:, :, 0].reshape(-1).astype(int)
+
+    seconds = time.perf_counter() - start
+    logger.info(
+        f"バックテスト完了: {len(windows)}日 × {n_weights}通り × {horizon}ホライズン / "
+        f"{seconds:.2f}s（{workers}プロセス）"
+    )
+    return BacktestResult(summary=summary, windows=len(windows), seconds=seconds)
+
+
+def compare_summaries(base: pd.DataFrame, other: pd.DataFrame) -> pd.DataFrame:
+    """
+    2つのスコアのバージョンの結果を、同じ重み・ホライズン同士で比較
+
+    Returns:
+        重み・ホライズン・各指標の base / other / 差分
+    """
+    from analyzer import TREND_SCORE_COMPONENTS
+
+    keys = TREND_SCORE_COMPONENTS + ["horizon"]
+    merged = base[keys + METRICS].merge(
+        other[keys + METRICS], on=keys, suffixes=("_base", "_other")
+    )
+    for metric in METRICS:
+        merged[f"{metric}_diff"] = (merged[f"{metric}_other"] - merged[f"{metric}_base"]).round(4)
+    return merged
+
+
+def _parse_grid(specs: list[str]) -> dict[str, list[float]]:
+    """ "rank_change=0.5,1,2" 形式の指定を辞書に変換"""
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        grid[name] = [float(v) for v in values.split(",") if v]
+    return grid
+
+
+def main():
+    """メイン実行"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI トレンドスコアのバックテスト")
+    parser.add_argument("--days", type=int, default=None, help="直近の日数（既定: 全期間）")
+    parser.add_argument("--horizon", type=int, default=3, help="何日先まで評価するか")
+    parser.add_argument("--top-k", type=int, default=20, help="上位件数")
+    parser.add_argument(
+        "--grid", nargs="*", default=[], help="重みの候補（例: rank_change=0.5,1,2 reviews=0,1）"
+    )
+    parser.add_argument("--no-momentum", action="store_true", help="モメンタム特徴量を使わない")
+    parser.add_argument("--workers", type=int, default=None, help="ワーカープロセス数")
+    parser.add_argument(
+        "--label", default="current", help="結果ファイル名のラベル（スコアのバージョン）"
+    )
+    parser.add_argument("--compare", type=Path, default=None, help="比較対象の結果CSV")
+    args = parser.parse_args()
+
+    scoring = load_scoring()
+    snapshots = load_daily_snapshots(days=args.days)
+    windows = build_windows(snapshots, args.horizon, momentum=not args.no_momentum, scoring=scoring)
+    grid = weight_grid(current_weights(scoring), **_parse_grid(args.grid))
+    result = run_backtest(windows, grid, args.top_k, args.workers)
+    if result.windows == 0:
+        logger.warning("評価できる日がありません（2日分以上の生データが必要です）")
+        return
+
+    output_dir = default_output_dir()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"backtest_{args.label}.csv"
+    result.summary.to_csv(path, index=False, encoding="utf-8")
+    print(
+        result.summary.sort_values(
+            ["horizon", "precision_at_k"], ascending=[True, False]
+        ).to_string(index=False)
+    )
+    print(f"\n結果: {path}")
+
+    if args.compare:
+        print(compare_summaries(pd.read_csv(args.compare), result.summary).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
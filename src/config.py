@@ -10,7 +10,6 @@ from typing import Optional
 
 from dotenv import load_dotenv
 
-
 # .envファイル読み込み
 load_dotenv()
 
@@ -18,6 +17,7 @@ load_dotenv()
 @dataclass
 class AmazonConfig:
     """Amazon API設定"""
+
     access_key: str
     secret_key: str
     partner_tag: str
@@ -40,6 +40,7 @@ class AmazonConfig:
 @dataclass
 class ScrapingConfig:
     """スクレイピング設定"""
+
     request_delay: float  # 秒
     max_retries: int
     user_agent: str
@@ -53,13 +54,63 @@ class ScrapingConfig:
         )
 
 
+@dataclass
+class StorageConfig:
+    """生データ保存設定"""
+
+    raw_format: str  # csv / parquet / feather
+
+    @classmethod
+    def from_env(cls) -> "StorageConfig":
+        return cls(
+            raw_format=os.getenv("RAW_STORAGE_FORMAT", "csv").lower(),
+        )
+
+    @property
+    def is_columnar(self) -> bool:
+        """列指向ストアに保存するか"""
+        return self.raw_format != "csv"
+
+
+@dataclass
+class AnalysisConfig:
+    """分析設定"""
+
+    memory_budget_mb: int  # 履歴の分割分析で1チャンクに使うメモリの目安
+
+    @classmethod
+    def from_env(cls) -> "AnalysisConfig":
+        return cls(
+            memory_budget_mb=int(os.getenv("ANALYSIS_MEMORY_BUDGET_MB", "256")),
+        )
+
+
+@dataclass
+class PriceConfig:
+    """価格履歴・値下がり検知設定"""
+
+    drop_percent: float  # 前回価格からの下落率の閾値（%）
+    median_drop_percent: float  # 直近の中央値からの下落率の閾値（%）
+    window: int  # 中央値に使う直近の観測数
+
+    @classmethod
+    def from_env(cls) -> "PriceConfig":
+        return cls(
+            drop_percent=float(os.getenv("PRICE_DROP_PERCENT", "10")),
+            median_drop_percent=float(os.getenv("PRICE_MEDIAN_DROP_PERCENT", "15")),
+            window=int(os.getenv("PRICE_WINDOW", "14")),
+        )
+
+
 @dataclass
 class PathConfig:
     """パス設定"""
+
     base_dir: Path
     data_dir: Path
     reports_dir: Path
     raw_data_dir: Path
+    columnar_data_dir: Path
 
     @classmethod
     def from_env(cls, base_dir: Optional[Path] = None) -> "PathConfig":
@@ -74,6 +125,7 @@ class PathConfig:
             data_dir=data_dir,
             reports_dir=reports_dir,
             raw_data_dir=data_dir / "raw",
+            columnar_data_dir=data_dir / "columnar",
         )
 
     def ensure_dirs(self) -> None:
@@ -86,8 +138,12 @@ class PathConfig:
 @dataclass
 class AppConfig:
     """アプリケーション全体設定"""
+
     amazon: AmazonConfig
     scraping: ScrapingConfig
+    storage: StorageConfig
+    analysis: AnalysisConfig
+    prices: PriceConfig
     paths: PathConfig
     log_level: str
 
@@ -100,6 +156,9 @@ class AppConfig:
         return cls(
             amazon=AmazonConfig.from_env(),
             scraping=ScrapingConfig.from_env(),
+            storage=StorageConfig.from_env(),
+            analysis=AnalysisConfig.from_env(),
+            prices=PriceConfig.from_env(),
             paths=paths,
             log_level=os.getenv("LOG_LEVEL", "INFO"),
         )
@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+"""
+重複商品のクラスタリングモジュール
+
+複数カテゴリへの掲載や、色・サイズ違いで別ASINになっている同一商品を
+商品名の文字n-gramのMinHash / LSHでまとめる
+
+- 商品名は NFKC 正規化・小文字化し、空白と記号を除いてから文字3-gramに分ける
+  （分かち書きが不要なため日本語の商品名に向く）
+- MinHash署名（既定64個）を帯（既定16本 × 4行）に分け、同じ帯の値を持つ商品だけを候補にする。
+  候補はバケットごとに先頭の商品とだけ比べるため、全ペア比較をせず商品数にほぼ比例する
+- 署名の一致率（Jaccard係数の推定値）が threshold 以上の候補を同じクラスタとし、
+  連結成分をクラスタとする
+"""
+
+import re
+import unicodedata
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# 帯のキーを作る係数（奇数）
+_BAND_MULTIPLIERS = np.array(
+    [
+        0x9E3779B97F4A7C15,
+        0xC2B2AE3D27D4EB4F,
+        0x165667B19E3779F9,
+        0x27D4EB2F165667C5,
+        0x85EBCA77C2B2AE63,
+        0xFF51AFD7ED558CCD,
+        0xC4CEB9FE1A85EC53,
+        0x94D049BB133111EB,
+    ],
+    dtype=np.uint64,
+)
+
+# n-gramの多項式ハッシュの係数
+_GRAM_MULTIPLIER = np.uint64(0x100000001B3)
+
+# 空白・記号（\W）と下線
+_SEPARATORS = re.compile(r"[\W_]+")
+
+# 商品名のない商品の署名
+_EMPTY = np.iinfo(np.uint32).max
+
+
+def default_clusters_path() -> Path:
+    """クラスタ状態ファイルの既定パス"""
+    return Path(config.paths.data_dir) / "product_clusters.npz"
+
+
+def normalize_name(name: str) -> str:
+    """商品名を正規化（NFKC・小文字化、空白と記号を除去）"""
+    return _SEPARATORS.sub("", unicodedata.normalize("NFKC", name or "").lower())
+
+
+def shingle_hashes(
+    names: list[str], ngram: int = 3, normalized: bool = False
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    商品名ごとの文字n-gramのハッシュ値
+
+    正規化した商品名を連結してコードポイントの配列にし、n-gramは文字ごとの
+    多項式ハッシュで一括計算する（n-gramの文字列は作らない）。
+    n文字に満たない商品名は全体を1つのn-gramとする
+
+    Args:
+        names: 商品名のリスト
+        ngram: n-gramの長さ
+        normalized: 商品名が正規化済みなら True（正規化を省く）
+
+    Returns:
+        (全n-gramのハッシュ値（uint64）, 商品名ごとの開始位置)
+    """
+    texts = names if normalized else [normalize_name(name) for name in names]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    ends = np.cumsum(lengths)
+    text_starts = ends - lengths
+    codepoints = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(
+        np.uint64
+    )
+    codepoints = np.append(codepoints, np.zeros(ngram, dtype=np.uint64))
+
+    # n-gramの開始位置（短い商品名は先頭の1つ）
+    owner = np.repeat(np.arange(len(texts)), lengths)
+    position = np.arange(len(owner))
+    end = ends[owner]
+    valid = (position + ngram <= end) | (
+        (position == text_starts[owner]) & (lengths[owner] < ngram)
+    )
+    position, end = position[valid], end[valid]
+
+    hashes = np.zeros(len(position), dtype=np.uint64)
+    for j in range(ngram):
+        char = np.where(position + j < end, codepoints[position + j], 0)
+        hashes = hashes * _GRAM_MULTIPLIER + char
+    starts = np.searchsorted(owner[valid], np.arange(len(texts)))
+    return hashes, starts
+
+
+class MinHasher:
+    """n-gram集合のMinHash署名"""
+
+    def __init__(self, num_perm: int = 64, ngram: int = 3, seed: int = 1):
+        """
+        Args:
+            num_perm: 署名の長さ（ハッシュ関数の数）
+            ngram: 文字n-gramの長さ
+            seed: ハッシュ関数の乱数シード（同じ署名を比べるには同じ値にする）
+        """
+        self.num_perm = num_perm
+        self.ngram = ngram
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(
+            0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True
+        ) | np.uint64(1)
+        self.b = rng.integers(0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True)
+
+    def signatures(self, names: list[str]) -> np.ndarray:
+        """
+        商品名ごとの署名
+
+        n-gramのハッシュ値に乗算シフト法のハッシュ関数 (a·h + b) mod 2^64 >> 32 を
+        1つずつ適用し、商品名ごとの最小値を reduceat でまとめて求める（剰余演算を使わない）
+
+        Returns:
+            (商品名数 × num_perm) のuint32配列（商品名のない行は全て最大値）
+        """
+        signatures = np.full((len(names), self.num_perm), _EMPTY, dtype=np.uint32)
+        hashes, starts = shingle_hashes(names, self.ngram)
+        if len(hashes) == 0:
+            return signatures
+
+        ends = np.append(starts[1:], len(hashes))
+        present = ends > starts
+        offsets = starts[present]
+        shift = np.uint64(32)
+        for k in range(self.num_perm):
+            values = (self.a[k] * hashes + self.b[k]) >> shift
+            signatures[present, k] = np.minimum.reduceat(values, offsets)
+        return signatures
+
+
+def connected_components(n: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """
+    辺 (u, v) で結ばれた連結成分
+
+    各頂点のラベルを隣接頂点の最小値に置き換え、ポインタジャンプで縮める操作を
+    変化がなくなるまで繰り返す
+
+    Returns:
+        頂点ごとの成分ラベル（成分内の最小の頂点番号）
+    """
+    labels = np.arange(n)
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, u, labels[v])
+        np.minimum.at(labels, v, labels[u])
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def cluster_signatures(
+    signatures: np.ndarray, bands: int = 16, threshold: float = 0.6
+) -> np.ndarray:
+    """
+    MinHash署名をLSHでクラスタリング
+
+    Args:
+        signatures: (商品数 × num_perm) の署名
+        bands: 帯の数（num_perm を割り切る数）
+        threshold: 同じクラスタとみなす署名の一致率
+
+    Returns:
+        商品ごとのクラスタ番号（クラスタ内の最小の行番号）
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    valid = np.flatnonzero(signatures[:, 0] != _EMPTY)
+    if len(valid) < 2:
+        return np.arange(n)
+
+    sig = signatures[valid]
+    order = np.arange(len(valid))
+    sources, targets = [], []
+    for band in range(bands):
+        block = sig[:, band * rows : (band + 1) * rows].astype(np.uint64)
+        keys = (block * _BAND_MULTIPLIERS[np.arange(rows) % len(_BAND_MULTIPLIERS)]).sum(axis=1)
+        _, inverse = np.unique(keys, return_inverse=True)
+        leader = np.full(inverse.max() + 1, len(valid))
+        np.minimum.at(leader, inverse, order)
+        leader = leader[inverse]
+        paired = leader != order
+        sources.append(order[paired])
+        targets.append(leader[paired])
+
+    pairs = np.sort(np.concatenate(sources) * len(valid) + np.concatenate(targets))
+    pairs = pairs[np.diff(pairs, prepend=-1) != 0]
+    u, v = pairs // len(valid), pairs % len(valid)
+    similar = (sig[u] == sig[v]).mean(axis=1) >= threshold
+    labels = connected_components(len(valid), u[similar], v[similar])
+
+    result = np.arange(n)
+    result[valid] = valid[labels]
+    return result
+
+
+class ProductClusters:
+    """
+    ASINごとのMinHash署名と重複クラスタ
+
+    ASIN → 配列の位置を辞書で引き、署名は (ASIN数 × num_perm) の配列に持つ。
+    署名は新しいASINと商品名の変わったASINだけ計算し、クラスタは参照時に全署名から求め直す。
+    クラスタの代表は最初に観測したASIN。
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.6,
+        num_perm: int = 64,
+        bands: int = 16,
+        ngram: int = 3,
+        capacity: int = 1024,
+    ):
+        """
+        Args:
+            threshold: 同じクラスタとみなす署名の一致率（Jaccard係数の推定値）
+            num_perm: 署名の長さ
+            bands: LSHの帯の数（num_perm を割り切る数）
+            ngram: 文字n-gramの長さ
+            capacity: 配列の初期容量
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_permはbandsで割り切れる値にしてください: {num_perm} / {bands}")
+        self.threshold = threshold
+        self.bands = bands
+        self.hasher = MinHasher(num_perm, ngram)
+        self.asins: list[str] = []
+        self.names: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.signatures = np.full((capacity, num_perm), _EMPTY, dtype=np.uint32)
+        self._labels: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.asins)
+
+    def _reserve(self, size: int) -> None:
+        """容量が足りなければ倍に拡張"""
+        capacity = len(self.signatures)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        grown = np.full((capacity, self.signatures.shape[1]), _EMPTY, dtype=np.uint32)
+        grown[: len(self.asins)] = self.signatures[: len(self.asins)]
+        self.signatures = grown
+
+    def _position(self, asin: str) -> int:
+        position = self.positions.get(asin)
+        if position is None:
+            position = len(self.asins)
+            self._reserve(position + 1)
+            self.asins.append(asin)
+            self.names.append("")
+            self.positions[asin] = position
+        return position
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        収集1回分の商品名で署名を更新
+
+        Args:
+            df: asin, name を含むDataFrame
+
+        Returns:
+            署名を計算したASIN数
+        """
+        df = df[["asin", "name"]].dropna().drop_duplicates("asin", keep="last")
+        changed = self._changed(df)
+        if not changed:
+            return 0
+
+        positions = np.array([p for p, _ in changed], dtype=np.int64)
+        names = [name for _, name in changed]
+        self.signatures[positions] = self.hasher.signatures(names)
+        for position, name in changed:
+            self.names[position] = name
+        self._labels = None
+        return len(changed)
+
+    def _changed(self, df: pd.DataFrame) -> list[tuple[int, str]]:
+        """新しいASINと商品名の変わったASINの (位置, 商品名)"""
+        changed = []
+        for asin, name in zip(df["asin"].astype(str).tolist(), df["name"].astype(str).tolist()):
+            position = self.positions.get(asin)
+            if position is None:
+                changed.append((self._position(asin), name))
+            elif self.names[position] != name:
+                changed.append((position, name))
+        return changed
+
+    def labels(self) -> np.ndarray:
+        """ASINごとのクラスタ番号（代表ASINの位置、更新があるまで使い回す）"""
+        if self._labels is None or len(self._labels) != len(self.asins):
+            self._labels = cluster_signatures(
+                self.signatures[: len(self.asins)], self.bands, self.threshold
+            )
+        return self._labels
+
+    def cluster_keys(self, asins) -> np.ndarray:
+        """
+        ASINごとのクラスタの代表ASIN（未登録のASINは自身）
+
+        Args:
+            asins: ASINの配列
+        """
+        asins = np.asarray(asins, dtype=object)
+        positions = np.fromiter(
+            (self.positions.get(str(a), -1) for a in asins), dtype=np.int64, count=len(asins)
+        )
+        known = positions >= 0
+        keys: np.ndarray = asins.copy()
+        if known.any():
+            representatives = np.array(self.asins, dtype=object)
+            keys[known] = representatives[self.labels()[positions[known]]]
+        return keys
+
+    def clusters(self, min_size: int = 2) -> pd.DataFrame:
+        """
+        重複クラスタの一覧
+
+        Args:
+            min_size: 表示するクラスタの最小ASIN数
+
+        Returns:
+            cluster（代表ASIN）, asin, name, size の列を持つDataFrame（大きいクラスタから）
+        """
+        if not self.asins:
+            return pd.DataFrame(columns=["cluster", "asin", "name", "size"])
+        labels = self.labels()
+        sizes = np.bincount(labels, minlength=len(labels))
+        df = pd.DataFrame(
+            {
+                "cluster": np.array(self.asins, dtype=object)[labels],
+                "asin": self.asins,
+                "name": self.names,
+                "size": sizes[labels],
+                "label": labels,
+            }
+        )
+        df = df[df["size"] >= min_size]
+        df = df.sort_values(["size", "label"], ascending=[False, True], kind="stable")
+        return df.drop(columns="label").reset_index(drop=True)
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """状態を .npz に書き出し（一時ファイル経由）"""
+        path = path or default_clusters_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        size = len(self.asins)
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                asins=np.array(self.asins, dtype=str),
+                names=np.array(self.names, dtype=str),
+                signatures=self.signatures[:size],
+                labels=self.labels(),
+                settings=np.array([self.threshold, self.bands, self.hasher.ngram]),
+            )
+        tmp_path.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "ProductClusters":
+        """状態を読み込み（ファイルがなければ空の状態）"""
+        path = path or default_clusters_path()
+        if not path.exists():
+            return cls()
+        with np.load(path) as data:
+            asins = data["asins"].tolist()
+            threshold, bands, ngram = data["settings"].tolist()
+            signatures = data["signatures"]
+            clusters = cls(
+                threshold,
+                signatures.shape[1],
+                int(bands),
+                int(ngram),
+                capacity=max(len(asins), 1024),
+            )
+            clusters.signatures[: len(asins)] = signatures
+            clusters.names = data["names"].tolist()
+            clusters._labels = data["labels"]
+        clusters.asins = asins
+        clusters.positions = {asin: i for i, asin in enumerate(asins)}
+        return clusters
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, threshold: float = 0.6) -> "ProductClusters":
+        """DataFrameの商品名からクラスタを作成（状態を保存しない一時的な分析用）"""
+        clusters = cls(threshold)
+        clusters.update(df)
+        return clusters
+
+    @classmethod
+    def from_history(cls, store) -> "ProductClusters":
+        """
+        履歴ストアの全ASINの最新の商品名から状態を再構築（初回のみ）
+
+        Args:
+            store: history.HistoryStore
+        """
+        clusters = cls()
+        rows = pd.DataFrame(store.iter_rows())
+        if not rows.empty:
+            clusters.update(rows)
+        return clusters
+
+    @classmethod
+    def open(cls, path: Optional[Path] = None) -> "ProductClusters":
+        """
+        状態を開く
+
+        状態ファイルがなく履歴ストアがある場合は、履歴ストアから初期化する
+        """
+        from history import HistoryStore, default_db_path
+
+        path = path or default_clusters_path()
+        if not path.exists() and default_db_path().exists():
+            clusters = cls.from_history(HistoryStore())
+            logger.info(f"重複クラスタを履歴ストアから初期化: {len(clusters)}件")
+            return clusters
+        return cls.load(path)
+
+
+def collapse_duplicates(
+    df: pd.DataFrame, clusters: Optional[ProductClusters] = None, by=None
+) -> pd.DataFrame:
+    """
+    クラスタごとに先頭の行だけを残す（dfは良い順に並べておく）
+
+    Args:
+        df: asin, name を含むDataFrame
+        clusters: 重複クラスタ（省略時はdfの商品名からその場で作成）
+        by: クラスタに加えて重複判定に使う列（カテゴリ別の上位など）
+
+    Returns:
+        重複を除いたDataFrame（元の順序）
+    """
+    if df.empty:
+        return df
+    if clusters is None:
+        clusters = ProductClusters.from_frame(df)
+    keys = pd.DataFrame({"cluster": clusters.cluster_keys(df["asin"].to_numpy())}, index=df.index)
+    for column in [by] if isinstance(by, str) else (by or []):
+        keys[column] = df[column]
+    return df[~keys.duplicated().to_numpy()]
+
+
+def main():
+    """メイン実行（重複クラスタの一覧）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI 重複商品のクラスタ")
+    parser.add_argument("--min-size", type=int, default=2, help="表示するクラスタの最小ASIN数")
+    parser.add_argument("--limit", type=int, default=50, help="表示件数（行）")
+    args = parser.parse_args()
+
+    clusters = ProductClusters.open()
+    df = clusters.clusters(args.min_size)
+    if df.empty:
+        logger.info("重複クラスタはありません")
+        return
+    logger.info(
+        f"重複クラスタ: {df['cluster'].nunique()}件 / {len(df)}ASIN（全{len(clusters)}ASIN）"
+    )
+    print(df.head(args.limit).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,7 @@ from loguru import logger
 @dataclass
 class DistributionConfig:
     """配信設定"""
+
     # Email設定
     smtp_host: str
     smtp_port: int
@@ -123,11 +124,7 @@ class EmailDistributor(Distributor):
                 if self.config.smtp_use_tls:
                     server.starttls()
                 server.login(self.config.smtp_user, self.config.smtp_password)
-                server.sendmail(
-                    self.config.email_from,
-                    self.config.email_to,
-                    msg.as_string()
-                )
+                server.sendmail(self.config.email_from, self.config.email_to, msg.as_string())
 
             logger.info(f"Email送信成功: {self.config.email_to}")
             return True
@@ -159,27 +156,16 @@ class SlackDistributor(Distributor):
                 "blocks": [
                     {
                         "type": "header",
-                        "text": {
-                            "type": "plain_text",
-                            "text": subject,
-                            "emoji": True
-                        }
+                        "text": {"type": "plain_text", "text": subject, "emoji": True},
                     },
                     {
                         "type": "section",
-                        "text": {
-                            "type": "mrkdwn",
-                            "text": self._format_for_slack(content)
-                        }
-                    }
-                ]
+                        "text": {"type": "mrkdwn", "text": self._format_for_slack(content)},
+                    },
+                ],
             }
 
-            response = requests.post(
-                self.config.slack_webhook_url,
-                json=payload,
-                timeout=30
-            )
+            response = requests.post(self.config.slack_webhook_url, json=payload, timeout=30)
             response.raise_for_status()
 
             logger.info("Slack送信成功")
@@ -218,18 +204,12 @@ class DiscordDistributor(Distributor):
                         "title": subject,
                         "description": self._format_for_discord(content),
                         "color": 6570404,  # 紫系
-                        "footer": {
-                            "text": "EcomTrendAI - 自動生成レポート"
-                        }
+                        "footer": {"text": "EcomTrendAI - 自動生成レポート"},
                     }
                 ]
             }
 
-            response = requests.post(
-                self.config.discord_webhook_url,
-                json=payload,
-                timeout=30
-            )
+            response = requests.post(self.config.discord_webhook_url, json=payload, timeout=30)
             response.raise_for_status()
 
             logger.info("Discord送信成功")
@@ -265,10 +245,7 @@ class ReportDistributor:
             self.distributors.append(DiscordDistributor(self.config))
 
     def distribute(
-        self,
-        subject: str,
-        content: str,
-        html_content: Optional[str] = None
+        self, subject: str, content: str, html_content: Optional[str] = None
     ) -> dict[str, bool]:
         """
         全配信先にレポートを配信
@@ -297,10 +274,7 @@ class ReportDistributor:
         return results
 
     def distribute_from_files(
-        self,
-        md_path: Path,
-        html_path: Optional[Path] = None,
-        subject: Optional[str] = None
+        self, md_path: Path, html_path: Optional[Path] = None, subject: Optional[str] = None
     ) -> dict[str, bool]:
         """
         ファイルから読み込んで配信
@@ -349,7 +323,7 @@ def create_summary_for_notification(trends: list, top_n: int = 5) -> str:
     for i, t in enumerate(trends[:top_n], 1):
         name = t.name[:35] + "..." if len(t.name) > 35 else t.name
         lines.append(f"{i}. {name}")
-        lines.append(f"   📊 変動: +{t.rank_change_percent:.0f}% | カテゴリ: {t.category}")
+        lines.append(f"   📊 変動: {t.rank_change_percent:+.0f}% | カテゴリ: {t.category}")
         lines.append(f"   🔗 [商品ページ]({t.affiliate_url})")
         lines.append("")
 
@@ -0,0 +1,691 @@
+# -*- coding: utf-8 -*-
+"""
+データエクスポートモジュール
+
+履歴データを各種フォーマットでストリーミング出力
+行単位で処理し、リクエストあたりのメモリ使用量を一定に保つ
+
+Parquet / Arrow は収集時に生データ1ファイルごとのスナップショットを
+事前生成しておき、リクエスト時は変換せずに配信する
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from dataclasses import asdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from loguru import logger
+
+from config import config
+
+# xlsxwriterが利用可能かチェック
+try:
+    import xlsxwriter
+
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+# pyarrowが利用可能かチェック
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# エクスポート列（順序固定）
+EXPORT_COLUMNS = [
+    "timestamp",
+    "asin",
+    "name",
+    "category",
+    "current_rank",
+    "rank_change_percent",
+    "price",
+    "review_count",
+    "rating",
+]
+
+# 数値として出力する列
+NUMERIC_COLUMNS = {"current_rank", "rank_change_percent", "price", "review_count", "rating"}
+
+# xlsxの1シートの最大行数（ヘッダー行を含む）
+XLSX_MAX_ROWS = 1_048_576
+
+# products_YYYYMMDD_HHMMSS.csv
+RAW_FILE_PATTERN = re.compile(r"products_(\d{8})_\d{6}\.csv$")
+
+# 事前生成するスナップショットの拡張子（Arrowはストリーム形式）
+PARQUET_SUFFIX = ".parquet"
+ARROW_SUFFIX = ".arrows"
+
+# 結合・絞り込みしたParquetのキャッシュ（data/export/cache）に残すファイル数
+PARQUET_CACHE_FILES = 32
+
+CSV_MEDIA_TYPE = "text/csv"
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Acceptヘッダーのメディアタイプ → フォーマット名
+MEDIA_TYPE_FORMATS = {
+    CSV_MEDIA_TYPE: "csv",
+    JSON_MEDIA_TYPE: "json",
+    NDJSON_MEDIA_TYPE: "ndjson",
+    "application/jsonl": "ndjson",
+    PARQUET_MEDIA_TYPE: "parquet",
+    "application/x-parquet": "parquet",
+    ARROW_MEDIA_TYPE: "arrow",
+    XLSX_MEDIA_TYPE: "xlsx",
+}
+
+if PYARROW_AVAILABLE:
+    # スナップショットのスキーマ（EXPORT_COLUMNSと同順）
+    EXPORT_SCHEMA = pa.schema(
+        [
+            ("timestamp", pa.timestamp("us")),
+            ("asin", pa.string()),
+            ("name", pa.string()),
+            ("category", pa.string()),
+            ("current_rank", pa.int32()),
+            ("rank_change_percent", pa.float64()),
+            ("price", pa.float64()),
+            ("review_count", pa.int32()),
+            ("rating", pa.float32()),
+        ]
+    )
+
+
+def parse_date(value: Optional[str]) -> Optional[date]:
+    """
+    日付文字列をパース（YYYY-MM-DD または YYYYMMDD）
+
+    Raises:
+        ValueError: 形式が不正な場合
+    """
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d", "%Y%m%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"日付形式が不正です: {value}")
+
+
+def default_export_dir() -> Path:
+    """スナップショットの保存先"""
+    return Path(config.paths.data_dir) / "export"
+
+
+def list_raw_files(
+    data_dir: Path,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    suffix: str = ".csv",
+) -> list[Path]:
+    """
+    期間内の生データファイル（またはそのスナップショット）を時刻順に列挙
+
+    ファイル名の日付で絞り込むため、期間外のファイルは開かない
+    """
+    files = []
+    for path in sorted(data_dir.glob(f"products_*{suffix}")):
+        match = RAW_FILE_PATTERN.search(path.stem + ".csv")
+        if not match:
+            continue
+        day = datetime.strptime(match.group(1), "%Y%m%d").date()
+        if date_from and day < date_from:
+            continue
+        if date_to and day > date_to:
+            continue
+        files.append(path)
+    return files
+
+
+def iter_history_rows(
+    data_dir: Optional[Path] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None,
+) -> Iterator[dict]:
+    """
+    履歴データを1行ずつ返す
+
+    Args:
+        data_dir: 生データディレクトリ
+        date_from: 開始日（含む）
+        date_to: 終了日（含む）
+        category: カテゴリフィルタ
+
+    Yields:
+        EXPORT_COLUMNSをキーとする辞書
+
+    data_dir未指定で履歴ストア（data/history.db）がある場合は、
+    索引を使ってストアから読み出す。履歴ストアがなく RAW_STORAGE_FORMAT が
+    列指向の場合は、列指向ストアから期間内のrunを読み出す
+    """
+    if data_dir is None:
+        from history import HistoryStore, default_db_path
+
+        if default_db_path().exists():
+            store = HistoryStore()
+            for row in store.iter_rows(date_from, date_to, category):
+                yield {col: row[col] for col in EXPORT_COLUMNS}
+            return
+        if config.storage.is_columnar:
+            yield from _iter_columnar_rows(date_from, date_to, category)
+            return
+
+    data_dir = data_dir or config.paths.raw_data_dir
+    for path in list_raw_files(data_dir, date_from, date_to):
+        with open(path, "r", newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                if category and row.get("category") != category:
+                    continue
+                yield {col: row.get(col, "") for col in EXPORT_COLUMNS}
+
+
+def _to_number(value: str):
+    """数値列の文字列を数値に変換（空文字はNone）"""
+    if value in ("", None):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def stream_csv(rows: Iterable[dict], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """
+    行データをCSVとしてストリーミング出力
+
+    ヘッダーを即座に送出し、以降はchunk_rows行ごとにバッファを吐き出す。
+    バッファは使い回すため、メモリ使用量は総行数に依存しない。
+
+    Args:
+        rows: EXPORT_COLUMNSをキーとする辞書の反復子
+        chunk_rows: 1チャンクあたりの行数
+
+    Yields:
+        UTF-8エンコード済みのCSVチャンク
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+
+    def flush() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writeheader()
+    yield flush()
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield flush()
+            pending = 0
+    if pending:
+        yield flush()
+
+
+def _json_row(row: dict) -> dict:
+    """数値列を数値に変換した辞書"""
+    return {
+        name: (_to_number(value) if name in NUMERIC_COLUMNS else value or None)
+        for name, value in row.items()
+    }
+
+
+def stream_ndjson(rows: Iterable[dict], chunk_rows: int = 1000) -> Iterator[bytes]:
+    """
+    行データをNDJSON（1行1オブジェクト）としてストリーミング出力
+
+    Args:
+        rows: EXPORT_COLUMNSをキーとする辞書の反復子
+        chunk_rows: 1チャンクあたりの行数
+    """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(_json_row(row), ensure_ascii=False))
+        if len(lines) >= chunk_rows:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def negotiate_format(accept: Optional[str], default: str = "json") -> Optional[str]:
+    """
+    Acceptヘッダーからエクスポートフォーマットを決定
+
+    q値の高い順に、対応するメディアタイプを探す。
+    ワイルドカードのみ、またはヘッダーなしの場合はdefaultを返す。
+
+    Returns:
+        フォーマット名（対応するものがなければNone）
+    """
+    if not accept:
+        return default
+
+    candidates = []
+    for order, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, order, media_type.lower()))
+
+    for _, _, media_type in sorted(candidates):
+        if media_type in MEDIA_TYPE_FORMATS:
+            return MEDIA_TYPE_FORMATS[media_type]
+        if media_type in ("*/*", "application/*"):
+            return default
+    return None
+
+
+def write_xlsx(
+    rows: Iterable[dict], path: Path, sheet_name: str = "trends", max_rows: int = XLSX_MAX_ROWS
+) -> int:
+    """
+    行データをxlsxに書き出し（constant_memoryモード）
+
+    constant_memoryモードでは書き終えた行を一時ファイルへフラッシュするため、
+    行数に関わらずワークブック全体をメモリに保持しない。
+    1シートの行数の上限を超える分は新しいシート（<sheet_name>_2, _3, ...）に続けて書き出す
+
+    Args:
+        rows: EXPORT_COLUMNSをキーとする辞書の反復子
+        path: 出力先
+        sheet_name: シート名
+        max_rows: 1シートの最大行数（ヘッダー行を含む）
+
+    Returns:
+        書き出したデータ行数
+    """
+    if not XLSXWRITER_AVAILABLE:
+        raise ImportError("xlsxwriterがインストールされていません。pip install xlsxwriter")
+
+    workbook = xlsxwriter.Workbook(str(path), {"constant_memory": True, "strings_to_urls": False})
+    try:
+        header_format = workbook.add_format({"bold": True})
+        # 型ごとの書き込みメソッドを列単位で事前に決め、write()の型判定を省く
+        writers = [(col, name, name in NUMERIC_COLUMNS) for col, name in enumerate(EXPORT_COLUMNS)]
+
+        def add_sheet(number: int):
+            sheet = workbook.add_worksheet(sheet_name if number == 1 else f"{sheet_name}_{number}")
+            for col, name in enumerate(EXPORT_COLUMNS):
+                sheet.write_string(0, col, name, header_format)
+            return sheet.write_number, sheet.write_string
+
+        sheets = 1
+        write_number, write_string = add_sheet(sheets)
+
+        count = 0
+        line = 0
+        for count, row in enumerate(rows, 1):
+            line += 1
+            if line == max_rows:
+                sheets += 1
+                write_number, write_string = add_sheet(sheets)
+                line = 1
+            for col, name, numeric in writers:
+                value = row.get(name)
+                if value is None or value == "":
+                    continue
+                if numeric:
+                    number = _to_number(value)
+                    if isinstance(number, str):
+                        write_string(line, col, number)
+                    else:
+                        write_number(line, col, number)
+                else:
+                    write_string(line, col, value)
+    finally:
+        workbook.close()
+
+    return count
+
+
+def stream_file(path: Path, chunk_size: int = 64 * 1024, delete: bool = False) -> Iterator[bytes]:
+    """
+    ファイルをチャンク単位で読み出す
+
+    Args:
+        path: 対象ファイル
+        chunk_size: チャンクサイズ（バイト）
+        delete: 読み終えたらファイルを削除
+    """
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+    finally:
+        if delete:
+            path.unlink(missing_ok=True)
+
+
+def stream_xlsx(rows: Iterable[dict], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    行データをxlsxとしてストリーミング出力
+
+    xlsxはZIPコンテナのため、一時ファイルへ書き終えてからチャンク送信する。
+    メモリ使用量は行数に依存しない。
+    """
+    fd, tmp_name = tempfile.mkstemp(suffix=".xlsx", prefix="ecomtrend_export_")
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        count = write_xlsx(rows, tmp_path)
+        logger.info(f"xlsxエクスポート: {count}行 ({tmp_path.stat().st_size:,} bytes)")
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    yield from stream_file(tmp_path, chunk_size=chunk_size, delete=True)
+
+
+def _iter_columnar_rows(
+    date_from: Optional[date], date_to: Optional[date], category: Optional[str]
+) -> Iterator[dict]:
+    """列指向ストアの期間内のrunを1行ずつ返す（値の形式は履歴ストアと同じ）"""
+    import pandas as pd
+
+    from storage import ColumnarStore
+
+    store = ColumnarStore(file_format=config.storage.raw_format)
+    runs = [
+        run_id
+        for run_id in store.list_runs()
+        if (not date_from or run_id[:8] >= date_from.strftime("%Y%m%d"))
+        and (not date_to or run_id[:8] <= date_to.strftime("%Y%m%d"))
+    ]
+    for df in store.iter_runs(runs, columns=EXPORT_COLUMNS):
+        if category:
+            df = df[df["category"] == category]
+        df = df.astype({"current_rank": "Int64", "review_count": "Int64"}).astype(object)
+        df = df.where(df.notna(), None)
+        df["timestamp"] = [
+            None if ts is None else pd.Timestamp(ts).isoformat() for ts in df["timestamp"]
+        ]
+        yield from df.to_dict("records")
+
+
+# === Parquet / Arrow スナップショット ===
+
+
+def _require_pyarrow() -> None:
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrowがインストールされていません。pip install pyarrow")
+
+
+def read_raw_table(csv_path: Path) -> "pa.Table":
+    """
+    生データCSVをEXPORT_SCHEMAのArrowテーブルとして読み込み
+
+    欠損している列はnullで埋める
+    """
+    _require_pyarrow()
+    import pyarrow.csv as pa_csv
+
+    table = pa_csv.read_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(
+            column_types={f.name: f.type for f in EXPORT_SCHEMA},
+            include_columns=EXPORT_COLUMNS,
+            include_missing_columns=True,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.select(EXPORT_COLUMNS).cast(EXPORT_SCHEMA)
+
+
+def _atomic_write(path: Path, write) -> None:
+    """一時ファイルへ書き込んでから置き換え"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def read_products_table(products: list) -> "pa.Table":
+    """
+    ProductDataのリストをEXPORT_SCHEMAのArrowテーブルに変換
+
+    列指向ストアに保存した場合など、CSVを経由せずにスナップショットを作るために使う
+    """
+    _require_pyarrow()
+    import pandas as pd
+
+    df = pd.DataFrame([asdict(p) for p in products]).reindex(columns=EXPORT_COLUMNS)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+    return pa.Table.from_pandas(df, schema=EXPORT_SCHEMA, preserve_index=False)
+
+
+def _write_snapshot(table: "pa.Table", stem: str, export_dir: Optional[Path]) -> tuple[Path, Path]:
+    """テーブルを <stem>.parquet / <stem>.arrow として書き出し"""
+    export_dir = export_dir or default_export_dir()
+    export_dir.mkdir(parents=True, exist_ok=True)
+
+    parquet_path = export_dir / (stem + PARQUET_SUFFIX)
+    arrow_path = export_dir / (stem + ARROW_SUFFIX)
+
+    _atomic_write(parquet_path, lambda p: pq.write_table(table, p, compression="zstd"))
+
+    def write_arrow(p: Path) -> None:
+        with pa_ipc.new_stream(str(p), table.schema) as writer:
+            writer.write_table(table)
+
+    _atomic_write(arrow_path, write_arrow)
+    logger.debug(f"スナップショット生成: {stem} ({table.num_rows}行)")
+    return parquet_path, arrow_path
+
+
+def write_columnar_snapshot(csv_path: Path, export_dir: Optional[Path] = None) -> tuple[Path, Path]:
+    """
+    生データ1ファイル分のParquet / Arrowスナップショットを生成
+
+    収集直後に呼び出し、エクスポート時の変換を不要にする
+
+    Args:
+        csv_path: 生データCSV
+        export_dir: 出力先（省略時は data/export）
+
+    Returns:
+        (Parquetパス, Arrowパス)
+    """
+    _require_pyarrow()
+    return _write_snapshot(read_raw_table(csv_path), csv_path.stem, export_dir)
+
+
+def write_products_snapshot(
+    products: list, run_at: Optional[datetime] = None, export_dir: Optional[Path] = None
+) -> tuple[Path, Path]:
+    """
+    収集結果から直接Parquet / Arrowスナップショットを生成
+
+    生データを列指向ストアに保存する場合（CSVを書かない場合）に使う。
+    ファイル名はCSVと同じ products_YYYYMMDD_HHMMSS とし、期間指定のエクスポートに含める
+
+    Args:
+        products: ProductDataのリスト
+        run_at: 収集時刻（省略時は現在時刻）
+        export_dir: 出力先（省略時は data/export）
+
+    Returns:
+        (Parquetパス, Arrowパス)
+    """
+    _require_pyarrow()
+    run_at = run_at or datetime.now()
+    stem = f"products_{run_at.strftime('%Y%m%d_%H%M%S')}"
+    return _write_snapshot(read_products_table(products), stem, export_dir)
+
+
+def build_columnar_snapshots(
+    data_dir: Optional[Path] = None, export_dir: Optional[Path] = None, force: bool = False
+) -> int:
+    """
+    スナップショットが未生成・古い生データ分をまとめて生成（既存データの移行用）
+
+    Returns:
+        生成したファイル数
+    """
+    data_dir = data_dir or config.paths.raw_data_dir
+    export_dir = export_dir or default_export_dir()
+
+    built = 0
+    for csv_path in list_raw_files(data_dir):
+        arrow_path = export_dir / (csv_path.stem + ARROW_SUFFIX)
+        parquet_path = export_dir / (csv_path.stem + PARQUET_SUFFIX)
+        mtime = csv_path.stat().st_mtime
+        if (
+            not force
+            and arrow_path.exists()
+            and parquet_path.exists()
+            and min(arrow_path.stat().st_mtime, parquet_path.stat().st_mtime) >= mtime
+        ):
+            continue
+        write_columnar_snapshot(csv_path, export_dir)
+        built += 1
+
+    logger.info(f"スナップショット生成完了: {built}件")
+    return built
+
+
+def iter_arrow_tables(
+    export_dir: Optional[Path] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None,
+) -> Iterator["pa.Table"]:
+    """
+    期間内のArrowスナップショットをメモリマップで読み込んで返す
+
+    読み込みはゼロコピーで、カテゴリ指定時のみフィルタ結果を新たに確保する
+    """
+    _require_pyarrow()
+    export_dir = export_dir or default_export_dir()
+    for path in list_raw_files(export_dir, date_from, date_to, suffix=ARROW_SUFFIX):
+        with pa.memory_map(str(path)) as source:
+            table = pa_ipc.open_stream(source).read_all()
+        if category:
+            table = table.filter(pc.equal(table["category"], category))
+        if table.num_rows:
+            yield table
+
+
+def stream_arrow(tables: Iterable["pa.Table"]) -> Iterator[bytes]:
+    """
+    テーブル群を1本のArrow IPCストリームとして出力
+
+    テーブルごとにレコードバッチを書き出し、その都度バッファを送出する
+    """
+    _require_pyarrow()
+    buffer = io.BytesIO()
+    with pa_ipc.new_stream(buffer, EXPORT_SCHEMA) as writer:
+        for table in tables:
+            writer.write_table(table)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def cached_parquet(
+    export_dir: Optional[Path] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None,
+    max_files: int = PARQUET_CACHE_FILES,
+) -> Optional[Path]:
+    """
+    期間内のスナップショットを1つにまとめたParquetファイル
+
+    1スナップショットそのまま（カテゴリ指定なし）なら保存済みのファイルを返す。
+    結合・絞り込みが必要な場合は、スナップショットの版（ファイル名・サイズ・更新時刻）と
+    カテゴリの組み合わせごとに1回だけエンコードしてキャッシュし、以降はそのファイルを返す
+
+    Args:
+        max_files: 残すキャッシュファイル数（使われていない順に削除）
+
+    Returns:
+        Parquetファイル（期間内のスナップショットがなければ None）
+    """
+    _require_pyarrow()
+    export_dir = export_dir or default_export_dir()
+    if not export_dir.exists():
+        return None
+    snapshots = list_raw_files(export_dir, date_from, date_to, suffix=PARQUET_SUFFIX)
+    if not snapshots:
+        return None
+    if len(snapshots) == 1 and not category:
+        return snapshots[0]
+
+    sources = list_raw_files(export_dir, date_from, date_to, suffix=ARROW_SUFFIX)
+    h = hashlib.sha256((category or "").encode("utf-8"))
+    for path in sources:
+        stat = path.stat()
+        h.update(f"\0{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    cache_dir = export_dir / "cache"
+    cache_path = cache_dir / f"trends_{h.hexdigest()[:32]}{PARQUET_SUFFIX}"
+    if cache_path.exists():
+        os.utime(cache_path)
+        return cache_path
+
+    def write(path: Path) -> None:
+        with pq.ParquetWriter(path, EXPORT_SCHEMA, compression="zstd") as writer:
+            for table in iter_arrow_tables(export_dir, date_from, date_to, category):
+                writer.write_table(table)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    _atomic_write(cache_path, write)
+    logger.info(
+        f"Parquetエクスポートをキャッシュ: {cache_path.name} ({len(sources)}スナップショット)"
+    )
+
+    cached = sorted(cache_dir.glob(f"trends_*{PARQUET_SUFFIX}"), key=lambda f: f.stat().st_mtime_ns)
+    for old in cached[:-max_files]:
+        old.unlink(missing_ok=True)
+    return cache_path
+
+
+def main():
+    """メイン実行（既存データのスナップショット生成）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI エクスポート用スナップショット生成")
+    parser.add_argument("--force", action="store_true", help="全ファイルを再生成")
+    args = parser.parse_args()
+
+    built = build_columnar_snapshots(force=args.force)
+    print(f"生成: {built}件 → {default_export_dir()}")
+
+
+if __name__ == "__main__":
+    main()
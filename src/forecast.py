@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+ランク予測モジュール
+
+ASINごとの日次ランク系列に「水準 + 傾き + 曜日の周期項」を最小二乗で当てはめ、
+数日先のランクを予測する
+
+- ランクは対数で扱う（予測値は常に1以上、変動は比率で効く）
+- 全系列を1つの行列（ASIN数 × 日数、未掲載の日はNaN）に並べ、
+  正規方程式の係数を行列積1回でまとめて作り、バッチで解く（ASINごとのループなし）
+- 傾き・周期項にはリッジ正則化をかけ、観測の少ない系列は直近の水準に近い予測になる
+- 周期項は周期の2倍以上の日数がある場合のみ使う
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# 予測結果の列
+FORECAST_COLUMNS = [
+    "asin",
+    "current_rank",
+    "forecast_rank",
+    "forecast_change_percent",
+    "trend_percent_per_day",
+    "observations",
+    "rmse",
+]
+
+
+@dataclass
+class RankSeries:
+    """ASIN × 日のランク行列"""
+
+    asins: np.ndarray  # ASIN（行の順）
+    days: pd.DatetimeIndex  # 日付（列の順、連続）
+    ranks: np.ndarray  # ASIN数 × 日数（未掲載はNaN）
+
+    def __len__(self) -> int:
+        return len(self.asins)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "RankSeries":
+        """
+        生データから作成
+
+        同じ日に複数回収集した場合は最後の収集、
+        同じ収集で複数カテゴリに掲載された場合は最上位のランクを使う
+
+        Args:
+            df: asin, current_rank, timestamp を含むDataFrame
+        """
+        df = df[["asin", "current_rank", "timestamp"]].dropna()
+        if df.empty:
+            return cls(np.array([], dtype=object), pd.DatetimeIndex([]), np.empty((0, 0)))
+
+        # 時刻は収集ごとに同じ値のため、種類ごとに1回だけ解析する
+        time_codes, time_values = pd.factorize(df["timestamp"])
+        parsed = pd.to_datetime(pd.Index(time_values).astype(str), format="ISO8601")
+        t = parsed.asi8[time_codes]
+        days = pd.date_range(parsed.min().normalize(), parsed.max().normalize(), freq="D")
+        day_codes = days.get_indexer(parsed.normalize())[time_codes]
+
+        asin_codes, asins = pd.factorize(df["asin"].astype(str), sort=True)
+        rank = df["current_rank"].to_numpy(dtype=float)
+
+        # ASIN × 日のセルごとに最後の収集時刻を求め、その収集の行のうち最上位のランクを使う（並べ替えなし）
+        cells = asin_codes * len(days) + day_codes
+        size = len(asins) * len(days)
+        latest = np.full(size, np.iinfo(np.int64).min)
+        np.maximum.at(latest, cells, t)
+        last_run = t == latest[cells]
+        best = np.full(size, np.inf)
+        np.minimum.at(best, cells[last_run], rank[last_run])
+        ranks = np.where(np.isinf(best), np.nan, best).reshape(len(asins), len(days))
+        return cls(np.asarray(asins, dtype=object), days, ranks)
+
+
+@dataclass
+class RankForecast:
+    """当てはめ結果"""
+
+    series: RankSeries
+    coef: np.ndarray  # ASIN数 × 説明変数の数（対数ランク）
+    observations: np.ndarray  # 系列ごとの観測日数
+    rmse: np.ndarray  # 系列ごとの対数ランクの残差の二乗平均平方根
+    forecaster: "RankForecaster"
+
+    def predict(self, horizon: int = 1) -> np.ndarray:
+        """
+        最終日からhorizon日後のランクを予測
+
+        Returns:
+            ASIN数の配列（観測のない系列はNaN）
+        """
+        steps = np.array([len(self.series.days) - 1 + horizon], dtype=float)
+        design = self.forecaster.design(steps, len(self.series.days))
+        log_rank = self.coef @ design[0]
+        return np.where(self.observations > 0, np.maximum(np.exp(log_rank), 1.0), np.nan)
+
+    def to_frame(self, horizon: int = 1) -> pd.DataFrame:
+        """
+        予測結果の表
+
+        - current_rank: 最後に掲載された日のランク
+        - forecast_change_percent: 現在ランクからの予測上昇率（正 = 上昇）
+        - trend_percent_per_day: 傾きによる1日あたりの上昇率（正 = 上昇）
+
+        Returns:
+            FORECAST_COLUMNS の列を持つDataFrame（観測のある系列のみ）
+        """
+        ranks = self.series.ranks
+        observed = ~np.isnan(ranks)
+        last = ranks.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+        current = ranks[np.arange(len(ranks)), last]
+        forecast = self.predict(horizon)
+        slope = self.coef[:, 1] / max(len(self.series.days) - 1, 1)
+
+        frame = pd.DataFrame(
+            {
+                "asin": self.series.asins,
+                "current_rank": current,
+                "forecast_rank": forecast.round(1),
+                "forecast_change_percent": ((current - forecast) / current * 100).round(2),
+                "trend_percent_per_day": ((1 - np.exp(slope)) * 100).round(2),
+                "observations": self.observations,
+                "rmse": self.rmse.round(4),
+            }
+        )
+        return frame[self.observations > 0].reset_index(drop=True)
+
+
+@dataclass
+class RankForecaster:
+    """
+    対数ランクの線形トレンド + 周期項のバッチ最小二乗
+
+    Attributes:
+        period: 周期（日、既定は曜日の7日）
+        harmonics: 周期項の調和数（sin/cos の組の数）
+        ridge: 傾き・周期項の正則化の強さ（観測1日分の重みに対する比）
+    """
+
+    period: int = 7
+    harmonics: int = 1
+    ridge: float = 0.1
+
+    def seasonal(self, days: int) -> bool:
+        """周期項を使うか（周期の2倍以上の日数がある場合）"""
+        return self.harmonics > 0 and days >= 2 * self.period
+
+    def design(self, steps: np.ndarray, days: int) -> np.ndarray:
+        """
+        説明変数の行列
+
+        傾きの列は最終日を0、初日を-1とする（係数の大きさを日数によらず揃える）
+
+        Args:
+            steps: 初日からの日数
+            days: 当てはめに使う日数
+
+        Returns:
+            len(steps) × 説明変数の数
+        """
+        columns = [np.ones_like(steps), (steps - (days - 1)) / max(days - 1, 1)]
+        if self.seasonal(days):
+            for k in range(1, self.harmonics + 1):
+                angle = 2 * np.pi * k * steps / self.period
+                columns += [np.sin(angle), np.cos(angle)]
+        return np.column_stack(columns)
+
+    def fit(self, series: RankSeries) -> RankForecast:
+        """
+        全系列をまとめて当てはめ
+
+        系列ごとに観測のある日だけで正規方程式 (XᵀWX + λI)β = XᵀWy を作る。
+        XᵀWX は「日ごとの xxᵀ を並べた行列」と観測マスクの行列積1回で全系列分を求める
+
+        Args:
+            series: ランク行列
+
+        Returns:
+            当てはめ結果
+        """
+        days = len(series.days)
+        design = self.design(np.arange(days, dtype=float), days)
+        n_params = design.shape[1]
+
+        observed = ~np.isnan(series.ranks)
+        weights = observed.astype(float)
+        log_rank = np.log(np.where(observed, series.ranks, 1.0))
+
+        outer = (design[:, :, None] * design[:, None, :]).reshape(days, n_params * n_params)
+        gram = (weights @ outer).reshape(len(series), n_params, n_params)
+        rhs = (weights * log_rank) @ design
+
+        penalty = np.full(n_params, max(self.ridge, 1e-9))  # 観測1日の系列でも解けるよう0にはしない
+        penalty[0] = 0.0  # 水準は正則化しない
+        gram += np.diag(penalty)
+        observations = observed.sum(axis=1)
+        gram[observations == 0, 0, 0] = 1.0  # 観測のない系列（結果は使わない）
+
+        coef = np.linalg.solve(gram, rhs[:, :, None])[:, :, 0]
+        residual = (log_rank - coef @ design.T) * weights
+        rmse = np.sqrt((residual**2).sum(axis=1) / np.maximum(observations, 1))
+        return RankForecast(series, coef, observations, rmse, self)
+
+
+def forecast_ranks(
+    df: pd.DataFrame,
+    horizon: int = 1,
+    forecaster: Optional[RankForecaster] = None,
+) -> pd.DataFrame:
+    """
+    生データから全ASINのランクを予測
+
+    Args:
+        df: asin, current_rank, timestamp を含むDataFrame（複数日分）
+        horizon: 最終日から何日後を予測するか
+        forecaster: 予測モデル（省略時は既定の設定）
+
+    Returns:
+        FORECAST_COLUMNS の列を持つDataFrame
+    """
+    series = RankSeries.from_dataframe(df)
+    if len(series) == 0:
+        return pd.DataFrame(columns=FORECAST_COLUMNS)
+    return (forecaster or RankForecaster()).fit(series).to_frame(horizon)
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+履歴ストアモジュール
+
+ASINごとの時系列をSQLite（組み込み）に追記保存し、索引で検索する
+- (asin, timestamp): 商品単位の履歴・最新値（主キー）
+- (category, timestamp): カテゴリ・期間の範囲検索
+
+生データCSVは取り込み済みファイルを記録し、新規・更新分のみ取り込む
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# 保存する列（順序固定）
+HISTORY_COLUMNS = [
+    "timestamp",
+    "asin",
+    "name",
+    "category",
+    "current_rank",
+    "previous_rank",
+    "rank_change",
+    "rank_change_percent",
+    "price",
+    "review_count",
+    "rating",
+    "source",
+]
+
+INTEGER_COLUMNS = {"current_rank", "previous_rank", "rank_change", "review_count"}
+REAL_COLUMNS = {"rank_change_percent", "price", "rating"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    asin TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    category TEXT NOT NULL,
+    name TEXT,
+    current_rank INTEGER,
+    previous_rank INTEGER,
+    rank_change INTEGER,
+    rank_change_percent REAL,
+    price REAL,
+    review_count INTEGER,
+    rating REAL,
+    source TEXT,
+    PRIMARY KEY (asin, timestamp, category)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_observations_category_ts
+    ON observations (category, timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_observations_ts
+    ON observations (timestamp);
+
+CREATE TABLE IF NOT EXISTS ingested_files (
+    name TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+"""
+
+
+INSERT_SQL = (
+    f"INSERT OR REPLACE INTO observations ({', '.join(HISTORY_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})"
+)
+
+
+def default_db_path() -> Path:
+    """データベースの既定パス"""
+    return Path(config.paths.data_dir) / "history.db"
+
+
+def normalize_timestamp(value) -> str:
+    """タイムスタンプを秒精度のISO形式（YYYY-MM-DDTHH:MM:SS）に揃える"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="seconds")
+    return datetime.fromisoformat(str(value)).isoformat(timespec="seconds")
+
+
+def _convert(name: str, value):
+    """列の型に合わせて変換（空文字はNone）"""
+    if value is None or value == "":
+        return None
+    if name in INTEGER_COLUMNS:
+        return int(float(value))
+    if name in REAL_COLUMNS:
+        return float(value)
+    return value
+
+
+def _row_values(row: dict) -> tuple:
+    """辞書をHISTORY_COLUMNS順の値タプルに変換"""
+    values = []
+    for name in HISTORY_COLUMNS:
+        value = row.get(name)
+        if name == "timestamp":
+            value = normalize_timestamp(value)
+        elif name == "category":
+            value = value or ""
+        else:
+            value = _convert(name, value)
+        values.append(value)
+    return tuple(values)
+
+
+def _frame_values(df: pd.DataFrame) -> list[tuple]:
+    """
+    生データのDataFrameをHISTORY_COLUMNS順の値タプルに一括変換
+
+    1行ずつ変換するより速いため、ファイル取り込みで使う
+    """
+    df = df.reindex(columns=HISTORY_COLUMNS)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601").dt.strftime(
+        "%Y-%m-%dT%H:%M:%S"
+    )
+    df["category"] = df["category"].fillna("")
+    for name in INTEGER_COLUMNS:
+        df[name] = pd.to_numeric(df[name], errors="coerce").astype("Int64")
+    for name in REAL_COLUMNS:
+        df[name] = pd.to_numeric(df[name], errors="coerce")
+    # 主キー順に挿入するとB木の更新が局所化される
+    df = df.sort_values(["asin", "category"], kind="stable")
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+def _range_bounds(start: Optional[date], end: Optional[date]) -> tuple[str, str]:
+    """日付範囲をタイムスタンプ文字列の半開区間 [lower, upper) に変換"""
+    lower = start.isoformat() if start else ""
+    upper = (end + timedelta(days=1)).isoformat() if end else "9999"
+    return lower, upper
+
+
+class HistoryStore:
+    """ASIN時系列の永続ストア（SQLite / WAL）"""
+
+    def __init__(self, db_path: Optional[Path] = None):
+        """
+        Args:
+            db_path: データベースファイル（省略時は data/history.db）
+        """
+        self.db_path = db_path or default_db_path()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """接続を開き、正常終了時にコミットして閉じる"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # === 取り込み ===
+
+    def add_rows(self, rows: Iterable[dict], conn: Optional[sqlite3.Connection] = None) -> int:
+        """
+        観測値を追加（同じ asin / timestamp / category は上書き）
+
+        Args:
+            rows: HISTORY_COLUMNSをキーとする辞書の反復子
+
+        Returns:
+            追加した行数
+        """
+        values = (_row_values(row) for row in rows)
+        if conn is not None:
+            return self._insert(conn, values)
+        with self._connect() as conn:
+            return self._insert(conn, values)
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, values: Iterable[tuple]) -> int:
+        return conn.executemany(INSERT_SQL, values).rowcount
+
+    def add_products(self, products: list) -> int:
+        """ProductDataのリストを追加（収集直後の取り込み用）"""
+        from dataclasses import asdict
+
+        return self.add_rows(asdict(p) for p in products)
+
+    def ingest_file(self, csv_path: Path, force: bool = False) -> int:
+        """
+        生データCSVを1ファイル取り込み
+
+        取り込み済みで更新のないファイルはスキップする
+
+        Returns:
+            取り込んだ行数（スキップ時は0）
+        """
+        stat = csv_path.stat()
+        if not force and self._ingested().get(csv_path.name) == (stat.st_mtime, stat.st_size):
+            return 0
+
+        with self._connect() as conn:
+            count = self._insert(conn, _frame_values(pd.read_csv(csv_path, encoding="utf-8-sig")))
+
+            conn.execute(
+                "INSERT OR REPLACE INTO ingested_files (name, mtime, size, rows, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (csv_path.name, stat.st_mtime, stat.st_size, count, datetime.now().isoformat()),
+            )
+        return count
+
+    def _ingested(self) -> dict[str, tuple[float, int]]:
+        """取り込み済みファイル名 → (mtime, size)"""
+        with self._connect() as conn:
+            return {
+                r["name"]: (r["mtime"], r["size"])
+                for r in conn.execute("SELECT name, mtime, size FROM ingested_files")
+            }
+
+    def sync(self, data_dir: Optional[Path] = None, force: bool = False) -> int:
+        """
+        生データディレクトリの新規・更新ファイルを取り込み
+
+        Returns:
+            取り込んだ行数
+        """
+        from exporter import list_raw_files
+
+        data_dir = data_dir or config.paths.raw_data_dir
+        ingested = {} if force else self._ingested()
+
+        total = files = 0
+        for csv_path in list_raw_files(data_dir):
+            stat = csv_path.stat()
+            if ingested.get(csv_path.name) == (stat.st_mtime, stat.st_size):
+                continue
+            total += self.ingest_file(csv_path, force=True)
+            files += 1
+        if files:
+            logger.info(f"履歴ストア取り込み: {files}ファイル / {total}行")
+        return total
+
+    # === 検索 ===
+
+    def asin_history(
+        self,
+        asin: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        """
+        ASINの履歴を時刻順に取得（主キーの範囲検索）
+
+        Args:
+            asin: 商品ID
+            start: 開始日（含む）
+            end: 終了日（含む）
+            limit: 最大件数（直近から数える）
+        """
+        lower, upper = _range_bounds(start, end)
+        sql = (
+            f"SELECT {', '.join(HISTORY_COLUMNS)} FROM observations "
+            "WHERE asin = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC"
+        )
+        params: list = [asin, lower, upper]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = [dict(r) for r in conn.execute(sql, params)]
+        rows.reverse()
+        return rows
+
+    def latest(self, asin: str) -> Optional[dict]:
+        """ASINの最新の観測値"""
+        rows = self.asin_history(asin, limit=1)
+        return rows[0] if rows else None
+
+    def iter_rows(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        category: Optional[str] = None,
+    ) -> Iterator[dict]:
+        """
+        期間・カテゴリの観測値を時刻順に1行ずつ返す
+
+        カテゴリ指定時は (category, timestamp) 索引、未指定時は timestamp 索引を使う
+        """
+        lower, upper = _range_bounds(start, end)
+        where = "timestamp >= ? AND timestamp < ?"
+        params: list = [lower, upper]
+        if category:
+            where = "category = ? AND " + where
+            params.insert(0, category)
+        sql = f"SELECT {', '.join(HISTORY_COLUMNS)} FROM observations WHERE {where} ORDER BY timestamp"
+
+        with self._connect() as conn:
+            for row in conn.execute(sql, params):
+                yield dict(row)
+
+    def latest_ranks(self) -> list[dict]:
+        """ASIN・カテゴリごとの最新ランク（asin, category, current_rank, timestamp）"""
+        with self._connect() as conn:
+            # SQLiteではMAX()と同じ行の他の列が返る
+            rows = conn.execute(
+                "SELECT asin, category, current_rank, MAX(timestamp) AS timestamp "
+                "FROM observations GROUP BY asin, category"
+            )
+            return [dict(r) for r in rows]
+
+    def categories(self) -> list[str]:
+        """保存済みのカテゴリ一覧"""
+        with self._connect() as conn:
+            return [
+                r[0]
+                for r in conn.execute(
+                    "SELECT DISTINCT category FROM observations ORDER BY category"
+                )
+            ]
+
+    def count(self) -> int:
+        """保存済みの観測値数"""
+        with self._connect() as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0])
+
+
+def main():
+    """メイン実行（生データの取り込み）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI 履歴ストア取り込み")
+    parser.add_argument("--force", action="store_true", help="取り込み済みファイルも再取り込み")
+    args = parser.parse_args()
+
+    store = HistoryStore()
+    added = store.sync(force=args.force)
+    print(f"取り込み: {added}行 / 合計: {store.count()}行 → {store.db_path}")
+
+
+if __name__ == "__main__":
+    main()
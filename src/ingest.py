@@ -0,0 +1,530 @@
+# -*- coding: utf-8 -*-
+"""
+取り込み処理モジュール
+
+収集直後のデータを保存前に加工するステージ群
+- RankChangeStage: ASIN・カテゴリごとの最新ランク索引と突き合わせ、
+  previous_rank / rank_change / rank_change_percent を算出
+- MomentumStage: ASINごとのモメンタム状態（analyzer.MomentumState）を更新
+- AnomalyStage: ASIN別・カテゴリ別の変動幅から急上昇を検出（anomaly.AnomalyDetector）
+- SeasonalityStage: カテゴリ別・ASIN別の曜日・時間帯プロファイルを更新（seasonality.SeasonalProfiles）
+- PriceStage: ASINごとの価格履歴を更新し、値下がりを検出（prices.PriceIndex）
+- DedupStage: 商品名のMinHash署名を更新し、重複商品をまとめる（dedup.ProductClusters）
+- SearchStage: 商品名のn-gram転置索引と絞り込み用の属性を更新（search.ProductSearchIndex）
+- SeriesStage: ASINごとのランク・価格・評価・スコアの時系列を更新（products.ProductSeriesIndex）
+- WatchlistStage: 全ユーザーのウォッチリストと照合し、一致を通知キューに積む（watchlist.WatchlistMatcher）
+
+最新ランク索引は収集のたびに差分更新するため、過去のCSVは読み直さない
+"""
+
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# 索引のキー
+INDEX_KEYS = ["asin", "category"]
+
+
+def _empty_index() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "asin": pd.Series(dtype="str"),
+            "category": pd.Series(dtype="str"),
+            "last_rank": pd.Series(dtype="Int64"),
+            "last_timestamp": pd.Series(dtype="datetime64[us]"),
+        }
+    ).set_index(INDEX_KEYS)
+
+
+class LatestRankIndex:
+    """
+    ASIN・カテゴリごとの最新ランク
+
+    (asin, category) をインデックスに持つDataFrameで、取り込みのたびに
+    今回分だけを上書きする。ファイルサイズは商品数に比例し、履歴の長さには依存しない。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: 索引ファイル（省略時は data/latest_ranks.csv）
+        """
+        self.path = path or config.paths.data_dir / "latest_ranks.csv"
+        self.frame = self._load()
+
+    def _load(self) -> pd.DataFrame:
+        if not self.path.exists():
+            return _empty_index()
+        df = pd.read_csv(
+            self.path,
+            encoding="utf-8",
+            dtype={"asin": "str", "category": "str", "last_rank": "Int64"},
+            keep_default_na=False,
+            na_values={"last_rank": [""], "last_timestamp": [""]},
+        )
+        df["last_timestamp"] = pd.to_datetime(df["last_timestamp"], format="ISO8601")
+        return df.set_index(INDEX_KEYS)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def lookup(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        各行の前回ランク・時刻を取得（ハッシュ結合）
+
+        Returns:
+            dfと同じ行順の last_rank / last_timestamp 列
+        """
+        if self.frame.empty:
+            return pd.DataFrame(
+                {
+                    "last_rank": pd.Series(pd.NA, index=df.index, dtype="Int64"),
+                    "last_timestamp": pd.Series(pd.NaT, index=df.index, dtype="datetime64[us]"),
+                }
+            )
+        joined = df[INDEX_KEYS].join(self.frame, on=INDEX_KEYS, how="left")
+        return joined[["last_rank", "last_timestamp"]]
+
+    def update(self, df: pd.DataFrame) -> None:
+        """
+        今回分で最新ランクを上書き
+
+        同じキーが複数行ある場合は最も新しい行を採用する
+        """
+        latest = (
+            df.assign(
+                last_rank=df["current_rank"].astype("Int64"),
+                last_timestamp=pd.to_datetime(df["timestamp"], format="ISO8601"),
+            )
+            .sort_values("last_timestamp", kind="stable")
+            .drop_duplicates(INDEX_KEYS, keep="last")
+            .set_index(INDEX_KEYS)[["last_rank", "last_timestamp"]]
+        )
+        if self.frame.empty:
+            self.frame = latest
+            return
+        # 既存キーの更新と新規キーの追加
+        kept = self.frame[~self.frame.index.isin(latest.index)]
+        self.frame = pd.concat([kept, latest])
+
+    def save(self) -> None:
+        """索引を書き出し（一時ファイル経由）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.frame.reset_index().to_csv(
+            tmp_path, index=False, encoding="utf-8", date_format="%Y-%m-%dT%H:%M:%S"
+        )
+        tmp_path.replace(self.path)
+
+    @classmethod
+    def from_history(cls, store, path: Optional[Path] = None) -> "LatestRankIndex":
+        """
+        履歴ストアから索引を再構築
+
+        Args:
+            store: history.HistoryStore
+        """
+        index = cls(path)
+        rows = store.latest_ranks()
+        index.frame = _empty_index()
+        if rows:
+            index.update(pd.DataFrame(rows))
+        return index
+
+    @classmethod
+    def open(cls, path: Optional[Path] = None) -> "LatestRankIndex":
+        """
+        索引を開く
+
+        索引ファイルがなく履歴ストアがある場合は、履歴ストアから初期化する
+        """
+        from history import HistoryStore, default_db_path
+
+        index = cls(path)
+        if not index.path.exists() and default_db_path().exists():
+            index = cls.from_history(HistoryStore(), path)
+            logger.info(f"最新ランク索引を履歴ストアから初期化: {len(index)}件")
+        return index
+
+
+def compute_rank_changes(df: pd.DataFrame, index: LatestRankIndex) -> pd.DataFrame:
+    """
+    前回ランクとの差分を一括計算
+
+    - previous_rank: 同じ ASIN・カテゴリの直前の観測ランク
+    - rank_change: previous_rank - current_rank（正=上昇）
+    - rank_change_percent: rank_change / previous_rank × 100
+
+    前回の観測がない商品は previous_rank / rank_change を空にし、
+    rank_change_percent はページ掲載の変動率を残す。
+
+    Args:
+        df: 今回の収集分（asin, category, current_rank, timestamp, rank_change_percent を含む）
+        index: 最新ランク索引（更新しない）
+
+    Returns:
+        3列を更新したDataFrame（コピー）
+    """
+    df = df.copy()
+    previous = index.lookup(df)
+
+    # 同じ回の再取り込みなど、索引の方が新しい・同時刻の場合は前回とみなさない
+    timestamps = pd.to_datetime(df["timestamp"], format="ISO8601")
+    is_previous = previous["last_timestamp"].notna() & (previous["last_timestamp"] < timestamps)
+    previous_rank = previous["last_rank"].where(is_previous)
+
+    current_rank = df["current_rank"].astype("Int64")
+    rank_change = previous_rank - current_rank
+    percent = (rank_change.astype("Float64") / previous_rank.astype("Float64") * 100).round(2)
+
+    page_percent = pd.to_numeric(df["rank_change_percent"], errors="coerce")
+    df["previous_rank"] = previous_rank
+    df["rank_change"] = rank_change
+    df["rank_change_percent"] = percent.astype("float64").where(is_previous, page_percent)
+    return df
+
+
+class RankChangeStage:
+    """前回ランクとの差分を埋めるステージ"""
+
+    def __init__(self, index: Optional[LatestRankIndex] = None):
+        self.index = index if index is not None else LatestRankIndex.open()
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        result = compute_rank_changes(df, self.index)
+        self.index.update(df)
+        return result
+
+    def commit(self) -> None:
+        """保存完了後に索引を永続化"""
+        self.index.save()
+
+
+class MomentumStage:
+    """モメンタム特徴量の状態を更新するステージ（データは変更しない）"""
+
+    def __init__(self, state=None, path: Optional[Path] = None):
+        """
+        Args:
+            state: analyzer.MomentumState（省略時は保存済みの状態を開く）
+            path: 状態ファイル（省略時は data/momentum_state.npz）
+        """
+        from analyzer import MomentumState
+
+        self.path = path
+        self.state = state if state is not None else MomentumState.open(path)
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        self.state.update(df)
+        return df
+
+    def commit(self) -> None:
+        """保存完了後に状態を永続化"""
+        self.state.save(self.path)
+
+
+class AnomalyStage:
+    """急上昇を検出するステージ（データは変更しない）"""
+
+    def __init__(self, detector=None, path: Optional[Path] = None, log_path: Optional[Path] = None):
+        """
+        Args:
+            detector: anomaly.AnomalyDetector（省略時は保存済みの状態を読み込む）
+            path: 状態ファイル（省略時は data/anomaly_state.npz）
+            log_path: 検出結果の追記先（省略時は data/anomalies.csv）
+        """
+        from anomaly import AnomalyDetector
+
+        self.path = path
+        self.log_path = log_path
+        self.detector = detector if detector is not None else AnomalyDetector.load(path)
+        self.anomalies = pd.DataFrame()
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        detected = self.detector.process(df)
+        if not detected.empty:
+            logger.info(f"急上昇を検出: {len(detected)}件")
+            self.anomalies = pd.concat([self.anomalies, detected], ignore_index=True)
+        return df
+
+    def commit(self) -> None:
+        """保存完了後に状態と検出結果を永続化"""
+        from anomaly import append_anomalies
+
+        self.detector.save(self.path)
+        append_anomalies(self.anomalies, self.log_path)
+        self.anomalies = pd.DataFrame()
+
+
+class SeasonalityStage:
+    """曜日・時間帯プロファイルを更新するステージ（データは変更しない）"""
+
+    def __init__(self, profiles=None, path: Optional[Path] = None, scoring=None, momentum=None):
+        """
+        Args:
+            profiles: seasonality.SeasonalProfiles（省略時は保存済みの状態を開く）
+            path: 状態ファイル（省略時は data/seasonality.npz）
+            scoring: スコア定義（省略時は data/scores.json、なければ既定のスコア）
+            momentum: analyzer.MomentumState（指定時はモメンタム込みのスコアで集計する。
+                分析時と同じく MomentumStage で更新した後の特徴量を使う）
+        """
+        from scoring import BUILTIN_SCORES, ScoreRegistry, default_scores_path
+        from seasonality import SeasonalProfiles
+
+        self.path = path
+        if scoring is None:
+            scoring = ScoreRegistry.load() if default_scores_path().exists() else BUILTIN_SCORES
+        self.scoring = scoring
+        self.momentum = momentum
+        self.profiles = profiles if profiles is not None else SeasonalProfiles.open(path, scoring)
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        from scoring import DEFAULT_SCORE
+
+        scored = self.momentum.add_features(df.copy()) if self.momentum is not None else df
+        self.profiles.update(df, self.scoring.compute(scored, [DEFAULT_SCORE])[DEFAULT_SCORE])
+        return df
+
+    def commit(self) -> None:
+        """保存完了後に状態を永続化"""
+        self.profiles.save(self.path)
+
+
+class PriceStage:
+    """価格履歴を更新し値下がりを検出するステージ（データは変更しない）"""
+
+    def __init__(self, index=None, path: Optional[Path] = None, log_path: Optional[Path] = None):
+        """
+        Args:
+            index: prices.PriceIndex（省略時は保存済みの状態を開く）
+            path: 状態ファイル（省略時は data/price_index.npz）
+            log_path: 検出結果の追記先（省略時は data/price_drops.csv）
+        """
+        from prices import PriceIndex
+
+        self.path = path
+        self.log_path = log_path
+        self.index = index if index is not None else PriceIndex.open(path)
+        self.drops = pd.DataFrame()
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        detected = self.index.update(df)
+        if not detected.empty:
+            logger.info(f"値下がりを検出: {len(detected)}件")
+            self.drops = pd.concat([self.drops, detected], ignore_index=True)
+        return df
+
+    def commit(self) -> None:
+        """保存完了後に状態と検出結果を永続化"""
+        from prices import append_price_drops
+
+        self.index.save(self.path)
+        append_price_drops(self.drops, self.log_path)
+        self.drops = pd.DataFrame()
+
+
+class DedupStage:
+    """重複商品のクラスタを更新するステージ（データは変更しない）"""
+
+    def __init__(self, clusters=None, path: Optional[Path] = None):
+        """
+        Args:
+            clusters: dedup.ProductClusters（省略時は保存済みの状態を開く）
+            path: 状態ファイル（省略時は data/product_clusters.npz）
+        """
+        from dedup import ProductClusters
+
+        self.path = path
+        self.clusters = clusters if clusters is not None else ProductClusters.open(path)
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        self.clusters.update(df)
+        return df
+
+    def commit(self) -> None:
+        """保存完了後に状態を永続化"""
+        self.clusters.save(self.path)
+
+
+class SearchStage:
+    """商品名の検索索引を更新するステージ（データは変更しない）"""
+
+    def __init__(self, index=None, path: Optional[Path] = None):
+        """
+        Args:
+            index: search.ProductSearchIndex（省略時は保存済みの状態を開く）
+            path: 状態ファイル（省略時は data/search_index.npz）
+        """
+        from search import ProductSearchIndex
+
+        self.path = path
+        self.index = index if index is not None else ProductSearchIndex.open(path)
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        self.index.update(df)
+        return df
+
+    def commit(self) -> None:
+        """保存完了後に状態を永続化"""
+        self.index.save(self.path)
+
+
+class SeriesStage:
+    """商品ごとの時系列を更新するステージ（データは変更しない）"""
+
+    def __init__(self, index=None, path: Optional[Path] = None, scoring=None):
+        """
+        Args:
+            index: products.ProductSeriesIndex（省略時は保存済みの状態を開く）
+            path: 状態ファイル（省略時は data/product_series.npz）
+            scoring: スコア定義（省略時は data/scores.json、なければ既定のスコア）
+        """
+        from products import ProductSeriesIndex
+        from scoring import BUILTIN_SCORES, ScoreRegistry, default_scores_path
+
+        self.path = path
+        if scoring is None:
+            scoring = ScoreRegistry.load() if default_scores_path().exists() else BUILTIN_SCORES
+        self.scoring = scoring
+        self.index = index if index is not None else ProductSeriesIndex.open(path, scoring)
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        from scoring import DEFAULT_SCORE
+
+        self.index.update(df, self.scoring.compute(df, [DEFAULT_SCORE])[DEFAULT_SCORE])
+        return df
+
+    def commit(self) -> None:
+        """保存完了後に状態を永続化"""
+        self.index.save(self.path)
+
+
+class WatchlistStage:
+    """ウォッチリストと照合するステージ（データは変更しない）"""
+
+    def __init__(self, matcher=None, log_path: Optional[Path] = None):
+        """
+        Args:
+            matcher: watchlist.WatchlistMatcher（省略時はリアルタイムアラートを使えるユーザーの登録からまとめる）
+            log_path: 通知キュー（省略時は data/watch_alerts.csv）
+        """
+        from watchlist import WatchlistMatcher
+
+        self.log_path = log_path
+        self.matcher = matcher if matcher is not None else WatchlistMatcher.from_store()
+        self.alerts = pd.DataFrame()
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        matched = self.matcher.match(df)
+        if not matched.empty:
+            logger.info(f"ウォッチリストに一致: {len(matched)}件")
+            self.alerts = pd.concat([self.alerts, matched], ignore_index=True)
+        return df
+
+    def commit(self) -> None:
+        """保存完了後に一致を通知キューに追記"""
+        from watchlist import append_alerts
+
+        append_alerts(self.alerts, self.log_path)
+        self.alerts = pd.DataFrame()
+
+
+class IngestPipeline:
+    """
+    収集データの取り込みパイプライン
+
+    run() で各ステージを順に適用し、保存が完了したら commit() で
+    ステージの状態を永続化する
+    """
+
+    def __init__(self, stages: Optional[list] = None):
+        self.stages = stages if stages is not None else self._default_stages()
+
+    @staticmethod
+    def _default_stages() -> list:
+        """
+        既定のステージを作成
+
+        前回ランクの補完（RankChangeStage）は必須のため失敗したら例外を送出し、
+        ほかのステージは初期化に失敗したら警告を出して読み飛ばす
+        """
+        rank_change = RankChangeStage()
+        created: dict = {}
+        for factory in (
+            MomentumStage,
+            AnomalyStage,
+            SeasonalityStage,
+            PriceStage,
+            DedupStage,
+            SearchStage,
+            SeriesStage,
+            WatchlistStage,
+        ):
+            try:
+                created[factory] = factory()
+            except Exception as e:
+                logger.warning(
+                    f"取り込みステージの初期化失敗（読み飛ばし）: {factory.__name__}: {e}"
+                )
+
+        # 季節性プロファイルは分析時と同じくモメンタム込みのスコアで集計する
+        momentum, seasonality = created.get(MomentumStage), created.get(SeasonalityStage)
+        if momentum is not None and seasonality is not None:
+            seasonality.momentum = getattr(momentum, "state", None)
+        return [rank_change, *created.values()]
+
+    def run_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        DataFrameに全ステージを適用
+
+        RankChangeStage 以外のステージが失敗したら警告を出して以降の適用・永続化から外す
+        （状態が途中まで更新されている可能性があるため保存しない）
+        """
+        for stage in list(self.stages):
+            try:
+                df = stage(df)
+            except Exception as e:
+                if isinstance(stage, RankChangeStage):
+                    raise
+                logger.warning(f"取り込みステージ失敗（読み飛ばし）: {type(stage).__name__}: {e}")
+                self.stages.remove(stage)
+        return df
+
+    def run(self, products: list) -> list:
+        """
+        ProductDataのリストに全ステージを適用
+
+        Returns:
+            加工後のProductDataリスト（入力と同順）
+        """
+        if not products:
+            return products
+
+        product_type = type(products[0])
+        df = self.run_frame(pd.DataFrame([asdict(p) for p in products]))
+
+        result = []
+        for record in df.astype(object).where(df.notna(), None).to_dict("records"):
+            for name in ("previous_rank", "rank_change"):
+                if record[name] is not None:
+                    record[name] = int(record[name])
+            result.append(product_type(**record))
+
+        filled = int(df["previous_rank"].notna().sum())
+        logger.info(f"前回ランク補完: {filled}/{len(df)}件")
+        return result
+
+    def commit(self) -> None:
+        """ステージの状態を永続化（失敗したステージは警告を出し、残りのステージは続ける）"""
+        for stage in self.stages:
+            if not hasattr(stage, "commit"):
+                continue
+            try:
+                stage.commit()
+            except Exception as e:
+                logger.warning(f"取り込みステージの保存失敗: {type(stage).__name__}: {e}")
@@ -51,18 +51,97 @@ def run_scraper(categories: list[str], limit: int) -> int:
         time.sleep(3)  # カテゴリ間の待機
 
     if all_products:
-        filepath = saver.save_to_csv(all_products)
+        all_products, pipeline = apply_ingest_pipeline(all_products)
+        filepath = saver.save(all_products)
+        if pipeline is not None:
+            commit_ingest_pipeline(pipeline)
         logger.info(f"データ保存完了: {filepath} ({len(all_products)}件)")
+        write_export_snapshot(filepath, all_products)
+        update_history_store(all_products, filepath)
     else:
         logger.warning("データを収集できませんでした")
 
     return len(all_products)
 
 
-def run_analyzer() -> tuple[list, dict]:
+def apply_ingest_pipeline(products: list) -> tuple[list, Optional[object]]:
+    """
+    保存前の取り込みステージ（前回ランクとの差分計算など）を適用
+
+    前回ランク以外のステージの失敗はパイプライン内で読み飛ばす。
+    前回ランクの補完が失敗しても収集結果は保存できるよう、元のデータをそのまま返す
+
+    Returns:
+        (加工後のProductDataリスト, パイプライン（失敗時はNone）)
+    """
+    from ingest import IngestPipeline
+
+    try:
+        pipeline = IngestPipeline()
+        return pipeline.run(products), pipeline
+    except Exception as e:
+        logger.warning(f"取り込みステージ失敗: {e}")
+        return products, None
+
+
+def commit_ingest_pipeline(pipeline) -> None:
+    """保存完了後に取り込みステージの状態（最新ランク索引など）を永続化"""
+    try:
+        pipeline.commit()
+    except Exception as e:
+        logger.warning(f"最新ランク索引の保存失敗: {e}")
+
+
+def write_export_snapshot(filepath: Path, products: Optional[list] = None) -> None:
+    """
+    エクスポート用のParquet / Arrowスナップショットを生成
+
+    CSV保存時はCSVから、列指向ストア保存時は収集結果から直接生成する。
+    派生データのため、失敗しても収集処理は継続する
+
+    Args:
+        filepath: DataSaver.saveの戻り値（CSVのパス、または列指向ストアのルート）
+        products: 今回の収集結果
+    """
+    from exporter import PYARROW_AVAILABLE, write_columnar_snapshot, write_products_snapshot
+
+    if not PYARROW_AVAILABLE:
+        return
+    try:
+        if filepath.suffix == ".csv":
+            write_columnar_snapshot(filepath)
+        elif products:
+            write_products_snapshot(products)
+    except Exception as e:
+        logger.warning(f"スナップショット生成失敗: {filepath.name}: {e}")
+
+
+def update_history_store(products: list, filepath: Path) -> None:
+    """
+    履歴ストアに今回の収集分を追加
+
+    CSVは取り込み済みとして記録し、後続の一括取り込みで重複させない。
+    派生データのため、失敗しても収集処理は継続する
+    """
+    from history import HistoryStore
+
+    try:
+        store = HistoryStore()
+        if filepath.suffix == ".csv":
+            store.ingest_file(filepath)
+        else:
+            store.add_products(products)
+    except Exception as e:
+        logger.warning(f"履歴ストア更新失敗: {e}")
+
+
+def run_analyzer(collapse_duplicates: bool = False) -> tuple[list, dict]:
     """
     トレンド分析を実行
 
+    Args:
+        collapse_duplicates: 重複商品（別カテゴリ・色違いなど）を1件にまとめる
+
     Returns:
         (全体トレンド, カテゴリ別トレンド)
     """
@@ -71,10 +150,10 @@ def run_analyzer() -> tuple[list, dict]:
     logger.info("=== トレンド分析開始 ===")
     analyzer = TrendAnalyzer()
 
-    trends = analyzer.analyze_trends(top_n=20)
-    category_trends = analyzer.analyze_by_category()
+    trends = analyzer.analyze_trends(top_n=20, collapse_duplicates=collapse_duplicates)
+    category_trends = analyzer.analyze_by_category(collapse_duplicates=collapse_duplicates)
 
-    significant = analyzer.detect_significant_movers(threshold=80.0)
+    significant = analyzer.detect_significant_movers()
     if significant:
         logger.info(f"大幅変動商品: {len(significant)}件")
 
@@ -82,41 +161,105 @@ def run_analyzer() -> tuple[list, dict]:
     return trends, category_trends
 
 
-def run_reporter(trends: list, category_trends: dict) -> tuple[list[Path], Optional[Path], Optional[Path]]:
+def run_reporter(
+    trends: list,
+    category_trends: dict,
+    formats: Optional[list[str]] = None,
+    history_days: int = 30,
+) -> tuple[list[Path], Optional[Path], Optional[Path]]:
     """
     レポート生成を実行
 
+    全アイテムを一度だけフォーマットし、各形式を並列に書き出す
+
     Args:
         trends: 全体トレンド
         category_trends: カテゴリ別トレンド
+        formats: 出力形式（デフォルト: md, html）
+        history_days: HTMLのランク推移に使う履歴の日数（0で無効）
 
     Returns:
         (生成されたレポートファイルパス一覧, MDパス, HTMLパス)
     """
-    from analyzer import ReportGenerator
-    from reporter import HTMLReportGenerator
+    from reporter import ReportPipeline
 
     logger.info("=== レポート生成開始 ===")
-    reports = []
+    formats = formats or ["md", "html"]
 
-    # Markdownレポート
-    md_reporter = ReportGenerator()
-    md_path = md_reporter.generate_markdown_report(trends, category_trends)
-    reports.append(md_path)
+    rank_history = None
+    if "html" in formats and history_days > 0:
+        rank_history = load_rank_history(history_days)
 
-    # HTMLレポート
-    html_reporter = HTMLReportGenerator()
-    html_path = html_reporter.generate(trends, category_trends)
-    reports.append(html_path)
+    price_drops = load_recent_price_drops()
+
+    pipeline = ReportPipeline(formats=formats)
+    result = pipeline.run(
+        trends, category_trends, rank_history=rank_history, price_drops=price_drops
+    )
+    reports = list(result.paths.values())
 
-    logger.info(f"レポート生成完了: {len(reports)}件")
-    return reports, md_path, html_path
+    for fmt, seconds in result.timings.items():
+        logger.info(f"  {fmt}: {seconds * 1000:.1f}ms")
+    logger.info(f"レポート生成完了: {len(reports)}件 ({result.total_seconds * 1000:.1f}ms)")
+    return reports, result.paths.get("md"), result.paths.get("html")
+
+
+def load_rank_history(days: int) -> Optional[object]:
+    """
+    HTMLのランク推移用に、最新の収集日から遡ってN日分の生データを読み込み
+
+    ファイル数ではなく収集日で選ぶ（1日に複数回収集しても N 日分になる）
+
+    Args:
+        days: 最新の収集日を含めて遡る日数
+
+    Returns:
+        asin, timestamp, current_rank のDataFrame（生データがなければ None）
+    """
+    from analyzer import TrendAnalyzer
+    from archive import default_raw_dir
+
+    analyzer = TrendAnalyzer(data_dir=default_raw_dir())
+    history: object = analyzer.load_recent_days(days, ["asin", "timestamp", "current_rank"])
+    return history
+
+
+def load_recent_price_drops() -> Optional[object]:
+    """
+    レポート用に直近24時間の値下がりを読み込み
+
+    派生データのため、失敗してもレポートは値下がりセクションなしで生成する
+    """
+    from prices import recent_price_drops
+
+    try:
+        drops: object = recent_price_drops(hours=24)
+        return drops
+    except Exception as e:
+        logger.warning(f"値下がりの読み込み失敗: {e}")
+        return None
+
+
+def run_archive() -> int:
+    """
+    レポートアーカイブを更新（変更のあった日のみ再生成）
+
+    Returns:
+        再生成した日数
+    """
+    from archive import ReportArchiveBuilder
+
+    logger.info("=== アーカイブ更新開始 ===")
+    result = ReportArchiveBuilder().build()
+    logger.info(
+        f"アーカイブ更新完了: 再生成{len(result.rebuilt_days)}日 / "
+        f"スキップ{len(result.skipped_days)}日"
+    )
+    return len(result.rebuilt_days)
 
 
 def run_distributor(
-    trends: list,
-    md_path: Optional[Path] = None,
-    html_path: Optional[Path] = None
+    trends: list, md_path: Optional[Path] = None, html_path: Optional[Path] = None
 ) -> dict[str, bool]:
     """
     レポート配信を実行
@@ -169,11 +312,28 @@ def main():
         default=20,
         help="カテゴリあたりの取得件数（デフォルト: 20）",
     )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=["md", "html", "csv", "json", "txt"],
+        default=["md", "html"],
+        help="レポート出力形式（デフォルト: md html）",
+    )
+    parser.add_argument(
+        "--collapse-duplicates",
+        action="store_true",
+        help="重複商品（別カテゴリ・色違いなど）をレポートで1件にまとめる",
+    )
     parser.add_argument(
         "--skip-scrape",
         action="store_true",
         help="データ収集をスキップ（既存データで分析のみ）",
     )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="レポートアーカイブ（reports/archive）を更新",
+    )
     parser.add_argument(
         "--distribute",
         action="store_true",
@@ -204,13 +364,16 @@ def main():
             logger.info("データ収集をスキップ（--skip-scrape）")
 
         # Step 2: トレンド分析
-        trends, category_trends = run_analyzer()
+        trends, category_trends = run_analyzer(args.collapse_duplicates)
         if not trends:
             logger.error("分析対象データがありません。")
             return 1
 
         # Step 3: レポート生成
-        reports, md_path, html_path = run_reporter(trends, category_trends)
+        reports, md_path, html_path = run_reporter(trends, category_trends, args.formats)
+
+        if args.archive:
+            run_archive()
 
         # Step 4: レポート配信（--distributeまたはデフォルト動作）
         distribution_results = {}
@@ -233,7 +396,7 @@ def main():
         # コンソール出力（簡易）
         print("\n【本日のトップ5】")
         for i, t in enumerate(trends[:5], 1):
-            print(f"{i}. {t.name[:40]}... (+{t.rank_change_percent:.0f}%)")
+            print(f"{i}. {t.name[:40]}... ({t.rank_change_percent:+.0f}%)")
         print(f"\n詳細レポート: {reports[0] if reports else 'なし'}")
 
         return 0
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+価格履歴モジュール
+
+収集のたびにASINごとの価格の要約（前回価格・最安値・最高値・直近の中央値）を
+逐次更新し、閾値を超える値下がりを検出する
+
+- 状態はASIN → 配列位置の辞書と列ごとのNumPy配列で持ち、過去のCSVは読み直さない
+- 直近 window 回分の価格はリングバッファ（ASIN × window）に保持し、中央値はソートで一括計算
+- 判定には更新前の状態を使う（値下がりした価格自身で基準がぶれない）
+"""
+
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# 検出結果の列
+PRICE_DROP_COLUMNS = [
+    "timestamp",
+    "asin",
+    "name",
+    "category",
+    "price",
+    "previous_price",
+    "median_price",
+    "min_price",
+    "max_price",
+    "drop_percent",
+    "median_drop_percent",
+    "is_lowest",
+]
+
+# 要約の列
+PRICE_SUMMARY_COLUMNS = ["last_price", "min_price", "max_price", "median_price", "observations"]
+
+# 状態配列: 名前 → (dtype, 初期値)
+_PRICE_ARRAYS = {
+    "last_price": (np.float32, np.nan),
+    "min_price": (np.float32, np.nan),
+    "max_price": (np.float32, np.nan),
+    "last_seen": (np.float64, np.nan),  # エポック秒
+    "observations": (np.int32, 0),
+}
+
+
+def default_state_path() -> Path:
+    """価格履歴の状態ファイルの既定パス"""
+    return Path(config.paths.data_dir) / "price_index.npz"
+
+
+def default_log_path() -> Path:
+    """値下がりの検出結果の追記先の既定パス"""
+    return Path(config.paths.data_dir) / "price_drops.csv"
+
+
+class PriceIndex:
+    """
+    ASINごとの価格履歴の要約
+
+    円建ての価格は float32 で誤差なく表せるため、状態はすべて float32 で持つ。
+    ASINあたりのメモリは (4 + window) × 4バイト程度で、履歴の長さに依存しない。
+
+    値下がりの判定（いずれかを満たす行）
+    - 前回価格から drop_percent % 以上の下落
+    - 直近 window 回分の中央値から median_drop_percent % 以上の下落（min_observations 回以上の観測があるASINのみ）
+    """
+
+    def __init__(
+        self,
+        window: Optional[int] = None,
+        drop_percent: Optional[float] = None,
+        median_drop_percent: Optional[float] = None,
+        min_observations: int = 3,
+        capacity: int = 1024,
+    ):
+        """
+        Args:
+            window: 中央値に使う直近の観測数（省略時は PRICE_WINDOW）
+            drop_percent: 前回価格からの下落率の閾値（省略時は PRICE_DROP_PERCENT）
+            median_drop_percent: 中央値からの下落率の閾値（省略時は PRICE_MEDIAN_DROP_PERCENT）
+            min_observations: 中央値での判定に必要な過去の観測数
+            capacity: 配列の初期容量
+        """
+        self.window = window or config.prices.window
+        self.drop_percent = drop_percent if drop_percent is not None else config.prices.drop_percent
+        self.median_drop_percent = (
+            median_drop_percent
+            if median_drop_percent is not None
+            else config.prices.median_drop_percent
+        )
+        self.min_observations = min_observations
+        self.asins: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.arrays = {
+            name: np.full(capacity, fill, dtype=dtype)
+            for name, (dtype, fill) in _PRICE_ARRAYS.items()
+        }
+        self.recent = np.full((capacity, self.window), np.nan, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.asins)
+
+    def _reserve(self, size: int) -> None:
+        """容量が足りなければ倍に拡張"""
+        capacity = len(self.recent)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name, (dtype, fill) in _PRICE_ARRAYS.items():
+            grown = np.full(capacity, fill, dtype=dtype)
+            grown[: len(self.asins)] = self.arrays[name][: len(self.asins)]
+            self.arrays[name] = grown
+        grown = np.full((capacity, self.window), np.nan, dtype=np.float32)
+        grown[: len(self.asins)] = self.recent[: len(self.asins)]
+        self.recent = grown
+
+    def _position(self, asin: str) -> int:
+        position = self.positions.get(asin)
+        if position is None:
+            position = len(self.asins)
+            self._reserve(position + 1)
+            self.asins.append(asin)
+            self.positions[asin] = position
+        return position
+
+    def _medians(self, idx: np.ndarray) -> np.ndarray:
+        """指定位置の直近の中央値（観測のない位置はNaN）"""
+        n = np.minimum(self.arrays["observations"][idx], self.window)
+        medians = np.full(len(idx), np.nan)
+        has = n > 0
+        if has.any():
+            ordered = np.sort(self.recent[idx[has]], axis=1)  # NaNは末尾
+            rows = np.arange(len(ordered))
+            lower = ordered[rows, (n[has] - 1) // 2]
+            upper = ordered[rows, n[has] // 2]
+            medians[has] = (lower.astype(np.float64) + upper) / 2
+        return medians
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        収集1回分を判定し、状態を更新
+
+        同じASINが複数カテゴリに掲載されている場合は最初の行を使う。
+        前回の観測以前の時刻の行は無視する（再取り込みで状態は変わらない）
+
+        Args:
+            df: asin, price, timestamp を含むDataFrame
+
+        Returns:
+            値下がりと判定した行（PRICE_DROP_COLUMNSのうちdfにある列 + 判定値）
+        """
+        df = df[df["asin"].notna() & (pd.to_numeric(df["price"], errors="coerce") > 0)]
+        if df.empty:
+            return pd.DataFrame(columns=PRICE_DROP_COLUMNS)
+
+        df = df.drop_duplicates("asin")
+        # 時刻文字列は収集回ごとに同じため、重複を除いてから解析する
+        codes, unique = pd.factorize(df["timestamp"])
+        seconds = (
+            pd.to_datetime(unique, format="ISO8601")
+            .to_numpy()
+            .astype("datetime64[s]")
+            .astype(np.int64)
+        )
+        t = seconds.astype(np.float64)[codes]
+        price = pd.to_numeric(df["price"]).to_numpy(dtype=np.float64)
+        asins = df["asin"].astype(str).tolist()
+        idx = np.fromiter((self._position(a) for a in asins), dtype=np.int64, count=len(asins))
+
+        a = self.arrays
+        last_seen = a["last_seen"][idx]
+        newer = np.isnan(last_seen) | (t > last_seen)
+        df, idx, price, t = df[newer], idx[newer], price[newer], t[newer]
+
+        previous = a["last_price"][idx].astype(np.float64)
+        minimum = a["min_price"][idx].astype(np.float64)
+        maximum = a["max_price"][idx].astype(np.float64)
+        count = a["observations"][idx]
+        median = self._medians(idx)
+
+        with np.errstate(invalid="ignore"):
+            drop = (previous - price) / previous * 100
+            median_drop = np.where(
+                count >= self.min_observations, (median - price) / median * 100, np.nan
+            )
+            flagged = (drop >= self.drop_percent) | (median_drop >= self.median_drop_percent)
+            is_lowest = price < minimum
+
+        self.recent[idx, count % self.window] = price
+        a["last_price"][idx] = price
+        a["min_price"][idx] = np.fmin(minimum, price)
+        a["max_price"][idx] = np.fmax(maximum, price)
+        a["last_seen"][idx] = t
+        a["observations"][idx] = count + 1
+
+        result = df[flagged].assign(
+            price=price[flagged],
+            previous_price=previous[flagged],
+            median_price=np.round(median[flagged], 2),
+            min_price=minimum[flagged],
+            max_price=maximum[flagged],
+            drop_percent=np.round(drop[flagged], 2),
+            median_drop_percent=np.round(median_drop[flagged], 2),
+            is_lowest=is_lowest[flagged],
+        )
+        return result[[c for c in PRICE_DROP_COLUMNS if c in result.columns]].reset_index(drop=True)
+
+    def summary(self, asins) -> pd.DataFrame:
+        """
+        指定ASINの価格の要約（未観測のASINは欠損値）
+
+        Returns:
+            PRICE_SUMMARY_COLUMNS の列を持つDataFrame（asinsと同順）
+        """
+        positions = np.fromiter(
+            (self.positions.get(str(a), -1) for a in asins), dtype=np.int64, count=len(asins)
+        )
+        known = positions >= 0
+        result = {}
+        for name in PRICE_SUMMARY_COLUMNS:
+            values = np.full(len(positions), np.nan)
+            if name == "median_price":
+                values[known] = self._medians(positions[known])
+            else:
+                values[known] = self.arrays[name][positions[known]]
+            result[name] = values
+        return pd.DataFrame(result)
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """状態を .npz に書き出し（一時ファイル経由）"""
+        path = path or default_state_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        size = len(self.asins)
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                allow_pickle=False,
+                asins=np.array(self.asins, dtype=str),
+                window=self.window,
+                recent=self.recent[:size],
+                **{name: values[:size] for name, values in self.arrays.items()},
+            )
+        tmp_path.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "PriceIndex":
+        """
+        状態を読み込み（ファイルがなければ空の状態）
+
+        閾値は保存せず、読み込み時の設定を使う
+        """
+        path = path or default_state_path()
+        if not path.exists():
+            return cls()
+        with np.load(path) as data:
+            asins = data["asins"].tolist()
+            index = cls(int(data["window"]), capacity=max(len(asins), 1024))
+            for name in _PRICE_ARRAYS:
+                index.arrays[name][: len(asins)] = data[name]
+            index.recent[: len(asins)] = data["recent"]
+        index.asins = asins
+        index.positions = {asin: i for i, asin in enumerate(asins)}
+        return index
+
+    @classmethod
+    def from_history(cls, store) -> "PriceIndex":
+        """
+        履歴ストアの全観測値から状態を再構築（初回のみ）
+
+        Args:
+            store: history.HistoryStore
+        """
+        index = cls()
+        rows = pd.DataFrame(store.iter_rows())
+        if rows.empty:
+            return index
+        for _, run in rows.groupby("timestamp", sort=True):
+            index.update(run)
+        return index
+
+    @classmethod
+    def open(cls, path: Optional[Path] = None) -> "PriceIndex":
+        """
+        状態を開く
+
+        状態ファイルがなく履歴ストアがある場合は、履歴ストアから初期化する
+        """
+        from history import HistoryStore, default_db_path
+
+        path = path or default_state_path()
+        if not path.exists() and default_db_path().exists():
+            index = cls.from_history(HistoryStore())
+            logger.info(f"価格履歴を履歴ストアから初期化: {len(index)}件")
+            return index
+        return cls.load(path)
+
+
+def append_price_drops(drops: pd.DataFrame, path: Optional[Path] = None) -> None:
+    """検出結果をCSVに追記"""
+    if drops.empty:
+        return
+    path = path or default_log_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    drops.reindex(columns=PRICE_DROP_COLUMNS).to_csv(
+        path, mode="a", header=not path.exists(), index=False, encoding="utf-8"
+    )
+
+
+def load_price_drops(path: Optional[Path] = None, limit: Optional[int] = None) -> pd.DataFrame:
+    """
+    検出結果を読み込み
+
+    Args:
+        limit: 直近の件数
+    """
+    path = path or default_log_path()
+    if not path.exists():
+        return pd.DataFrame(columns=PRICE_DROP_COLUMNS)
+    df = pd.read_csv(path, encoding="utf-8")
+    return df.tail(limit).reset_index(drop=True) if limit else df
+
+
+def recent_price_drops(
+    hours: float = 24,
+    min_percent: float = 0.0,
+    category: Optional[str] = None,
+    path: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    直近の値下がり（ASINごとに最新の1件、下落率の大きい順）
+
+    期間は最新の検出時刻から数える（収集が止まっていても直近の結果を返す）
+
+    Args:
+        hours: 対象期間（時間）
+        min_percent: 前回比・中央値比の大きい方の下限（%）
+        category: カテゴリで絞り込み
+        path: 検出結果ファイル（省略時は data/price_drops.csv）
+    """
+    df = load_price_drops(path)
+    if df.empty:
+        return df
+
+    timestamps = pd.to_datetime(df["timestamp"], format="ISO8601")
+    df = df[timestamps >= timestamps.max() - timedelta(hours=hours)]
+    df = df.drop_duplicates("asin", keep="last")
+    if category:
+        df = df[df["category"] == category]
+    largest = df[["drop_percent", "median_drop_percent"]].max(axis=1)
+    df = df[largest >= min_percent]
+    order = np.argsort(-largest[df.index].to_numpy(), kind="stable")
+    return df.iloc[order].reset_index(drop=True)
+
+
+def main():
+    """メイン実行（直近の値下がりを表示）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI 値下がりの検出結果")
+    parser.add_argument("--hours", type=float, default=24, help="対象期間（時間）")
+    parser.add_argument("--min-percent", type=float, default=0.0, help="下落率の下限（%%）")
+    parser.add_argument("--category", help="カテゴリで絞り込み")
+    parser.add_argument("--limit", type=int, default=20, help="表示件数")
+    args = parser.parse_args()
+
+    df = recent_price_drops(args.hours, args.min_percent, args.category).head(args.limit)
+    if df.empty:
+        logger.info("値下がりはありません")
+        return
+    print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
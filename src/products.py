@@ -0,0 +1,485 @@
+# -*- coding: utf-8 -*-
+"""
+商品単位の時系列モジュール
+
+ASINごとのランク・価格・評価・レビュー数・トレンドスコアの時系列を列指向の配列に持ち、
+1商品の全履歴を配列のスライスで返す（`/products/{asin}`・`/products/{asin}/history`）
+
+- 観測値は (ASIN, 時刻) 順に並べた列ごとの配列と、ASINごとの開始オフセット（CSR形式）で持つ
+- 収集のたびに取り込みパイプラインで追加分（差分）だけを積み、差分が大きくなったら保存時に本体へまとめ直す
+- APIは状態ファイルを1度だけ読み込み、ファイルが書き換わるまで使い回す（リクエストごとにファイルを読まない）
+- トレンドスコアは収集時に既定のスコア定義で計算した値を保存する
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# 時系列の列
+SERIES_COLUMNS = [
+    "timestamp",
+    "category",
+    "current_rank",
+    "price",
+    "rating",
+    "review_count",
+    "trend_score",
+]
+
+# 観測値の数値列（不明はNaN）
+_VALUE_COLUMNS = ["current_rank", "price", "rating", "review_count", "trend_score"]
+
+# 整数で返す列
+_INTEGER_COLUMNS = {"current_rank", "review_count"}
+
+# 前回の観測時刻のキーでカテゴリ番号に使うビット数
+_CATEGORY_BITS = 16
+
+# 差分が本体のこの割合を超えたら保存時にまとめ直す
+_COMPACT_RATIO = 0.25
+
+
+def default_series_path() -> Path:
+    """商品時系列の状態ファイルの既定パス"""
+    return Path(config.paths.data_dir) / "product_series.npz"
+
+
+def _empty_rows() -> dict[str, np.ndarray]:
+    """観測値の列（0行）"""
+    rows: dict[str, np.ndarray] = {
+        "position": np.empty(0, dtype=np.int32),
+        "timestamp": np.empty(0, dtype=np.int64),
+        "category": np.empty(0, dtype=np.int32),
+    }
+    rows.update({name: np.empty(0, dtype=np.float32) for name in _VALUE_COLUMNS})
+    return rows
+
+
+def _take(rows: dict[str, np.ndarray], index) -> dict[str, np.ndarray]:
+    return {name: values[index] for name, values in rows.items()}
+
+
+def _epoch(day: date) -> int:
+    """日付0時のエポック秒（観測時刻と同じくタイムゾーンなし）"""
+    return (day - date(1970, 1, 1)).days * 86400
+
+
+def _values(values: np.ndarray, integer: bool) -> list:
+    """数値配列をJSON向けのリストに変換（NaNはNone、要素ごとに判定しない）"""
+    missing = np.isnan(values)
+    converted: np.ndarray
+    if integer:
+        converted = np.where(missing, 0, values).astype(np.int64)
+    else:
+        converted = values.astype(np.float64).round(2)
+    if missing.any():
+        converted = np.where(missing, np.array(None), converted.astype(object))
+    result: list = converted.tolist()
+    return result
+
+
+class ProductSeriesIndex:
+    """
+    ASINごとの観測値の時系列
+
+    ASIN → 位置を辞書で引き、観測値は本体（ASIN・時刻順のCSR形式）と差分（収集回ごとの追加分）に分けて持つ。
+    1商品の履歴は本体のスライスと差分の二分探索で取り出し、全観測値は走査しない。
+    値は float32（ランク・レビュー数は2^24未満で誤差なし）で、観測値あたり約30バイト。
+    """
+
+    def __init__(self):
+        self.asins: list[str] = []
+        self.names: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.categories: list[str] = []
+        self.category_codes: dict[str, int] = {}
+        # (ASIN位置 << _CATEGORY_BITS | カテゴリ番号) → 最後に観測した時刻（エポック秒）
+        self.last_seen: dict[int, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.base = _empty_rows()
+        self._delta_chunks: list[dict[str, np.ndarray]] = []
+        self._delta: Optional[dict[str, np.ndarray]] = None
+        # 時刻（エポック秒）→ ISO 8601文字列（収集時刻は全ASINで共通のため使い回す）
+        self._labels: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.asins)
+
+    @property
+    def size(self) -> int:
+        """観測値の数"""
+        return len(self.base["timestamp"]) + self.delta_size
+
+    @property
+    def delta_size(self) -> int:
+        """差分の観測値の数"""
+        return sum(len(chunk["timestamp"]) for chunk in self._delta_chunks)
+
+    def _position(self, asin: str) -> int:
+        position = self.positions.get(asin)
+        if position is None:
+            position = len(self.asins)
+            self.asins.append(asin)
+            self.names.append("")
+            self.positions[asin] = position
+        return position
+
+    def _category_code(self, category: str) -> int:
+        code = self.category_codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self.category_codes[category] = code
+        return code
+
+    def update(self, df: pd.DataFrame, scores: Optional[pd.Series] = None) -> int:
+        """
+        収集1回分の観測値を追加
+
+        ASIN・カテゴリごとに前回の観測以前の時刻の行は無視する（再取り込みで重複しない）
+
+        Args:
+            df: asin, timestamp と任意の name, category, current_rank, price, rating, review_count を含むDataFrame
+            scores: dfと同じインデックスのトレンドスコア
+
+        Returns:
+            追加した観測値の数
+        """
+        df = df[df["asin"].notna() & df["timestamp"].notna()]
+        if df.empty:
+            return 0
+
+        # 時刻文字列は収集回ごとに同じため、重複を除いてから解析する
+        codes, unique = pd.factorize(df["timestamp"])
+        seconds = (
+            pd.to_datetime(unique, format="ISO8601")
+            .to_numpy()
+            .astype("datetime64[s]")
+            .astype(np.int64)
+        )
+        t = seconds[codes]
+        asins = df["asin"].astype(str).tolist()
+        categories = (
+            df["category"].fillna("").astype(str).tolist() if "category" in df else [""] * len(df)
+        )
+        positions = np.fromiter(
+            (self._position(a) for a in asins), dtype=np.int64, count=len(asins)
+        )
+        category_codes = np.array([self._category_code(c) for c in categories], dtype=np.int64)
+        keys = (positions << _CATEGORY_BITS | category_codes).tolist()
+        seen = np.fromiter(
+            (self.last_seen.get(k, -1) for k in keys), dtype=np.int64, count=len(keys)
+        )
+        newer = t > seen
+        if not newer.any():
+            return 0
+
+        df, positions, t = df[newer], positions[newer], t[newer]
+        chunk = {"position": positions.astype(np.int32), "timestamp": t}
+        chunk["category"] = category_codes[newer].astype(np.int32)
+        for name in _VALUE_COLUMNS:
+            source = (
+                scores[df.index] if name == "trend_score" and scores is not None else df.get(name)
+            )
+            if source is None:
+                chunk[name] = np.full(len(df), np.nan, dtype=np.float32)
+            else:
+                chunk[name] = pd.to_numeric(source, errors="coerce").to_numpy(
+                    dtype=np.float32, na_value=np.nan
+                )
+        self._delta_chunks.append(chunk)
+        self._delta = None
+
+        for key, timestamp in zip(np.array(keys)[newer].tolist(), t.tolist()):
+            self.last_seen[key] = max(self.last_seen.get(key, -1), timestamp)
+        if "name" in df:
+            for position, name in zip(positions.tolist(), df["name"].tolist()):
+                if isinstance(name, str) and name:
+                    self.names[position] = name
+        return len(df)
+
+    def _sorted_delta(self) -> dict[str, np.ndarray]:
+        """差分を (ASIN位置, 時刻) 順に並べた列（更新があるまで使い回す）"""
+        if self._delta is None:
+            if self._delta_chunks:
+                rows = {
+                    name: np.concatenate([c[name] for c in self._delta_chunks])
+                    for name in self._delta_chunks[0]
+                }
+                self._delta = _take(rows, np.lexsort((rows["timestamp"], rows["position"])))
+            else:
+                self._delta = _empty_rows()
+        return self._delta
+
+    def _rows(self, position: int) -> dict[str, np.ndarray]:
+        """ASINの全観測値（時刻順）"""
+        if position + 1 < len(self.offsets):
+            rows = _take(self.base, slice(self.offsets[position], self.offsets[position + 1]))
+        else:
+            rows = _take(self.base, slice(0, 0))
+        delta = self._sorted_delta()
+        lower, upper = np.searchsorted(delta["position"], [position, position + 1])
+        if upper == lower:
+            return rows
+        added = _take(delta, slice(lower, upper))
+        if len(rows["timestamp"]) == 0:
+            return added
+        merged = {name: np.concatenate([rows[name], added[name]]) for name in added}
+        # 差分は通常本体より新しいため連結で時刻順になる（新しいカテゴリの過去の観測値だけ並べ直す）
+        if added["timestamp"][0] < rows["timestamp"][-1]:
+            merged = _take(merged, np.argsort(merged["timestamp"], kind="stable"))
+        return merged
+
+    def _timestamp_labels(self, seconds: np.ndarray) -> list[str]:
+        """時刻をISO 8601文字列に変換（変換済みの時刻は使い回す）"""
+        seconds = seconds.tolist()
+        missing = [t for t in set(seconds) if t not in self._labels]
+        if missing:
+            labels = np.datetime_as_string(np.array(missing, dtype="datetime64[s]")).tolist()
+            self._labels.update(zip(missing, labels))
+        return [self._labels[t] for t in seconds]
+
+    def compact(self) -> None:
+        """差分を本体にまとめ直す"""
+        if not self._delta_chunks:
+            return
+        counts = np.diff(self.offsets)
+        base = dict(self.base, position=np.repeat(np.arange(len(counts), dtype=np.int32), counts))
+        delta = self._sorted_delta()
+        rows = {name: np.concatenate([base[name], delta[name]]) for name in delta}
+        rows = _take(rows, np.lexsort((rows["timestamp"], rows["position"])))
+        self.offsets = np.searchsorted(rows["position"], np.arange(len(self.asins) + 1)).astype(
+            np.int64
+        )
+        self.base = rows
+        self._delta_chunks, self._delta = [], None
+
+    def history(
+        self,
+        asin: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        category: Optional[str] = None,
+    ) -> Optional[dict[str, list]]:
+        """
+        ASINの時系列
+
+        Args:
+            asin: 商品ID
+            start: 開始日（含む）
+            end: 終了日（含む）
+            category: カテゴリで絞り込み（複数カテゴリに掲載された商品向け）
+
+        Returns:
+            SERIES_COLUMNS の列名 → 値のリスト（時刻順、不明な値は None）。未登録のASINは None
+        """
+        position = self.positions.get(asin)
+        if position is None:
+            return None
+        rows = self._rows(position)
+        lower = np.searchsorted(rows["timestamp"], _epoch(start)) if start else 0
+        upper = (
+            np.searchsorted(rows["timestamp"], _epoch(end + timedelta(days=1)))
+            if end
+            else len(rows["timestamp"])
+        )
+        rows = _take(rows, slice(lower, upper))
+        if category is not None:
+            rows = _take(rows, rows["category"] == self.category_codes.get(category, -1))
+
+        series = {
+            "timestamp": self._timestamp_labels(rows["timestamp"]),
+            "category": np.array(self.categories, dtype=object)[rows["category"]].tolist(),
+        }
+        for name in _VALUE_COLUMNS:
+            series[name] = _values(rows[name], name in _INTEGER_COLUMNS)
+        return series
+
+    def detail(self, asin: str) -> Optional[dict]:
+        """
+        ASINの最新の観測値と全期間の要約
+
+        Returns:
+            asin, name, 最新の観測値（SERIES_COLUMNS）と observations, first_seen,
+            best_rank, min_price, max_price の辞書。未登録のASINは None
+        """
+        position = self.positions.get(asin)
+        if position is None:
+            return None
+        rows = self._rows(position)
+        if len(rows["timestamp"]) == 0:
+            return None
+
+        latest = {name: values[-1:] for name, values in rows.items()}
+        detail: dict[str, object] = {"asin": asin, "name": self.names[position] or None}
+        detail["timestamp"] = self._timestamp_labels(latest["timestamp"])[0]
+        detail["category"] = self.categories[int(latest["category"][0])]
+        for name in _VALUE_COLUMNS:
+            detail[name] = _values(latest[name], name in _INTEGER_COLUMNS)[0]
+
+        ranks, prices = rows["current_rank"], rows["price"]
+        detail["observations"] = len(rows["timestamp"])
+        detail["first_seen"] = self._timestamp_labels(rows["timestamp"][:1])[0]
+        ranks, prices = ranks[np.isfinite(ranks)], prices[np.isfinite(prices)]
+        detail["best_rank"] = int(ranks.min()) if len(ranks) else None
+        detail["min_price"] = float(prices.min()) if len(prices) else None
+        detail["max_price"] = float(prices.max()) if len(prices) else None
+        return detail
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """
+        状態を .npz に書き出し（一時ファイル経由）
+
+        差分が本体の一定割合を超えていれば先にまとめ直す
+        """
+        if self.delta_size > _COMPACT_RATIO * len(self.base["timestamp"]):
+            self.compact()
+        path = path or default_series_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        delta = self._sorted_delta()
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                allow_pickle=False,
+                asins=np.array(self.asins, dtype=str),
+                names=np.array(self.names, dtype=str),
+                categories=np.array(self.categories, dtype=str),
+                last_seen_keys=np.fromiter(
+                    self.last_seen, dtype=np.int64, count=len(self.last_seen)
+                ),
+                last_seen=np.fromiter(
+                    self.last_seen.values(), dtype=np.int64, count=len(self.last_seen)
+                ),
+                offsets=self.offsets,
+                **{f"base_{name}": values for name, values in self.base.items()},
+                **{f"delta_{name}": values for name, values in delta.items()},
+            )
+        tmp_path.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "ProductSeriesIndex":
+        """状態を読み込み（ファイルがなければ空の状態）"""
+        path = path or default_series_path()
+        index = cls()
+        if not path.exists():
+            return index
+        with np.load(path) as data:
+            index.asins = data["asins"].tolist()
+            index.names = data["names"].tolist()
+            index.categories = data["categories"].tolist()
+            index.last_seen = dict(zip(data["last_seen_keys"].tolist(), data["last_seen"].tolist()))
+            index.offsets = data["offsets"]
+            index.base = {name: data[f"base_{name}"] for name in _empty_rows()}
+            delta = {name: data[f"delta_{name}"] for name in _empty_rows()}
+        if len(delta["timestamp"]):
+            index._delta_chunks, index._delta = [delta], delta
+        index.positions = {asin: i for i, asin in enumerate(index.asins)}
+        index.category_codes = {category: i for i, category in enumerate(index.categories)}
+        return index
+
+    @classmethod
+    def from_history(cls, store, scoring=None) -> "ProductSeriesIndex":
+        """
+        履歴ストアの全観測値から状態を再構築（初回のみ）
+
+        Args:
+            store: history.HistoryStore
+            scoring: scoring.ScoreRegistry（省略時は既定のスコアのみ）
+        """
+        from scoring import BUILTIN_SCORES, DEFAULT_SCORE
+
+        scoring = scoring or BUILTIN_SCORES
+        index = cls()
+        rows = pd.DataFrame(store.iter_rows())
+        if not rows.empty:
+            index.update(rows, scoring.compute(rows, [DEFAULT_SCORE])[DEFAULT_SCORE])
+            index.compact()
+        return index
+
+    @classmethod
+    def open(cls, path: Optional[Path] = None, scoring=None) -> "ProductSeriesIndex":
+        """
+        状態を開く
+
+        状態ファイルがなく履歴ストアがある場合は、履歴ストアから初期化する
+        """
+        from history import HistoryStore, default_db_path
+
+        path = path or default_series_path()
+        if not path.exists() and default_db_path().exists():
+            index = cls.from_history(HistoryStore(), scoring)
+            logger.info(f"商品時系列を履歴ストアから初期化: {len(index)}件 / {index.size}点")
+            return index
+        return cls.load(path)
+
+
+# 読み込み済みの状態: パス → ((更新時刻, サイズ), 状態)
+_loaded: dict[Path, tuple[tuple[int, int], ProductSeriesIndex]] = {}
+
+
+def cached_index(path: Optional[Path] = None) -> ProductSeriesIndex:
+    """
+    保存済みの状態（ファイルが更新されるまで読み込み済みのものを使い回す）
+
+    APIではリクエストごとに読み込まず、収集で状態ファイルが書き換わったときだけ読み直す
+    """
+    path = path or default_series_path()
+    if not path.exists():
+        return ProductSeriesIndex()
+    stat = path.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    loaded = _loaded.get(path)
+    if loaded is None or loaded[0] != version:
+        loaded = (version, ProductSeriesIndex.load(path))
+        _loaded[path] = loaded
+    return loaded[1]
+
+
+def product_detail(asin: str, path: Optional[Path] = None) -> Optional[dict]:
+    """保存済みの状態から商品の最新値と要約を取得（ProductSeriesIndex.detail）"""
+    return cached_index(path).detail(asin)
+
+
+def product_history(
+    asin: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[str] = None,
+    path: Optional[Path] = None,
+) -> Optional[dict[str, list]]:
+    """保存済みの状態から商品の時系列を取得（ProductSeriesIndex.history）"""
+    return cached_index(path).history(asin, start, end, category)
+
+
+def main():
+    """メイン実行（商品の時系列を表示）"""
+    import argparse
+
+    from exporter import parse_date
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI 商品の時系列")
+    parser.add_argument("asin", help="商品ID")
+    parser.add_argument("--from", dest="date_from", help="開始日（YYYY-MM-DD）")
+    parser.add_argument("--to", dest="date_to", help="終了日（YYYY-MM-DD）")
+    parser.add_argument("--category", help="カテゴリで絞り込み")
+    args = parser.parse_args()
+
+    series = product_history(
+        args.asin, parse_date(args.date_from), parse_date(args.date_to), args.category
+    )
+    if not series or not series["timestamp"]:
+        logger.info(f"観測値がありません: {args.asin}")
+        return
+    print(pd.DataFrame(series, columns=SERIES_COLUMNS).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
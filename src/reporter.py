@@ -5,13 +5,190 @@
 トレンド分析結果を各種フォーマットで出力
 """
 
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from loguru import logger
 
-from config import config
+from config import config, get_affiliate_url
+
+# パイプラインで出力可能な形式
+REPORT_FORMATS = ("md", "html", "csv", "json", "txt")
+
+# HTMLレポートの表示件数
+HTML_TOP_N = 20
+
+# 値下がりセクションの表示件数
+PRICE_DROP_TOP_N = 10
+
+
+@dataclass
+class FormattedTrend:
+    """
+    フォーマット済みトレンドアイテム
+
+    価格・評価・変動率の表示文字列を一度だけ生成し、全出力形式で共有する
+    """
+
+    asin: str
+    name: str
+    category: str
+    affiliate_url: str
+    current_rank: Any
+    rank_change_percent: float
+    trend_score: float
+    price: Optional[float]
+    rating: Optional[float]
+    price_label: str  # "¥12,980"（価格不明時は空文字）
+    rating_label: str  # "★4.5"（評価なし時は空文字）
+    change_label: str  # "+150%"（下落時は "-50%"）
+    change_class: str  # HTMLのCSSクラス（上昇・横ばい: positive、下落: negative）
+
+
+@dataclass
+class FormattedPriceDrop:
+    """フォーマット済み値下がりアイテム"""
+
+    asin: str
+    name: str
+    category: str
+    affiliate_url: str
+    price: float
+    previous_price: Optional[float]
+    drop_percent: Optional[float]  # 前回比（%）
+    median_drop_percent: Optional[float]  # 直近の中央値比（%）
+    is_lowest: bool
+    price_label: str  # "¥9,800"
+    previous_label: str  # "¥12,800"（前回価格不明時は空文字）
+    drop_label: str  # "-23%"（前回比・中央値比の大きい方）
+
+
+@dataclass
+class ReportView:
+    """全出力形式で共有するレポートビュー"""
+
+    generated_at: datetime
+    trends: list[FormattedTrend]
+    category_trends: dict[str, list[FormattedTrend]] = field(default_factory=dict)
+    sparklines: dict[str, str] = field(default_factory=dict)  # ASIN -> インラインSVG
+    price_drops: list[FormattedPriceDrop] = field(default_factory=list)
+
+    @property
+    def date_str(self) -> str:
+        """ファイル名用の日付（YYYYMMDD）"""
+        return self.generated_at.strftime("%Y%m%d")
+
+
+def format_trend(trend: Any) -> FormattedTrend:
+    """トレンドアイテムを表示用にフォーマット"""
+    return FormattedTrend(
+        asin=getattr(trend, "asin", ""),
+        name=trend.name,
+        category=trend.category,
+        affiliate_url=trend.affiliate_url,
+        current_rank=getattr(trend, "current_rank", None),
+        rank_change_percent=trend.rank_change_percent,
+        trend_score=trend.trend_score,
+        price=trend.price,
+        rating=trend.rating,
+        price_label=f"¥{trend.price:,.0f}" if trend.price else "",
+        rating_label=f"★{trend.rating:.1f}" if trend.rating else "",
+        change_label=f"{trend.rank_change_percent:+.0f}%",
+        change_class="negative" if trend.rank_change_percent < 0 else "positive",
+    )
+
+
+def format_price_drops(drops: Any) -> list[FormattedPriceDrop]:
+    """
+    値下がりの検出結果を表示用にフォーマット
+
+    Args:
+        drops: prices.PRICE_DROP_COLUMNS の列を持つDataFrame
+    """
+
+    def _value(value: Any) -> Optional[float]:
+        return None if value is None or value != value else float(value)
+
+    result = []
+    for row in drops.to_dict("records"):
+        drop = _value(row.get("drop_percent"))
+        median_drop = _value(row.get("median_drop_percent"))
+        previous = _value(row.get("previous_price"))
+        largest = max((v for v in (drop, median_drop) if v is not None), default=0.0)
+        result.append(
+            FormattedPriceDrop(
+                asin=row["asin"],
+                name=row.get("name") or "",
+                category=row.get("category") or "",
+                affiliate_url=get_affiliate_url(row["asin"]),
+                price=float(row["price"]),
+                previous_price=previous,
+                drop_percent=drop,
+                median_drop_percent=median_drop,
+                is_lowest=bool(row.get("is_lowest")),
+                price_label=f"¥{row['price']:,.0f}",
+                previous_label=f"¥{previous:,.0f}" if previous else "",
+                drop_label=f"-{largest:.0f}%",
+            )
+        )
+    return result
+
+
+def build_report_view(
+    trends: list,
+    category_trends: dict,
+    generated_at: Optional[datetime] = None,
+    rank_history: Optional[Any] = None,
+    price_drops: Optional[Any] = None,
+) -> ReportView:
+    """
+    レポートビューを構築
+
+    同一オブジェクトは一度だけフォーマットする
+
+    Args:
+        trends: 全体トレンド
+        category_trends: カテゴリ別トレンド
+        generated_at: 生成日時（省略時は現在時刻）
+        rank_history: ランク履歴DataFrame（指定時はスパークラインを生成）
+        price_drops: 値下がりの検出結果DataFrame（下落率の大きい順）
+
+    Returns:
+        ReportView
+    """
+    cache: dict[int, FormattedTrend] = {}
+
+    def _format(trend: Any) -> FormattedTrend:
+        key = id(trend)
+        if key not in cache:
+            cache[key] = format_trend(trend)
+        return cache[key]
+
+    view = ReportView(
+        generated_at=generated_at or datetime.now(),
+        trends=[_format(t) for t in trends],
+        category_trends={
+            category: [_format(t) for t in items] for category, items in category_trends.items()
+        },
+    )
+
+    if rank_history is not None:
+        from sparkline import sparklines_for_asins
+
+        view.sparklines = sparklines_for_asins(
+            rank_history, [t.asin for t in view.trends[:HTML_TOP_N]]
+        )
+
+    if price_drops is not None and len(price_drops):
+        view.price_drops = format_price_drops(price_drops.head(PRICE_DROP_TOP_N))
+
+    return view
 
 
 class HTMLReportGenerator:
@@ -21,22 +198,35 @@ class HTMLReportGenerator:
         self.output_dir = output_dir or config.paths.reports_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-    def generate(self, trends: list, category_trends: dict) -> Path:
+    def generate(
+        self, trends: list, category_trends: dict, rank_history: Optional[Any] = None
+    ) -> Path:
         """
         HTMLレポートを生成
 
         Args:
             trends: 全体トレンド
             category_trends: カテゴリ別トレンド
+            rank_history: ランク履歴DataFrame（指定時は推移スパークラインを表示）
+
+        Returns:
+            レポートファイルパス
+        """
+        return self.write(build_report_view(trends, category_trends, rank_history=rank_history))
+
+    def write(self, view: ReportView) -> Path:
+        """
+        フォーマット済みビューからHTMLレポートを書き出し
+
+        Args:
+            view: レポートビュー
 
         Returns:
             レポートファイルパス
         """
-        date_str = datetime.now().strftime("%Y%m%d")
-        filename = f"trends_{date_str}.html"
-        filepath = self.output_dir / filename
+        filepath = self.output_dir / f"trends_{view.date_str}.html"
 
-        html_content = self._build_html(trends, category_trends)
+        html_content = self._render_html(view)
 
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(html_content)
@@ -46,30 +236,39 @@ class HTMLReportGenerator:
 
     def _build_html(self, trends: list, category_trends: dict) -> str:
         """HTMLコンテンツを構築"""
+        return self._render_html(build_report_view(trends, category_trends))
+
+    def _render_html(self, view: ReportView) -> str:
+        """レポートビューからHTMLコンテンツを構築"""
+        show_sparklines = bool(view.sparklines)
+        sparkline_header = "<th>推移</th>" if show_sparklines else ""
+
         trend_rows = ""
-        for i, t in enumerate(trends[:20], 1):
-            price_str = f"¥{t.price:,.0f}" if t.price else "-"
-            rating_str = f"★{t.rating:.1f}" if t.rating else "-"
+        for i, t in enumerate(view.trends[:HTML_TOP_N], 1):
+            sparkline_cell = (
+                f'<td>{view.sparklines.get(t.asin, "")}</td>' if show_sparklines else ""
+            )
             trend_rows += f"""
             <tr>
                 <td>{i}</td>
                 <td><a href="{t.affiliate_url}" target="_blank">{t.name[:50]}</a></td>
                 <td>{t.category}</td>
-                <td class="positive">+{t.rank_change_percent:.0f}%</td>
+                <td class="{t.change_class}">{t.change_label}</td>
+                {sparkline_cell}
                 <td>{t.trend_score}</td>
-                <td>{price_str}</td>
-                <td>{rating_str}</td>
+                <td>{t.price_label or "-"}</td>
+                <td>{t.rating_label or "-"}</td>
             </tr>
             """
 
         category_sections = ""
-        for category, items in category_trends.items():
+        for category, items in view.category_trends.items():
             items_html = ""
             for i, t in enumerate(items[:5], 1):
                 items_html += f"""
                 <li>
                     <a href="{t.affiliate_url}" target="_blank">{t.name[:40]}</a>
-                    <span class="change">+{t.rank_change_percent:.0f}%</span>
+                    <span class="change">{t.change_label}</span>
                 </li>
                 """
             category_sections += f"""
@@ -79,13 +278,47 @@ class HTMLReportGenerator:
             </div>
             """
 
+        price_drop_card = ""
+        if view.price_drops:
+            drop_rows = ""
+            for d in view.price_drops:
+                lowest = '<span class="lowest">最安値</span>' if d.is_lowest else ""
+                drop_rows += f"""
+            <tr>
+                <td><a href="{d.affiliate_url}" target="_blank">{d.name[:50]}</a></td>
+                <td>{d.category}</td>
+                <td>{d.price_label} {lowest}</td>
+                <td>{d.previous_label or "-"}</td>
+                <td class="drop">{d.drop_label}</td>
+            </tr>
+            """
+            price_drop_card = f"""
+        <div class="card">
+            <h2>値下がり商品</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>商品名</th>
+                        <th>カテゴリ</th>
+                        <th>価格</th>
+                        <th>前回</th>
+                        <th>下落率</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {drop_rows}
+                </tbody>
+            </table>
+        </div>
+"""
+
         return f"""
 <!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>EcomTrendAI トレンドレポート - {datetime.now().strftime('%Y/%m/%d')}</title>
+    <title>EcomTrendAI トレンドレポート - {view.generated_at.strftime('%Y/%m/%d')}</title>
     <style>
         * {{ margin: 0; padding: 0; box-sizing: border-box; }}
         body {{
@@ -135,6 +368,7 @@ class HTMLReportGenerator:
         a {{ color: #667eea; text-decoration: none; }}
         a:hover {{ text-decoration: underline; }}
         .positive {{ color: #22c55e; font-weight: bold; }}
+        .negative {{ color: #ef4444; font-weight: bold; }}
         .category-section {{
             display: inline-block;
             width: calc(33% - 20px);
@@ -148,6 +382,9 @@ class HTMLReportGenerator:
         .category-section ol {{ padding-left: 20px; }}
         .category-section li {{ margin-bottom: 8px; }}
         .change {{ color: #22c55e; margin-left: 10px; font-size: 0.9em; }}
+        .sparkline {{ display: block; }}
+        .drop {{ color: #ef4444; font-weight: bold; }}
+        .lowest {{ color: #ef4444; font-size: 0.8em; margin-left: 5px; }}
         footer {{
             text-align: center;
             padding: 20px;
@@ -163,7 +400,7 @@ class HTMLReportGenerator:
     <div class="container">
         <header>
             <h1>EcomTrendAI トレンドレポート</h1>
-            <p>生成日時: {datetime.now().strftime('%Y年%m月%d日 %H:%M')}</p>
+            <p>生成日時: {view.generated_at.strftime('%Y年%m月%d日 %H:%M')}</p>
         </header>
 
         <div class="card">
@@ -175,6 +412,7 @@ class HTMLReportGenerator:
                         <th>商品名</th>
                         <th>カテゴリ</th>
                         <th>変動</th>
+                        {sparkline_header}
                         <th>スコア</th>
                         <th>価格</th>
                         <th>評価</th>
@@ -190,6 +428,7 @@ class HTMLReportGenerator:
             <h2>カテゴリ別トレンド</h2>
             {category_sections}
         </div>
+{price_drop_card}
 
         <footer>
             <p>このレポートは EcomTrendAI によって自動生成されました。</p>
@@ -199,3 +438,186 @@ class HTMLReportGenerator:
 </body>
 </html>
         """
+
+
+@dataclass
+class PipelineResult:
+    """レポートパイプライン実行結果"""
+
+    paths: dict[str, Path]
+    timings: dict[str, float]  # 形式 -> 秒（"view" は共有フォーマット処理）
+    total_seconds: float
+
+
+class ReportPipeline:
+    """
+    マルチフォーマットレポートパイプライン
+
+    全アイテムを一度だけフォーマットし、要求された形式を
+    ワーカースレッドで並列に書き出す
+    """
+
+    def __init__(
+        self,
+        output_dir: Optional[Path] = None,
+        formats: Optional[list[str]] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.output_dir = output_dir or config.paths.reports_dir
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.formats = list(formats or ["md", "html"])
+        unknown = [f for f in self.formats if f not in REPORT_FORMATS]
+        if unknown:
+            raise ValueError(f"未対応のレポート形式: {', '.join(unknown)}")
+        self.max_workers = max_workers or len(self.formats)
+
+    def _writers(self) -> dict[str, Callable[[ReportView], Path]]:
+        """形式ごとの書き出し関数"""
+        return {
+            "md": self._write_markdown,
+            "html": self._write_html,
+            "csv": self._write_csv,
+            "json": self._write_json,
+            "txt": self._write_summary,
+        }
+
+    def run(
+        self,
+        trends: list,
+        category_trends: dict,
+        generated_at: Optional[datetime] = None,
+        rank_history: Optional[Any] = None,
+        price_drops: Optional[Any] = None,
+    ) -> PipelineResult:
+        """
+        パイプラインを実行
+
+        Args:
+            trends: 全体トレンド
+            category_trends: カテゴリ別トレンド
+            generated_at: 生成日時（バックフィル時などに指定）
+            rank_history: ランク履歴DataFrame（HTMLのスパークライン用）
+            price_drops: 値下がりの検出結果DataFrame（MD / HTML / JSONの値下がりセクション用）
+
+        Returns:
+            PipelineResult
+        """
+        start = time.perf_counter()
+        view = build_report_view(trends, category_trends, generated_at, rank_history, price_drops)
+        timings = {"view": time.perf_counter() - start}
+
+        writers = self._writers()
+
+        def _timed(fmt: str) -> tuple[str, Path, float]:
+            t0 = time.perf_counter()
+            path = writers[fmt](view)
+            return fmt, path, time.perf_counter() - t0
+
+        paths: dict[str, Path] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for fmt, path, elapsed in executor.map(_timed, self.formats):
+                paths[fmt] = path
+                timings[fmt] = elapsed
+
+        total = time.perf_counter() - start
+        logger.info(
+            f"レポートパイプライン完了: {len(paths)}形式 / {total * 1000:.1f}ms ("
+            + ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in timings.items())
+            + ")"
+        )
+        return PipelineResult(paths=paths, timings=timings, total_seconds=total)
+
+    def _write_markdown(self, view: ReportView) -> Path:
+        from analyzer import ReportGenerator
+
+        return Path(ReportGenerator(output_dir=self.output_dir).write_markdown(view))
+
+    def _write_html(self, view: ReportView) -> Path:
+        return HTMLReportGenerator(output_dir=self.output_dir).write(view)
+
+    def _write_csv(self, view: ReportView) -> Path:
+        filepath = self.output_dir / f"trends_{view.date_str}.csv"
+        with open(filepath, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(
+                [
+                    "rank",
+                    "asin",
+                    "name",
+                    "category",
+                    "current_rank",
+                    "rank_change_percent",
+                    "trend_score",
+                    "price",
+                    "rating",
+                    "affiliate_url",
+                ]
+            )
+            for i, t in enumerate(view.trends, 1):
+                writer.writerow(
+                    [
+                        i,
+                        t.asin,
+                        t.name,
+                        t.category,
+                        t.current_rank,
+                        t.rank_change_percent,
+                        t.trend_score,
+                        t.price,
+                        t.rating,
+                        t.affiliate_url,
+                    ]
+                )
+        logger.info(f"CSVレポート生成完了: {filepath}")
+        return filepath
+
+    def _write_json(self, view: ReportView) -> Path:
+        def _item(t: FormattedTrend) -> dict:
+            return {
+                "asin": t.asin,
+                "name": t.name,
+                "category": t.category,
+                "current_rank": t.current_rank,
+                "rank_change_percent": t.rank_change_percent,
+                "trend_score": t.trend_score,
+                "price": t.price,
+                "rating": t.rating,
+                "affiliate_url": t.affiliate_url,
+            }
+
+        payload = {
+            "generated_at": view.generated_at.isoformat(),
+            "count": len(view.trends),
+            "trends": [_item(t) for t in view.trends],
+            "categories": {
+                category: [_item(t) for t in items]
+                for category, items in view.category_trends.items()
+            },
+            "price_drops": [
+                {
+                    "asin": d.asin,
+                    "name": d.name,
+                    "category": d.category,
+                    "price": d.price,
+                    "previous_price": d.previous_price,
+                    "drop_percent": d.drop_percent,
+                    "median_drop_percent": d.median_drop_percent,
+                    "is_lowest": d.is_lowest,
+                    "affiliate_url": d.affiliate_url,
+                }
+                for d in view.price_drops
+            ],
+        }
+        filepath = self.output_dir / f"trends_{view.date_str}.json"
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+        logger.info(f"JSONレポート生成完了: {filepath}")
+        return filepath
+
+    def _write_summary(self, view: ReportView) -> Path:
+        from distributor import create_summary_for_notification
+
+        filepath = self.output_dir / f"trends_{view.date_str}_summary.txt"
+        filepath.write_text(create_summary_for_notification(view.trends), encoding="utf-8")
+        logger.info(f"通知サマリー生成完了: {filepath}")
+        return filepath
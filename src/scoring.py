@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+スコア定義モジュール
+
+スコアを「特徴量の式 × 重み」の和として設定ファイルで宣言し、
+式は読み込み時に一度だけ検証・コンパイルして列単位（NumPy）で評価する
+
+- 既定のトレンドスコア（ランク変動・レビュー数・評価・モメンタム）も同じ仕組みで定義
+- 複数のスコアを1回の計算でまとめて求める（特徴量の取り出し・同じ式の評価は1回だけ）
+- 式で使えるのは特徴量名・数値・四則演算・比較・&/|/~ と FUNCTIONS の関数のみ
+
+設定ファイル（data/scores.json）の例:
+    {
+        "default": {"weights": {"reviews": 0.5}},
+        "scores": [
+            {
+                "name": "bargain",
+                "plans": ["pro", "enterprise"],
+                "terms": [
+                    {"name": "rank", "expr": "minimum(rank_change_percent / 2, 50)", "weight": 1.0},
+                    {"name": "cheap", "expr": "where(price > 0, 20 - minimum(log10(price + 1) * 4, 20), 0)"}
+                ]
+            }
+        ]
+    }
+"""
+
+import ast
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import CodeType
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# 既定のスコア名
+DEFAULT_SCORE = "default"
+
+# 式で参照できる特徴量（欠損値は0として扱う）
+FEATURES = (
+    "current_rank",
+    "previous_rank",
+    "rank_change",
+    "rank_change_percent",
+    "price",
+    "review_count",
+    "rating",
+    "velocity",
+    "acceleration",
+    "ewma_rank",
+    "days_in_chart",
+)
+
+# 式で使える関数（すべて配列を要素ごとに処理する）
+FUNCTIONS = {
+    "abs": np.abs,
+    "clip": np.clip,
+    "exp": np.exp,
+    "log10": np.log10,
+    "log1p": np.log1p,
+    "maximum": np.maximum,
+    "minimum": np.minimum,
+    "sqrt": np.sqrt,
+    "where": np.where,
+}
+
+# 既定のトレンドスコアの構成要素（名前 → 式）
+DEFAULT_TERMS = {
+    # ランク変動（正規化: 0-100%を0-50ポイントに）
+    "rank_change": "minimum(rank_change_percent / 2, 50)",
+    # レビュー数（対数スケール、最大30ポイント）
+    "reviews": "where(review_count > 0, minimum(log10(where(review_count > 0, review_count, 1)) * 10, 30), 0)",
+    # 評価（4.0以上で加点、4.5なら+10, 5.0なら+20）
+    "rating": "where(rating >= 4.0, (rating - 4.0) * 20, 0)",
+    # モメンタム（1日あたりの上昇率10%ごとに1ポイント、最大10ポイント）
+    "momentum": (
+        "where((velocity > 0) & (ewma_rank > 0), "
+        "minimum(velocity / where(ewma_rank > 0, ewma_rank, 1) * 10, 10), 0)"
+    ),
+}
+
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.Pow,
+    ast.Mod,
+    ast.USub,
+    ast.UAdd,
+    ast.Invert,
+    ast.BitAnd,
+    ast.BitOr,
+    ast.Gt,
+    ast.GtE,
+    ast.Lt,
+    ast.LtE,
+    ast.Eq,
+    ast.NotEq,
+)
+
+
+def default_scores_path() -> Path:
+    """スコア定義ファイルの既定パス"""
+    return Path(config.paths.data_dir) / "scores.json"
+
+
+class ScoreExpressionError(ValueError):
+    """スコアの式が不正"""
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    """検証・コンパイル済みの式"""
+
+    source: str
+    names: frozenset[str]  # 参照する特徴量
+    code: CodeType
+
+    def __call__(self, features: dict[str, np.ndarray], size: int) -> np.ndarray:
+        """
+        特徴量の配列で評価
+
+        Args:
+            features: 特徴量名 → float64配列
+            size: 行数（定数だけの式も行数分に広げる）
+        """
+        result = eval(
+            self.code, {"__builtins__": {}, **FUNCTIONS}, features
+        )  # noqa: S307（検証済みの式のみ）
+        return np.broadcast_to(np.asarray(result, dtype=float), (size,))
+
+
+def compile_expression(source: str) -> CompiledExpression:
+    """
+    式を検証してコンパイル
+
+    Raises:
+        ScoreExpressionError: 構文エラー、または許可されていない構文・名前を含む場合
+    """
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError as e:
+        raise ScoreExpressionError(f"式の構文エラー: {source} ({e.msg})") from None
+
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ScoreExpressionError(f"式に使えない構文です: {type(node).__name__} ({source})")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ScoreExpressionError(f"式に使える定数は数値のみです: {source}")
+        if isinstance(node, ast.Compare) and len(node.ops) != 1:
+            raise ScoreExpressionError(f"比較の連結は使えません（& で結合してください）: {source}")
+        if isinstance(node, ast.Call):
+            if (
+                not isinstance(node.func, ast.Name)
+                or node.func.id not in FUNCTIONS
+                or node.keywords
+            ):
+                raise ScoreExpressionError(f"式に使えない関数呼び出しです: {source}")
+        if isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            if node.id not in FEATURES:
+                raise ScoreExpressionError(f"未対応の特徴量です: {node.id} ({source})")
+            names.add(node.id)
+
+    # 整数の定数は小数にする（Pythonの整数演算で巨大な値を作らせない）
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            node.value = float(node.value)
+    expression = CompiledExpression(
+        source, frozenset(names), compile(tree, f"<score:{source}>", "eval")
+    )
+
+    # 引数の数などの誤りは読み込み時に検出する
+    try:
+        with np.errstate(all="ignore"):
+            expression({name: np.zeros(1) for name in names}, 1)
+    except Exception as e:
+        raise ScoreExpressionError(f"式を評価できません: {source} ({e})") from None
+    return expression
+
+
+@dataclass
+class ScoreDefinition:
+    """スコア定義（式ごとの値 × 重み の和、小数第2位に丸める）"""
+
+    name: str
+    terms: dict[str, CompiledExpression]  # 構成要素名 → 式
+    weights: dict[str, float]  # 構成要素名 → 重み
+    plans: tuple[str, ...] = ()  # 利用できるプラン（空なら全プラン）
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScoreDefinition":
+        """設定ファイルの1エントリから作成"""
+        terms, weights = {}, {}
+        for i, term in enumerate(data["terms"]):
+            name = term.get("name", f"term{i}")
+            terms[name] = compile_expression(term["expr"])
+            weights[name] = float(term.get("weight", 1.0))
+        return cls(
+            name=data["name"], terms=terms, weights=weights, plans=tuple(data.get("plans", ()))
+        )
+
+
+def default_definition(weights: Optional[dict[str, float]] = None) -> ScoreDefinition:
+    """
+    既定のトレンドスコアの定義
+
+    Args:
+        weights: 構成要素ごとの重み（省略した構成要素は1.0）
+    """
+    weights = dict(weights or {})
+    unknown = set(weights) - set(DEFAULT_TERMS)
+    if unknown:
+        raise ScoreExpressionError(f"既定のスコアにない構成要素です: {', '.join(sorted(unknown))}")
+    return ScoreDefinition(
+        name=DEFAULT_SCORE,
+        terms={name: compile_expression(expr) for name, expr in DEFAULT_TERMS.items()},
+        weights={name: float(weights.get(name, 1.0)) for name in DEFAULT_TERMS},
+    )
+
+
+@dataclass
+class ScoreRegistry:
+    """スコア定義の一覧"""
+
+    definitions: dict[str, ScoreDefinition] = field(
+        default_factory=lambda: {DEFAULT_SCORE: default_definition()}
+    )
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.definitions
+
+    def names(self) -> list[str]:
+        return list(self.definitions)
+
+    def register(self, definition: ScoreDefinition) -> None:
+        """スコアを登録（同名は置き換え）"""
+        self.definitions[definition.name] = definition
+
+    def available_for(self, plan: str) -> list[str]:
+        """プランで利用できるスコア名"""
+        return [name for name, d in self.definitions.items() if not d.plans or plan in d.plans]
+
+    def _features(self, df: pd.DataFrame, names: set[str]) -> dict[str, np.ndarray]:
+        """式が参照する特徴量をfloat64配列で取り出し（列がない・欠損値は0）"""
+        features = {}
+        for name in names:
+            if name in df.columns:
+                values = pd.to_numeric(df[name], errors="coerce").to_numpy(
+                    dtype=float, na_value=np.nan
+                )
+                features[name] = np.nan_to_num(values, nan=0.0)
+            else:
+                features[name] = np.zeros(len(df))
+        return features
+
+    def terms(
+        self, df: pd.DataFrame, names: Optional[list[str]] = None
+    ) -> dict[str, dict[str, np.ndarray]]:
+        """
+        スコアごとの構成要素の値
+
+        同じ式は複数のスコアで使われていても1回だけ評価する
+
+        Returns:
+            スコア名 → (構成要素名 → 値の配列)
+        """
+        definitions = [self.definitions[name] for name in (names or self.names())]
+        expressions = {e.source: e for d in definitions for e in d.terms.values()}
+        features = self._features(df, set().union(*(e.names for e in expressions.values())))
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            values = {source: e(features, len(df)) for source, e in expressions.items()}
+        return {
+            d.name: {term: values[e.source] for term, e in d.terms.items()} for d in definitions
+        }
+
+    def compute(self, df: pd.DataFrame, names: Optional[list[str]] = None) -> pd.DataFrame:
+        """
+        スコアを1回の計算でまとめて求める
+
+        Args:
+            df: 商品データ
+            names: スコア名（省略時は全スコア）
+
+        Returns:
+            スコア名の列を持つDataFrame（dfと同じインデックス）
+        """
+        result = {}
+        for name, terms in self.terms(df, names).items():
+            weights = self.definitions[name].weights
+            score = np.zeros(len(df))
+            for term, values in terms.items():
+                score = score + values * weights[term]
+            result[name] = np.round(score, 2)
+        return pd.DataFrame(result, index=df.index)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "ScoreRegistry":
+        """
+        設定ファイルから読み込み（ファイルがなければ既定のスコアのみ）
+
+        Raises:
+            ScoreExpressionError: 式が不正な場合
+        """
+        path = path or default_scores_path()
+        registry = cls()
+        if not path.exists():
+            return registry
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        registry.register(default_definition(data.get("default", {}).get("weights")))
+        for entry in data.get("scores", []):
+            if entry["name"] == DEFAULT_SCORE:
+                raise ScoreExpressionError(
+                    f"'{DEFAULT_SCORE}' は既定のスコア名です（重みは default.weights で指定）"
+                )
+            registry.register(ScoreDefinition.from_dict(entry))
+        logger.info(f"スコア定義を読み込み: {', '.join(registry.names())}")
+        return registry
+
+
+# 既定のスコアのみのレジストリ（式のコンパイルはモジュール読み込み時の1回）
+BUILTIN_SCORES = ScoreRegistry()
@@ -24,6 +24,7 @@ from config import config, get_affiliate_url
 @dataclass
 class ProductData:
     """商品データ"""
+
     asin: str
     name: str
     category: str
@@ -64,10 +65,12 @@ class AmazonScraper:
 
     def __init__(self):
         self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": config.scraping.user_agent,
-            "Accept-Language": "ja-JP,ja;q=0.9,en-US;q=0.8,en;q=0.7",
-        })
+        self.session.headers.update(
+            {
+                "User-Agent": config.scraping.user_agent,
+                "Accept-Language": "ja-JP,ja;q=0.9,en-US;q=0.8,en;q=0.7",
+            }
+        )
         self.delay = config.scraping.request_delay
 
     def _request(self, url: str) -> Optional[BeautifulSoup]:
@@ -216,7 +219,7 @@ class AmazonScraper:
             name=name,
             category=category,
             current_rank=final_rank,
-            previous_rank=None,  # 履歴データから計算
+            previous_rank=None,  # 取り込み時に履歴から計算（ingest.RankChangeStage）
             rank_change=rank_change,
             rank_change_percent=self._calc_change_percent(rank_change, final_rank),
             price=price,
@@ -279,16 +282,61 @@ class AmazonScraper:
         """ランク変動率を計算"""
         if rank_change is None:
             return None
-        # 簡易計算（実際は前回ランクとの比較が必要）
+        # ページ掲載の変動率（前回ランクがある場合は取り込み時に置き換える）
         return float(rank_change)
 
 
 class DataSaver:
     """データ保存クラス"""
 
-    def __init__(self, output_dir: Optional[Path] = None):
+    def __init__(self, output_dir: Optional[Path] = None, storage_format: Optional[str] = None):
+        """
+        Args:
+            output_dir: CSVの保存先
+            storage_format: csv / parquet / feather（省略時は RAW_STORAGE_FORMAT）
+        """
         self.output_dir = output_dir or config.paths.raw_data_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.storage_format = storage_format or config.storage.raw_format
+
+    def save(self, products: list[ProductData]) -> Path:
+        """
+        設定された保存形式で保存
+
+        Returns:
+            CSVのパス、または列指向ストアのルート
+        """
+        if self.storage_format == "csv":
+            return self.save_to_csv(products)
+        return self.save_to_columnar(products)
+
+    def save_to_columnar(
+        self,
+        products: list[ProductData],
+        run_at: Optional[datetime] = None,
+        root: Optional[Path] = None,
+    ) -> Path:
+        """
+        商品データを日付・カテゴリ別の列指向ストアに保存
+
+        Args:
+            products: 商品データリスト
+            run_at: 収集時刻（省略時は現在時刻）
+            root: ストアのルート（省略時は data/columnar）
+
+        Returns:
+            ストアのルート
+        """
+        from storage import ColumnarStore
+
+        if not products:
+            logger.warning("保存するデータがありません")
+            return Path()
+
+        store = ColumnarStore(root=root, file_format=self.storage_format)
+        paths = store.write_products(products, run_at)
+        logger.info(f"データ保存完了: {store.root} ({len(products)}件, {len(paths)}パーティション)")
+        return Path(store.root)
 
     def save_to_csv(self, products: list[ProductData], filename: Optional[str] = None) -> Path:
         """
@@ -311,14 +359,25 @@ class DataSaver:
 
         filepath = self.output_dir / filename
 
+        # affiliate_url はASINから生成できるため保存しない
         fieldnames = [
-            "asin", "name", "category", "current_rank", "previous_rank",
-            "rank_change", "rank_change_percent", "price", "currency",
-            "review_count", "rating", "affiliate_url", "timestamp", "source"
+            "asin",
+            "name",
+            "category",
+            "current_rank",
+            "previous_rank",
+            "rank_change",
+            "rank_change_percent",
+            "price",
+            "currency",
+            "review_count",
+            "rating",
+            "timestamp",
+            "source",
         ]
 
         with open(filepath, "w", newline="", encoding="utf-8-sig") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
             writer.writeheader()
             for product in products:
                 writer.writerow(asdict(product))
@@ -0,0 +1,617 @@
+# -*- coding: utf-8 -*-
+"""
+商品名の全文検索モジュール
+
+商品名の文字2-gram・3-gramの転置索引で商品を検索する
+
+- 商品名は重複クラスタと同じ正規化（NFKC・小文字化、空白と記号を除去）をしてからn-gramに分ける
+  （分かち書きが不要なため日本語の商品名に向く）
+- n-gramは文字列ではなく64bitのハッシュ値で持つ。索引はハッシュ値のソート済み配列・
+  位置のオフセット・ASIN位置の配列（CSR形式）で、収集のたびに追加分（差分）だけを積む。
+  差分が大きくなったら保存時に本体へまとめ直す
+- 検索語の3-gram（2文字の語は2-gram）をすべて含むASINを、出現数の少ないn-gramから順に
+  二分探索で絞り込み、商品名に検索語が含まれることを確かめてから返す
+- 並び順は商品名に占める検索語の割合（短く一致度の高い商品名を上位）、同点はランク順
+"""
+
+import unicodedata
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import config
+from dedup import normalize_name, shingle_hashes
+
+# 検索結果の列
+SEARCH_COLUMNS = ["asin", "name", "category", "price", "rating", "current_rank", "score"]
+
+# 状態配列: 名前 → (dtype, 初期値)
+_SEARCH_ARRAYS = {
+    "category": (np.int32, -1),
+    "price": (np.float32, np.nan),
+    "rating": (np.float32, np.nan),
+    "current_rank": (np.int32, np.iinfo(np.int32).max),  # 不明は最大値（ランク順で最後）
+    "length": (np.int32, 0),  # 正規化した商品名の文字数
+}
+
+# 不明なランク
+_UNKNOWN_RANK = int(np.iinfo(np.int32).max)
+
+# 索引するn-gramの長さ
+_NGRAMS = (2, 3)
+
+# カテゴリの所属キー（位置 << _CATEGORY_BITS | カテゴリ番号）のカテゴリ番号のビット数
+_CATEGORY_BITS = 16
+
+# 差分が本体のこの割合を超えたら保存時にまとめ直す
+_COMPACT_RATIO = 0.25
+
+# 候補が転置リストのこの割合より十分少なければ二分探索で絞り込む
+_SEARCHSORTED_RATIO = 16
+
+# 商品名を確かめる候補の数（limit の倍数）
+_VERIFY_FACTOR = 4
+
+# 商品名・ASINを1つの文字列に連結して保存するときの区切り
+_SEPARATOR = "\0"
+
+
+def default_index_path() -> Path:
+    """検索索引ファイルの既定パス"""
+    return Path(config.paths.data_dir) / "search_index.npz"
+
+
+def split_query(query: str) -> list[str]:
+    """検索語を空白（全角を含む）で分け、それぞれを商品名と同じく正規化"""
+    terms = [normalize_name(term) for term in unicodedata.normalize("NFKC", query or "").split()]
+    return [term for term in terms if term]
+
+
+def name_grams(names: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    正規化済みの商品名ごとの文字2-gram・3-gramのハッシュ値
+
+    2文字に満たない商品名は全体を1つのn-gramとする
+
+    Returns:
+        (n-gramのハッシュ値（uint64）, 商品名の番号（int64）)
+    """
+    hashes, owners = [], []
+    for ngram in _NGRAMS:
+        gram_hashes, starts = shingle_hashes(names, ngram, normalized=True)
+        counts = np.diff(np.append(starts, len(gram_hashes)))
+        hashes.append(gram_hashes)
+        owners.append(np.repeat(np.arange(len(names)), counts))
+    return np.concatenate(hashes), np.concatenate(owners)
+
+
+def build_postings(
+    hashes: np.ndarray, positions: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (n-gram, ASIN位置) の組からCSR形式の転置索引を作成
+
+    ハッシュ値を連番に置き換え、(連番 << 32 | 位置) の1つのキーでソートする
+    （2列の lexsort より速い）。同じ組は1つにまとめる
+
+    Returns:
+        (ソート済みのハッシュ値, 各ハッシュ値の開始オフセット（末尾に総数）, ASIN位置（int32）)
+    """
+    if len(hashes) == 0:
+        return (
+            np.empty(0, dtype=np.uint64),
+            np.zeros(1, dtype=np.int64),
+            np.empty(0, dtype=np.int32),
+        )
+    keys, inverse = np.unique(hashes, return_inverse=True)
+    packed = np.sort((inverse.astype(np.int64) << 32) | positions.astype(np.int64))
+    packed = packed[np.diff(packed, prepend=-1) != 0]
+    offsets = np.searchsorted(packed >> 32, np.arange(len(keys) + 1))
+    return keys, offsets, (packed & 0xFFFFFFFF).astype(np.int32)
+
+
+def _contains(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """values の各要素が昇順配列 sorted_values に含まれるか（二分探索）"""
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    index = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    found: np.ndarray = sorted_values[index] == values
+    return found
+
+
+def query_grams(terms: list[str]) -> np.ndarray:
+    """
+    正規化済みの検索語を引くn-gramのハッシュ値
+
+    3文字以上の語は3-gram、2文字の語は2-gram。語を覆うのに足りる分だけ
+    （先頭から3文字おきと末尾）を使い、重なるn-gramの転置リストは引かない
+    """
+    hashes = []
+    for term in terms:
+        ngram = min(len(term), 3)
+        term_hashes = shingle_hashes([term], ngram, normalized=True)[0]
+        picks = np.unique(np.append(np.arange(0, len(term_hashes), ngram), len(term_hashes) - 1))
+        hashes.append(term_hashes[picks])
+    return np.unique(np.concatenate(hashes))
+
+
+def _merge(base: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    """本体と差分の転置リストを1つの昇順配列にまとめる"""
+    if len(delta) == 0:
+        return base
+    merged = np.sort(np.concatenate([base, delta]))
+    unique: np.ndarray = merged[np.diff(merged, prepend=-1) != 0]
+    return unique
+
+
+def _ranking_keys(scores: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """
+    並び順のキー（小さいほど上位）
+
+    (一致度の高い順, ランク順, 位置順) を1つのint64にまとめ、argpartition で上位を取り出せるようにする。
+    一致度は小数3桁、ランクは2^24未満に丸める
+    """
+    quantized = 1000 - np.round(scores * 1000).astype(np.int64)
+    ranks = np.minimum(ranks, (1 << 24) - 1).astype(np.int64)
+    return (quantized << 53) | (ranks << 29) | np.arange(len(scores), dtype=np.int64)
+
+
+def _join(values: list[str]) -> np.ndarray:
+    """文字列のリストを区切り文字で連結したUTF-8のバイト列に変換（保存用）"""
+    return np.frombuffer(_SEPARATOR.join(values).encode("utf-8"), dtype=np.uint8)
+
+
+def _split(data: np.ndarray, count: int) -> list[str]:
+    """_join の逆変換"""
+    return data.tobytes().decode("utf-8").split(_SEPARATOR) if count else []
+
+
+class ProductSearchIndex:
+    """
+    商品名の転置索引と絞り込み用の属性
+
+    ASIN → 配列位置を辞書で引き、カテゴリ・価格・評価・ランクは列ごとの配列に持つ
+    （カテゴリ列は最新のカテゴリ。複数カテゴリに掲載された商品の絞り込みには、
+    (位置, カテゴリ番号) の組のソート済み配列を使う）。
+    転置索引は本体（CSR形式）と差分（n-gramのハッシュ値とASIN位置の組）に分け、
+    更新では新しいASINと商品名の変わったASINのn-gramだけを差分に追加する。
+    商品名が変わったASINの古いn-gramは残るが、検索時に商品名を確かめて除く。
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Args:
+            capacity: 配列の初期容量
+        """
+        self.asins: list[str] = []
+        self.names: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.categories: list[str] = []
+        self.category_codes: dict[str, int] = {}
+        self.arrays = {
+            name: np.full(capacity, fill, dtype=dtype)
+            for name, (dtype, fill) in _SEARCH_ARRAYS.items()
+        }
+        self.memberships = np.empty(0, dtype=np.int64)
+        self.keys, self.offsets, self.postings = build_postings(
+            np.empty(0, dtype=np.uint64), np.empty(0)
+        )
+        self._delta_hashes: list[np.ndarray] = []
+        self._delta_positions: list[np.ndarray] = []
+        self._delta: Optional[tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.asins)
+
+    @property
+    def delta_size(self) -> int:
+        """差分のn-gram数"""
+        return sum(len(hashes) for hashes in self._delta_hashes)
+
+    def _reserve(self, size: int) -> None:
+        """容量が足りなければ倍に拡張"""
+        capacity = len(self.arrays["length"])
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name, (dtype, fill) in _SEARCH_ARRAYS.items():
+            grown = np.full(capacity, fill, dtype=dtype)
+            grown[: len(self.arrays[name])] = self.arrays[name]
+            self.arrays[name] = grown
+
+    def _category_code(self, category: str) -> int:
+        code = self.category_codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self.category_codes[category] = code
+        return code
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        収集1回分で索引と属性を更新
+
+        Args:
+            df: asin, name と任意の category, price, rating, current_rank を含むDataFrame
+
+        Returns:
+            索引に追加したASIN数（新しいASINと商品名の変わったASIN）
+        """
+        df = df.dropna(subset=["asin", "name"])
+        if df.empty:
+            return 0
+        # 同じASINが複数カテゴリに掲載されている場合、属性は最後の行、カテゴリはすべて残す
+        listings = df[["asin", "category"]] if "category" in df else None
+        df = df.drop_duplicates("asin", keep="last")
+
+        asins = df["asin"].astype(str).tolist()
+        names = df["name"].astype(str).tolist()
+        positions = np.empty(len(asins), dtype=np.int64)
+        changed = []
+        for i, (asin, name) in enumerate(zip(asins, names)):
+            position = self.positions.get(asin)
+            if position is None:
+                position = len(self.asins)
+                self.asins.append(asin)
+                self.names.append(name)
+                self.positions[asin] = position
+                changed.append(i)
+            elif self.names[position] != name:
+                self.names[position] = name
+                changed.append(i)
+            positions[i] = position
+        self._reserve(len(self.asins))
+
+        if listings is not None:
+            codes = [self._category_code(c) for c in df["category"].astype(str).tolist()]
+            self.arrays["category"][positions] = codes
+            listed = listings.dropna(subset=["category"]).astype(str)
+            keys = [
+                self.positions[asin] << _CATEGORY_BITS | self._category_code(category)
+                for asin, category in zip(listed["asin"].tolist(), listed["category"].tolist())
+            ]
+            self.memberships = np.union1d(self.memberships, np.array(keys, dtype=np.int64))
+        for name in ("price", "rating", "current_rank"):
+            if name in df:
+                values = pd.to_numeric(df[name], errors="coerce").to_numpy(
+                    dtype=np.float64, na_value=np.nan
+                )
+                known = ~np.isnan(values)
+                self.arrays[name][positions[known]] = values[known]
+
+        if changed:
+            texts = [normalize_name(names[i]) for i in changed]
+            hashes, owners = name_grams(texts)
+            self._delta_hashes.append(hashes)
+            self._delta_positions.append(positions[changed][owners].astype(np.int32))
+            self.arrays["length"][positions[changed]] = [len(text) for text in texts]
+            self._delta = None
+        return len(changed)
+
+    def _sorted_delta(self) -> tuple[np.ndarray, np.ndarray]:
+        """差分を (ハッシュ値, 位置) の順にソートした組（更新があるまで使い回す）"""
+        if self._delta is None:
+            if self._delta_hashes:
+                hashes = np.concatenate(self._delta_hashes)
+                positions = np.concatenate(self._delta_positions)
+                order = np.lexsort((positions, hashes))
+                self._delta = hashes[order], positions[order]
+            else:
+                self._delta = np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int32)
+        return self._delta
+
+    def _lookup(self, key: np.uint64) -> tuple[np.ndarray, np.ndarray]:
+        """n-gramを含むASIN位置（本体・差分それぞれ昇順）"""
+        base = self.postings[:0]
+        i = np.searchsorted(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            base = self.postings[self.offsets[i] : self.offsets[i + 1]]
+        delta_hashes, delta_positions = self._sorted_delta()
+        lower = np.searchsorted(delta_hashes, key, side="left")
+        upper = np.searchsorted(delta_hashes, key, side="right")
+        return base, delta_positions[lower:upper]
+
+    def compact(self) -> None:
+        """差分を本体にまとめ直す"""
+        if not self._delta_hashes:
+            return
+        counts = np.diff(self.offsets)
+        self.keys, self.offsets, self.postings = build_postings(
+            np.concatenate([np.repeat(self.keys, counts), *self._delta_hashes]),
+            np.concatenate([self.postings, *self._delta_positions]),
+        )
+        self._delta_hashes, self._delta_positions, self._delta = [], [], None
+
+    def _candidates(self, terms: list[str]) -> np.ndarray:
+        """
+        検索語のn-gramをすべて含むASIN位置（昇順）
+
+        出現数の少ないn-gramの転置リストから始め、候補より十分長いリストは二分探索、
+        そうでなければASIN数のブール配列に立てて絞り込む
+        """
+        lists = sorted(
+            (self._lookup(h) for h in query_grams(terms)),
+            key=lambda pair: len(pair[0]) + len(pair[1]),
+        )
+        candidates = _merge(*lists[0])
+        mask = None
+        for base, delta in lists[1:]:
+            if len(candidates) == 0:
+                break
+            if len(base) + len(delta) > _SEARCHSORTED_RATIO * len(candidates):
+                candidates = candidates[_contains(base, candidates) | _contains(delta, candidates)]
+                continue
+            if mask is None:
+                mask = np.zeros(len(self.asins), dtype=bool)
+            mask[base] = mask[delta] = True
+            candidates = candidates[mask[candidates]]
+            mask[base] = mask[delta] = False
+        return candidates
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """
+        商品名で検索
+
+        空白で区切った検索語をすべて含む商品を返す（2文字以上の語で索引を引き、1文字の語は商品名で確かめる。
+        1文字の語だけの場合は全商品の商品名を確かめる）
+
+        Args:
+            query: 検索語
+            category: カテゴリで絞り込み（そのカテゴリに掲載されたことのある商品）
+            min_price: 価格の下限
+            max_price: 価格の上限
+            min_rating: 評価の下限
+            limit: 最大件数
+
+        Returns:
+            SEARCH_COLUMNS をキーに持つ辞書のリスト（一致度の高い順）。
+            score は商品名（正規化後）に占める検索語の文字数の割合
+        """
+        terms = split_query(query)
+        if not terms or not self.asins:
+            return []
+
+        indexed = [term for term in terms if len(term) >= 2]
+        # 1文字の語だけの場合は索引を引けないため、全商品を候補にして商品名で確かめる
+        candidates = self._candidates(indexed) if indexed else np.arange(len(self.asins))
+        arrays = self.arrays
+        if category is not None:
+            code = self.category_codes.get(category)
+            if code is None:
+                return []
+            listed = (candidates.astype(np.int64) << _CATEGORY_BITS) | code
+            candidates = candidates[_contains(self.memberships, listed)]
+        if min_price is not None:
+            candidates = candidates[arrays["price"][candidates] >= min_price]
+        if max_price is not None:
+            candidates = candidates[arrays["price"][candidates] <= max_price]
+        if min_rating is not None:
+            candidates = candidates[arrays["rating"][candidates] >= min_rating]
+
+        lengths = np.maximum(arrays["length"][candidates], 1)
+        scores = np.minimum(sum(map(len, terms)) / lengths, 1.0)
+        keys = _ranking_keys(scores, arrays["current_rank"][candidates])
+
+        # 上位から商品名を確かめる（n-gramが離れて現れる商品・改名前のn-gramを除く）。
+        # 全候補をソートせず、まず上位 limit の数倍だけを取り出す
+        head = min(len(keys), _VERIFY_FACTOR * limit)
+        order = np.argpartition(keys, head - 1)[:head] if head < len(keys) else np.arange(len(keys))
+        order = order[np.argsort(keys[order])]
+        matched = self._verify(candidates, order, terms, limit)
+        if len(matched) < limit and head < len(keys):
+            rest = np.flatnonzero(keys > keys[order[-1]])
+            rest = rest[np.argsort(keys[rest])]
+            matched += self._verify(candidates, rest, terms, limit - len(matched))
+        return self._records(candidates[matched], scores[matched], category)
+
+    def _verify(
+        self, candidates: np.ndarray, order: np.ndarray, terms: list[str], limit: int
+    ) -> list[int]:
+        """order の順に商品名が全検索語を含む候補を最大 limit 件選ぶ（candidates 内の番号を返す）"""
+        matched = []
+        for i in order.tolist():
+            name = normalize_name(self.names[candidates[i]])
+            if all(term in name for term in terms):
+                matched.append(i)
+                if len(matched) >= limit:
+                    break
+        return matched
+
+    def _records(
+        self, positions: np.ndarray, scores: np.ndarray, category: Optional[str] = None
+    ) -> list[dict]:
+        """
+        検索結果の行（不明な値は None、価格・評価は小数第2位に丸める）
+
+        カテゴリで絞り込んだ場合は、最新のカテゴリではなく絞り込んだカテゴリを返す
+        """
+        records = []
+        for position, score in zip(positions.tolist(), scores.tolist()):
+            code = int(self.arrays["category"][position])
+            category_name = category
+            if category is None and code >= 0:
+                category_name = self.categories[code]
+            price = float(self.arrays["price"][position])
+            rating = float(self.arrays["rating"][position])
+            rank = int(self.arrays["current_rank"][position])
+            records.append(
+                {
+                    "asin": self.asins[position],
+                    "name": self.names[position],
+                    "category": category_name,
+                    "price": None if np.isnan(price) else round(price, 2),
+                    "rating": None if np.isnan(rating) else round(rating, 2),
+                    "current_rank": None if rank == _UNKNOWN_RANK else rank,
+                    "score": round(score, 3),
+                }
+            )
+        return records
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """
+        状態を .npz に書き出し（一時ファイル経由）
+
+        差分が本体の一定割合を超えていれば先にまとめ直す
+        """
+        if self.delta_size > _COMPACT_RATIO * len(self.postings):
+            self.compact()
+        path = path or default_index_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        size = len(self.asins)
+        delta_hashes, delta_positions = self._sorted_delta()
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                allow_pickle=False,
+                asins=_join(self.asins),
+                names=_join(self.names),
+                categories=np.array(self.categories, dtype=str),
+                keys=self.keys,
+                offsets=self.offsets,
+                postings=self.postings,
+                delta_hashes=delta_hashes,
+                delta_positions=delta_positions,
+                memberships=self.memberships,
+                **{name: values[:size] for name, values in self.arrays.items()},
+            )
+        tmp_path.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "ProductSearchIndex":
+        """状態を読み込み（ファイルがなければ空の状態）"""
+        path = path or default_index_path()
+        if not path.exists():
+            return cls()
+        with np.load(path) as data:
+            size = len(data["length"])
+            index = cls(capacity=max(size, 1024))
+            for name in _SEARCH_ARRAYS:
+                index.arrays[name][:size] = data[name]
+            index.asins = _split(data["asins"], size)
+            index.names = _split(data["names"], size)
+            index.categories = data["categories"].tolist()
+            index.keys, index.offsets, index.postings = (
+                data["keys"],
+                data["offsets"],
+                data["postings"],
+            )
+            if "memberships" in data.files:
+                index.memberships = data["memberships"]
+            else:
+                # カテゴリの所属を保存していない索引は最新のカテゴリから作る
+                known = np.flatnonzero(data["category"] >= 0)
+                codes = data["category"][known].astype(np.int64)
+                index.memberships = (known.astype(np.int64) << _CATEGORY_BITS) | codes
+            if len(data["delta_hashes"]):
+                index._delta_hashes = [data["delta_hashes"]]
+                index._delta_positions = [data["delta_positions"]]
+                index._delta = (data["delta_hashes"], data["delta_positions"])
+        index.positions = {asin: i for i, asin in enumerate(index.asins)}
+        index.category_codes = {category: i for i, category in enumerate(index.categories)}
+        return index
+
+    @classmethod
+    def from_history(cls, store) -> "ProductSearchIndex":
+        """
+        履歴ストアの全観測値から索引を再構築（初回のみ）
+
+        Args:
+            store: history.HistoryStore
+        """
+        index = cls()
+        rows = pd.DataFrame(store.iter_rows())
+        if not rows.empty:
+            index.update(rows)
+            index.compact()
+        return index
+
+    @classmethod
+    def open(cls, path: Optional[Path] = None) -> "ProductSearchIndex":
+        """
+        状態を開く
+
+        状態ファイルがなく履歴ストアがある場合は、履歴ストアから初期化する
+        """
+        from history import HistoryStore, default_db_path
+
+        path = path or default_index_path()
+        if not path.exists() and default_db_path().exists():
+            index = cls.from_history(HistoryStore())
+            logger.info(f"検索索引を履歴ストアから初期化: {len(index)}件")
+            return index
+        return cls.load(path)
+
+
+# 読み込み済みの索引: パス → ((更新時刻, サイズ), 索引)
+_loaded: dict[Path, tuple[tuple[int, int], ProductSearchIndex]] = {}
+
+
+def cached_index(path: Optional[Path] = None) -> ProductSearchIndex:
+    """
+    保存済みの索引（ファイルが更新されるまで読み込み済みのものを使い回す）
+
+    APIではリクエストごとに読み込まず、収集で索引ファイルが書き換わったときだけ読み直す
+    """
+    path = path or default_index_path()
+    if not path.exists():
+        return ProductSearchIndex()
+    stat = path.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    loaded = _loaded.get(path)
+    if loaded is None or loaded[0] != version:
+        loaded = (version, ProductSearchIndex.load(path))
+        _loaded[path] = loaded
+    return loaded[1]
+
+
+def search_products(
+    query: str,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    limit: int = 20,
+    path: Optional[Path] = None,
+) -> list[dict]:
+    """保存済みの索引で商品名を検索（引数は ProductSearchIndex.search と同じ）"""
+    return cached_index(path).search(query, category, min_price, max_price, min_rating, limit)
+
+
+def main():
+    """メイン実行（商品名の検索）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI 商品検索")
+    parser.add_argument("query", help="検索語（空白区切りでAND検索）")
+    parser.add_argument("--category", help="カテゴリで絞り込み")
+    parser.add_argument("--min-price", type=float, help="価格の下限")
+    parser.add_argument("--max-price", type=float, help="価格の上限")
+    parser.add_argument("--min-rating", type=float, help="評価の下限")
+    parser.add_argument("--limit", type=int, default=20, help="表示件数")
+    args = parser.parse_args()
+
+    results = search_products(
+        args.query, args.category, args.min_price, args.max_price, args.min_rating, args.limit
+    )
+    if not results:
+        logger.info("該当する商品はありません")
+        return
+    print(pd.DataFrame(results, columns=SEARCH_COLUMNS).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
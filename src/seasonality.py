@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""
+季節性モジュール
+
+トレンドスコアの曜日・時間帯ごとの平均をカテゴリ別・ASIN別に逐次集計し、
+「いつもその曜日・時間帯は高い（低い）」分を季節成分としてスコアから除く
+
+- キーごとに「曜日7 + 時間帯24」の枠の件数・合計・二乗和だけを保持する（履歴は読み直さない）
+- 集計は収集1回分をまとめて np.add.at で加算する（行ごとのPythonループなし）
+- 季節成分 = 枠の平均 - キー全体の平均。件数の少ない枠は prior 件分だけ0に寄せる
+- ASINの季節成分は、観測が少ないうちはカテゴリの季節成分に寄せる
+- 件数は max_count で頭打ちにするため、古い観測値の重みは徐々に下がる
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# 枠の並び（曜日0=月曜〜6=日曜、続いて0〜23時）
+WEEKDAYS = ["月", "火", "水", "木", "金", "土", "日"]
+N_WEEKDAYS = 7
+N_HOURS = 24
+N_SLOTS = N_WEEKDAYS + N_HOURS
+
+# 集計の単位
+LEVELS = ("category", "asin")
+
+
+def default_seasonality_path() -> Path:
+    """季節性プロファイルの状態ファイルの既定パス"""
+    return Path(config.paths.data_dir) / "seasonality.npz"
+
+
+def time_slots(timestamps: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    時刻から曜日・時間帯の枠番号を求める
+
+    時刻は収集ごとに同じ値のため、種類ごとに1回だけ解析する
+
+    Returns:
+        (曜日の枠 0〜6, 時間帯の枠 7〜30)。時刻が欠損の行は -1
+    """
+    codes, values = pd.factorize(timestamps)
+    parsed = pd.to_datetime(pd.Index(values).astype(str), format="ISO8601")
+    weekday = np.append(parsed.dayofweek.to_numpy(), -1)[codes]
+    hour = np.append(parsed.hour.to_numpy() + N_WEEKDAYS, -1)[codes]
+    return weekday, hour
+
+
+class ProfileTable:
+    """
+    キーごとの枠別の件数・合計・二乗和
+
+    キー → 行位置を辞書で引き、値は (容量 × N_SLOTS) の配列に持つ
+    """
+
+    def __init__(self, max_count: float, capacity: int = 1024):
+        """
+        Args:
+            max_count: キーあたりの件数の上限（おおよそ直近何件分を重視するか）
+            capacity: 配列の初期容量
+        """
+        self.max_count = max_count
+        self.keys: list[str] = []
+        self.positions: dict[str, int] = {}
+        self._index: Optional[pd.Index] = None
+        self.count = np.zeros((capacity, N_SLOTS))
+        self.total = np.zeros((capacity, N_SLOTS))
+        self.squares = np.zeros((capacity, N_SLOTS))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self.count)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("count", "total", "squares"):
+            grown = np.zeros((capacity, N_SLOTS))
+            grown[: len(self.keys)] = getattr(self, name)[: len(self.keys)]
+            setattr(self, name, grown)
+
+    def _position(self, key: str) -> int:
+        position = self.positions.get(key)
+        if position is None:
+            position = len(self.keys)
+            self._reserve(position + 1)
+            self.keys.append(key)
+            self.positions[key] = position
+        return position
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """キーの行位置（未登録は -1、キーの索引はキーが増えるまで使い回す）"""
+        if self._index is None or len(self._index) != len(self.keys):
+            self._index = pd.Index(self.keys, dtype=object)
+        return np.asarray(self._index.get_indexer(keys))
+
+    def add(
+        self, keys: np.ndarray, weekday: np.ndarray, hour: np.ndarray, values: np.ndarray
+    ) -> None:
+        """
+        観測値を曜日・時間帯の枠に加算
+
+        Args:
+            keys: 行ごとのキー
+            weekday, hour: time_slots の枠番号
+            values: 行ごとの値
+        """
+        codes, unique = pd.factorize(keys)
+        positions = np.fromiter(
+            (self._position(k) for k in unique), dtype=np.int64, count=len(unique)
+        )
+        rows = positions[codes]
+        for slots in (weekday, hour):
+            np.add.at(self.count, (rows, slots), 1.0)
+            np.add.at(self.total, (rows, slots), values)
+            np.add.at(self.squares, (rows, slots), values**2)
+
+        # 件数の上限を超えたキーは平均・分散を保ったまま件数を縮める
+        n = self.count[positions, :N_WEEKDAYS].sum(axis=1)
+        scale = np.minimum(1.0, self.max_count / np.maximum(n, 1.0))[:, None]
+        for name in ("count", "total", "squares"):
+            getattr(self, name)[positions] *= scale
+
+    def deviations(self, positions: np.ndarray, slots: np.ndarray, prior: float) -> np.ndarray:
+        """
+        指定した枠の季節成分（枠の平均 - キー全体の平均、件数で縮小）
+
+        Args:
+            positions: 行位置（-1 の行は0）
+            slots: 行ごとの枠番号（-1 の行は0）
+            prior: 縮小の強さ（件数がこの値のとき半分にする）
+
+        Returns:
+            len(positions) の配列
+        """
+        known = (positions >= 0) & (slots >= 0)
+        p, slot = positions[known], slots[known]
+        count, total = self.count[p, slot], self.total[p, slot]
+        result = np.zeros(len(positions))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.total[p, :N_WEEKDAYS].sum(axis=1) / self.count[p, :N_WEEKDAYS].sum(axis=1)
+            slot_mean = np.where(count > 0, total / count, mean)
+            result[known] = np.nan_to_num((slot_mean - mean) * count / (count + prior))
+        return result
+
+    def strength(self) -> pd.DataFrame:
+        """
+        キーごとの曜日・時間帯による説明率（相関比 η²、0〜1）
+
+        Returns:
+            key, observations, weekday_strength, hour_strength, peak_weekday の列を持つDataFrame
+        """
+        size = len(self.keys)
+        count, total, squares = self.count[:size], self.total[:size], self.squares[:size]
+        result = {"key": self.keys, "observations": count[:, :N_WEEKDAYS].sum(axis=1).round(1)}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for name, part in (
+                ("weekday", slice(0, N_WEEKDAYS)),
+                ("hour", slice(N_WEEKDAYS, N_SLOTS)),
+            ):
+                n, s, q = count[:, part], total[:, part], squares[:, part]
+                mean = s.sum(axis=1) / n.sum(axis=1)
+                between = (np.where(n > 0, s**2 / n, 0.0)).sum(axis=1) - n.sum(axis=1) * mean**2
+                within_total = q.sum(axis=1) - n.sum(axis=1) * mean**2
+                result[f"{name}_strength"] = np.nan_to_num(
+                    np.clip(between / within_total, 0, 1)
+                ).round(4)
+            slot_mean = np.where(
+                count[:, :N_WEEKDAYS] > 0, total[:, :N_WEEKDAYS] / count[:, :N_WEEKDAYS], -np.inf
+            )
+        result["peak_weekday"] = [WEEKDAYS[i] for i in slot_mean.argmax(axis=1)] if size else []
+        return pd.DataFrame(result)
+
+    def state(self, prefix: str) -> dict:
+        """npz保存用の配列"""
+        size = len(self.keys)
+        return {
+            f"{prefix}_keys": np.array(self.keys, dtype=str),
+            f"{prefix}_count": self.count[:size],
+            f"{prefix}_total": self.total[:size],
+            f"{prefix}_squares": self.squares[:size],
+        }
+
+    @classmethod
+    def from_state(cls, data, prefix: str, max_count: float) -> "ProfileTable":
+        keys = data[f"{prefix}_keys"].tolist()
+        table = cls(max_count, capacity=max(len(keys), 1024))
+        for name in ("count", "total", "squares"):
+            getattr(table, name)[: len(keys)] = data[f"{prefix}_{name}"]
+        table.keys = keys
+        table.positions = {key: i for i, key in enumerate(keys)}
+        return table
+
+
+class SeasonalProfiles:
+    """
+    カテゴリ別・ASIN別の曜日・時間帯プロファイル
+
+    季節成分は「曜日の成分 + 時間帯の成分」。ASINの成分は
+    観測件数に応じてカテゴリの成分から ASIN 自身の成分へ寄せる。
+    """
+
+    def __init__(
+        self, prior: float = 5.0, category_max_count: float = 5000, asin_max_count: float = 100
+    ):
+        """
+        Args:
+            prior: 枠の平均を縮小する強さ（件数の少ない枠・ASINほど0・カテゴリに寄せる）
+            category_max_count: カテゴリあたりの件数の上限
+            asin_max_count: ASINあたりの件数の上限
+        """
+        self.prior = prior
+        self.category_max_count = category_max_count
+        self.asin_max_count = asin_max_count
+        self.tables = {
+            "category": ProfileTable(category_max_count),
+            "asin": ProfileTable(asin_max_count),
+        }
+
+    def __len__(self) -> int:
+        return len(self.tables["asin"])
+
+    @staticmethod
+    def _keys(df: pd.DataFrame, level: str) -> np.ndarray:
+        return np.asarray(df[level].astype(object).where(df[level].notna(), "").astype(str))
+
+    def update(self, df: pd.DataFrame, scores) -> int:
+        """
+        収集1回分のスコアでプロファイルを更新
+
+        Args:
+            df: asin, category, timestamp を含むDataFrame
+            scores: 行ごとのトレンドスコア（季節成分を除く前）
+
+        Returns:
+            加算した行数
+
+        複数のカテゴリに載ったASINは、ASIN別には収集1回につき1件（スコアの平均）として加算する
+        """
+        values = np.asarray(scores, dtype=float)
+        weekday, hour = time_slots(df["timestamp"])
+        valid = (weekday >= 0) & ~np.isnan(values)
+        if not valid.any():
+            return 0
+        self.tables["category"].add(
+            self._keys(df, "category")[valid], weekday[valid], hour[valid], values[valid]
+        )
+
+        rows = pd.DataFrame(
+            {
+                "timestamp": np.asarray(df["timestamp"])[valid],
+                "asin": self._keys(df, "asin")[valid],
+                "weekday": weekday[valid],
+                "hour": hour[valid],
+                "value": values[valid],
+            }
+        )
+        if rows.duplicated(["timestamp", "asin"]).any():
+            rows = rows.groupby(["timestamp", "asin"], sort=False, as_index=False).agg(
+                weekday=("weekday", "first"), hour=("hour", "first"), value=("value", "mean")
+            )
+        self.tables["asin"].add(
+            rows["asin"].to_numpy(),
+            rows["weekday"].to_numpy(),
+            rows["hour"].to_numpy(),
+            rows["value"].to_numpy(dtype=float),
+        )
+        return int(valid.sum())
+
+    def offsets(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        行ごとの季節成分（その行の時刻の曜日・時間帯の成分の和）
+
+        Args:
+            df: asin, category, timestamp を含むDataFrame
+
+        Returns:
+            len(df) の配列（プロファイルのないキー・時刻のない行は0）
+        """
+        if df.empty:
+            return np.zeros(0)
+        weekday, hour = time_slots(df["timestamp"])
+        category, asin = self.tables["category"], self.tables["asin"]
+        category_positions = category.lookup(self._keys(df, "category"))
+        asin_positions = asin.lookup(self._keys(df, "asin"))
+
+        # ASINの件数が prior のとき、ASINとカテゴリの成分を半々にする
+        known = asin_positions >= 0
+        n = np.zeros(len(df))
+        n[known] = asin.count[asin_positions[known], :N_WEEKDAYS].sum(axis=1)
+        weight = n / (n + self.prior)
+
+        result = np.zeros(len(df))
+        for slots in (weekday, hour):
+            result += weight * asin.deviations(asin_positions, slots, self.prior)
+            result += (1 - weight) * category.deviations(category_positions, slots, self.prior)
+        return result
+
+    def deseasonalize(self, df: pd.DataFrame, scores: pd.Series) -> pd.Series:
+        """
+        スコアから季節成分を除く
+
+        Returns:
+            scoresと同じインデックスのスコア（小数第2位に丸める）
+        """
+        return (scores - self.offsets(df)).round(2)
+
+    def strength(self, level: str = "category") -> pd.DataFrame:
+        """
+        キーごとの曜日・時間帯の季節性の強さ（ProfileTable.strength、曜日の強い順）
+
+        Args:
+            level: "category" または "asin"
+        """
+        return (
+            self.tables[level]
+            .strength()
+            .sort_values("weekday_strength", ascending=False, kind="stable")
+            .reset_index(drop=True)
+        )
+
+    def profile(self, key: str, level: str = "category") -> pd.DataFrame:
+        """
+        キーの枠ごとの季節成分と件数
+
+        Returns:
+            slot（曜日名・"N時"）, offset, count の列を持つDataFrame（N_SLOTS行）
+        """
+        table = self.tables[level]
+        position = table.positions.get(key, -1)
+        count = table.count[position] if position >= 0 else np.zeros(N_SLOTS)
+        offset = table.deviations(np.full(N_SLOTS, position), np.arange(N_SLOTS), self.prior)
+        return pd.DataFrame(
+            {
+                "slot": WEEKDAYS + [f"{h}時" for h in range(N_HOURS)],
+                "offset": offset.round(2),
+                "count": count.round(1),
+            }
+        )
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """状態を .npz に書き出し（一時ファイル経由）"""
+        path = path or default_seasonality_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                settings=np.array([self.prior, self.category_max_count, self.asin_max_count]),
+                **{k: v for level in LEVELS for k, v in self.tables[level].state(level).items()},
+            )
+        tmp_path.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "SeasonalProfiles":
+        """状態を読み込み（ファイルがなければ空の状態）"""
+        path = path or default_seasonality_path()
+        if not path.exists():
+            return cls()
+        with np.load(path) as data:
+            prior, category_max_count, asin_max_count = data["settings"].tolist()
+            profiles = cls(prior, category_max_count, asin_max_count)
+            for level in LEVELS:
+                profiles.tables[level] = ProfileTable.from_state(
+                    data, level, getattr(profiles, f"{level}_max_count")
+                )
+        return profiles
+
+    @classmethod
+    def from_history(cls, store, scoring=None) -> "SeasonalProfiles":
+        """
+        履歴ストアの全観測値から状態を再構築（初回のみ）
+
+        分析時と同じスコアで集計するため、モメンタム特徴量も収集順に積み上げながら
+        各回の時点の値を使う
+
+        Args:
+            store: history.HistoryStore
+            scoring: scoring.ScoreRegistry（省略時は既定のスコアのみ）
+        """
+        from analyzer import MomentumState
+        from scoring import BUILTIN_SCORES, DEFAULT_SCORE
+
+        scoring = scoring or BUILTIN_SCORES
+        profiles = cls()
+        rows = pd.DataFrame(store.iter_rows())
+        if rows.empty:
+            return profiles
+        momentum = MomentumState()
+        for _, run in rows.groupby("timestamp", sort=True):
+            momentum.update(run)
+            scored = momentum.add_features(run.copy())
+            profiles.update(run, scoring.compute(scored, [DEFAULT_SCORE])[DEFAULT_SCORE])
+        return profiles
+
+    @classmethod
+    def open(cls, path: Optional[Path] = None, scoring=None) -> "SeasonalProfiles":
+        """
+        状態を開く
+
+        状態ファイルがなく履歴ストアがある場合は、履歴ストアから初期化する
+        """
+        from history import HistoryStore, default_db_path
+
+        path = path or default_seasonality_path()
+        if not path.exists() and default_db_path().exists():
+            profiles = cls.from_history(HistoryStore(), scoring)
+            logger.info(f"季節性プロファイルを履歴ストアから初期化: {len(profiles)}件")
+            return profiles
+        return cls.load(path)
+
+
+def main():
+    """メイン実行（季節性の強いカテゴリ・ASINの表示）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI 季節性プロファイル")
+    parser.add_argument("--level", choices=LEVELS, default="category", help="集計の単位")
+    parser.add_argument("--top", type=int, default=10, help="表示件数")
+    parser.add_argument("--profile", help="枠ごとの季節成分を表示するキー（カテゴリ名・ASIN）")
+    args = parser.parse_args()
+
+    profiles = SeasonalProfiles.open()
+    if args.profile:
+        print(profiles.profile(args.profile, args.level).to_string(index=False))
+        return
+    print(profiles.strength(args.level).head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
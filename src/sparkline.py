@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+スパークライン生成モジュール
+
+ランク推移をインラインSVGとして一括生成
+全商品の座標計算をNumPyでまとめて行い、商品ごとの描画ライブラリ呼び出しを避ける
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# SVG内部座標系（viewBox）の解像度
+VIEWBOX_WIDTH = 1000
+VIEWBOX_HEIGHT = 100
+
+COLOR_UP = "#22c55e"  # ランク上昇（数値が小さくなった）
+COLOR_DOWN = "#ef4444"  # ランク下降
+
+
+def build_rank_matrix(history: pd.DataFrame, asins: list[str], max_points: int = 30) -> np.ndarray:
+    """
+    履歴データからASIN × 時刻のランク行列を構築
+
+    Args:
+        history: 履歴データ（asin, timestamp, current_rank列）
+        asins: 行の並び順となるASINリスト
+        max_points: 直近何時点まで使うか
+
+    Returns:
+        shape (len(asins), T) のfloat配列（欠損はNaN）
+    """
+    if history is None or history.empty or not asins:
+        return np.full((len(asins), 0), np.nan)
+
+    pivot = history.pivot_table(
+        index="asin", columns="timestamp", values="current_rank", aggfunc="min"
+    )
+    pivot = pivot.reindex(index=asins, columns=sorted(pivot.columns)[-max_points:])
+    return np.asarray(pivot, dtype=float)
+
+
+def render_sparklines(matrix: np.ndarray, width: int = 100, height: int = 24) -> list[str]:
+    """
+    ランク行列から全行分のSVGスパークラインを生成
+
+    ランク1が上端になるよう描画する。有効な点が2点未満の行は空文字列。
+
+    Args:
+        matrix: shape (N, T) のランク配列（NaNは欠損）
+        width: 表示幅（px）
+        height: 表示高さ（px）
+
+    Returns:
+        SVG文字列のリスト（行順）
+    """
+    n, t = matrix.shape
+    if n == 0:
+        return []
+    if t < 2:
+        return [""] * n
+
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=1)
+
+    # 行ごとの最小・最大（欠損を無視）
+    lo = np.where(valid, matrix, np.inf).min(axis=1)
+    hi = np.where(valid, matrix, -np.inf).max(axis=1)
+    span = np.where(hi > lo, hi - lo, 1.0)
+
+    # 座標を一括計算（整数座標でviewBoxに収める）
+    pad = 5
+    xs = np.linspace(0, VIEWBOX_WIDTH, t).round().astype(np.int64)
+    ys = (matrix - lo[:, None]) / span[:, None] * (VIEWBOX_HEIGHT - 2 * pad) + pad
+    ys = np.where(valid, ys, 0).round().astype(np.int64)
+
+    # 欠損の直後はパスを切る（M）、それ以外は線を引く（L）
+    prev_valid = np.concatenate([np.zeros((n, 1), dtype=bool), valid[:, :-1]], axis=1)
+
+    # トークン文字列は (コマンド, 列, y) の組み合わせで有限個なので事前生成して添字参照する
+    table = np.array(
+        [f"{cmd}{x},{y}" for cmd in "ML" for x in xs for y in range(VIEWBOX_HEIGHT + 1)],
+        dtype=object,
+    )
+    columns = prev_valid.astype(np.int64) * t + np.arange(t)[None, :]
+    token_ids = columns * (VIEWBOX_HEIGHT + 1) + ys
+
+    # 最初と最後の有効値でトレンド方向を判定
+    first_idx = valid.argmax(axis=1)
+    last_idx = t - 1 - valid[:, ::-1].argmax(axis=1)
+    rows = np.arange(n)
+    improved = matrix[rows, last_idx] <= matrix[rows, first_idx]
+    colors = np.where(improved, COLOR_UP, COLOR_DOWN)
+
+    head = (
+        f'<svg class="sparkline" width="{width}" height="{height}" '
+        f'viewBox="0 0 {VIEWBOX_WIDTH} {VIEWBOX_HEIGHT}" preserveAspectRatio="none" '
+        f'xmlns="http://www.w3.org/2000/svg"><path fill="none" stroke-width="2" '
+        f'vector-effect="non-scaling-stroke" stroke="'
+    )
+    svgs = []
+    for i in range(n):
+        if counts[i] < 2:
+            svgs.append("")
+            continue
+        path = " ".join(table[token_ids[i][valid[i]]])
+        svgs.append(f'{head}{colors[i]}" d="{path}"/></svg>')
+    return svgs
+
+
+def sparklines_for_asins(
+    history: Optional[pd.DataFrame], asins: list[str], max_points: int = 30, **kwargs
+) -> dict[str, str]:
+    """
+    指定ASINのスパークラインを生成
+
+    Args:
+        history: 履歴データ
+        asins: 対象ASIN
+        max_points: 直近何時点まで使うか
+
+    Returns:
+        ASIN -> SVG文字列（描画できないASINは含まない）
+    """
+    unique = list(dict.fromkeys(asins))
+    matrix = build_rank_matrix(history, unique, max_points=max_points)
+    svgs = render_sparklines(matrix, **kwargs)
+    return {asin: svg for asin, svg in zip(unique, svgs) if svg}
@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+"""
+列指向ストレージモジュール
+
+生データを日付・カテゴリでパーティション分割した Parquet / Feather として保存
+読み込み時はパーティションと列を絞り込み、必要なファイル・列だけを読む
+
+ディレクトリ構成（Hive形式）:
+    data/columnar/date=2026-01-06/category=<URLエンコード>/part-20260106_100000.parquet
+"""
+
+import os
+import re
+from dataclasses import asdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+from urllib.parse import quote
+
+import pandas as pd
+from loguru import logger
+
+from config import config
+
+# pyarrowが利用可能かチェック
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# 生データの列（CSVと同順、affiliate_url はASINから生成するため保存しない）
+RAW_COLUMNS = [
+    "asin",
+    "name",
+    "category",
+    "current_rank",
+    "previous_rank",
+    "rank_change",
+    "rank_change_percent",
+    "price",
+    "currency",
+    "review_count",
+    "rating",
+    "timestamp",
+    "source",
+]
+
+# フォーマット → 拡張子
+STORAGE_FORMATS = {"parquet": ".parquet", "feather": ".feather"}
+
+# part-YYYYMMDD_HHMMSS.<ext>（収集1回 = 1 run）
+PART_FILE_PATTERN = re.compile(r"part-(\d{8}_\d{6})\.(parquet|feather)$")
+
+if PYARROW_AVAILABLE:
+    # ファイルに保存する列（category はパーティションキーとしてパスに持つ）
+    RAW_SCHEMA = pa.schema(
+        [
+            ("asin", pa.string()),
+            ("name", pa.string()),
+            ("current_rank", pa.int32()),
+            ("previous_rank", pa.int32()),
+            ("rank_change", pa.int32()),
+            ("rank_change_percent", pa.float64()),
+            ("price", pa.float32()),
+            ("currency", pa.dictionary(pa.int8(), pa.string())),
+            ("review_count", pa.int32()),
+            ("rating", pa.float32()),
+            ("timestamp", pa.timestamp("us")),
+            ("source", pa.dictionary(pa.int8(), pa.string())),
+        ]
+    )
+
+    PARTITION_SCHEMA = pa.schema([("date", pa.string()), ("category", pa.string())])
+
+# pandasで読み込む際にカテゴリ型にする列
+CATEGORICAL_COLUMNS = ("category", "currency", "source")
+
+
+def _require_pyarrow() -> None:
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrowがインストールされていません。pip install pyarrow")
+
+
+def _run_id(run_at: datetime) -> str:
+    return run_at.strftime("%Y%m%d_%H%M%S")
+
+
+class ColumnarStore:
+    """
+    パーティション分割された列指向ストア
+
+    1回の収集（run）をカテゴリごとに1ファイルとして書き込む。
+    既存ファイルは変更しない（追記のみ）。
+    """
+
+    def __init__(self, root: Optional[Path] = None, file_format: str = "parquet"):
+        """
+        Args:
+            root: 保存先ディレクトリ（省略時は data/columnar）
+            file_format: parquet または feather
+        """
+        _require_pyarrow()
+        if file_format not in STORAGE_FORMATS:
+            raise ValueError(f"未対応のフォーマット: {file_format}")
+        self.root = root or config.paths.columnar_data_dir
+        self.file_format = file_format
+        self.suffix = STORAGE_FORMATS[file_format]
+
+    # === 書き込み ===
+
+    def write_frame(self, df: pd.DataFrame, run_at: datetime) -> list[Path]:
+        """
+        DataFrameを1 run分として書き込み
+
+        Args:
+            df: 生データ（RAW_COLUMNSを含む）
+            run_at: 収集時刻（パーティションの日付とファイル名に使用）
+
+        Returns:
+            書き込んだファイルのリスト
+        """
+        df = df.reindex(columns=RAW_COLUMNS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+
+        paths = []
+        for category, group in df.groupby("category", sort=True, dropna=False):
+            table = pa.Table.from_pandas(
+                group.drop(columns="category"), schema=RAW_SCHEMA, preserve_index=False
+            )
+            paths.append(self._write_partition(table, run_at, category))
+        return paths
+
+    def write_products(self, products: list, run_at: Optional[datetime] = None) -> list[Path]:
+        """ProductDataのリストを1 run分として書き込み"""
+        run_at = run_at or datetime.now()
+        df = pd.DataFrame([asdict(p) for p in products], columns=RAW_COLUMNS)
+        return self.write_frame(df, run_at)
+
+    def _partition_dir(self, day: date, category) -> Path:
+        category = "" if pd.isna(category) else str(category)
+        return self.root / f"date={day.isoformat()}" / f"category={quote(category, safe='')}"
+
+    def _write_partition(self, table: "pa.Table", run_at: datetime, category) -> Path:
+        directory = self._partition_dir(run_at.date(), category)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"part-{_run_id(run_at)}{self.suffix}"
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            if self.file_format == "parquet":
+                pq.write_table(table, tmp_path, compression="zstd")
+            else:
+                feather.write_feather(table, tmp_path, compression="lz4")
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return path
+
+    # === 読み込み ===
+
+    def list_runs(self) -> list[str]:
+        """保存済みのrun ID（YYYYMMDD_HHMMSS）を古い順に列挙"""
+        runs = set()
+        for path in self.root.glob(f"date=*/category=*/part-*{self.suffix}"):
+            match = PART_FILE_PATTERN.search(path.name)
+            if match:
+                runs.add(match.group(1))
+        return sorted(runs)
+
+    def _dataset(self, files: Optional[list[Path]] = None) -> "ds.Dataset":
+        partitioning = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+        fmt = "parquet" if self.file_format == "parquet" else "feather"
+        if files is not None:
+            return ds.dataset(
+                [str(f) for f in files],
+                format=fmt,
+                partitioning=partitioning,
+                partition_base_dir=str(self.root),
+            )
+        return ds.dataset(str(self.root), format=fmt, partitioning=partitioning)
+
+    def _to_pandas(self, table: "pa.Table", columns: Optional[Sequence[str]]) -> pd.DataFrame:
+        names = list(columns) if columns else RAW_COLUMNS
+        df = table.to_pandas()
+        df = df[[c for c in names if c in df.columns]]
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+        return df
+
+    def read(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        categories: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        条件に合うデータを読み込み
+
+        日付・カテゴリはパーティションで絞り込むため、対象外のファイルは開かない。
+        columnsを指定すると、それ以外の列はディスクから読まない。
+
+        Args:
+            columns: 読み込む列（省略時はRAW_COLUMNS）
+            date_from: 開始日（含む）
+            date_to: 終了日（含む）
+            categories: カテゴリフィルタ
+
+        Returns:
+            DataFrame（category / currency / source はカテゴリ型）
+        """
+        if not self.root.exists():
+            return pd.DataFrame(columns=list(columns or RAW_COLUMNS))
+
+        conditions = []
+        if date_from:
+            conditions.append(pc.field("date") >= date_from.isoformat())
+        if date_to:
+            conditions.append(pc.field("date") <= date_to.isoformat())
+        if categories:
+            conditions.append(pc.field("category").isin(list(categories)))
+
+        row_filter = None
+        for condition in conditions:
+            row_filter = condition if row_filter is None else row_filter & condition
+
+        table = self._dataset().to_table(
+            columns=list(columns) if columns else None, filter=row_filter
+        )
+        return self._to_pandas(table, columns)
+
+    def read_runs(
+        self, run_ids: Sequence[str], columns: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """
+        指定したrunのデータを読み込み
+
+        ファイル名（run ID）で対象を決めるため、他のrunのファイルは開かない
+        """
+        return self.read_files(self._run_files(run_ids), columns)
+
+    def read_files(
+        self, files: Sequence[Path], columns: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """
+        ストア内のファイルを指定して読み込み（収集時刻順）
+
+        Args:
+            files: パーティションファイル（files_by_day などで取得）
+            columns: 読み込む列（省略時はRAW_COLUMNS）
+        """
+        if not files:
+            return pd.DataFrame(columns=list(columns or RAW_COLUMNS))
+
+        table = self._dataset(list(files)).to_table(columns=list(columns) if columns else None)
+        df = self._to_pandas(table, columns)
+        if "timestamp" in df.columns:
+            df = df.sort_values("timestamp", kind="stable", ignore_index=True)
+        return df
+
+    def iter_runs(
+        self,
+        run_ids: Sequence[str],
+        columns: Optional[Sequence[str]] = None,
+        batch_rows: int = 100_000,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        指定したrunのデータを1回分ずつ、最大batch_rows行のDataFrameに分けて読み込み
+
+        runごとに収集時刻で並べ替えてから分割するため、run同士の時刻が重ならなければ
+        （収集1回 = 1 run の通常の運用）、行の順序は read_runs で run_ids をまとめて読んだ場合と同じ。
+        同時にメモリに置くのは1 run分のみ
+
+        Args:
+            run_ids: 古い順のrun ID
+            columns: 読み込む列（省略時はRAW_COLUMNS）
+            batch_rows: 1回に返す最大行数
+        """
+        names = list(columns) if columns else None
+        for run_id in run_ids:
+            files = self._run_files([run_id])
+            if not files:
+                continue
+            table = self._dataset(files).to_table(columns=names)
+            if "timestamp" in table.column_names:
+                # 安定ソート（同時刻の行はファイル順のまま）
+                table = table.take(pc.sort_indices(table, sort_keys=[("timestamp", "ascending")]))
+            for offset in range(0, table.num_rows, batch_rows):
+                yield self._to_pandas(table.slice(offset, batch_rows), columns)
+
+    def files_by_day(self) -> dict[str, list[Path]]:
+        """
+        パーティションファイルを収集日ごとにグループ化
+
+        Returns:
+            YYYYMMDD -> ファイルパスリスト（run ID順、同じrunはパス順）
+        """
+        days: dict[str, list[Path]] = {}
+        files = []
+        for path in self.root.glob(f"date=*/category=*/part-*{self.suffix}"):
+            match = PART_FILE_PATTERN.search(path.name)
+            if match:
+                files.append((match.group(1), path))
+        for run_id, path in sorted(files):
+            days.setdefault(run_id[:8], []).append(path)
+        return days
+
+    def _run_files(self, run_ids: Sequence[str]) -> list[Path]:
+        """指定したrunのファイル（パス順）"""
+        wanted = set(run_ids)
+        return sorted(
+            path
+            for path in self.root.glob(f"date=*/category=*/part-*{self.suffix}")
+            if (match := PART_FILE_PATTERN.search(path.name)) and match.group(1) in wanted
+        )
+
+    def read_latest_runs(
+        self, count: int = 1, columns: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """直近count回分のrunを読み込み"""
+        runs = self.list_runs()
+        return (
+            self.read_runs(runs[-count:], columns)
+            if runs
+            else pd.DataFrame(columns=list(columns or RAW_COLUMNS))
+        )
+
+
+def open_part_store(path: Path) -> ColumnarStore:
+    """パーティションファイルのパス（root/date=*/category=*/part-*）から所属するストアを開く"""
+    file_format = next(name for name, suffix in STORAGE_FORMATS.items() if suffix == path.suffix)
+    return ColumnarStore(root=path.parents[2], file_format=file_format)
+
+
+def convert_csv_dir(
+    store: ColumnarStore, data_dir: Optional[Path] = None, force: bool = False
+) -> int:
+    """
+    既存の生データCSVを列指向ストアへ変換
+
+    ファイル名（products_YYYYMMDD_HHMMSS.csv）をrun IDとして引き継ぐため、
+    変換済みのrunはスキップする
+
+    Args:
+        store: 変換先ストア
+        data_dir: 生データディレクトリ
+        force: 変換済みのrunも再変換
+
+    Returns:
+        変換したファイル数
+    """
+    from exporter import list_raw_files
+
+    data_dir = data_dir or config.paths.raw_data_dir
+    existing = set() if force else set(store.list_runs())
+
+    converted = 0
+    for csv_path in list_raw_files(data_dir):
+        run_id = csv_path.stem[len("products_") :]
+        if run_id in existing:
+            continue
+        df = pd.read_csv(csv_path, encoding="utf-8-sig")
+        store.write_frame(df, datetime.strptime(run_id, "%Y%m%d_%H%M%S"))
+        converted += 1
+
+    logger.info(f"列指向ストアへ変換: {converted}ファイル → {store.root}")
+    return converted
+
+
+def main():
+    """メイン実行（既存CSVの変換）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI 生データの列指向変換")
+    parser.add_argument(
+        "--format", choices=list(STORAGE_FORMATS), default="parquet", help="保存フォーマット"
+    )
+    parser.add_argument("--force", action="store_true", help="変換済みのファイルも再変換")
+    args = parser.parse_args()
+
+    store = ColumnarStore(file_format=args.format)
+    converted = convert_csv_dir(store, force=args.force)
+    print(f"変換: {converted}ファイル → {store.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+ウォッチリストモジュール
+
+ユーザーごとに登録したASIN・キーワード・カテゴリを収集のたびに全ユーザー分まとめて照合し、
+一致した商品を通知キュー（data/watch_alerts.csv）に積む（リアルタイムアラート、PRO以上）
+
+- キーワードは全ユーザー分を1つのAho-Corasickオートマトンにまとめ、商品名を1回走査して全キーワードを照合する
+- ASIN・カテゴリは値 → ユーザーの辞書（ハッシュ表）で引く
+- 照合の手間は商品数と商品名の長さに比例し、ユーザー数・キーワード数にはほぼよらない
+
+通知の条件:
+- ASIN: 収集のたびに通知（ランクの推移を追う）
+- キーワード・カテゴリ: ランキングに新しく入った商品だけ（previous_rank がない行）
+"""
+
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+from loguru import logger
+
+from config import config
+from dedup import normalize_name
+
+# 通知キューの列
+ALERT_COLUMNS = [
+    "timestamp",
+    "user_id",
+    "kind",
+    "watch",
+    "asin",
+    "name",
+    "category",
+    "current_rank",
+    "previous_rank",
+    "price",
+]
+
+# 種類ごとの登録上限
+MAX_WATCHES = 100
+
+# キーワードの最小文字数（正規化後。1文字はほぼ全商品に一致する）
+MIN_KEYWORD_LENGTH = 2
+
+
+def default_watchlists_path() -> Path:
+    """ウォッチリストの保存ファイルの既定パス"""
+    return Path(config.paths.data_dir) / "watchlists.json"
+
+
+def default_alerts_path() -> Path:
+    """通知キューの既定パス"""
+    return Path(config.paths.data_dir) / "watch_alerts.csv"
+
+
+@dataclass
+class Watchlist:
+    """ユーザーのウォッチリスト"""
+
+    user_id: str
+    asins: list[str] = field(default_factory=list)
+    keywords: list[str] = field(default_factory=list)
+    categories: list[str] = field(default_factory=list)
+    updated_at: datetime = field(default_factory=datetime.now)
+
+    def to_dict(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "asins": self.asins,
+            "keywords": self.keywords,
+            "categories": self.categories,
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+def clean_watches(values: Iterable[str], kind: str) -> list[str]:
+    """
+    登録値を整える（前後の空白を除き、重複を除く）
+
+    Args:
+        values: 登録値
+        kind: "asin" / "keyword" / "category"
+
+    Raises:
+        ValueError: 上限を超える、または短すぎるキーワードがある
+    """
+    cleaned = list(dict.fromkeys(v.strip() for v in values if v and v.strip()))
+    if len(cleaned) > MAX_WATCHES:
+        raise ValueError(f"{kind}は{MAX_WATCHES}件まで登録できます")
+    if kind == "keyword":
+        short = [v for v in cleaned if len(normalize_name(v)) < MIN_KEYWORD_LENGTH]
+        if short:
+            raise ValueError(
+                f"キーワードは記号・空白を除いて{MIN_KEYWORD_LENGTH}文字以上にしてください: {short[0]}"
+            )
+    return cleaned
+
+
+class WatchlistStore:
+    """ウォッチリストの永続ストア（JSON）"""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: 保存ファイル（省略時は data/watchlists.json）
+        """
+        self.path = path or default_watchlists_path()
+        self._watchlists: dict[str, Watchlist] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for uid, wdata in data.items():
+                self._watchlists[uid] = Watchlist(
+                    user_id=wdata["user_id"],
+                    asins=wdata.get("asins", []),
+                    keywords=wdata.get("keywords", []),
+                    categories=wdata.get("categories", []),
+                    updated_at=datetime.fromisoformat(
+                        wdata.get("updated_at", datetime.now().isoformat())
+                    ),
+                )
+        except Exception as e:
+            logger.warning(f"ウォッチリスト読み込みエラー: {e}")
+
+    def _save(self) -> None:
+        """一時ファイル経由で書き出し"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {uid: w.to_dict() for uid, w in self._watchlists.items()},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        tmp_path.replace(self.path)
+
+    def __len__(self) -> int:
+        return len(self._watchlists)
+
+    def __iter__(self):
+        return iter(list(self._watchlists.values()))
+
+    def get(self, user_id: str) -> Watchlist:
+        """ユーザーのウォッチリスト（未登録なら空）"""
+        return self._watchlists.get(user_id) or Watchlist(user_id=user_id)
+
+    def set(
+        self,
+        user_id: str,
+        asins: Iterable[str] = (),
+        keywords: Iterable[str] = (),
+        categories: Iterable[str] = (),
+    ) -> Watchlist:
+        """
+        ウォッチリストを置き換えて保存
+
+        Raises:
+            ValueError: 登録値が不正（clean_watches）
+        """
+        watchlist = Watchlist(
+            user_id=user_id,
+            asins=clean_watches(asins, "asin"),
+            keywords=clean_watches(keywords, "keyword"),
+            categories=clean_watches(categories, "category"),
+        )
+        self._watchlists[user_id] = watchlist
+        self._save()
+        return watchlist
+
+    def delete(self, user_id: str) -> bool:
+        """ウォッチリストを削除"""
+        if self._watchlists.pop(user_id, None) is None:
+            return False
+        self._save()
+        return True
+
+
+class AhoCorasick:
+    """
+    複数キーワードの同時照合（Aho-Corasickオートマトン）
+
+    全キーワードの文字の木（トライ）に失敗遷移を張り、テキストを1文字ずつ1回だけ読んで
+    含まれる全キーワードを見つける。照合の手間はテキストの長さ + 一致数に比例し、キーワード数によらない
+    """
+
+    def __init__(self, patterns: list[str]):
+        """
+        Args:
+            patterns: キーワード（空文字列は不可）
+        """
+        self.patterns = patterns
+        self.goto: list[dict[str, int]] = [{}]
+        outputs: list[list[int]] = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                following = self.goto[state].get(ch)
+                if following is None:
+                    following = len(self.goto)
+                    self.goto[state][ch] = following
+                    self.goto.append({})
+                    outputs.append([])
+                state = following
+            outputs[state].append(pattern_id)
+
+        # 幅優先で失敗遷移を張り、失敗先の出力を引き継ぐ（照合時に失敗遷移をたどって出力を集めない）
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, following in self.goto[state].items():
+                queue.append(following)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[following] = self.goto[fallback].get(ch, 0)
+                outputs[following] += outputs[self.fail[following]]
+        self.outputs = [tuple(o) for o in outputs]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def find(self, text: str) -> set[int]:
+        """テキストに含まれるキーワードの番号"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found: set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class WatchlistMatcher:
+    """
+    全ユーザーのウォッチリストをまとめた照合器
+
+    ASIN・カテゴリは値 → (ユーザー, 登録値) の辞書、キーワードは正規化した文字列の
+    Aho-Corasickオートマトンにまとめ、収集1回分を1回の走査で照合する
+    """
+
+    def __init__(self, watchlists: Iterable[Watchlist]):
+        self.asin_watchers: dict[str, list[tuple[str, str]]] = {}
+        self.category_watchers: dict[str, list[tuple[str, str]]] = {}
+        keyword_ids: dict[str, int] = {}
+        self.keyword_watchers: list[list[tuple[str, str]]] = []
+        for watchlist in watchlists:
+            for asin in watchlist.asins:
+                self.asin_watchers.setdefault(asin, []).append((watchlist.user_id, asin))
+            for category in watchlist.categories:
+                self.category_watchers.setdefault(category, []).append(
+                    (watchlist.user_id, category)
+                )
+            for keyword in watchlist.keywords:
+                normalized = normalize_name(keyword)
+                if len(normalized) < MIN_KEYWORD_LENGTH:
+                    continue
+                if normalized not in keyword_ids:
+                    keyword_ids[normalized] = len(keyword_ids)
+                    self.keyword_watchers.append([])
+                self.keyword_watchers[keyword_ids[normalized]].append((watchlist.user_id, keyword))
+        self.automaton = AhoCorasick(list(keyword_ids))
+
+    def __len__(self) -> int:
+        """登録値の数（ASIN・カテゴリ・キーワードの種類数）"""
+        return len(self.asin_watchers) + len(self.category_watchers) + len(self.automaton)
+
+    @classmethod
+    def from_store(cls, store: Optional[WatchlistStore] = None, auth=None) -> "WatchlistMatcher":
+        """
+        リアルタイムアラートを使えるユーザーのウォッチリストからまとめる
+
+        Args:
+            store: ウォッチリストのストア（省略時は data/watchlists.json）
+            auth: auth.AuthService（省略時は data/users.json）
+        """
+        from auth import AuthService
+
+        store = store if store is not None else WatchlistStore()
+        auth = auth if auth is not None else AuthService()
+        eligible = []
+        for watchlist in store:
+            user = auth.get_user(watchlist.user_id)
+            if (
+                user is not None
+                and user.can_use_feature("realtime_alerts")
+                and user.is_subscription_active()
+            ):
+                eligible.append(watchlist)
+        return cls(eligible)
+
+    def match(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        収集1回分を全ウォッチリストと照合
+
+        同じユーザー・ASINの一致は1件にまとめる（ASIN・カテゴリ・キーワードの順に優先）
+
+        Args:
+            df: asin, name, category, current_rank, timestamp と任意の previous_rank, price を含むDataFrame
+
+        Returns:
+            ALERT_COLUMNS の列を持つDataFrame
+        """
+        if df.empty or len(self) == 0:
+            return pd.DataFrame(columns=ALERT_COLUMNS)
+
+        entered = df["previous_rank"].isna().tolist() if "previous_rank" in df else [True] * len(df)
+        names = df["name"].tolist() if "name" in df else [None] * len(df)
+        categories = df["category"].tolist() if "category" in df else [None] * len(df)
+        hits: list[tuple[int, str, str, str]] = []
+        for i, (asin, name, category, is_new) in enumerate(
+            zip(df["asin"].tolist(), names, categories, entered)
+        ):
+            for user_id, watch in self.asin_watchers.get(asin, ()):
+                hits.append((i, user_id, "asin", watch))
+            if not is_new:
+                continue
+            for user_id, watch in self.category_watchers.get(category, ()):
+                hits.append((i, user_id, "category", watch))
+            if len(self.automaton) and isinstance(name, str):
+                for keyword_id in self.automaton.find(normalize_name(name)):
+                    for user_id, watch in self.keyword_watchers[keyword_id]:
+                        hits.append((i, user_id, "keyword", watch))
+        if not hits:
+            return pd.DataFrame(columns=ALERT_COLUMNS)
+
+        rows, user_ids, kinds, watches = zip(*hits)
+        alerts = (
+            df.iloc[list(rows)]
+            .reset_index(drop=True)
+            .assign(user_id=user_ids, kind=kinds, watch=watches)
+        )
+        alerts = alerts.drop_duplicates(["user_id", "asin"])
+        return alerts.reindex(columns=ALERT_COLUMNS).reset_index(drop=True)
+
+
+def append_alerts(alerts: pd.DataFrame, path: Optional[Path] = None) -> None:
+    """一致した商品を通知キューに追記"""
+    if alerts.empty:
+        return
+    path = path or default_alerts_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    alerts.reindex(columns=ALERT_COLUMNS).to_csv(
+        path, mode="a", header=not path.exists(), index=False, encoding="utf-8"
+    )
+
+
+def load_alerts(path: Optional[Path] = None) -> pd.DataFrame:
+    """通知キューを読み込み"""
+    path = path or default_alerts_path()
+    if not path.exists():
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+    return pd.read_csv(path, encoding="utf-8", dtype={"user_id": str, "asin": str, "watch": str})
+
+
+def recent_alerts(user_id: str, hours: float = 24, path: Optional[Path] = None) -> pd.DataFrame:
+    """
+    ユーザーの直近の通知（新しい順）
+
+    期間は通知キューの最新の時刻から数える（収集が止まっていても直近の結果を返す）
+
+    Args:
+        user_id: ユーザーID
+        hours: 対象期間（時間）
+        path: 通知キュー（省略時は data/watch_alerts.csv）
+    """
+    df = load_alerts(path)
+    if df.empty:
+        return df
+    timestamps = pd.to_datetime(df["timestamp"], format="ISO8601")
+    recent = (df["user_id"] == user_id) & (
+        timestamps >= timestamps.max() - pd.Timedelta(hours=hours)
+    )
+    return df[recent].iloc[::-1].reset_index(drop=True)
+
+
+def main():
+    """メイン実行（ユーザーの直近の通知を表示）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EcomTrendAI ウォッチリストの通知")
+    parser.add_argument("user_id", help="ユーザーID")
+    parser.add_argument("--hours", type=float, default=24, help="対象期間（時間）")
+    args = parser.parse_args()
+
+    alerts = recent_alerts(args.user_id, args.hours)
+    if alerts.empty:
+        logger.info(f"通知はありません: {args.user_id}")
+        return
+    print(alerts.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
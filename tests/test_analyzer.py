@@ -3,12 +3,21 @@
 トレンド分析モジュールのテスト
 """
 
+from dataclasses import asdict
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 
-from analyzer import TrendAnalyzer, TrendItem
+from analyzer import (
+    MomentumState,
+    StreamingTopK,
+    TrendAnalyzer,
+    TrendItem,
+    estimate_chunk_rows,
+    iter_whole_runs,
+)
 
 
 class TestTrendAnalyzer:
@@ -42,25 +51,47 @@ B005,テスト商品E,パソコン,5,,200,200.0,29800,JPY,2000,4.6,https://amazo
         assert "asin" in df.columns
         assert "trend_score" not in df.columns  # まだ計算されていない
 
+    def test_load_latest_data_schema(self, sample_data: Path):
+        """明示スキーマで読み込み、affiliate_url は読み込まない"""
+        df = TrendAnalyzer(data_dir=sample_data).load_latest_data()
+
+        assert "affiliate_url" not in df.columns
+        assert "currency" not in df.columns
+        assert isinstance(df["category"].dtype, pd.CategoricalDtype)
+        assert df["current_rank"].dtype == "float32"
+        assert isinstance(df["asin"].dtype, pd.StringDtype)
+
+    def test_affiliate_url_is_derived(self, sample_data: Path):
+        """affiliate_url はASINから生成される"""
+        from config import get_affiliate_url
+
+        trends = TrendAnalyzer(data_dir=sample_data).analyze_trends()
+
+        assert all(t.affiliate_url == get_affiliate_url(t.asin) for t in trends)
+
     def test_calculate_trend_score(self, sample_data: Path):
         """トレンドスコア計算テスト"""
         analyzer = TrendAnalyzer(data_dir=sample_data)
 
         # 高スコアケース: 高ランク変動 + 多レビュー + 高評価
-        row1 = pd.Series({
-            "rank_change_percent": 100,
-            "review_count": 1000,
-            "rating": 4.5,
-        })
+        row1 = pd.Series(
+            {
+                "rank_change_percent": 100,
+                "review_count": 1000,
+                "rating": 4.5,
+            }
+        )
         score1 = analyzer.calculate_trend_score(row1)
         assert score1 > 0
 
         # 低スコアケース
-        row2 = pd.Series({
-            "rank_change_percent": 10,
-            "review_count": 10,
-            "rating": 3.5,
-        })
+        row2 = pd.Series(
+            {
+                "rank_change_percent": 10,
+                "review_count": 10,
+                "rating": 3.5,
+            }
+        )
         score2 = analyzer.calculate_trend_score(row2)
 
         # 高スコアの方が大きい
@@ -88,6 +119,86 @@ B005,テスト商品E,パソコン,5,,200,200.0,29800,JPY,2000,4.6,https://amazo
         assert len(category_trends["家電"]) == 2
         assert len(category_trends["ゲーム"]) == 2
 
+    def test_analyze_dataframe_by_category_top_n(self, tmp_path: Path):
+        """カテゴリごとの上位N件はスコア順、同点は元の順序、カテゴリは出現順"""
+        df = pd.DataFrame(
+            {
+                "asin": [f"B{i:03d}" for i in range(8)],
+                "name": [f"商品{i}" for i in range(8)],
+                "category": ["本", "家電", "本", "家電", "本", "家電", "本", "本"],
+                "current_rank": range(1, 9),
+                "rank_change_percent": [10.0, 80.0, 60.0, 80.0, None, 20.0, 60.0, 90.0],
+                "review_count": 0,
+                "rating": 0.0,
+                "affiliate_url": "",
+            }
+        )
+
+        result = TrendAnalyzer(data_dir=tmp_path).analyze_dataframe_by_category(df, top_n=3)
+
+        assert list(result) == ["本", "家電"]
+        assert [t.asin for t in result["本"]] == ["B007", "B002", "B006"]
+        assert [t.asin for t in result["家電"]] == ["B001", "B003", "B005"]
+
+    def test_collapse_duplicates(self, tmp_path: Path):
+        """重複商品はスコア最上位の1件に、カテゴリ別ではカテゴリ内の重複だけをまとめる"""
+        from dedup import ProductClusters
+
+        df = pd.DataFrame(
+            {
+                "asin": ["B001", "B002", "B003", "B004", "B001"],
+                "name": [
+                    "ワイヤレスイヤホン ノイズキャンセリング ブラック",
+                    "ワイヤレスイヤホン ノイズキャンセリング ホワイト",
+                    "電動歯ブラシ 音波式",
+                    "電動歯ブラシ 音波式 替えブラシ付き",
+                    "ワイヤレスイヤホン ノイズキャンセリング ブラック",
+                ],
+                "category": ["家電", "家電", "家電", "本", "本"],
+                "current_rank": [1, 2, 3, 4, 5],
+                "rank_change_percent": [50.0, 90.0, 40.0, 30.0, 20.0],
+            }
+        )
+        analyzer = TrendAnalyzer(data_dir=tmp_path)
+
+        trends = analyzer.analyze_dataframe(df, top_n=3, collapse_duplicates=True)
+        by_category = analyzer.analyze_dataframe_by_category(df, collapse_duplicates=True)
+
+        assert [t.asin for t in trends] == ["B002", "B003"]
+        assert [t.asin for t in by_category["家電"]] == ["B002", "B003"]
+        assert [t.asin for t in by_category["本"]] == ["B004", "B001"]
+
+        # 保存済みのクラスタがあればそちらを使う
+        clusters = ProductClusters.from_frame(df.iloc[[0, 2]])
+        trends = TrendAnalyzer(data_dir=tmp_path, clusters=clusters).analyze_dataframe(
+            df, collapse_duplicates=True
+        )
+        assert [t.asin for t in trends] == ["B002", "B001", "B003", "B004"]
+
+    def test_vectorized_score_matches_row_score(self, sample_data: Path):
+        """一括計算と1行ずつの計算が一致し、欠損値は0として扱う"""
+        analyzer = TrendAnalyzer(data_dir=sample_data)
+        df = analyzer.load_latest_data()
+        df.loc[0, ["rank_change_percent", "review_count", "rating"]] = None
+
+        scores = analyzer.calculate_trend_scores(df)
+
+        assert scores.tolist() == [analyzer.calculate_trend_score(row) for _, row in df.iterrows()]
+        assert scores.iloc[0] == 0.0
+
+    def test_trend_items_convert_missing_to_none(self, sample_data: Path):
+        """欠損した価格・レビュー数はNone、整数列はintになる"""
+        analyzer = TrendAnalyzer(data_dir=sample_data)
+        df = analyzer.load_latest_data()
+        df.loc[df["asin"] == "B005", ["price", "review_count"]] = None
+
+        trends = {t.asin: t for t in analyzer.analyze_dataframe(df)}
+
+        assert trends["B005"].price is None
+        assert trends["B005"].review_count is None
+        assert type(trends["B001"].review_count) is int
+        assert type(trends["B001"].current_rank) is int
+
     def test_detect_significant_movers(self, sample_data: Path):
         """大幅変動検出テスト"""
         analyzer = TrendAnalyzer(data_dir=sample_data)
@@ -100,6 +211,26 @@ B005,テスト商品E,パソコン,5,,200,200.0,29800,JPY,2000,4.6,https://amazo
         significant_high = analyzer.detect_significant_movers(threshold=200.0)
         assert len(significant_high) >= 1  # B005(200%)
 
+    def test_detect_significant_movers_from_anomaly_log(self, sample_data: Path, tmp_path: Path):
+        """異常検知の検出結果があれば、最新データのうち検出された商品をzスコア順に返す"""
+        log_path = tmp_path / "anomalies.csv"
+        pd.DataFrame(
+            {
+                "timestamp": ["2026-01-04T10:00:00", "2026-01-05T10:00:00", "2026-01-05T10:00:00"],
+                "asin": ["B002", "B004", "B001"],
+                "category": ["家電", "ゲーム", "家電"],
+                "rank_change_percent": [80.0, 30.0, 100.0],
+                "asin_zscore": [9.0, 3.5, None],
+                "category_zscore": [None, 3.2, 4.1],
+            }
+        ).to_csv(log_path, index=False)
+        analyzer = TrendAnalyzer(data_dir=sample_data, anomaly_log=log_path)
+
+        # B002 は過去の収集での検出のため含まない
+        assert [t.asin for t in analyzer.detect_significant_movers()] == ["B001", "B004"]
+        assert [t.asin for t in analyzer.detect_significant_movers(threshold=50.0)] == ["B001"]
+        assert analyzer.detect_significant_movers()[0].trend_score > 0
+
     def test_empty_data(self, tmp_path: Path):
         """空データの場合のテスト"""
         empty_dir = tmp_path / "empty"
@@ -136,6 +267,158 @@ class TestTrendItem:
         assert item.rank_change_percent == 50.0
         assert item.trend_score == 75.5
 
+    def test_trend_item_has_no_instance_dict(self):
+        """__slots__ により属性辞書を持たない"""
+        item = TrendItem("B001", "商品", "家電", 0.0, 1, None, None, None, "", 0.0)
+
+        assert not hasattr(item, "__dict__")
+        assert asdict(item)["velocity"] is None
+
+    def test_from_dataframe(self):
+        """必須列のみのDataFrameから一括生成（省略列はNone）"""
+        df = pd.DataFrame(
+            {
+                "asin": ["B001", "B002"],
+                "name": ["商品A", "商品B"],
+                "category": ["家電", "本"],
+                "current_rank": [3.0, 7.0],
+                "affiliate_url": ["https://amazon.co.jp/dp/B001", "https://amazon.co.jp/dp/B002"],
+                "trend_score": [12.5, 3],
+                "previous_rank": [5, None],
+            }
+        )
+
+        items = TrendItem.from_dataframe(df)
+
+        assert [i.asin for i in items] == ["B001", "B002"]
+        assert items[0].current_rank == 3 and type(items[0].current_rank) is int
+        assert items[0].previous_rank == 5
+        assert items[1].previous_rank is None
+        assert items[1].price is None
+        assert items[1].rank_change_percent == 0
+        assert TrendItem.from_dataframe(df.iloc[:0]) == []
+
+
+def run(timestamp: str, ranks: dict[str, int]) -> pd.DataFrame:
+    """1回分の収集データ（モメンタム更新用）"""
+    return pd.DataFrame(
+        {"asin": list(ranks), "current_rank": list(ranks.values()), "timestamp": timestamp}
+    )
+
+
+class TestMomentumState:
+    """MomentumStateのテスト"""
+
+    def test_first_observation(self):
+        """初回は速度0、平滑化ランクは観測値"""
+        state = MomentumState()
+        state.update(run("2026-01-01T10:00:00", {"B001": 50}))
+
+        features = state.features(["B001"]).iloc[0]
+        assert features["velocity"] == 0
+        assert features["ewma_rank"] == 50
+        assert features["days_in_chart"] == 1
+
+    def test_velocity_and_acceleration(self):
+        """速度は位/日、加速度は3回目の観測から"""
+        state = MomentumState(half_life_hours=24)
+        state.update(run("2026-01-01T00:00:00", {"B001": 100}))
+        state.update(run("2026-01-02T00:00:00", {"B001": 60}))
+
+        features = state.features(["B001"]).iloc[0]
+        assert features["velocity"] == 40
+        assert features["acceleration"] == 0
+        assert features["ewma_rank"] == 80  # 半減期1日 → 前回と今回の中間
+
+        state.update(run("2026-01-02T12:00:00", {"B001": 50}))
+
+        features = state.features(["B001"]).iloc[0]
+        assert features["velocity"] == 20
+        assert features["acceleration"] == -40
+        assert features["days_in_chart"] == 2
+
+    def test_stale_rows_are_ignored(self):
+        """前回以前の時刻の行では状態を変えない"""
+        state = MomentumState()
+        state.update(run("2026-01-02T00:00:00", {"B001": 10}))
+
+        updated = state.update(run("2026-01-01T00:00:00", {"B001": 90}))
+
+        assert updated == 0
+        assert state.features(["B001"]).iloc[0]["ewma_rank"] == 10
+
+    def test_best_rank_across_categories(self):
+        """同じ回に複数カテゴリで掲載されたASINは最上位ランクを使う"""
+        state = MomentumState()
+        state.update(
+            pd.DataFrame(
+                {
+                    "asin": ["B001", "B001"],
+                    "current_rank": [30, 5],
+                    "timestamp": "2026-01-01T00:00:00",
+                }
+            )
+        )
+
+        assert len(state) == 1
+        assert state.features(["B001"]).iloc[0]["ewma_rank"] == 5
+
+    def test_unknown_asin_is_missing(self):
+        """未観測のASINは欠損値"""
+        state = MomentumState()
+        state.update(run("2026-01-01T00:00:00", {"B001": 10}))
+
+        features = state.features(["B999", "B001"])
+
+        assert features["velocity"].isna().tolist() == [True, False]
+
+    def test_grows_beyond_capacity(self):
+        """初期容量を超えても配列を拡張して保持"""
+        state = MomentumState(capacity=2)
+        state.update(run("2026-01-01T00:00:00", {f"B{i:03d}": i + 1 for i in range(5)}))
+
+        assert len(state) == 5
+        assert state.features(["B004"]).iloc[0]["ewma_rank"] == 5
+
+    def test_save_and_load(self, tmp_path: Path):
+        """保存した状態を読み直して更新を続けられる"""
+        state = MomentumState(half_life_hours=12)
+        state.update(run("2026-01-01T00:00:00", {"B001": 100, "B002": 20}))
+        path = state.save(tmp_path / "momentum_state.npz")
+
+        loaded = MomentumState.load(path)
+        loaded.update(run("2026-01-02T00:00:00", {"B001": 60}))
+
+        assert loaded.half_life_hours == 12
+        assert len(loaded) == 2
+        assert loaded.features(["B001"]).iloc[0]["velocity"] == 40
+
+    def test_analyzer_uses_momentum(self, tmp_path: Path):
+        """分析結果に特徴量が付与され、上昇中の商品はスコアが加点される"""
+        state = MomentumState()
+        state.update(run("2026-01-04T10:00:00", {"B001": 20, "B002": 2}))
+        state.update(run("2026-01-05T10:00:00", {"B001": 1, "B002": 2}))
+        df = pd.DataFrame(
+            {
+                "asin": ["B001", "B002"],
+                "name": ["商品A", "商品B"],
+                "category": ["家電", "家電"],
+                "current_rank": [1, 2],
+                "rank_change_percent": [50.0, 50.0],
+                "review_count": [100, 100],
+                "rating": [4.0, 4.0],
+                "affiliate_url": ["", ""],
+            }
+        )
+
+        trends = TrendAnalyzer(data_dir=tmp_path, momentum=state).analyze_dataframe(df)
+
+        by_asin = {t.asin: t for t in trends}
+        assert by_asin["B001"].velocity == 19
+        assert by_asin["B001"].days_in_chart == 2
+        assert by_asin["B001"].trend_score > by_asin["B002"].trend_score
+        assert TrendAnalyzer(data_dir=tmp_path).analyze_dataframe(df)[0].velocity is None
+
 
 class TestReportGenerator:
     """ReportGeneratorのテスト"""
@@ -144,6 +427,7 @@ class TestReportGenerator:
     def generator(self, tmp_path: Path):
         """ReportGeneratorのフィクスチャ"""
         from analyzer import ReportGenerator
+
         return ReportGenerator(output_dir=tmp_path)
 
     @pytest.fixture
@@ -177,13 +461,16 @@ class TestReportGenerator:
     def test_init_creates_output_dir(self, tmp_path: Path):
         """出力ディレクトリが作成される"""
         from analyzer import ReportGenerator
+
         output_dir = tmp_path / "reports"
         generator = ReportGenerator(output_dir=output_dir)
 
         assert output_dir.exists()
         assert generator.output_dir == output_dir
 
-    def test_generate_markdown_report(self, generator, sample_trends, sample_category_trends, tmp_path):
+    def test_generate_markdown_report(
+        self, generator, sample_trends, sample_category_trends, tmp_path
+    ):
         """Markdownレポートが生成される"""
         filepath = generator.generate_markdown_report(sample_trends, sample_category_trends)
 
@@ -328,6 +615,15 @@ B001,商品A,家電,1,,100,100.0,10000,JPY,500,4.5,https://test.com,2026-01-01T1
         # 最新3ファイル × 1レコード = 3レコード
         assert len(df) == 3
 
+    def test_load_historical_data_keeps_categories(self, historical_data: Path):
+        """複数ファイルを結合してもカテゴリ型を保つ"""
+        analyzer = TrendAnalyzer(data_dir=historical_data)
+        df = analyzer.load_historical_data(days=7)
+
+        assert isinstance(df["category"].dtype, pd.CategoricalDtype)
+        assert isinstance(df["timestamp"].dtype, pd.CategoricalDtype)
+        assert len(df) == 5
+
     def test_load_historical_data_empty(self, tmp_path: Path):
         """空ディレクトリの場合"""
         empty_dir = tmp_path / "empty"
@@ -339,5 +635,157 @@ B001,商品A,家電,1,,100,100.0,10000,JPY,500,4.5,https://test.com,2026-01-01T1
         assert df is None
 
 
+class TestAnalyzeHistory:
+    """analyze_history（分割読み込み）のテスト"""
+
+    @pytest.fixture
+    def raw_dir(self, tmp_path: Path) -> Path:
+        """同点の多い4日分（1日900行）"""
+        data_dir = tmp_path / "raw"
+        data_dir.mkdir()
+        rng = np.random.default_rng(0)
+        rows = 900
+        for day in range(1, 5):
+            pd.DataFrame(
+                {
+                    "asin": [f"B{i % 1200:04d}" for i in range(day * 300, day * 300 + rows)],
+                    "name": [f"商品{i}" for i in range(rows)],
+                    "category": rng.choice(["家電", "ゲーム", "本"], rows),
+                    "current_rank": rng.integers(1, 100, rows),
+                    "rank_change_percent": rng.choice([10.0, 50.0, 120.0, np.nan], rows),
+                    "price": 1980.0,
+                    "review_count": rng.choice([0, 10, 100], rows),
+                    "rating": rng.choice([3.5, 4.5], rows),
+                    "timestamp": f"2026-01-{day:02d}T10:00:00",
+                }
+            ).to_csv(
+                data_dir / f"products_202601{day:02d}_100000.csv", index=False, encoding="utf-8-sig"
+            )
+        return data_dir
+
+    def test_matches_in_memory(self, raw_dir: Path):
+        """結合して分析した場合と同じ結果（同点の順序も含む）"""
+        analyzer = TrendAnalyzer(data_dir=raw_dir)
+        df = analyzer.load_historical_data(days=3)
+
+        trends, by_category = analyzer.analyze_history(
+            days=3, top_n=50, category_top_n=20, memory_budget_mb=0.01
+        )
+
+        assert trends == analyzer.analyze_dataframe(df, top_n=50)
+        assert by_category == analyzer.analyze_dataframe_by_category(df, top_n=20)
+        assert list(by_category) == list(df["category"].unique())
+
+    def test_matches_in_memory_with_momentum(self, raw_dir: Path):
+        """モメンタム特徴量を収集順に積み上げて結合・分析した場合と同じ結果"""
+        analyzer = TrendAnalyzer(data_dir=raw_dir, momentum=MomentumState())
+        df = MomentumState().replay(analyzer.load_historical_data(days=7))
+        plain = TrendAnalyzer(data_dir=raw_dir)
+
+        trends, by_category = analyzer.analyze_history(days=7, top_n=30, memory_budget_mb=0.01)
+
+        assert trends == plain.analyze_dataframe(df, top_n=30)
+        assert by_category == plain.analyze_dataframe_by_category(df)
+
+    def test_past_runs_ignore_current_momentum(self, raw_dir: Path):
+        """過去の収集回のスコアは現在のモメンタム状態（後の収集回）によらない"""
+        current = MomentumState()
+        for path in sorted(raw_dir.glob("*.csv")):
+            current.update(pd.read_csv(path))
+        # 最新の収集回より後に全ASINが1位になった状態
+        future = pd.DataFrame(
+            {"asin": current.asins, "current_rank": 1, "timestamp": "2026-01-10T10:00:00"}
+        )
+        current.update(future)
+
+        trends, _ = TrendAnalyzer(data_dir=raw_dir, momentum=current).analyze_history(
+            days=7, top_n=30, memory_budget_mb=0.01
+        )
+        fresh, _ = TrendAnalyzer(data_dir=raw_dir, momentum=MomentumState()).analyze_history(
+            days=7, top_n=30, memory_budget_mb=1
+        )
+
+        assert trends == fresh
+
+    def test_whole_runs(self, raw_dir: Path):
+        """収集1回分が複数のチャンクに分かれない（結合すると同じ行）"""
+        chunks = list(
+            TrendAnalyzer(data_dir=raw_dir).iter_historical_chunks(days=7, chunk_rows=400)
+        )
+
+        runs = list(iter_whole_runs(iter(chunks)))
+
+        assert [r["timestamp"].nunique() for r in runs] == [1, 1, 1, 1]
+        assert [len(r) for r in runs] == [900, 900, 900, 900]
+        pd.testing.assert_frame_equal(
+            pd.concat(runs, ignore_index=True),
+            pd.concat(chunks, ignore_index=True),
+            check_categorical=False,
+        )
+
+    def test_chunks_follow_budget(self, raw_dir: Path):
+        """予算が小さいほどチャンクが小さい（結合すると同じ行）"""
+        analyzer = TrendAnalyzer(data_dir=raw_dir)
+
+        chunks = list(analyzer.iter_historical_chunks(days=7, chunk_rows=400))
+
+        assert max(len(c) for c in chunks) == 400
+        assert sum(len(c) for c in chunks) == 3600
+        sample = chunks[0]
+        assert estimate_chunk_rows(sample, 64) > estimate_chunk_rows(sample, 1) >= 1000
+
+    def test_empty(self, tmp_path: Path):
+        """データがない場合は空"""
+        assert TrendAnalyzer(data_dir=tmp_path).analyze_history() == ([], {})
+
+
+def test_forecast(tmp_path: Path):
+    """過去N日分から予測上昇率の高い順、観測日数の少ないASINは除く"""
+    header = "asin,name,category,current_rank,rank_change_percent,timestamp\n"
+    for day in range(1, 8):
+        rows = f"B001,上昇中,家電,{100 - 10 * day},10.0,2026-01-0{day}T10:00:00\n"
+        rows += f"B002,下降中,ゲーム,{10 + day},0.0,2026-01-0{day}T10:00:00\n"
+        if day == 7:
+            rows += "B003,新着,家電,1,0.0,2026-01-07T10:00:00\n"
+        (tmp_path / f"products_2026010{day}_100000.csv").write_text(
+            header + rows, encoding="utf-8-sig"
+        )
+
+    forecast = TrendAnalyzer(data_dir=tmp_path).forecast(days=7, horizon=1)
+
+    assert forecast["asin"].tolist() == ["B001", "B002"]
+    assert forecast["name"].tolist() == ["上昇中", "下降中"]
+    assert forecast["category"].tolist() == ["家電", "ゲーム"]
+    assert forecast.loc[0, "forecast_rank"] < forecast.loc[0, "current_rank"] == 30
+    assert forecast.loc[1, "forecast_change_percent"] < 0
+    assert TrendAnalyzer(data_dir=tmp_path).forecast(top_n=1)["asin"].tolist() == ["B001"]
+
+
+def test_forecast_by_collection_day(tmp_path: Path):
+    """1日に複数回収集しても、最新の収集日から遡ったN日分で当てはめる"""
+    header = "asin,name,category,current_rank,timestamp\n"
+    for day in range(1, 10):
+        for hour in (4, 10, 16, 22):
+            row = f"B001,上昇中,家電,{200 - 10 * day - hour // 6},2026-01-0{day}T{hour:02d}:00:00\n"
+            (tmp_path / f"products_2026010{day}_{hour:02d}0000.csv").write_text(
+                header + row, encoding="utf-8"
+            )
+
+    forecast = TrendAnalyzer(data_dir=tmp_path).forecast(days=7)
+
+    assert forecast["observations"].tolist() == [7]
+    assert forecast.loc[0, "current_rank"] == 200 - 90 - 3
+
+
+def test_streaming_top_k():
+    """スコア降順、同点は先に追加した行が上位"""
+    top = StreamingTopK(3)
+    for seq, score in enumerate([5.0, 9.0, 5.0, 7.0, 9.0, 5.0]):
+        top.push("k", score, seq, {"seq": seq})
+
+    assert [row["seq"] for row in top.top("k")] == [1, 4, 3]
+    assert top.top("unknown") == []
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
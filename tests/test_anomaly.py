@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+anomaly.pyモジュールのテスト
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly import AnomalyDetector, RunningStats, append_anomalies, load_anomalies
+
+
+def scrape(day: int, changes: dict[str, float], category: str = "家電") -> pd.DataFrame:
+    """1回分の収集データ"""
+    return pd.DataFrame(
+        {
+            "timestamp": f"2026-01-{day:02d}T10:00:00",
+            "asin": list(changes),
+            "name": [f"商品{asin}" for asin in changes],
+            "category": category,
+            "current_rank": range(1, len(changes) + 1),
+            "rank_change_percent": list(changes.values()),
+        }
+    )
+
+
+class TestRunningStats:
+    """RunningStatsのテスト"""
+
+    def test_merge_matches_batch_statistics(self):
+        """バッチごとに合成しても一括計算と同じ平均・分散になる"""
+        rng = np.random.default_rng(0)
+        values = rng.normal(10, 3, 50)
+        stats = RunningStats(max_count=1000)
+        for chunk in np.array_split(values, 7):
+            stats.merge(
+                ["k"],
+                np.array([len(chunk)], dtype=float),
+                np.array([chunk.mean()]),
+                np.array([((chunk - chunk.mean()) ** 2).sum()]),
+            )
+
+        count, mean, std = stats.lookup(["k", "unknown"])
+
+        assert count.tolist() == [50, 0]
+        assert mean[0] == pytest.approx(values.mean())
+        assert std[0] == pytest.approx(values.std(ddof=1))
+
+    def test_count_is_capped(self):
+        """件数は上限で頭打ち、分散は保つ"""
+        stats = RunningStats(max_count=10)
+        for value in [1.0, 3.0] * 20:
+            stats.merge(["k"], np.array([1.0]), np.array([value]), np.array([0.0]))
+
+        count, mean, std = stats.lookup(["k"])
+
+        assert count[0] == 10
+        assert 1.0 < mean[0] < 3.0
+        assert std[0] == pytest.approx(1.0, abs=0.2)
+
+
+class TestAnomalyDetector:
+    """AnomalyDetectorのテスト"""
+
+    @pytest.fixture
+    def detector(self) -> AnomalyDetector:
+        detector = AnomalyDetector(threshold=4.0, min_count=5)
+        rng = np.random.default_rng(0)
+        for day in range(1, 11):
+            changes = {f"B{i:03d}": float(rng.normal(0, 5)) for i in range(20)}
+            detector.process(scrape(day, changes))
+        return detector
+
+    def test_flags_spike(self, detector):
+        """通常の変動幅を大きく超える上昇を検出"""
+        changes = {f"B{i:03d}": 1.0 for i in range(20)}
+        changes["B007"] = 20000.0
+
+        result = detector.process(scrape(11, changes))
+
+        assert result["asin"].tolist() == ["B007"]
+        assert result.loc[0, "asin_zscore"] >= 4.0
+        assert result.loc[0, "category_zscore"] >= 4.0
+
+    def test_drop_is_not_flagged(self, detector):
+        """急落は対象外"""
+        result = detector.process(scrape(11, {"B001": -900.0}))
+
+        assert result.empty
+
+    def test_new_keys_are_not_judged(self):
+        """観測数が min_count 未満のASIN・カテゴリは判定しない"""
+        detector = AnomalyDetector(min_count=5)
+
+        result = detector.process(scrape(1, {"B001": 5000.0}))
+
+        assert result.empty
+
+    def test_category_baseline(self, detector):
+        """初登場のASINでもカテゴリの変動幅から検出"""
+        result = detector.process(scrape(11, {"B999": 900.0}))
+
+        assert result["asin"].tolist() == ["B999"]
+        assert pd.isna(result.loc[0, "asin_zscore"])
+
+    def test_save_and_load(self, detector, tmp_path: Path):
+        """保存した状態で判定を続けられる"""
+        path = detector.save(tmp_path / "anomaly_state.npz")
+
+        loaded = AnomalyDetector.load(path)
+
+        assert len(loaded.asin_stats) == 20
+        assert loaded.process(scrape(11, {"B003": 900.0}))["asin"].tolist() == ["B003"]
+
+
+def test_append_and_load_anomalies(tmp_path: Path):
+    """検出結果を追記して読み込む"""
+    path = tmp_path / "anomalies.csv"
+    row = scrape(1, {"B001": 900.0}).assign(asin_zscore=5.0, category_zscore=None)
+
+    append_anomalies(row, path)
+    append_anomalies(row.assign(asin="B002"), path)
+
+    df = load_anomalies(path)
+    assert df["asin"].tolist() == ["B001", "B002"]
+    assert load_anomalies(path, limit=1)["asin"].tolist() == ["B002"]
@@ -3,6 +3,7 @@
 REST APIのテスト
 """
 
+import sys
 import tempfile
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -10,12 +11,12 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-import sys
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 # FastAPIテスト用
 try:
     from fastapi.testclient import TestClient
+
     FASTAPI_AVAILABLE = True
 except ImportError:
     FASTAPI_AVAILABLE = False
@@ -36,6 +37,20 @@ def auth_service(temp_dir):
     return AuthService(users_file=temp_dir / "users.json")
 
 
+@pytest.fixture(autouse=True)
+def isolated_data_dir(temp_dir, monkeypatch):
+    """APIが既定で読み書きするデータ（ユーザー・APIキーなど）を一時ディレクトリに向ける"""
+    from config import config
+
+    monkeypatch.setattr(config.paths, "data_dir", temp_dir)
+    if FASTAPI_AVAILABLE:
+        import api
+
+        monkeypatch.setattr(
+            api, "AuthService", lambda: AuthService(users_file=temp_dir / "users.json")
+        )
+
+
 @pytest.fixture
 def billing_manager(auth_service):
     """BillingManagerインスタンス"""
@@ -64,6 +79,23 @@ def pro_user(auth_service):
     return user, raw_key
 
 
+@pytest.fixture
+def plan_api_key(auth_service):
+    """指定プランのユーザーを作り、そのAPIキーを返す関数"""
+    import uuid
+
+    def create(plan: SubscriptionPlan) -> str:
+        user = auth_service.create_user(f"user_{uuid.uuid4().hex[:8]}@example.com")
+        if plan != SubscriptionPlan.FREE:
+            auth_service.update_subscription(
+                user.user_id, plan, "sub_test", datetime.now() + timedelta(days=30)
+            )
+        raw_key, _ = auth_service.generate_api_key(user.user_id)
+        return raw_key
+
+    return create
+
+
 @pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not installed")
 class TestAPIEndpoints:
     """APIエンドポイントのテスト"""
@@ -75,6 +107,7 @@ class TestAPIEndpoints:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users.json"))
 
         from api import create_app
+
         app = create_app()
         return TestClient(app)
 
@@ -114,8 +147,8 @@ class TestAPIEndpoints:
                 "name": "テスト 太郎",
                 "email": "test@example.com",
                 "category": "general",
-                "message": "これはテストメッセージです。"
-            }
+                "message": "これはテストメッセージです。",
+            },
         )
         assert response.status_code == 200
         data = response.json()
@@ -130,8 +163,8 @@ class TestAPIEndpoints:
                 "name": "テスト",
                 "email": "invalid-email",
                 "category": "general",
-                "message": "テスト"
-            }
+                "message": "テスト",
+            },
         )
         assert response.status_code == 422  # Validation Error
 
@@ -142,15 +175,22 @@ class TestAPIEndpoints:
             json={
                 "name": "テスト"
                 # email, category, message が欠落
-            }
+            },
         )
         assert response.status_code == 422  # Validation Error
 
     def test_contact_endpoint_all_categories(self, client):
         """お問い合わせエンドポイント - 全カテゴリテスト"""
         categories = [
-            "general", "sales", "technical", "billing",
-            "privacy", "bug", "feature", "partnership", "other"
+            "general",
+            "sales",
+            "technical",
+            "billing",
+            "privacy",
+            "bug",
+            "feature",
+            "partnership",
+            "other",
         ]
         for category in categories:
             response = client.post(
@@ -159,8 +199,8 @@ class TestAPIEndpoints:
                     "name": "カテゴリテスト",
                     "email": "test@example.com",
                     "category": category,
-                    "message": f"カテゴリ: {category}"
-                }
+                    "message": f"カテゴリ: {category}",
+                },
             )
             assert response.status_code == 200
 
@@ -305,10 +345,7 @@ class TestWebhookHandling:
 
     def test_handle_unknown_webhook_event(self, billing_manager):
         """未知のWebhookイベント処理"""
-        event = {
-            "type": "unknown.event.type",
-            "data": {"object": {}}
-        }
+        event = {"type": "unknown.event.type", "data": {"object": {}}}
         result = billing_manager.handle_webhook_event(event)
         assert result is True  # 未知イベントは無視
 
@@ -328,9 +365,9 @@ class TestWebhookHandling:
                 "object": {
                     "id": "sub_update_test",
                     "status": "active",
-                    "current_period_end": (datetime.now() + timedelta(days=60)).timestamp()
+                    "current_period_end": (datetime.now() + timedelta(days=60)).timestamp(),
                 }
-            }
+            },
         }
         result = billing_manager.handle_webhook_event(event)
         assert result is True
@@ -343,11 +380,7 @@ class TestWebhookHandling:
 
         event = {
             "type": "invoice.payment_failed",
-            "data": {
-                "object": {
-                    "customer": "cus_payment_fail"
-                }
-            }
+            "data": {"object": {"customer": "cus_payment_fail"}},
         }
         result = billing_manager.handle_webhook_event(event)
         assert result is True
@@ -363,6 +396,7 @@ class TestAPITrends:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users.json"))
 
         from api import create_app
+
         app = create_app()
         return TestClient(app)
 
@@ -373,10 +407,7 @@ class TestAPITrends:
 
     def test_get_trends_with_invalid_key(self, client):
         """無効なAPIキーでは拒否"""
-        response = client.get(
-            "/trends",
-            headers={"X-API-Key": "invalid_key_12345"}
-        )
+        response = client.get("/trends", headers={"X-API-Key": "invalid_key_12345"})
         assert response.status_code == 401
 
 
@@ -390,6 +421,7 @@ class TestAPIBilling:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users.json"))
 
         from api import create_app
+
         app = create_app()
         return TestClient(app)
 
@@ -414,11 +446,13 @@ class TestAPIUsersFlow:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_dup.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"dup_{uuid.uuid4().hex[:8]}@example.com"
 
         # 1回目
@@ -432,6 +466,7 @@ class TestAPIUsersFlow:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_auth.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
@@ -443,11 +478,13 @@ class TestAPIUsersFlow:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_reg.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"new_{uuid.uuid4().hex[:8]}@example.com"
 
         response = client.post("/users/register", json={"email": email})
@@ -463,11 +500,13 @@ class TestAPIUsersFlow:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_me.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"me_{uuid.uuid4().hex[:8]}@example.com"
 
         # 登録
@@ -487,11 +526,13 @@ class TestAPIUsersFlow:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_apikey.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"apikey_{uuid.uuid4().hex[:8]}@example.com"
 
         # 登録
@@ -501,9 +542,7 @@ class TestAPIUsersFlow:
 
         # 新しいAPIキー作成
         response = client.post(
-            "/users/api-keys",
-            json={"name": "test-key"},
-            headers={"X-API-Key": api_key}
+            "/users/api-keys", json={"name": "test-key"}, headers={"X-API-Key": api_key}
         )
         assert response.status_code == 200
         data = response.json()
@@ -516,11 +555,13 @@ class TestAPIUsersFlow:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_revoke.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"revoke_{uuid.uuid4().hex[:8]}@example.com"
 
         # 登録
@@ -530,17 +571,12 @@ class TestAPIUsersFlow:
 
         # 新しいAPIキー作成
         create_resp = client.post(
-            "/users/api-keys",
-            json={"name": "revoke-key"},
-            headers={"X-API-Key": api_key}
+            "/users/api-keys", json={"name": "revoke-key"}, headers={"X-API-Key": api_key}
         )
         key_id = create_resp.json()["key_id"]
 
         # APIキー無効化
-        response = client.delete(
-            f"/users/api-keys/{key_id}",
-            headers={"X-API-Key": api_key}
-        )
+        response = client.delete(f"/users/api-keys/{key_id}", headers={"X-API-Key": api_key})
         assert response.status_code == 200
 
     def test_revoke_nonexistent_api_key(self, temp_dir, monkeypatch):
@@ -548,11 +584,13 @@ class TestAPIUsersFlow:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_revoke2.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"revoke2_{uuid.uuid4().hex[:8]}@example.com"
 
         # 登録
@@ -562,8 +600,7 @@ class TestAPIUsersFlow:
 
         # 存在しないキー無効化
         response = client.delete(
-            "/users/api-keys/nonexistent_key_id",
-            headers={"X-API-Key": api_key}
+            "/users/api-keys/nonexistent_key_id", headers={"X-API-Key": api_key}
         )
         assert response.status_code == 404
 
@@ -577,11 +614,13 @@ class TestAPIBillingEndpoints:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_upgrade.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"upgrade_{uuid.uuid4().hex[:8]}@example.com"
 
         # 登録
@@ -591,9 +630,7 @@ class TestAPIBillingEndpoints:
 
         # 無効なプラン
         response = client.post(
-            "/billing/upgrade",
-            json={"plan": "invalid_plan"},
-            headers={"X-API-Key": api_key}
+            "/billing/upgrade", json={"plan": "invalid_plan"}, headers={"X-API-Key": api_key}
         )
         assert response.status_code == 400
 
@@ -602,11 +639,13 @@ class TestAPIBillingEndpoints:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_upgrade2.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"upgrade2_{uuid.uuid4().hex[:8]}@example.com"
 
         # 登録
@@ -616,9 +655,7 @@ class TestAPIBillingEndpoints:
 
         # FREEへのアップグレード
         response = client.post(
-            "/billing/upgrade",
-            json={"plan": "free"},
-            headers={"X-API-Key": api_key}
+            "/billing/upgrade", json={"plan": "free"}, headers={"X-API-Key": api_key}
         )
         assert response.status_code == 400
 
@@ -627,11 +664,13 @@ class TestAPIBillingEndpoints:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_cancel.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"cancel_{uuid.uuid4().hex[:8]}@example.com"
 
         # 登録
@@ -640,10 +679,7 @@ class TestAPIBillingEndpoints:
         api_key = reg_resp.json()["api_key"]
 
         # FREEプランキャンセル
-        response = client.post(
-            "/billing/cancel",
-            headers={"X-API-Key": api_key}
-        )
+        response = client.post("/billing/cancel", headers={"X-API-Key": api_key})
         assert response.status_code == 400
 
 
@@ -657,11 +693,13 @@ class TestAPITrendsEndpoints:
         monkeypatch.setenv("USERS_FILE", str(temp_dir / "users_trends.json"))
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         # ユニークなメールアドレスを使用（UUID）
         import uuid
+
         email = f"trends_{uuid.uuid4().hex[:8]}@example.com"
 
         # 登録
@@ -686,32 +724,47 @@ class TestAPITrendsEndpoints:
         """Bearerトークンでのトレンド取得"""
         client, api_key = authenticated_client
 
-        response = client.get(
-            "/trends",
-            headers={"Authorization": f"Bearer {api_key}"}
-        )
+        response = client.get("/trends", headers={"Authorization": f"Bearer {api_key}"})
         assert response.status_code == 200
 
     def test_get_trends_with_limit(self, authenticated_client):
         """件数制限付きトレンド取得"""
         client, api_key = authenticated_client
 
-        response = client.get(
-            "/trends?limit=5",
-            headers={"X-API-Key": api_key}
-        )
+        response = client.get("/trends?limit=5", headers={"X-API-Key": api_key})
         assert response.status_code == 200
         data = response.json()
         assert data["count"] <= 5
 
+    def test_get_trends_collapse(self, authenticated_client, temp_dir, monkeypatch):
+        """collapse=trueで色違い・別カテゴリの重複商品を1件にまとめる"""
+        from config import config
+
+        client, api_key = authenticated_client
+        raw_dir = temp_dir / "raw_collapse"
+        raw_dir.mkdir()
+        (raw_dir / "products_20260101_100000.csv").write_text(
+            "asin,name,category,current_rank,rank_change_percent,timestamp\n"
+            "B001,ワイヤレスイヤホン ノイズキャンセリング ブラック,家電,1,90.0,2026-01-01T10:00:00\n"
+            "B002,ワイヤレスイヤホン ノイズキャンセリング ホワイト,家電,2,80.0,2026-01-01T10:00:00\n"
+            "B001,ワイヤレスイヤホン ノイズキャンセリング ブラック,ゲーム,3,70.0,2026-01-01T10:00:00\n"
+            "B003,電動歯ブラシ 音波式,家電,4,60.0,2026-01-01T10:00:00\n",
+            encoding="utf-8",
+        )
+        monkeypatch.setattr(config.paths, "raw_data_dir", raw_dir)
+        monkeypatch.setattr(config.paths, "data_dir", temp_dir)
+
+        plain = client.get("/trends", headers={"X-API-Key": api_key}).json()
+        collapsed = client.get("/trends?collapse=true", headers={"X-API-Key": api_key}).json()
+
+        assert [t["asin"] for t in plain["trends"]] == ["B001", "B002", "B001", "B003"]
+        assert [t["asin"] for t in collapsed["trends"]] == ["B001", "B003"]
+
     def test_get_category_trends(self, authenticated_client):
         """カテゴリ別トレンド取得"""
         client, api_key = authenticated_client
 
-        response = client.get(
-            "/trends/categories",
-            headers={"X-API-Key": api_key}
-        )
+        response = client.get("/trends/categories", headers={"X-API-Key": api_key})
         assert response.status_code == 200
         data = response.json()
         assert "categories" in data
@@ -720,10 +773,7 @@ class TestAPITrendsEndpoints:
         """大幅変動商品はPRO以上が必要"""
         client, api_key = authenticated_client
 
-        response = client.get(
-            "/trends/significant",
-            headers={"X-API-Key": api_key}
-        )
+        response = client.get("/trends/significant", headers={"X-API-Key": api_key})
         # FREEユーザーは403
         assert response.status_code == 403
 
@@ -731,10 +781,7 @@ class TestAPITrendsEndpoints:
         """CSV出力はPRO以上が必要"""
         client, api_key = authenticated_client
 
-        response = client.get(
-            "/export/csv",
-            headers={"X-API-Key": api_key}
-        )
+        response = client.get("/export/csv", headers={"X-API-Key": api_key})
         # FREEユーザーは403
         assert response.status_code == 403
 
@@ -742,13 +789,573 @@ class TestAPITrendsEndpoints:
         """JSON出力はPRO以上が必要"""
         client, api_key = authenticated_client
 
+        response = client.get("/export/json", headers={"X-API-Key": api_key})
+        # FREEユーザーは403
+        assert response.status_code == 403
+
+
+@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not installed")
+class TestCustomScoresEndpoint:
+    """カスタムスコアエンドポイントのテスト"""
+
+    @pytest.fixture
+    def client(self, auth_service, temp_dir, monkeypatch):
+        """スコア定義と生データを置いたテストクライアント"""
+        import json
+
+        import api
+        from config import config
+
+        raw_dir = temp_dir / "raw"
+        raw_dir.mkdir()
+        header = "asin,name,category,current_rank,rank_change_percent,price,review_count,rating,timestamp\n"
+        rows = "".join(
+            f"B00{i},商品{i},家電,{i + 1},{10 * (i + 1)}.0,1000,{1000 - 100 * i},4.5,2026-01-01T10:00:00\n"
+            for i in range(5)
+        )
+        (raw_dir / "products_20260101_100000.csv").write_text(header + rows, encoding="utf-8")
+        (temp_dir / "scores.json").write_text(
+            json.dumps(
+                {
+                    "scores": [
+                        {
+                            "name": "popular",
+                            "plans": ["pro", "enterprise"],
+                            "terms": [{"expr": "log1p(review_count)"}],
+                        },
+                        {"name": "bargain", "plans": ["enterprise"], "terms": [{"expr": "-price"}]},
+                    ]
+                }
+            ),
+            encoding="utf-8",
+        )
+
+        monkeypatch.setattr(config.paths, "data_dir", temp_dir)
+        monkeypatch.setattr(config.paths, "raw_data_dir", raw_dir)
+        monkeypatch.setattr(api, "AuthService", lambda: auth_service)
+        return TestClient(api.create_app())
+
+    def test_sorted_by_custom_score(self, client, plan_api_key):
+        """指定スコアの順に、プランで使える全スコアを返す"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
         response = client.get(
-            "/export/json",
-            headers={"X-API-Key": api_key}
+            "/trends/scores?score=popular&limit=3", headers={"X-API-Key": api_key}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["scores"] == ["default", "popular"]
+        assert [item["asin"] for item in data["items"]] == ["B000", "B001", "B002"]
+        assert set(data["items"][0]["scores"]) == {"default", "popular"}
+        assert data["items"][0]["scores"]["default"] == data["items"][0]["trend_score"]
+
+    def test_score_not_in_plan(self, client, plan_api_key):
+        """プランで使えないスコアは400"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.get("/trends/scores?score=bargain", headers={"X-API-Key": api_key})
+
+        assert response.status_code == 400
+
+    def test_requires_pro(self, client, plan_api_key):
+        """FREEプランは403"""
+        api_key = plan_api_key(SubscriptionPlan.FREE)
+        assert client.get("/trends/scores", headers={"X-API-Key": api_key}).status_code == 403
+
+
+@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not installed")
+class TestForecastEndpoint:
+    """ランク予測エンドポイントのテスト"""
+
+    @pytest.fixture
+    def client(self, auth_service, temp_dir, monkeypatch):
+        """10日分の生データを置いたテストクライアント"""
+        import api
+        from config import config
+
+        raw_dir = temp_dir / "raw"
+        raw_dir.mkdir()
+        header = "asin,name,category,current_rank,rank_change_percent,timestamp\n"
+        for day in range(1, 11):
+            rows = "".join(
+                f"B00{i},商品{i},家電,{3 * (20 - day) if i == 2 else 5 * (i + 1)},0.0,2026-01-{day:02d}T10:00:00\n"
+                for i in range(3)
+            )
+            (raw_dir / f"products_202601{day:02d}_100000.csv").write_text(
+                header + rows, encoding="utf-8"
+            )
+
+        monkeypatch.setattr(config.paths, "raw_data_dir", raw_dir)
+        monkeypatch.setattr(api, "AuthService", lambda: auth_service)
+        return TestClient(api.create_app())
+
+    def test_forecast(self, client, plan_api_key):
+        """予測上昇率の高い順に返す"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.get(
+            "/trends/forecast?horizon=2&days=10&limit=2", headers={"X-API-Key": api_key}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["horizon"] == 2
+        assert [item["asin"] for item in data["items"]] == ["B002", "B000"]
+        item = data["items"][0]
+        assert item["observations"] == 10
+        assert item["forecast_rank"] < item["current_rank"] == 30
+        assert item["affiliate_url"].startswith("https://")
+
+    def test_invalid_range(self, client, plan_api_key):
+        """範囲外のhorizon・daysは400"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        for query in ("horizon=0", "horizon=30", "days=3"):
+            response = client.get(f"/trends/forecast?{query}", headers={"X-API-Key": api_key})
+            assert response.status_code == 400
+
+    def test_requires_pro(self, client, plan_api_key):
+        """FREEプランは403"""
+        api_key = plan_api_key(SubscriptionPlan.FREE)
+        assert client.get("/trends/forecast", headers={"X-API-Key": api_key}).status_code == 403
+
+
+@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not installed")
+class TestPriceDropsEndpoint:
+    """値下がりエンドポイントのテスト"""
+
+    @pytest.fixture
+    def client(self, auth_service, temp_dir, monkeypatch):
+        """値下がりの検出結果を置いたテストクライアント"""
+        import pandas as pd
+
+        import api
+        from config import config
+        from prices import PriceIndex, append_price_drops
+
+        monkeypatch.setattr(config.paths, "data_dir", temp_dir)
+        index = PriceIndex(window=4, drop_percent=10)
+        for day, prices in enumerate([(1000, 1000, 1000), (900, 1000, 700)], 1):
+            df = pd.DataFrame(
+                {
+                    "asin": ["B000", "B001", "B002"],
+                    "name": ["商品0", "商品1", "商品2"],
+                    "category": ["家電", "家電", "本"],
+                    "price": prices,
+                    "timestamp": f"2026-01-{day:02d}T10:00:00",
+                }
+            )
+            append_price_drops(index.update(df))
+
+        monkeypatch.setattr(api, "AuthService", lambda: auth_service)
+        return TestClient(api.create_app())
+
+    def test_price_drops(self, client, plan_api_key):
+        """下落率の大きい順に返し、カテゴリ・下落率で絞り込める"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.get("/trends/price-drops", headers={"X-API-Key": api_key})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["asin"] for item in data["items"]] == ["B002", "B000"]
+        item = data["items"][0]
+        assert item["price"] == 700.0
+        assert item["previous_price"] == 1000.0
+        assert item["drop_percent"] == 30.0
+        assert item["median_drop_percent"] is None
+        assert item["affiliate_url"].startswith("https://")
+
+        for query, expected in (("category=家電", ["B000"]), ("min_percent=20", ["B002"])):
+            response = client.get(f"/trends/price-drops?{query}", headers={"X-API-Key": api_key})
+            assert [item["asin"] for item in response.json()["items"]] == expected
+
+    def test_invalid_hours(self, client, plan_api_key):
+        """範囲外のhoursは400"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        for query in ("hours=0", "hours=200"):
+            response = client.get(f"/trends/price-drops?{query}", headers={"X-API-Key": api_key})
+            assert response.status_code == 400
+
+    def test_requires_pro(self, client, plan_api_key):
+        """FREEプランは403"""
+        api_key = plan_api_key(SubscriptionPlan.FREE)
+        assert client.get("/trends/price-drops", headers={"X-API-Key": api_key}).status_code == 403
+
+
+@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not installed")
+class TestProductSearchEndpoint:
+    """商品検索エンドポイントのテスト"""
+
+    @pytest.fixture
+    def client(self, auth_service, temp_dir, monkeypatch):
+        """検索索引を置いたテストクライアント"""
+        import pandas as pd
+
+        import api
+        from config import config
+        from search import ProductSearchIndex
+
+        monkeypatch.setattr(config.paths, "data_dir", temp_dir)
+        index = ProductSearchIndex()
+        index.update(
+            pd.DataFrame(
+                {
+                    "asin": ["B000", "B001", "B002"],
+                    "name": ["ワイヤレスイヤホン ブラック", "有線イヤホン", "ワイヤレスマウス"],
+                    "category": ["家電", "家電", "PC"],
+                    "price": [3980, 1200, 1980],
+                    "rating": [4.3, 3.8, 4.1],
+                    "current_rank": [5, 3, 8],
+                }
+            )
+        )
+        index.save()
+
+        monkeypatch.setattr(api, "AuthService", lambda: auth_service)
+        return TestClient(api.create_app())
+
+    def test_search(self, client, test_user):
+        """一致度の高い順に返し、カテゴリ・価格・評価で絞り込める"""
+        _, raw_key = test_user
+        response = client.get("/products/search?q=イヤホン", headers={"X-API-Key": raw_key})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == 2
+        assert [item["asin"] for item in data["items"]] == ["B001", "B000"]
+        assert data["items"][0]["price"] == 1200.0
+        assert data["items"][0]["affiliate_url"].startswith("https://")
+
+        for query, expected in (
+            ("q=ワイヤレス&category=PC", ["B002"]),
+            ("q=ワイヤレス　イヤホン", ["B000"]),
+            ("q=イヤホン&max_price=2000", ["B001"]),
+            ("q=イヤホン&min_rating=4", ["B000"]),
+            ("q=ヘッドホン", []),
+            ("q=線", ["B001"]),
+        ):
+            response = client.get(f"/products/search?{query}", headers={"X-API-Key": raw_key})
+            assert [item["asin"] for item in response.json()["items"]] == expected
+
+    def test_invalid_query(self, client, test_user):
+        """検索語のないqと範囲外のlimitは400"""
+        _, raw_key = test_user
+        for query in ("q=%20", "q=%E3%80%80", "q=イヤホン&limit=0", "q=イヤホン&limit=101"):
+            response = client.get(f"/products/search?{query}", headers={"X-API-Key": raw_key})
+            assert response.status_code == 400
+
+
+@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not installed")
+class TestProductEndpoints:
+    """商品詳細・時系列エンドポイントのテスト"""
+
+    @pytest.fixture
+    def client(self, auth_service, temp_dir, monkeypatch):
+        """商品の時系列を置いたテストクライアント"""
+        import pandas as pd
+
+        import api
+        from config import config
+        from products import ProductSeriesIndex
+
+        monkeypatch.setattr(config.paths, "data_dir", temp_dir)
+        index = ProductSeriesIndex()
+        for day, rank, price in ((1, 9, 1000.0), (2, 4, 900.0), (3, 6, 950.0)):
+            index.update(
+                pd.DataFrame(
+                    {
+                        "asin": ["B001"],
+                        "name": ["ワイヤレスイヤホン"],
+                        "category": ["家電"],
+                        "current_rank": [rank],
+                        "price": [price],
+                        "timestamp": [f"2026-01-0{day}T10:00:00"],
+                    }
+                ),
+                pd.Series([float(10 - rank)]),
+            )
+        index.save()
+
+        monkeypatch.setattr(api, "AuthService", lambda: auth_service)
+        return TestClient(api.create_app())
+
+    def test_product_detail(self, client, test_user):
+        """最新の観測値と全期間の要約、未登録のASINは404"""
+        _, raw_key = test_user
+        response = client.get("/products/B001", headers={"X-API-Key": raw_key})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["name"] == "ワイヤレスイヤホン"
+        assert (data["current_rank"], data["price"], data["trend_score"]) == (6, 950.0, 4.0)
+        assert (data["observations"], data["best_rank"], data["min_price"]) == (3, 4, 900.0)
+        assert data["affiliate_url"].startswith("https://")
+
+        response = client.get("/products/B999", headers={"X-API-Key": raw_key})
+        assert response.status_code == 404
+
+    def test_product_history(self, client, test_user):
+        """期間で絞り込んだ時系列、不正な日付は400"""
+        _, raw_key = test_user
+        response = client.get(
+            "/products/B001/history?from=2026-01-02", headers={"X-API-Key": raw_key}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["from"], data["to"], data["count"]) == ("2026-01-02", None, 2)
+        assert data["series"]["timestamp"] == ["2026-01-02T10:00:00", "2026-01-03T10:00:00"]
+        assert data["series"]["current_rank"] == [4, 6]
+        assert data["series"]["trend_score"] == [6.0, 4.0]
+
+        response = client.get(
+            "/products/B001/history?to=2026-13-01", headers={"X-API-Key": raw_key}
+        )
+        assert response.status_code == 400
+        response = client.get("/products/B999/history", headers={"X-API-Key": raw_key})
+        assert response.status_code == 404
+
+
+@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not installed")
+class TestWatchlistEndpoints:
+    """ウォッチリストエンドポイントのテスト"""
+
+    @pytest.fixture
+    def client(self, auth_service, temp_dir, monkeypatch):
+        import api
+        from config import config
+
+        monkeypatch.setattr(config.paths, "data_dir", temp_dir)
+        monkeypatch.setattr(api, "AuthService", lambda: auth_service)
+        return TestClient(api.create_app())
+
+    def test_update_and_alerts(self, client, auth_service, plan_api_key):
+        """登録したウォッチリストで照合した通知を返す"""
+        import pandas as pd
+
+        from watchlist import WatchlistMatcher, append_alerts
+
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.put(
+            "/watchlist",
+            json={"asins": ["B001"], "keywords": ["イヤホン", "イヤホン"]},
+            headers={"X-API-Key": api_key},
+        )
+        assert response.status_code == 200
+        assert response.json()["keywords"] == ["イヤホン"]
+        assert client.get("/watchlist", headers={"X-API-Key": api_key}).json()["asins"] == ["B001"]
+
+        matcher = WatchlistMatcher.from_store(auth=auth_service)
+        append_alerts(
+            matcher.match(
+                pd.DataFrame(
+                    {
+                        "asin": ["B001", "B002"],
+                        "name": ["充電器", "ワイヤレスイヤホン"],
+                        "category": "家電",
+                        "current_rank": [3, 8],
+                        "previous_rank": [5, None],
+                        "timestamp": "2026-01-01T10:00:00",
+                    }
+                )
+            )
+        )
+
+        data = client.get("/watchlist/alerts", headers={"X-API-Key": api_key}).json()
+        assert data["count"] == 2
+        assert [(item["asin"], item["kind"]) for item in data["items"]] == [
+            ("B002", "keyword"),
+            ("B001", "asin"),
+        ]
+        assert data["items"][1]["previous_rank"] == 5.0
+        assert data["items"][0]["affiliate_url"].startswith("https://")
+
+    def test_invalid_watchlist(self, client, plan_api_key):
+        """短すぎるキーワードと範囲外のhoursは400"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.put(
+            "/watchlist", json={"keywords": ["黒"]}, headers={"X-API-Key": api_key}
+        )
+        assert response.status_code == 400
+        assert (
+            client.get("/watchlist/alerts?hours=0", headers={"X-API-Key": api_key}).status_code
+            == 400
+        )
+
+    def test_requires_pro(self, client, plan_api_key):
+        """FREEプランは403"""
+        api_key = plan_api_key(SubscriptionPlan.FREE)
+        assert client.get("/watchlist", headers={"X-API-Key": api_key}).status_code == 403
+        response = client.put(
+            "/watchlist", json={"asins": ["B001"]}, headers={"X-API-Key": api_key}
+        )
+        assert response.status_code == 403
+
+
+@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not installed")
+class TestExportEndpoints:
+    """エクスポートエンドポイントのテスト（履歴データ）"""
+
+    @pytest.fixture
+    def client(self, auth_service, temp_dir, monkeypatch):
+        """一時ユーザーストア・一時生データを使うテストクライアント"""
+        import api
+        from config import config
+
+        raw_dir = temp_dir / "raw"
+        raw_dir.mkdir()
+        header = "asin,name,category,current_rank,rank_change_percent,price,review_count,rating,timestamp\n"
+        for day in ("20260101", "20260102"):
+            rows = "".join(
+                f"B00{i},商品{i},家電,{i + 1},5.0,1000,10,4.5,{day[:4]}-{day[4:6]}-{day[6:]}T10:00:00\n"
+                for i in range(3)
+            )
+            (raw_dir / f"products_{day}_100000.csv").write_text(header + rows, encoding="utf-8")
+
+        from exporter import PYARROW_AVAILABLE, build_columnar_snapshots
+
+        if PYARROW_AVAILABLE:
+            build_columnar_snapshots(raw_dir, temp_dir / "export")
+
+        monkeypatch.setattr(config.paths, "data_dir", temp_dir)
+        monkeypatch.setattr(config.paths, "raw_data_dir", raw_dir)
+        monkeypatch.setattr(api, "AuthService", lambda: auth_service)
+        return TestClient(api.create_app())
+
+    def test_csv_streams_history(self, client, plan_api_key):
+        """CSVは期間内の履歴を全行返す"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.get("/export/csv", headers={"X-API-Key": api_key})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        lines = response.text.strip().splitlines()
+        assert lines[0].startswith("timestamp,asin,name,category")
+        assert len(lines) == 7
+
+    def test_csv_date_range(self, client, plan_api_key):
+        """from/toで期間を絞り込める"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.get(
+            "/export/csv?from=2026-01-02&to=2026-01-02&category=家電",
+            headers={"X-API-Key": api_key},
+        )
+        assert response.status_code == 200
+        rows = response.text.strip().splitlines()[1:]
+        assert len(rows) == 3
+        assert all(row.startswith("2026-01-02") for row in rows)
+
+    def test_csv_invalid_date(self, client, plan_api_key):
+        """不正な日付は400"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.get("/export/csv?to=yesterday", headers={"X-API-Key": api_key})
+        assert response.status_code == 400
+
+    def test_ndjson(self, client, plan_api_key):
+        """NDJSONは1行1レコード"""
+        import json
+
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.get("/export/ndjson?from=2026-01-02", headers={"X-API-Key": api_key})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert len(records) == 3
+        assert records[0]["asin"] == "B000"
+
+    def test_columnar_requires_pro(self, client, plan_api_key):
+        """Parquet / ArrowはPRO以上"""
+        api_key = plan_api_key(SubscriptionPlan.FREE)
+        for path in ("/export/ndjson", "/export/parquet", "/export/arrow"):
+            assert client.get(path, headers={"X-API-Key": api_key}).status_code == 403
+
+    def test_parquet(self, client, plan_api_key):
+        """単一日はスナップショットをそのまま、複数日は結合して返す"""
+        pytest.importorskip("pyarrow")
+        import io
+
+        import pyarrow.parquet as pq
+
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        single = client.get(
+            "/export/parquet?from=2026-01-01&to=2026-01-01", headers={"X-API-Key": api_key}
+        )
+        assert single.status_code == 200
+        assert pq.read_table(io.BytesIO(single.content)).num_rows == 3
+
+        merged = client.get("/export/parquet", headers={"X-API-Key": api_key})
+        assert merged.status_code == 200
+        assert merged.headers["content-type"].startswith("application/vnd.apache.parquet")
+        assert pq.read_table(io.BytesIO(merged.content)).num_rows == 6
+
+    def test_arrow(self, client, plan_api_key):
+        """Arrow IPCストリームを返す"""
+        pytest.importorskip("pyarrow")
+        import pyarrow.ipc as pa_ipc
+
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+        response = client.get("/export/arrow?category=家電", headers={"X-API-Key": api_key})
+        assert response.status_code == 200
+        assert pa_ipc.open_stream(response.content).read_all().num_rows == 6
+
+        response = client.get("/export/arrow?from=2027-01-01", headers={"X-API-Key": api_key})
+        assert response.status_code == 404
+
+    def test_negotiation(self, client, plan_api_key):
+        """Acceptヘッダーでフォーマットを選択"""
+        api_key = plan_api_key(SubscriptionPlan.PRO)
+
+        response = client.get(
+            "/export", headers={"X-API-Key": api_key, "Accept": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        response = client.get(
+            "/export", headers={"X-API-Key": api_key, "Accept": "text/csv;q=0.8, image/png"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+
+        response = client.get("/export", headers={"X-API-Key": api_key, "Accept": "image/png"})
+        assert response.status_code == 406
+
+        # xlsxはENTERPRISEのみ
+        response = client.get(
+            "/export",
+            headers={
+                "X-API-Key": api_key,
+                "Accept": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            },
         )
-        # FREEユーザーは403
         assert response.status_code == 403
 
+    def test_xlsx_requires_enterprise(self, client, plan_api_key):
+        """xlsx出力はENTERPRISEのみ"""
+        for plan in (SubscriptionPlan.FREE, SubscriptionPlan.PRO):
+            api_key = plan_api_key(plan)
+            response = client.get("/export/xlsx", headers={"X-API-Key": api_key})
+            assert response.status_code == 403
+
+    def test_xlsx_invalid_date(self, client, plan_api_key):
+        """不正な日付は400"""
+        pytest.importorskip("xlsxwriter")
+        api_key = plan_api_key(SubscriptionPlan.ENTERPRISE)
+        response = client.get("/export/xlsx?from=2026/01/01", headers={"X-API-Key": api_key})
+        assert response.status_code == 400
+
+    def test_xlsx_enterprise(self, client, plan_api_key):
+        """ENTERPRISEはxlsxを取得できる"""
+        pytest.importorskip("xlsxwriter")
+        import io
+        import zipfile
+
+        api_key = plan_api_key(SubscriptionPlan.ENTERPRISE)
+        response = client.get("/export/xlsx?from=2026-01-02", headers={"X-API-Key": api_key})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith(
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
+            sheet = zf.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        assert sheet.count("<row ") == 4
+
 
 @pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not installed")
 class TestNewsletterEndpoints:
@@ -763,15 +1370,13 @@ class TestNewsletterEndpoints:
         (temp_dir / "data").mkdir(exist_ok=True)
 
         from api import create_app
+
         app = create_app()
         return TestClient(app)
 
     def test_newsletter_subscribe_success(self, client):
         """ニュースレター購読登録 - 正常系"""
-        response = client.post(
-            "/api/newsletter/subscribe",
-            json={"email": "subscribe@example.com"}
-        )
+        response = client.post("/api/newsletter/subscribe", json={"email": "subscribe@example.com"})
         assert response.status_code == 200
         data = response.json()
         assert data["success"] is True
@@ -779,10 +1384,7 @@ class TestNewsletterEndpoints:
 
     def test_newsletter_subscribe_invalid_email(self, client):
         """ニュースレター購読登録 - 無効なメール"""
-        response = client.post(
-            "/api/newsletter/subscribe",
-            json={"email": "invalid-email"}
-        )
+        response = client.post("/api/newsletter/subscribe", json={"email": "invalid-email"})
         assert response.status_code == 422  # Validation Error
 
     def test_newsletter_subscribe_duplicate(self, client):
@@ -790,17 +1392,11 @@ class TestNewsletterEndpoints:
         email = "duplicate@example.com"
 
         # 1回目
-        response1 = client.post(
-            "/api/newsletter/subscribe",
-            json={"email": email}
-        )
+        response1 = client.post("/api/newsletter/subscribe", json={"email": email})
         assert response1.status_code == 200
 
         # 2回目（重複）
-        response2 = client.post(
-            "/api/newsletter/subscribe",
-            json={"email": email}
-        )
+        response2 = client.post("/api/newsletter/subscribe", json={"email": email})
         assert response2.status_code == 200
         data = response2.json()
         assert data["success"] is True
@@ -819,6 +1415,7 @@ class TestHealthEndpoints:
         (temp_dir / "data").mkdir(exist_ok=True)
 
         from api import create_app
+
         app = create_app()
         return TestClient(app)
 
@@ -863,6 +1460,7 @@ class TestClickTrackingEndpoints:
         (temp_dir / "data").mkdir(exist_ok=True)
 
         from api import create_app
+
         app = create_app()
         return TestClient(app)
 
@@ -874,10 +1472,12 @@ class TestClickTrackingEndpoints:
         (temp_dir / "data").mkdir(exist_ok=True)
 
         from api import create_app
+
         app = create_app()
         client = TestClient(app)
 
         import uuid
+
         email = f"tracking_{uuid.uuid4().hex[:8]}@example.com"
         reg_resp = client.post("/users/register", json={"email": email})
         api_key = reg_resp.json()["api_key"]
@@ -894,8 +1494,8 @@ class TestClickTrackingEndpoints:
                 "category": "electronics",
                 "price": 1980,
                 "rank": 100,
-                "source": "website"
-            }
+                "source": "website",
+            },
         )
         assert response.status_code == 200
         data = response.json()
@@ -905,11 +1505,7 @@ class TestClickTrackingEndpoints:
     def test_track_click_minimal(self, client):
         """クリック追跡 - 最小パラメータ"""
         response = client.post(
-            "/api/track/click",
-            json={
-                "asin": "B098765432",
-                "product_name": "最小商品"
-            }
+            "/api/track/click", json={"asin": "B098765432", "product_name": "最小商品"}
         )
         assert response.status_code == 200
         data = response.json()
@@ -917,12 +1513,7 @@ class TestClickTrackingEndpoints:
 
     def test_track_click_invalid_asin(self, client):
         """クリック追跡 - ASINなし"""
-        response = client.post(
-            "/api/track/click",
-            json={
-                "product_name": "商品名のみ"
-            }
-        )
+        response = client.post("/api/track/click", json={"product_name": "商品名のみ"})
         assert response.status_code == 422  # Validation Error
 
     def test_get_click_stats_requires_auth(self, client):
@@ -941,8 +1532,8 @@ class TestClickTrackingEndpoints:
                 "asin": "B011111111",
                 "product_name": "統計テスト商品1",
                 "category": "books",
-                "source": "dashboard"
-            }
+                "source": "dashboard",
+            },
         )
         client.post(
             "/api/track/click",
@@ -950,15 +1541,12 @@ class TestClickTrackingEndpoints:
                 "asin": "B022222222",
                 "product_name": "統計テスト商品2",
                 "category": "electronics",
-                "source": "sample"
-            }
+                "source": "sample",
+            },
         )
 
         # 統計取得
-        response = client.get(
-            "/api/track/stats",
-            headers={"X-API-Key": api_key}
-        )
+        response = client.get("/api/track/stats", headers={"X-API-Key": api_key})
         assert response.status_code == 200
         data = response.json()
         assert "total_clicks" in data
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+archive.pyモジュールのテスト
+
+インクリメンタルレポートアーカイブのテスト
+"""
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from analyzer import TrendAnalyzer
+from archive import ReportArchiveBuilder, category_slug, group_raw_files_by_day
+
+CSV_HEADER = (
+    "asin,name,category,current_rank,previous_rank,rank_change,rank_change_percent,"
+    "price,currency,review_count,rating,affiliate_url,timestamp,source\n"
+)
+
+
+def _write_day(data_dir: Path, day: str, change: int = 100, category: str = "家電&カメラ") -> Path:
+    """1日分の生データを作成"""
+    rows = "".join(
+        f"B00{i}{day[-2:]},商品{i},{category},{i + 1},,{change},{change + i}.0,"
+        f"{1000 * (i + 1)},JPY,{100 * (i + 1)},4.5,https://amazon.co.jp/dp/B00{i}?tag=test,"
+        f"{day[:4]}-{day[4:6]}-{day[6:]}T10:00:00,test\n"
+        for i in range(3)
+    )
+    path = data_dir / f"products_{day}_100000.csv"
+    path.write_text(CSV_HEADER + rows, encoding="utf-8-sig")
+    return path
+
+
+class TestReportArchiveBuilder:
+    """ReportArchiveBuilderのテスト"""
+
+    @pytest.fixture
+    def data_dir(self, tmp_path: Path) -> Path:
+        """3日分の生データ"""
+        data_dir = tmp_path / "raw"
+        data_dir.mkdir()
+        for day in ["20260101", "20260102", "20260103"]:
+            _write_day(data_dir, day)
+        return data_dir
+
+    @pytest.fixture
+    def builder(self, data_dir: Path, tmp_path: Path) -> ReportArchiveBuilder:
+        """ページあたり2日のビルダー"""
+        return ReportArchiveBuilder(data_dir=data_dir, archive_dir=tmp_path / "archive", per_page=2)
+
+    def test_group_raw_files_by_day(self, data_dir: Path):
+        """ファイルが日付ごとにまとまる"""
+        source = data_dir / "products_20260103_100000.csv"
+        (data_dir / "products_20260103_180000.csv").write_bytes(source.read_bytes())
+        days = group_raw_files_by_day(data_dir)
+
+        assert list(days) == ["20260101", "20260102", "20260103"]
+        assert len(days["20260103"]) == 2
+
+    def test_initial_build(self, builder: ReportArchiveBuilder):
+        """初回ビルドで全日・全ページが生成される"""
+        result = builder.build()
+
+        assert result.rebuilt_days == ["20260101", "20260102", "20260103"]
+        archive = builder.archive_dir
+        assert (archive / "index.html").exists()
+        assert (archive / "pages" / "page-1.html").exists()
+        assert (archive / "pages" / "page-2.html").exists()
+        assert (archive / "days" / "trends_20260102.html").exists()
+        assert (archive / "category" / "electronics" / "page-1.html").exists()
+
+        manifest = json.loads((archive / "manifest.json").read_text(encoding="utf-8"))
+        assert set(manifest["days"]) == {"20260101", "20260102", "20260103"}
+
+    def test_rebuild_skips_unchanged_days(self, builder: ReportArchiveBuilder):
+        """変更のない日は再生成されない"""
+        builder.build()
+
+        with patch.object(builder, "_build_day", wraps=builder._build_day) as mock_build:
+            result = builder.build()
+
+        assert mock_build.call_count == 0
+        assert result.rebuilt_days == []
+        assert len(result.skipped_days) == 3
+        assert result.pages_written == 0
+
+    def test_changed_day_is_rebuilt(self, builder: ReportArchiveBuilder, data_dir: Path):
+        """内容が変わった日のみ再生成される"""
+        builder.build()
+        _write_day(data_dir, "20260102", change=300)
+
+        result = builder.build()
+
+        assert result.rebuilt_days == ["20260102"]
+        page = (builder.archive_dir / "pages" / "page-1.html").read_text(encoding="utf-8")
+        assert "+300%" in page
+
+    def test_score_definitions(self, data_dir: Path, tmp_path: Path):
+        """設定したスコア定義で採点し、定義を変えると全日を再生成する"""
+        scores_path = tmp_path / "scores.json"
+        builder = ReportArchiveBuilder(
+            data_dir=data_dir, archive_dir=tmp_path / "archive", scores_path=scores_path
+        )
+        builder.build()
+        assert builder.build().rebuilt_days == []
+
+        weights = {"rank_change": 0.0, "reviews": 0.0, "rating": 0.0}
+        scores_path.write_text(json.dumps({"default": {"weights": weights}}), encoding="utf-8")
+        with patch("analyzer.TrendAnalyzer", wraps=TrendAnalyzer) as analyzer:
+            result = builder.build()
+
+        assert result.rebuilt_days == ["20260101", "20260102", "20260103"]
+        assert analyzer.call_args.kwargs["scoring"] is builder.scoring
+        assert builder.scoring.definitions["default"].weights["rank_change"] == 0.0
+        assert builder.build().rebuilt_days == []
+
+    def test_new_day_keeps_old_pages(self, builder: ReportArchiveBuilder, data_dir: Path):
+        """新しい日を追加しても古いページは書き換えない"""
+        builder.build()
+        page1 = builder.archive_dir / "pages" / "page-1.html"
+        mtime = page1.stat().st_mtime_ns
+
+        _write_day(data_dir, "20260104")
+        result = builder.build()
+
+        assert result.rebuilt_days == ["20260104"]
+        assert page1.stat().st_mtime_ns == mtime
+        index = (builder.archive_dir / "index.html").read_text(encoding="utf-8")
+        assert "2026/01/04" in index
+
+    def test_removed_day(self, builder: ReportArchiveBuilder, data_dir: Path):
+        """ソースが削除された日はアーカイブからも削除される"""
+        builder.build()
+        (data_dir / "products_20260103_100000.csv").unlink()
+
+        result = builder.build()
+
+        assert result.removed_days == ["20260103"]
+        assert not (builder.archive_dir / "days" / "trends_20260103.html").exists()
+        assert not (builder.archive_dir / "pages" / "page-2.html").exists()
+
+    def test_force_rebuilds_all(self, builder: ReportArchiveBuilder):
+        """force指定で全日を再生成"""
+        builder.build()
+        result = builder.build(force=True)
+        assert len(result.rebuilt_days) == 3
+
+
+class TestCategorySlug:
+    """category_slugのテスト"""
+
+    def test_known_category(self):
+        """既知カテゴリは英字スラッグ"""
+        assert category_slug("家電&カメラ") == "electronics"
+
+    def test_unknown_category(self):
+        """未知カテゴリはハッシュベース"""
+        slug = category_slug("未知のカテゴリ")
+        assert slug.startswith("cat-")
+        assert slug == category_slug("未知のカテゴリ")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+backfill.pyモジュールのテスト
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from backfill import backfill_day, run_backfill
+
+CSV_HEADER = (
+    "asin,name,category,current_rank,rank_change_percent,price,review_count,rating,timestamp\n"
+)
+
+
+def _write_run(data_dir: Path, day: str, time: str = "100000", change: int = 100) -> Path:
+    """1回分の生データを作成"""
+    rows = "".join(
+        f"B00{i},商品{i},家電,{i + 1},{change + i}.0,{1000 * (i + 1)},{100 * (i + 1)},4.5,"
+        f"{day[:4]}-{day[4:6]}-{day[6:]}T{time[:2]}:00:00\n"
+        for i in range(3)
+    )
+    path = data_dir / f"products_{day}_{time}.csv"
+    path.write_text(CSV_HEADER + rows, encoding="utf-8-sig")
+    return path
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path) -> Path:
+    """4日分の生データ"""
+    data_dir = tmp_path / "raw"
+    data_dir.mkdir()
+    for day in ["20260101", "20260102", "20260103", "20260104"]:
+        _write_run(data_dir, day)
+    return data_dir
+
+
+def test_backfill_day_writes_scored_data_and_reports(data_dir: Path, tmp_path: Path):
+    """スコア付きデータとレポートを書き出し、一時ファイルを残さない"""
+    output_dir = tmp_path / "backfill"
+    late = _write_run(data_dir, "20260101", time="180000", change=300)
+
+    result = backfill_day("20260101", [data_dir / "products_20260101_100000.csv", late], output_dir)
+
+    assert result.rows == 3
+    scored = pd.read_csv(output_dir / "scored" / "scored_20260101.csv", encoding="utf-8-sig")
+    assert scored["rank_change_percent"].tolist() == [300.0, 301.0, 302.0]
+    assert scored["trend_score"].notna().all()
+    assert {p.name for p in result.paths} == {
+        "scored_20260101.csv",
+        "trends_20260101.md",
+        "trends_20260101.html",
+    }
+    assert sorted(p.name for p in output_dir.iterdir()) == [
+        "scored",
+        "trends_20260101.html",
+        "trends_20260101.md",
+    ]
+
+
+def test_run_backfill_date_range(data_dir: Path, tmp_path: Path):
+    """期間内の日だけを日付順に再生成"""
+    result = run_backfill(
+        data_dir, tmp_path / "backfill", date_from="20260102", date_to="20260103", workers=1
+    )
+
+    assert [d.day for d in result.days] == ["20260102", "20260103"]
+    assert result.rows == 6
+    assert not (tmp_path / "backfill" / "trends_20260101.md").exists()
+
+
+def test_run_backfill_process_pool_matches_inline(data_dir: Path, tmp_path: Path):
+    """プロセスプールでも1プロセスと同じ出力"""
+    inline = run_backfill(data_dir, tmp_path / "inline", workers=1, formats=("json",))
+    pooled = run_backfill(data_dir, tmp_path / "pooled", workers=2, formats=("json",))
+
+    assert pooled.workers == 2
+    assert [d.day for d in pooled.days] == [d.day for d in inline.days]
+    for day in inline.days:
+        name = f"scored/scored_{day.day}.csv"
+        assert (tmp_path / "pooled" / name).read_bytes() == (
+            tmp_path / "inline" / name
+        ).read_bytes()
+
+
+def test_run_backfill_uses_score_definitions(data_dir: Path, tmp_path: Path):
+    """スコア定義ファイルの重みでスコア付きデータとレポートを再生成"""
+    import json
+
+    scores_path = tmp_path / "scores.json"
+    scores_path.write_text(
+        json.dumps({"default": {"weights": {"rank_change": 0.0, "reviews": 0.0, "rating": 0.0}}}),
+        encoding="utf-8",
+    )
+
+    run_backfill(
+        data_dir, tmp_path / "backfill", workers=1, formats=("json",), scores_path=scores_path
+    )
+
+    scored = pd.read_csv(
+        tmp_path / "backfill" / "scored" / "scored_20260101.csv", encoding="utf-8-sig"
+    )
+    assert (scored["trend_score"] == 0).all()
+    report = json.loads(
+        (tmp_path / "backfill" / "trends_20260101.json").read_text(encoding="utf-8")
+    )
+    assert [t["trend_score"] for t in report["trends"]] == [0.0, 0.0, 0.0]
+
+
+def test_run_backfill_empty(tmp_path: Path):
+    """生データがない場合は何もしない"""
+    result = run_backfill(tmp_path, tmp_path / "backfill")
+
+    assert result.days == []
+    assert result.rows_per_second == 0.0
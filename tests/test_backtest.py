@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+backtest.pyモジュールのテスト
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import (
+    build_windows,
+    compare_summaries,
+    evaluate_window,
+    load_daily_snapshots,
+    run_backtest,
+    weight_grid,
+)
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path) -> Path:
+    """
+    5日分の生データ
+
+    B00i は毎日 i 位ずつ上昇し、変動率は i に比例、レビュー数は i に反比例する
+    """
+    data_dir = tmp_path / "raw"
+    data_dir.mkdir()
+    for day in range(1, 6):
+        pd.DataFrame(
+            {
+                "asin": [f"B00{i}" for i in range(10)],
+                "name": [f"商品{i}" for i in range(10)],
+                "category": "家電",
+                "current_rank": [100 - day * i for i in range(10)],
+                "rank_change_percent": [10.0 * i for i in range(10)],
+                "review_count": [(10 - i) * 100 for i in range(10)],
+                "timestamp": f"2026-01-{day:02d}T10:00:00",
+            }
+        ).to_csv(
+            data_dir / f"products_202601{day:02d}_100000.csv", index=False, encoding="utf-8-sig"
+        )
+    return data_dir
+
+
+@pytest.fixture
+def windows(data_dir: Path) -> list:
+    return build_windows(load_daily_snapshots(data_dir), horizon=2, momentum=False)
+
+
+def test_weight_grid():
+    """指定しない構成要素は1.0"""
+    grid = weight_grid(rank_change=[0.5, 1.0], reviews=[0.0, 1.0, 2.0])
+
+    assert grid.shape == (6, 4)
+    assert grid[:, 2:].tolist() == [[1.0, 1.0]] * 6
+    with pytest.raises(ValueError):
+        weight_grid(unknown=[1.0])
+
+
+def test_weight_grid_uses_score_definitions(tmp_path: Path, monkeypatch):
+    """現在のスコアの重みは data/scores.json の default.weights"""
+    import json
+
+    from config import config
+
+    monkeypatch.setattr(config.paths, "data_dir", tmp_path)
+    (tmp_path / "scores.json").write_text(
+        json.dumps({"default": {"weights": {"rank_change": 2.0, "momentum": 0.0}}}),
+        encoding="utf-8",
+    )
+
+    assert weight_grid().tolist() == [[2.0, 1.0, 1.0, 0.0]]
+    assert weight_grid(reviews=[0.0, 1.0])[:, 0].tolist() == [2.0, 2.0]
+    assert weight_grid({}).tolist() == [[1.0, 1.0, 1.0, 1.0]]
+
+
+def test_build_windows(windows):
+    """翌日以降の収集がない最終日は除き、先の日の収集がなければ未観測"""
+    assert [w.day.day for w in windows] == [1, 2, 3, 4]
+    assert windows[0].future_rank[3].tolist() == [94.0, 91.0]
+    assert windows[-1].observed.tolist() == [True, False]
+
+
+def test_evaluate_window(windows):
+    """変動率のみの重みは上昇を言い当て、レビュー数のみの重みは逆相関"""
+    weights = np.array([[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]])
+
+    result = evaluate_window(windows[0], weights, top_k=3)
+
+    precision, persistence, spearman = result[:, 0, 0], result[:, 0, 1], result[:, 0, 2]
+    assert precision.tolist() == pytest.approx([1.0, 2 / 3])
+    assert persistence.tolist() == [1.0, 1.0]
+    assert spearman.tolist() == pytest.approx([1.0, -1.0])
+
+
+def test_run_backtest_summary(windows):
+    """重み・ホライズンごとの平均指標（ワーカー数によらず同じ）"""
+    grid = weight_grid(rank_change=[0.0, 1.0], reviews=[0.0, 1.0], momentum=[0.0])
+
+    result = run_backtest(windows, grid, top_k=3, workers=1)
+    pooled = run_backtest(windows, grid, top_k=3, workers=2)
+
+    assert len(result.summary) == 4 * 2
+    assert result.summary[result.summary["horizon"] == 2]["days"].max() == 3
+    assert result.best("spearman")[["rank_change", "reviews"]].tolist() == [1.0, 0.0]
+    pd.testing.assert_frame_equal(result.summary, pooled.summary)
+
+
+def test_compare_summaries(windows):
+    """同じ重み同士の指標の差分"""
+    base = run_backtest(windows, weight_grid(), top_k=3, workers=1).summary
+    other = base.assign(precision_at_k=base["precision_at_k"] - 0.25)
+
+    compared = compare_summaries(base, other)
+
+    assert compared["precision_at_k_diff"].tolist() == [-0.25, -0.25]
+
+
+def test_empty(tmp_path: Path):
+    """データがない場合は評価しない"""
+    result = run_backtest(build_windows(load_daily_snapshots(tmp_path)))
+
+    assert result.windows == 0
+    assert result.summary.empty
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+dedup.pyモジュールのテスト
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dedup import (
+    MinHasher,
+    ProductClusters,
+    cluster_signatures,
+    collapse_duplicates,
+    connected_components,
+    normalize_name,
+    shingle_hashes,
+)
+
+NAMES = {
+    "B001": "【Amazon限定】ワイヤレスイヤホン Bluetooth 5.3 ノイズキャンセリング ブラック",
+    "B002": "【Amazon限定】ワイヤレスイヤホン Bluetooth 5.3 ノイズキャンセリング ホワイト",
+    "B003": "ワイヤレスイヤホン Ｂｌｕｅｔｏｏｔｈ５.３ ノイズキャンセリング（ブラック）",
+    "B004": "Nintendo Switch 有機ELモデル",
+    "B005": "電動歯ブラシ 音波式 替えブラシ4本付き",
+}
+
+
+def products(names: dict[str, str]) -> pd.DataFrame:
+    return pd.DataFrame({"asin": list(names), "name": list(names.values())})
+
+
+def test_normalize_name():
+    """全角・半角と大文字・小文字を揃え、空白と記号を除く"""
+    assert normalize_name("Ｂｌｕｅｔｏｏｔｈ ５.３【黒】") == "bluetooth53黒"
+    assert normalize_name(None) == ""
+
+
+def test_shingle_hashes():
+    """同じn-gramは同じハッシュ値、短い商品名は全体で1つ、空の商品名はなし"""
+    hashes, starts = shingle_hashes(["abcd", "", "ab", "bcd"])
+
+    assert starts.tolist() == [0, 2, 2, 3]
+    assert len(hashes) == 4
+    assert hashes[1] == hashes[3]  # "bcd"
+
+
+def test_signature_agreement_estimates_jaccard():
+    """署名の一致率はn-gram集合のJaccard係数に近い"""
+    hasher = MinHasher(num_perm=256)
+    a = "ワイヤレスイヤホンノイズキャンセリングブラック"
+    b = "ワイヤレスイヤホンノイズキャンセリングホワイト"
+    grams = [{s[i : i + 3] for i in range(len(s) - 2)} for s in (a, b)]
+    jaccard = len(grams[0] & grams[1]) / len(grams[0] | grams[1])
+
+    signatures = hasher.signatures([a, b, ""])
+
+    assert (signatures[0] == signatures[1]).mean() == pytest.approx(jaccard, abs=0.1)
+    assert (signatures[2] == np.iinfo(np.uint32).max).all()
+
+
+def test_connected_components():
+    """連結成分のラベルは成分内の最小の頂点番号"""
+    labels = connected_components(6, np.array([4, 1, 5]), np.array([5, 3, 1]))
+
+    assert labels.tolist() == [0, 1, 2, 1, 1, 1]
+
+
+class TestProductClusters:
+    """ProductClustersのテスト"""
+
+    def test_clusters_variants(self):
+        """色違い・表記ゆれは同じクラスタ、別商品は別クラスタ"""
+        clusters = ProductClusters.from_frame(products(NAMES))
+
+        keys = clusters.cluster_keys(["B003", "B002", "B001", "B004", "B005", "B999"])
+
+        assert keys.tolist() == ["B001", "B001", "B001", "B004", "B005", "B999"]
+        table = clusters.clusters()
+        assert table["asin"].tolist() == ["B001", "B002", "B003"]
+        assert table["size"].tolist() == [3, 3, 3]
+
+    def test_update_only_new_and_renamed(self):
+        """署名を計算するのは新しいASINと商品名の変わったASINだけ"""
+        clusters = ProductClusters.from_frame(products(NAMES))
+
+        assert clusters.update(products(NAMES)) == 0
+        renamed = {"B004": NAMES["B001"], "B006": "USBケーブル"}
+        assert clusters.update(products(renamed)) == 2
+        assert clusters.cluster_keys(["B004"]).tolist() == ["B001"]
+        assert len(clusters) == 6
+
+    def test_large_batch_is_linear(self):
+        """バリエーションのペアだけがまとまる（全ペアを比べない）"""
+        rng = np.random.default_rng(0)
+        words = [f"語{i:03d}" for i in range(500)]
+        base = [" ".join(rng.choice(words, 8)) for _ in range(500)]
+        names = base + [name + " レッド" for name in base]
+        signatures = MinHasher().signatures(names)
+
+        labels = cluster_signatures(signatures, bands=16, threshold=0.6)
+
+        assert (labels[500:] == np.arange(500)).all()
+        assert len(np.unique(labels)) == 500
+
+    def test_save_and_load(self, tmp_path: Path):
+        """保存した状態から同じクラスタを引く"""
+        clusters = ProductClusters.from_frame(products(NAMES))
+        path = clusters.save(tmp_path / "product_clusters.npz")
+
+        loaded = ProductClusters.load(path)
+
+        assert (
+            loaded.cluster_keys(list(NAMES)).tolist() == clusters.cluster_keys(list(NAMES)).tolist()
+        )
+        assert loaded.update(products(NAMES)) == 0
+        assert len(ProductClusters.load(tmp_path / "missing.npz")) == 0
+
+    def test_invalid_bands(self):
+        with pytest.raises(ValueError):
+            ProductClusters(num_perm=64, bands=10)
+
+
+def test_collapse_duplicates():
+    """クラスタごとに先頭の行を残し、byの列が違えば別に残す"""
+    df = products(NAMES).assign(category=["家電", "家電", "本", "ゲーム", "家電"])
+
+    assert collapse_duplicates(df)["asin"].tolist() == ["B001", "B004", "B005"]
+    assert collapse_duplicates(df, by="category")["asin"].tolist() == [
+        "B001",
+        "B003",
+        "B004",
+        "B005",
+    ]
+    assert collapse_duplicates(df.iloc[[2, 0, 1]])["asin"].tolist() == ["B003"]
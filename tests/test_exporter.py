@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+exporter.pyモジュールのテスト
+"""
+
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from exporter import (
+    EXPORT_COLUMNS,
+    PYARROW_AVAILABLE,
+    XLSXWRITER_AVAILABLE,
+    build_columnar_snapshots,
+    cached_parquet,
+    iter_arrow_tables,
+    iter_history_rows,
+    list_raw_files,
+    negotiate_format,
+    parse_date,
+    stream_arrow,
+    stream_csv,
+    stream_file,
+    stream_ndjson,
+    stream_xlsx,
+    write_products_snapshot,
+    write_xlsx,
+)
+
+CSV_HEADER = (
+    "asin,name,category,current_rank,previous_rank,rank_change,rank_change_percent,"
+    "price,currency,review_count,rating,affiliate_url,timestamp,source\n"
+)
+
+
+@pytest.fixture
+def raw_dir(tmp_path: Path) -> Path:
+    """3日分の生データ"""
+    data_dir = tmp_path / "raw"
+    data_dir.mkdir()
+    for day, category in [("20260101", "家電"), ("20260102", "ゲーム"), ("20260103", "家電")]:
+        rows = "".join(
+            f"B{day[-2:]}{i},商品{i},{category},{i + 1},,10,10.0,{1000 + i},JPY,{i},4.5,"
+            f"https://amazon.co.jp/dp/B{i},{day[:4]}-{day[4:6]}-{day[6:]}T10:00:00,test\n"
+            for i in range(4)
+        )
+        (data_dir / f"products_{day}_100000.csv").write_text(
+            CSV_HEADER + rows, encoding="utf-8-sig"
+        )
+    (data_dir / "notes.csv").write_text("ignored", encoding="utf-8")
+    return data_dir
+
+
+class TestParseDate:
+    """parse_dateのテスト"""
+
+    def test_formats(self):
+        """ハイフンあり・なし両方を受け付ける"""
+        assert parse_date("2026-01-05") == date(2026, 1, 5)
+        assert parse_date("20260105") == date(2026, 1, 5)
+        assert parse_date(None) is None
+
+    def test_invalid(self):
+        """不正な形式はValueError"""
+        with pytest.raises(ValueError):
+            parse_date("2026/01/05")
+
+
+class TestHistoryRows:
+    """履歴行イテレータのテスト"""
+
+    def test_list_raw_files_range(self, raw_dir: Path):
+        """期間外のファイルは除外される"""
+        files = list_raw_files(raw_dir, date(2026, 1, 2), date(2026, 1, 3))
+        assert [f.name[9:17] for f in files] == ["20260102", "20260103"]
+
+    def test_iter_all(self, raw_dir: Path):
+        """全行が時刻順に返る"""
+        rows = list(iter_history_rows(raw_dir))
+        assert len(rows) == 12
+        assert list(rows[0]) == EXPORT_COLUMNS
+        assert rows[0]["timestamp"].startswith("2026-01-01")
+
+    def test_iter_category(self, raw_dir: Path):
+        """カテゴリで絞り込める"""
+        rows = list(iter_history_rows(raw_dir, category="ゲーム"))
+        assert len(rows) == 4
+        assert {r["category"] for r in rows} == {"ゲーム"}
+
+
+def test_stream_csv_chunks(raw_dir: Path):
+    """ヘッダーを先に送り、以降は指定行数ごとに分割される"""
+    chunks = list(stream_csv(iter_history_rows(raw_dir), chunk_rows=5))
+
+    assert chunks[0].decode("utf-8") == ",".join(EXPORT_COLUMNS) + "\r\n"
+    # 12行 → 5 + 5 + 2
+    assert [c.count(b"\n") for c in chunks[1:]] == [5, 5, 2]
+
+
+def test_stream_ndjson(raw_dir: Path):
+    """1行1オブジェクトで、数値列は数値になる"""
+    import json
+
+    data = b"".join(stream_ndjson(iter_history_rows(raw_dir), chunk_rows=5)).decode("utf-8")
+    records = [json.loads(line) for line in data.splitlines()]
+
+    assert len(records) == 12
+    assert records[0]["current_rank"] == 1
+    assert records[0]["price"] == 1000
+    assert records[0]["name"] == "商品0"
+
+
+class TestNegotiateFormat:
+    """Acceptヘッダーのネゴシエーション"""
+
+    def test_default(self):
+        """ヘッダーなし・ワイルドカードは既定フォーマット"""
+        assert negotiate_format(None) == "json"
+        assert negotiate_format("*/*") == "json"
+
+    def test_quality(self):
+        """q値の高いものが優先される"""
+        accept = "text/csv;q=0.5, application/vnd.apache.parquet, */*;q=0.1"
+        assert negotiate_format(accept) == "parquet"
+        assert negotiate_format("application/x-ndjson;q=0.2, text/csv;q=0.9") == "csv"
+
+    def test_unsupported(self):
+        """対応フォーマットがなければNone"""
+        assert negotiate_format("image/png") is None
+        assert negotiate_format("text/csv;q=0") is None
+
+
+def test_stream_file_deletes(tmp_path: Path):
+    """読み終えたファイルを削除できる"""
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 10)
+    chunks = list(stream_file(path, chunk_size=4, delete=True))
+    assert chunks == [b"xxxx", b"xxxx", b"xx"]
+    assert not path.exists()
+
+
+@pytest.mark.skipif(not XLSXWRITER_AVAILABLE, reason="xlsxwriter not installed")
+class TestXlsx:
+    """xlsx出力のテスト"""
+
+    def test_write_xlsx(self, raw_dir: Path, tmp_path: Path):
+        """行数を返し、ZIPコンテナが生成される"""
+        out = tmp_path / "out.xlsx"
+        count = write_xlsx(iter_history_rows(raw_dir), out)
+
+        assert count == 12
+        assert out.read_bytes()[:2] == b"PK"
+
+    def test_write_xlsx_rolls_over_sheets(self, raw_dir: Path, tmp_path: Path):
+        """1シートの行数の上限を超える分は次のシートに書き出す"""
+        import zipfile
+
+        out = tmp_path / "out.xlsx"
+        count = write_xlsx(iter_history_rows(raw_dir), out, max_rows=6)
+
+        assert count == 12
+        with zipfile.ZipFile(out) as zf:
+            rows = [
+                zf.read(f"xl/worksheets/sheet{i}.xml").decode("utf-8").count("<row ")
+                for i in (1, 2, 3)
+            ]
+            assert "trends_3" in zf.read("xl/workbook.xml").decode("utf-8")
+        # 各シートにヘッダー + 5行、最後のシートに残りの2行
+        assert rows == [6, 6, 3]
+
+    def test_stream_xlsx(self, raw_dir: Path):
+        """ストリーミング出力は有効なxlsxになる"""
+        import io
+        import zipfile
+
+        data = b"".join(stream_xlsx(iter_history_rows(raw_dir), chunk_size=1024))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            assert "xl/worksheets/sheet1.xml" in zf.namelist()
+            sheet = zf.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        # ヘッダー + 12行
+        assert sheet.count("<row ") == 13
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow not installed")
+class TestColumnarSnapshots:
+    """Parquet / Arrowスナップショットのテスト"""
+
+    def test_build_and_skip(self, raw_dir: Path, tmp_path: Path):
+        """未生成分のみ生成する"""
+        export_dir = tmp_path / "export"
+        assert build_columnar_snapshots(raw_dir, export_dir) == 3
+        assert build_columnar_snapshots(raw_dir, export_dir) == 0
+        assert len(list(export_dir.glob("*.parquet"))) == 3
+        assert len(list(export_dir.glob("*.arrows"))) == 3
+
+    def test_iter_arrow_tables(self, raw_dir: Path, tmp_path: Path):
+        """期間・カテゴリで絞り込める"""
+        export_dir = tmp_path / "export"
+        build_columnar_snapshots(raw_dir, export_dir)
+
+        tables = list(iter_arrow_tables(export_dir, category="家電"))
+        assert [t.num_rows for t in tables] == [4, 4]
+        assert tables[0].column_names == EXPORT_COLUMNS
+        assert tables[0]["current_rank"].to_pylist() == [1, 2, 3, 4]
+
+        tables = list(
+            iter_arrow_tables(export_dir, date_from=date(2026, 1, 2), date_to=date(2026, 1, 2))
+        )
+        assert len(tables) == 1
+
+    def test_stream_arrow(self, raw_dir: Path, tmp_path: Path):
+        """複数スナップショットを1つのストリームに結合できる"""
+        import pyarrow.ipc as pa_ipc
+
+        export_dir = tmp_path / "export"
+        build_columnar_snapshots(raw_dir, export_dir)
+
+        data = b"".join(stream_arrow(iter_arrow_tables(export_dir)))
+        assert pa_ipc.open_stream(data).read_all().num_rows == 12
+
+    def test_cached_parquet(self, raw_dir: Path, tmp_path: Path):
+        """単一スナップショットはそのまま、結合・絞り込みはスナップショットの版ごとに1回だけエンコード"""
+        import pyarrow.parquet as pq
+
+        export_dir = tmp_path / "export"
+        build_columnar_snapshots(raw_dir, export_dir)
+
+        single = cached_parquet(export_dir, date_from=date(2026, 1, 2), date_to=date(2026, 1, 2))
+        assert single == export_dir / "products_20260102_100000.parquet"
+
+        merged = cached_parquet(export_dir)
+        assert pq.read_table(merged).num_rows == 12
+        with patch("pyarrow.parquet.ParquetWriter") as writer:
+            assert cached_parquet(export_dir) == merged
+        writer.assert_not_called()
+
+        filtered = cached_parquet(export_dir, category="家電")
+        assert filtered != merged
+        assert set(pq.read_table(filtered)["category"].to_pylist()) == {"家電"}
+
+        build_columnar_snapshots(raw_dir, export_dir, force=True)
+        assert cached_parquet(export_dir) != merged
+        assert cached_parquet(tmp_path / "missing") is None
+
+    def test_write_products_snapshot(self, tmp_path: Path):
+        """列指向ストア保存時はCSVを経由せず収集結果から生成する"""
+        from datetime import datetime
+
+        from scraper import ProductData
+
+        products = [
+            ProductData(
+                asin=f"B00{i}",
+                name=f"商品{i}",
+                category="家電",
+                current_rank=i + 1,
+                previous_rank=None,
+                rank_change=None,
+                rank_change_percent=None,
+                price=None if i else 1980.0,
+                currency="JPY",
+                review_count=10,
+                rating=4.5,
+                affiliate_url="",
+                timestamp="2026-01-02T10:00:00",
+                source="test",
+            )
+            for i in range(3)
+        ]
+        export_dir = tmp_path / "export"
+
+        write_products_snapshot(products, datetime(2026, 1, 2, 10), export_dir)
+
+        tables = list(iter_arrow_tables(export_dir, date_from=date(2026, 1, 2)))
+        assert [t.num_rows for t in tables] == [3]
+        assert tables[0].column_names == EXPORT_COLUMNS
+        assert tables[0]["price"].to_pylist() == [1980.0, None, None]
+        assert (export_dir / "products_20260102_100000.parquet").exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+forecast.pyモジュールのテスト
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast import FORECAST_COLUMNS, RankForecaster, RankSeries, forecast_ranks
+
+
+def history(days: int, ranks: dict[str, callable], start: str = "2026-01-01") -> pd.DataFrame:
+    """ASIN → 日番号からランクを返す関数 で日次の生データを作成（Noneは未掲載）"""
+    rows = []
+    for i, day in enumerate(pd.date_range(start, periods=days)):
+        for asin, rank in ranks.items():
+            value = rank(i, day)
+            if value is not None:
+                rows.append(
+                    {"asin": asin, "current_rank": value, "timestamp": f"{day.date()}T10:00:00"}
+                )
+    return pd.DataFrame(rows)
+
+
+class TestRankSeries:
+    """RankSeriesのテスト"""
+
+    def test_from_dataframe(self):
+        """日ごとに最後の収集・最上位のランク、未掲載の日はNaN"""
+        df = pd.DataFrame(
+            {
+                "asin": ["B002", "B001", "B001", "B001", "B002"],
+                "current_rank": [5, 30, 20, 10, 8],
+                "timestamp": [
+                    "2026-01-01T10:00:00",
+                    "2026-01-01T10:00:00",
+                    "2026-01-01T18:00:00",
+                    "2026-01-01T18:00:00",
+                    "2026-01-03T10:00:00",
+                ],
+            }
+        )
+
+        series = RankSeries.from_dataframe(df)
+
+        assert series.asins.tolist() == ["B001", "B002"]
+        assert len(series.days) == 3
+        np.testing.assert_array_equal(series.ranks, [[10, np.nan, np.nan], [5, np.nan, 8]])
+
+    def test_empty(self):
+        assert forecast_ranks(pd.DataFrame(columns=["asin", "current_rank", "timestamp"])).empty
+
+
+class TestRankForecaster:
+    """RankForecasterのテスト"""
+
+    def test_log_linear_trend(self):
+        """一定の比率で上昇する系列はその比率で外挿する"""
+        df = history(10, {"B001": lambda i, _: 100 * 0.9**i})
+
+        forecast = forecast_ranks(df, horizon=2, forecaster=RankForecaster(ridge=0))
+
+        row = forecast.iloc[0]
+        assert list(forecast.columns) == FORECAST_COLUMNS
+        assert row["forecast_rank"] == pytest.approx(100 * 0.9**11, abs=0.05)
+        assert row["trend_percent_per_day"] == pytest.approx(10.0)
+        assert row["rmse"] == pytest.approx(0.0, abs=1e-6)
+
+    def test_weekly_seasonality(self):
+        """曜日で上下する系列は予測日の曜日に合わせる"""
+        weekend = lambda _, day: 40 if day.dayofweek >= 5 else 10  # noqa: E731
+        df = history(28, {"B001": weekend})
+        forecaster = RankForecaster(harmonics=3)
+
+        saturday = 3  # 最終日 2026-01-28 は水曜日
+        predicted = forecast_ranks(df, horizon=saturday, forecaster=forecaster).iloc[0][
+            "forecast_rank"
+        ]
+        monday = forecast_ranks(df, horizon=saturday + 2, forecaster=forecaster).iloc[0][
+            "forecast_rank"
+        ]
+
+        assert predicted > 30
+        assert monday < 15
+        assert not RankForecaster().seasonal(13)
+
+    def test_sparse_series(self):
+        """観測1日の系列は現在ランク、観測のない日は当てはめに使わない"""
+        df = history(
+            14,
+            {
+                "B001": lambda i, _: 50 if i % 3 == 0 else None,
+                "B002": lambda i, _: 7 if i == 13 else None,
+            },
+        )
+
+        forecast = forecast_ranks(df).set_index("asin")
+
+        assert forecast["observations"].tolist() == [5, 1]
+        assert forecast["forecast_rank"].tolist() == [50.0, 7.0]
+        assert forecast.loc["B002", "current_rank"] == 7
+
+    def test_batch_matches_per_series_fit(self):
+        """全系列の一括当てはめは1系列ずつの最小二乗と同じ"""
+        rng = np.random.default_rng(0)
+        ranks = np.exp(rng.normal(4, 1, (50, 1)) + rng.normal(0, 0.2, (50, 21)))
+        ranks[rng.random(ranks.shape) < 0.3] = np.nan
+        series = RankSeries(
+            np.arange(50).astype(str), pd.date_range("2026-01-01", periods=21), ranks
+        )
+        forecaster = RankForecaster(ridge=1e-6)
+
+        coef = forecaster.fit(series).coef
+
+        design = forecaster.design(np.arange(21, dtype=float), 21)
+        for i in range(0, 50, 7):
+            observed = ~np.isnan(ranks[i])
+            expected = np.linalg.lstsq(design[observed], np.log(ranks[i, observed]), rcond=None)[0]
+            np.testing.assert_allclose(coef[i], expected, atol=1e-4)
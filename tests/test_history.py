@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+history.pyモジュールのテスト
+"""
+
+import os
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from history import HistoryStore, normalize_timestamp
+
+CSV_HEADER = (
+    "asin,name,category,current_rank,previous_rank,rank_change,rank_change_percent,"
+    "price,currency,review_count,rating,affiliate_url,timestamp,source\n"
+)
+
+
+def write_raw(raw_dir: Path, day: int, ranks: dict[str, int], category: str = "家電") -> Path:
+    """1 run分の生データCSV"""
+    rows = "".join(
+        f"{asin},商品{asin},{category},{rank},,,{rank * 1.5},1980,JPY,10,4.5,,"
+        f"2026-01-{day:02d}T10:00:00.123456,test\n"
+        for asin, rank in ranks.items()
+    )
+    path = raw_dir / f"products_202601{day:02d}_100000.csv"
+    path.write_text(CSV_HEADER + rows, encoding="utf-8-sig")
+    return path
+
+
+@pytest.fixture
+def raw_dir(tmp_path: Path) -> Path:
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    write_raw(raw_dir, 1, {"B001": 5, "B002": 9})
+    write_raw(raw_dir, 2, {"B001": 3, "B002": 7})
+    write_raw(raw_dir, 3, {"B001": 1, "B003": 2}, category="ゲーム")
+    return raw_dir
+
+
+@pytest.fixture
+def store(tmp_path: Path, raw_dir: Path) -> HistoryStore:
+    store = HistoryStore(tmp_path / "history.db")
+    store.sync(raw_dir)
+    return store
+
+
+def test_normalize_timestamp():
+    """秒精度のISO形式に揃える"""
+    assert normalize_timestamp("2026-01-01T10:00:00.123456") == "2026-01-01T10:00:00"
+    assert normalize_timestamp("2026-01-01 10:00:00") == "2026-01-01T10:00:00"
+
+
+class TestIngest:
+    """取り込みのテスト"""
+
+    def test_sync_is_incremental(self, store: HistoryStore, raw_dir: Path):
+        """取り込み済みファイルはスキップし、新規ファイルのみ取り込む"""
+        assert store.count() == 6
+        assert store.sync(raw_dir) == 0
+
+        write_raw(raw_dir, 4, {"B001": 2})
+        assert store.sync(raw_dir) == 1
+        assert store.count() == 7
+
+    def test_modified_file_is_reingested(self, store: HistoryStore, raw_dir: Path):
+        """更新されたファイルは再取り込みされ、重複しない"""
+        path = write_raw(raw_dir, 1, {"B001": 4, "B002": 9})
+        os.utime(path, (path.stat().st_atime, path.stat().st_mtime + 10))
+
+        assert store.sync(raw_dir) == 2
+        assert store.count() == 6
+        assert store.asin_history("B001")[0]["current_rank"] == 4
+
+    def test_add_products(self, tmp_path: Path):
+        """ProductDataを直接追加できる"""
+        from scraper import ProductData
+
+        store = HistoryStore(tmp_path / "products.db")
+        product = ProductData(
+            asin="B009",
+            name="商品",
+            category="本",
+            current_rank=3,
+            previous_rank=None,
+            rank_change=None,
+            rank_change_percent=None,
+            price=None,
+            currency="JPY",
+            review_count=None,
+            rating=None,
+            affiliate_url="",
+            timestamp="2026-01-05T09:00:00",
+            source="test",
+        )
+        assert store.add_products([product]) == 1
+        assert store.latest("B009")["current_rank"] == 3
+
+
+class TestQueries:
+    """検索のテスト"""
+
+    def test_asin_history(self, store: HistoryStore):
+        """ASINの履歴を時刻順に返す"""
+        history = store.asin_history("B001")
+        assert [r["current_rank"] for r in history] == [5, 3, 1]
+        assert history[0]["timestamp"] == "2026-01-01T10:00:00"
+        assert isinstance(history[0]["rank_change_percent"], float)
+
+    def test_asin_history_range(self, store: HistoryStore):
+        """期間・件数で絞り込める"""
+        history = store.asin_history("B001", start=date(2026, 1, 2), end=date(2026, 1, 2))
+        assert [r["current_rank"] for r in history] == [3]
+        assert [r["current_rank"] for r in store.asin_history("B001", limit=2)] == [3, 1]
+
+    def test_latest(self, store: HistoryStore):
+        """最新の観測値"""
+        assert store.latest("B002")["current_rank"] == 7
+        assert store.latest("B999") is None
+
+    def test_iter_rows_category(self, store: HistoryStore):
+        """カテゴリ・期間の範囲検索"""
+        rows = list(store.iter_rows(start=date(2026, 1, 2), category="家電"))
+        assert [(r["asin"], r["current_rank"]) for r in rows] == [("B001", 3), ("B002", 7)]
+        assert store.categories() == ["ゲーム", "家電"]
+
+
+def test_exporter_reads_history_store(tmp_path: Path, raw_dir: Path, monkeypatch):
+    """履歴ストアがあればエクスポートはストアから読む"""
+    from config import config
+    from exporter import EXPORT_COLUMNS, iter_history_rows
+
+    monkeypatch.setattr(config.paths, "data_dir", tmp_path)
+    monkeypatch.setattr(config.paths, "raw_data_dir", tmp_path / "empty")
+    HistoryStore().sync(raw_dir)
+
+    rows = list(iter_history_rows(date_from=date(2026, 1, 3)))
+    assert [r["asin"] for r in rows] == ["B001", "B003"]
+    assert list(rows[0]) == EXPORT_COLUMNS
+    assert rows[0]["category"] == "ゲーム"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+"""
+ingest.pyモジュールのテスト
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from analyzer import MomentumState
+from anomaly import AnomalyDetector, load_anomalies
+from dedup import ProductClusters
+from history import HistoryStore
+from ingest import (
+    AnomalyStage,
+    DedupStage,
+    IngestPipeline,
+    LatestRankIndex,
+    MomentumStage,
+    PriceStage,
+    RankChangeStage,
+    SearchStage,
+    SeasonalityStage,
+    SeriesStage,
+    WatchlistStage,
+    compute_rank_changes,
+)
+from prices import PriceIndex, load_price_drops
+from products import ProductSeriesIndex
+from scraper import ProductData
+from search import ProductSearchIndex
+from seasonality import SeasonalProfiles
+from watchlist import Watchlist, WatchlistMatcher, load_alerts
+
+
+def scrape(
+    timestamp: str, ranks: dict[str, int], category: str = "家電", page_percent: float = 50.0
+) -> pd.DataFrame:
+    """1回分の収集データ"""
+    return pd.DataFrame(
+        {
+            "asin": list(ranks),
+            "category": category,
+            "current_rank": list(ranks.values()),
+            "rank_change_percent": page_percent,
+            "timestamp": timestamp,
+        }
+    )
+
+
+def product(asin: str, rank: int, timestamp: str, category: str = "家電") -> ProductData:
+    return ProductData(
+        asin=asin,
+        name=f"商品{asin}",
+        category=category,
+        current_rank=rank,
+        previous_rank=None,
+        rank_change=None,
+        rank_change_percent=120.0,
+        price=1980.0,
+        currency="JPY",
+        review_count=10,
+        rating=4.5,
+        affiliate_url="",
+        timestamp=timestamp,
+        source="test",
+    )
+
+
+@pytest.fixture
+def index(tmp_path: Path) -> LatestRankIndex:
+    return LatestRankIndex(tmp_path / "latest_ranks.csv")
+
+
+class TestComputeRankChanges:
+    """前回ランクとの差分計算のテスト"""
+
+    def test_first_scrape_keeps_page_percent(self, index):
+        """前回の観測がない場合はページの変動率を残す"""
+        result = compute_rank_changes(scrape("2026-01-01T10:00:00", {"B001": 5}), index)
+
+        assert pd.isna(result.loc[0, "previous_rank"])
+        assert pd.isna(result.loc[0, "rank_change"])
+        assert result.loc[0, "rank_change_percent"] == 50.0
+
+    def test_second_scrape_uses_previous_rank(self, index):
+        """2回目は前回ランクから差分と変動率を計算"""
+        index.update(scrape("2026-01-01T10:00:00", {"B001": 20, "B002": 4}))
+
+        result = compute_rank_changes(
+            scrape("2026-01-02T10:00:00", {"B001": 5, "B002": 8, "B003": 1}), index
+        )
+        rows = result.set_index("asin")
+
+        assert rows.loc["B001", "previous_rank"] == 20
+        assert rows.loc["B001", "rank_change"] == 15
+        assert rows.loc["B001", "rank_change_percent"] == 75.0
+        assert rows.loc["B002", "rank_change"] == -4
+        assert rows.loc["B002", "rank_change_percent"] == -100.0
+        assert pd.isna(rows.loc["B003", "previous_rank"])
+        assert rows.loc["B003", "rank_change_percent"] == 50.0
+
+    def test_category_is_part_of_key(self, index):
+        """同じASINでもカテゴリが違えば別の系列"""
+        index.update(scrape("2026-01-01T10:00:00", {"B001": 20}, category="ゲーム"))
+
+        result = compute_rank_changes(scrape("2026-01-02T10:00:00", {"B001": 5}), index)
+
+        assert pd.isna(result.loc[0, "previous_rank"])
+
+    def test_same_timestamp_is_not_previous(self, index):
+        """同じ回の再取り込みでは前回とみなさない"""
+        index.update(scrape("2026-01-01T10:00:00", {"B001": 20}))
+
+        result = compute_rank_changes(scrape("2026-01-01T10:00:00", {"B001": 5}), index)
+
+        assert pd.isna(result.loc[0, "previous_rank"])
+
+
+class TestLatestRankIndex:
+    """最新ランク索引のテスト"""
+
+    def test_update_overwrites_existing_keys(self, index):
+        """既存キーは上書き、新規キーは追加"""
+        index.update(scrape("2026-01-01T10:00:00", {"B001": 20, "B002": 4}))
+        index.update(scrape("2026-01-02T10:00:00", {"B001": 5, "B003": 1}))
+
+        assert len(index) == 3
+        assert index.frame.loc[("B001", "家電"), "last_rank"] == 5
+        assert index.frame.loc[("B002", "家電"), "last_rank"] == 4
+
+    def test_save_and_load(self, index):
+        """保存した索引を読み直せる"""
+        index.update(scrape("2026-01-01T10:00:00", {"B001": 20, "B002": 4}))
+        index.save()
+
+        loaded = LatestRankIndex(index.path)
+
+        assert len(loaded) == 2
+        assert loaded.frame.loc[("B001", "家電"), "last_rank"] == 20
+        assert loaded.frame.loc[("B001", "家電"), "last_timestamp"] == pd.Timestamp(
+            "2026-01-01T10:00:00"
+        )
+
+    def test_from_history(self, tmp_path):
+        """履歴ストアの最新観測値から初期化"""
+        store = HistoryStore(tmp_path / "history.db")
+        store.add_rows(
+            [
+                {
+                    "asin": "B001",
+                    "category": "家電",
+                    "current_rank": 9,
+                    "timestamp": "2026-01-01T10:00:00",
+                },
+                {
+                    "asin": "B001",
+                    "category": "家電",
+                    "current_rank": 3,
+                    "timestamp": "2026-01-02T10:00:00",
+                },
+                {
+                    "asin": "B002",
+                    "category": "ゲーム",
+                    "current_rank": 7,
+                    "timestamp": "2026-01-01T10:00:00",
+                },
+            ]
+        )
+
+        index = LatestRankIndex.from_history(store, tmp_path / "latest_ranks.csv")
+
+        assert len(index) == 2
+        assert index.frame.loc[("B001", "家電"), "last_rank"] == 3
+        assert index.frame.loc[("B002", "ゲーム"), "last_rank"] == 7
+
+
+class TestIngestPipeline:
+    """取り込みパイプラインのテスト"""
+
+    def test_run_fills_product_fields(self, index):
+        """ProductDataの前回ランク・差分が整数で埋まる"""
+        pipeline = IngestPipeline([RankChangeStage(index)])
+        pipeline.run([product("B001", 10, "2026-01-01T10:00:00")])
+
+        result = pipeline.run(
+            [product("B001", 4, "2026-01-02T10:00:00"), product("B002", 1, "2026-01-02T10:00:00")]
+        )
+
+        assert isinstance(result[0], ProductData)
+        assert result[0].previous_rank == 10
+        assert isinstance(result[0].previous_rank, int)
+        assert result[0].rank_change == 6
+        assert result[0].rank_change_percent == 60.0
+        assert result[1].previous_rank is None
+        assert result[1].rank_change_percent == 120.0
+
+    def test_commit_persists_index(self, index):
+        """commit()まで索引ファイルは書き出さない"""
+        pipeline = IngestPipeline([RankChangeStage(index)])
+        pipeline.run([product("B001", 10, "2026-01-01T10:00:00")])
+        assert not index.path.exists()
+
+        pipeline.commit()
+
+        assert LatestRankIndex(index.path).frame.loc[("B001", "家電"), "last_rank"] == 10
+
+    def test_failed_stage_is_skipped(self, index, tmp_path):
+        """ほかのステージが失敗しても前回ランクは補完し、失敗したステージだけ永続化しない"""
+
+        class BrokenStage:
+            committed = False
+
+            def __call__(self, df):
+                raise OSError("broken state")
+
+            def commit(self):
+                BrokenStage.committed = True
+
+        class BrokenCommitStage:
+            def __call__(self, df):
+                return df
+
+            def commit(self):
+                raise OSError("disk full")
+
+        momentum_path = tmp_path / "momentum_state.npz"
+        pipeline = IngestPipeline(
+            [
+                RankChangeStage(index),
+                BrokenStage(),
+                BrokenCommitStage(),
+                MomentumStage(MomentumState(), momentum_path),
+            ]
+        )
+        pipeline.run([product("B001", 10, "2026-01-01T10:00:00")])
+        result = pipeline.run([product("B001", 4, "2026-01-02T10:00:00")])
+
+        pipeline.commit()
+
+        assert result[0].previous_rank == 10
+        assert not BrokenStage.committed
+        assert index.path.exists()
+        assert momentum_path.exists()
+
+    def test_default_stage_init_failure_is_skipped(self, index, monkeypatch):
+        """既定のステージの初期化に失敗したらそのステージだけ外す"""
+        import ingest
+
+        def broken():
+            raise OSError("corrupt search_index.npz")
+
+        monkeypatch.setattr(ingest, "RankChangeStage", lambda: RankChangeStage(index))
+        for name in (
+            "MomentumStage",
+            "AnomalyStage",
+            "SeasonalityStage",
+            "PriceStage",
+            "DedupStage",
+            "SeriesStage",
+            "WatchlistStage",
+        ):
+            monkeypatch.setattr(ingest, name, lambda: (lambda df: df))
+        monkeypatch.setattr(ingest, "SearchStage", broken)
+
+        pipeline = IngestPipeline()
+
+        assert len(pipeline.stages) == 8
+        assert isinstance(pipeline.stages[0], RankChangeStage)
+
+    def test_momentum_stage(self, index, tmp_path):
+        """モメンタム状態を更新し、commit()で保存"""
+        path = tmp_path / "momentum_state.npz"
+        pipeline = IngestPipeline([RankChangeStage(index), MomentumStage(MomentumState(), path)])
+        pipeline.run([product("B001", 10, "2026-01-01T10:00:00")])
+        pipeline.run([product("B001", 4, "2026-01-02T10:00:00")])
+        pipeline.commit()
+
+        assert MomentumState.load(path).features(["B001"]).iloc[0]["velocity"] == 6
+
+    def test_anomaly_stage(self, tmp_path):
+        """検出結果はcommit()で追記し、状態も保存"""
+        state_path, log_path = tmp_path / "anomaly_state.npz", tmp_path / "anomalies.csv"
+        stage = AnomalyStage(AnomalyDetector(min_count=3), state_path, log_path)
+        for day in range(1, 6):
+            stage(
+                scrape(
+                    f"2026-01-{day:02d}T10:00:00", {"B001": 5, "B002": 6}, page_percent=10.0 + day
+                )
+            )
+        stage(scrape("2026-01-06T10:00:00", {"B001": 1}, page_percent=50000.0))
+        assert not log_path.exists()
+
+        stage.commit()
+
+        assert load_anomalies(log_path)["asin"].tolist() == ["B001"]
+        assert len(AnomalyDetector.load(state_path).asin_stats) == 2
+
+    def test_seasonality_stage(self, tmp_path):
+        """曜日プロファイルを更新し、commit()で保存"""
+        path = tmp_path / "seasonality.npz"
+        stage = SeasonalityStage(SeasonalProfiles(), path)
+        stage(scrape("2026-01-03T10:00:00", {"B001": 5, "B002": 6}, page_percent=80.0))
+        stage(scrape("2026-01-05T10:00:00", {"B001": 5}, page_percent=10.0))
+        assert not path.exists()
+
+        stage.commit()
+
+        profile = SeasonalProfiles.load(path).profile("家電")
+        assert profile.set_index("slot").loc[["土", "月", "10時"], "count"].tolist() == [
+            2.0,
+            1.0,
+            3.0,
+        ]
+
+    def test_seasonality_stage_scores_with_momentum(self, tmp_path):
+        """モメンタム込みのスコアが曜日によらず一定なら、分析時に季節成分で変わらない"""
+        from analyzer import TrendAnalyzer
+
+        class FixedMomentum(MomentumState):
+            """収集ごとに velocity を差し替えるモメンタム状態"""
+
+            velocity = 0.0
+
+            def features(self, asins) -> pd.DataFrame:
+                return pd.DataFrame(
+                    {
+                        "velocity": [self.velocity] * len(asins),
+                        "acceleration": 0.0,
+                        "ewma_rank": 10.0,
+                        "days_in_chart": 1.0,
+                    }
+                )
+
+        # 金・土曜はランク変動で10点、ほかの曜日はモメンタムで10点
+        momentum = FixedMomentum()
+        stage = SeasonalityStage(
+            SeasonalProfiles(), tmp_path / "seasonality.npz", momentum=momentum
+        )
+        for day in pd.date_range("2026-01-05", periods=28):
+            weekend = day.dayofweek in (4, 5)
+            momentum.velocity = 0.0 if weekend else 10.0
+            stage(
+                scrape(
+                    day.strftime("%Y-%m-%dT10:00:00"),
+                    {"B001": 5},
+                    page_percent=20.0 if weekend else 0.0,
+                )
+            )
+
+        df = scrape("2026-02-04T10:00:00", {"B001": 5}, page_percent=0.0)
+        plain = TrendAnalyzer(data_dir=tmp_path, momentum=momentum).score_dataframe(df)
+        adjusted = TrendAnalyzer(
+            data_dir=tmp_path, momentum=momentum, seasonality=stage.profiles
+        ).score_dataframe(df)
+
+        assert plain["trend_score"].tolist() == [10.0]
+        assert adjusted["trend_score"].tolist() == [10.0]
+
+    def test_default_seasonality_stage_uses_momentum_state(self, index, monkeypatch, tmp_path):
+        """既定のステージでは季節性ステージがモメンタムステージの状態を使う"""
+        import ingest
+
+        state = MomentumState()
+        monkeypatch.setattr(ingest, "RankChangeStage", lambda: RankChangeStage(index))
+        monkeypatch.setattr(
+            ingest, "MomentumStage", lambda: MomentumStage(state, tmp_path / "m.npz")
+        )
+        monkeypatch.setattr(
+            ingest,
+            "SeasonalityStage",
+            lambda: SeasonalityStage(SeasonalProfiles(), tmp_path / "s.npz"),
+        )
+        for name in (
+            "AnomalyStage",
+            "PriceStage",
+            "DedupStage",
+            "SearchStage",
+            "SeriesStage",
+            "WatchlistStage",
+        ):
+            monkeypatch.setattr(ingest, name, lambda: (lambda df: df))
+
+        pipeline = IngestPipeline()
+
+        assert pipeline.stages[3].momentum is state
+
+    def test_price_stage(self, tmp_path):
+        """値下がりはcommit()で追記し、状態も保存"""
+        state_path, log_path = tmp_path / "price_index.npz", tmp_path / "price_drops.csv"
+        stage = PriceStage(
+            PriceIndex(window=5, drop_percent=10, median_drop_percent=15), state_path, log_path
+        )
+        stage(scrape("2026-01-01T10:00:00", {"B001": 5, "B002": 6}).assign(price=[1000.0, 500.0]))
+        stage(scrape("2026-01-02T10:00:00", {"B001": 5, "B002": 6}).assign(price=[850.0, 480.0]))
+        assert not log_path.exists()
+
+        stage.commit()
+
+        drops = load_price_drops(log_path)
+        assert drops["asin"].tolist() == ["B001"]
+        assert drops.loc[0, "drop_percent"] == 15.0
+        assert PriceIndex.load(state_path).summary(["B002"]).loc[0, "min_price"] == 480.0
+
+    def test_dedup_stage(self, tmp_path):
+        """商品名の署名を更新し、commit()で保存"""
+        path = tmp_path / "product_clusters.npz"
+        stage = DedupStage(ProductClusters(), path)
+        stage(
+            scrape("2026-01-01T10:00:00", {"B001": 1, "B002": 2}).assign(
+                name=[
+                    "ワイヤレスイヤホン ノイズキャンセリング ブラック",
+                    "ワイヤレスイヤホン ノイズキャンセリング ホワイト",
+                ]
+            )
+        )
+        assert not path.exists()
+
+        stage.commit()
+
+        assert ProductClusters.load(path).cluster_keys(["B002"]).tolist() == ["B001"]
+
+    def test_search_stage(self, tmp_path):
+        """商品名の索引を更新し、commit()で保存"""
+        path = tmp_path / "search_index.npz"
+        stage = SearchStage(ProductSearchIndex(), path)
+        stage(
+            scrape("2026-01-01T10:00:00", {"B001": 1, "B002": 2}).assign(
+                name=["ワイヤレスイヤホン", "電動歯ブラシ"]
+            )
+        )
+        assert not path.exists()
+
+        stage.commit()
+
+        assert [r["asin"] for r in ProductSearchIndex.load(path).search("イヤホン")] == ["B001"]
+
+    def test_series_stage(self, tmp_path):
+        """商品の時系列をスコアつきで更新し、commit()で保存"""
+        path = tmp_path / "product_series.npz"
+        stage = SeriesStage(ProductSeriesIndex(), path)
+        stage(scrape("2026-01-01T10:00:00", {"B001": 5, "B002": 6}))
+        stage(scrape("2026-01-01T16:00:00", {"B001": 3}))
+        assert not path.exists()
+
+        stage.commit()
+
+        series = ProductSeriesIndex.load(path).history("B001")
+        assert series["current_rank"] == [5, 3]
+        assert all(score is not None for score in series["trend_score"])
+
+    def test_watchlist_stage(self, tmp_path):
+        """一致はcommit()で通知キューに追記"""
+        log_path = tmp_path / "watch_alerts.csv"
+        stage = WatchlistStage(WatchlistMatcher([Watchlist("u1", asins=["B002"])]), log_path)
+        stage(scrape("2026-01-01T10:00:00", {"B001": 5, "B002": 6}))
+        assert not log_path.exists()
+
+        stage.commit()
+
+        alerts = load_alerts(log_path)
+        assert alerts[["user_id", "asin", "kind"]].values.tolist() == [["u1", "B002", "asin"]]
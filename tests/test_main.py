@@ -30,6 +30,50 @@ class TestRunScraperUnit:
 
         assert result == 0
 
+    def test_write_export_snapshot_failure_is_not_fatal(self, tmp_path):
+        """スナップショット生成に失敗しても例外を送出しない"""
+        from main import write_export_snapshot
+
+        with patch(
+            "exporter.write_columnar_snapshot", side_effect=OSError("disk full")
+        ) as mock_write:
+            write_export_snapshot(tmp_path / "products_20260101_100000.csv")
+
+        from exporter import PYARROW_AVAILABLE
+
+        assert mock_write.called == PYARROW_AVAILABLE
+
+    def test_write_export_snapshot_columnar_storage(self, tmp_path):
+        """列指向ストア保存時（CSVなし）は収集結果からスナップショットを生成する"""
+        from main import write_export_snapshot
+
+        products = [MagicMock()]
+        with patch("exporter.write_products_snapshot") as mock_write:
+            write_export_snapshot(tmp_path / "columnar", products)
+
+        from exporter import PYARROW_AVAILABLE
+
+        if PYARROW_AVAILABLE:
+            mock_write.assert_called_once_with(products)
+
+    def test_update_history_store_failure_is_not_fatal(self, tmp_path):
+        """履歴ストア更新に失敗しても例外を送出しない"""
+        from main import update_history_store
+
+        with patch("history.HistoryStore", side_effect=OSError("locked")):
+            update_history_store([], tmp_path / "products_20260101_100000.csv")
+
+    def test_apply_ingest_pipeline_failure_returns_input(self):
+        """取り込みステージに失敗しても元のデータを返す"""
+        from main import apply_ingest_pipeline
+
+        products = [MagicMock()]
+        with patch("ingest.IngestPipeline", side_effect=OSError("broken index")):
+            result, pipeline = apply_ingest_pipeline(products)
+
+        assert result is products
+        assert pipeline is None
+
 
 class TestRunAnalyzerUnit:
     """run_analyzer関数のユニットテスト"""
@@ -72,6 +116,42 @@ class TestRunReporterUnit:
 
         assert len(reports) == 2
 
+    def test_run_reporter_with_formats(self, tmp_path):
+        """指定した形式のレポートが生成される"""
+        from main import run_reporter
+        from reporter import ReportPipeline
+
+        with patch("reporter.ReportPipeline", lambda formats: ReportPipeline(tmp_path, formats)):
+            reports, md_path, html_path = run_reporter([], {}, formats=["csv", "json"])
+
+        assert len(reports) == 2
+        assert md_path is None
+        assert html_path is None
+        assert all(p.parent == tmp_path for p in reports)
+
+    def test_load_rank_history_by_day(self, tmp_path, monkeypatch):
+        """履歴はファイル数ではなく最新の収集日から遡った日数で選ぶ"""
+        from config import config
+        from main import load_rank_history
+
+        monkeypatch.setattr(config.paths, "raw_data_dir", tmp_path)
+        monkeypatch.setattr(config.storage, "raw_format", "csv")
+        for stamp in ("20260101_100000", "20260102_100000", "20260103_100000", "20260103_220000"):
+            day, time = stamp.split("_")
+            (tmp_path / f"products_{stamp}.csv").write_text(
+                "asin,name,category,current_rank,timestamp\n"
+                f"B001,商品,家電,1,{day[:4]}-{day[4:6]}-{day[6:]}T{time[:2]}:00:00\n",
+                encoding="utf-8",
+            )
+
+        history = load_rank_history(2)
+
+        assert history["timestamp"].str[:10].tolist() == ["2026-01-02", "2026-01-03", "2026-01-03"]
+        assert load_rank_history(1)["timestamp"].str[:10].unique().tolist() == ["2026-01-03"]
+
+        monkeypatch.setattr(config.paths, "raw_data_dir", tmp_path / "missing")
+        assert load_rank_history(2) is None
+
 
 class TestRunDistributorUnit:
     """run_distributor関数のユニットテスト"""
@@ -109,6 +189,7 @@ class TestMain:
                                 skip_scrape=False,
                                 distribute=False,
                                 skip_distribute=True,
+                                archive=False,
                             )
 
                             # モック設定
@@ -117,7 +198,10 @@ class TestMain:
                             mock_trend = MagicMock()
                             mock_trend.name = "テスト商品"
                             mock_trend.rank_change_percent = 50.0
-                            mock_analyzer.return_value = ([mock_trend], {"electronics": [mock_trend]})
+                            mock_analyzer.return_value = (
+                                [mock_trend],
+                                {"electronics": [mock_trend]},
+                            )
 
                             mock_reporter.return_value = (
                                 [Path("/tmp/report.md")],
@@ -152,6 +236,7 @@ class TestMain:
                         skip_scrape=True,
                         distribute=False,
                         skip_distribute=True,
+                        archive=False,
                     )
 
                     mock_analyzer.return_value = ([], {})
@@ -173,6 +258,7 @@ class TestMain:
                     skip_scrape=False,
                     distribute=False,
                     skip_distribute=True,
+                    archive=False,
                 )
 
                 mock_scraper.return_value = 0
@@ -194,6 +280,7 @@ class TestMain:
                         skip_scrape=True,
                         distribute=False,
                         skip_distribute=True,
+                        archive=False,
                     )
 
                     mock_analyzer.return_value = ([], {})
@@ -218,6 +305,7 @@ class TestMain:
                                 skip_scrape=False,
                                 distribute=True,
                                 skip_distribute=False,
+                                archive=False,
                             )
 
                             mock_scraper.return_value = 5
@@ -225,7 +313,11 @@ class TestMain:
                             mock_trend.name = "テスト商品"
                             mock_trend.rank_change_percent = 50.0
                             mock_analyzer.return_value = ([mock_trend], {})
-                            mock_reporter.return_value = ([Path("/tmp/report.md")], Path("/tmp/report.md"), None)
+                            mock_reporter.return_value = (
+                                [Path("/tmp/report.md")],
+                                Path("/tmp/report.md"),
+                                None,
+                            )
                             mock_distributor.return_value = {"email": True}
 
                             captured_output = StringIO()
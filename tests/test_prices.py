@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+prices.pyモジュールのテスト
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from prices import (
+    PRICE_DROP_COLUMNS,
+    PriceIndex,
+    append_price_drops,
+    load_price_drops,
+    recent_price_drops,
+)
+
+
+def run(day: int, prices: dict[str, float], category: str = "家電") -> pd.DataFrame:
+    """1回分の収集データ（1月day日の10時）"""
+    return pd.DataFrame(
+        {
+            "asin": list(prices),
+            "name": [f"商品{asin}" for asin in prices],
+            "category": category,
+            "price": list(prices.values()),
+            "timestamp": f"2026-01-{day:02d}T10:00:00",
+        }
+    )
+
+
+@pytest.fixture
+def index() -> PriceIndex:
+    return PriceIndex(window=4, drop_percent=10, median_drop_percent=15, min_observations=3)
+
+
+class TestPriceIndex:
+    """PriceIndexのテスト"""
+
+    def test_summary(self, index):
+        """前回価格・最安値・最高値・直近window回の中央値"""
+        for day, price in enumerate([1000, 1200, 900, 1100, 1300, 1250], 1):
+            index.update(run(day, {"B001": price}))
+
+        summary = index.summary(["B001", "B999"])
+
+        assert list(summary.columns) == [
+            "last_price",
+            "min_price",
+            "max_price",
+            "median_price",
+            "observations",
+        ]
+        assert summary.loc[0].tolist() == [1250.0, 900.0, 1300.0, 1175.0, 6.0]
+        assert summary.loc[1].isna().all()
+
+    def test_drop_from_previous(self, index):
+        """前回価格から閾値以上の下落を検出"""
+        index.update(run(1, {"B001": 1000, "B002": 1000}))
+
+        drops = index.update(run(2, {"B001": 880, "B002": 950}))
+
+        assert list(drops.columns) == PRICE_DROP_COLUMNS
+        row = drops.iloc[0]
+        assert drops["asin"].tolist() == ["B001"]
+        assert row["previous_price"] == 1000.0
+        assert row["drop_percent"] == 12.0
+        assert bool(row["is_lowest"])
+
+    def test_drop_from_median(self, index):
+        """段階的な値下がりは中央値から判定（観測数が足りるまで判定しない）"""
+        assert index.update(run(1, {"B001": 1000})).empty
+        assert index.update(run(2, {"B001": 950})).empty
+        assert index.update(run(3, {"B001": 900})).empty
+
+        drops = index.update(run(4, {"B001": 810}))
+
+        assert drops.loc[0, "median_price"] == 950.0
+        assert drops.loc[0, "drop_percent"] == 10.0
+        assert drops.loc[0, "median_drop_percent"] == pytest.approx(14.74, abs=0.01)
+
+        index.median_drop_percent = 5
+        index.drop_percent = 50
+        assert index.update(run(5, {"B001": 800}))["median_drop_percent"].tolist() == [13.51]
+
+    def test_ignores_missing_and_older(self, index):
+        """価格不明・0円の行と、前回以前の時刻の行は無視する"""
+        index.update(run(2, {"B001": 1000}))
+
+        assert index.update(run(2, {"B001": 500})).empty
+        assert index.update(run(1, {"B001": 500})).empty
+        assert index.update(run(3, {"B001": None, "B002": 0})).empty
+        assert len(index) == 1
+        assert index.summary(["B001"]).loc[0, "observations"] == 1
+
+    def test_duplicate_asin_uses_first_row(self, index):
+        """複数カテゴリに掲載されたASINは1回の観測として扱う"""
+        index.update(run(1, {"B001": 1000}))
+        df = pd.concat([run(2, {"B001": 800}, "家電"), run(2, {"B001": 800}, "本")])
+
+        drops = index.update(df)
+
+        assert drops["category"].tolist() == ["家電"]
+        assert index.summary(["B001"]).loc[0, "observations"] == 2
+
+    def test_grows_capacity(self):
+        """容量を超えるASINは配列を拡張して保持"""
+        index = PriceIndex(window=3, capacity=2)
+        index.update(run(1, {f"B{i:03d}": 100.0 + i for i in range(5)}))
+
+        assert len(index) == 5
+        np.testing.assert_array_equal(index.summary(["B004", "B000"])["last_price"], [104.0, 100.0])
+
+    def test_save_and_load(self, index, tmp_path: Path):
+        """保存した状態から同じ判定を行う"""
+        for day, price in enumerate([1000, 980, 1010], 1):
+            index.update(run(day, {"B001": price}))
+        path = index.save(tmp_path / "price_index.npz")
+
+        loaded = PriceIndex.load(path)
+        pd.testing.assert_frame_equal(loaded.summary(["B001"]), index.summary(["B001"]))
+        assert loaded.window == 4
+        assert loaded.update(run(4, {"B001": 800}))["drop_percent"].tolist() == [20.79]
+        assert len(PriceIndex.load(tmp_path / "missing.npz")) == 0
+
+
+def test_recent_price_drops(tmp_path: Path):
+    """直近の期間のASINごと最新の1件を、下落率の大きい順に返す"""
+    index = PriceIndex(window=4, drop_percent=10)
+    path = tmp_path / "price_drops.csv"
+    index.update(run(1, {"A": 1000, "B": 1000, "C": 1000}))
+    append_price_drops(index.update(run(2, {"A": 800, "B": 1000, "C": 1000})), path)
+    append_price_drops(index.update(run(4, {"A": 700, "B": 850, "C": 700})), path)
+    append_price_drops(index.update(run(5, {"B": 600}, "本")), path)
+
+    assert len(load_price_drops(path)) == 5
+    assert recent_price_drops(hours=48, path=path)["asin"].tolist() == ["B", "C", "A"]
+    assert recent_price_drops(hours=1, path=path)["asin"].tolist() == ["B"]
+    assert recent_price_drops(hours=48, min_percent=35, path=path)["asin"].tolist() == ["B"]
+    assert recent_price_drops(hours=48, category="家電", path=path)["asin"].tolist() == ["C", "A"]
+    assert recent_price_drops(path=tmp_path / "missing.csv").empty
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+products.pyモジュールのテスト
+"""
+
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from history import HistoryStore
+from products import ProductSeriesIndex, cached_index, product_history
+
+
+def scrape(timestamp: str, rows: dict[str, tuple], category: str = "家電") -> pd.DataFrame:
+    """1回分の収集データ（ASIN → (ランク, 価格)）"""
+    return pd.DataFrame(
+        {
+            "asin": list(rows),
+            "name": [f"商品{asin}" for asin in rows],
+            "category": category,
+            "current_rank": [rank for rank, _ in rows.values()],
+            "price": [price for _, price in rows.values()],
+            "rating": 4.5,
+            "review_count": 120,
+            "timestamp": timestamp,
+        }
+    )
+
+
+@pytest.fixture
+def index() -> ProductSeriesIndex:
+    index = ProductSeriesIndex()
+    index.update(scrape("2026-01-01T10:00:00", {"B001": (5, 1000.0), "B002": (8, None)}))
+    index.update(scrape("2026-01-02T10:00:00", {"B001": (3, 900.0)}))
+    index.update(scrape("2026-01-03T10:00:00", {"B001": (4, 950.0), "B002": (6, 500.0)}))
+    return index
+
+
+class TestProductSeriesIndex:
+    """ProductSeriesIndexのテスト"""
+
+    def test_history(self, index):
+        """ASINの観測値を時刻順に返し、不明な値はNone"""
+        series = index.history("B002")
+
+        assert series == {
+            "timestamp": ["2026-01-01T10:00:00", "2026-01-03T10:00:00"],
+            "category": ["家電", "家電"],
+            "current_rank": [8, 6],
+            "price": [None, 500.0],
+            "rating": [4.5, 4.5],
+            "review_count": [120, 120],
+            "trend_score": [None, None],
+        }
+        assert index.history("B999") is None
+
+    def test_history_range_and_category(self, index):
+        """期間の両端の日を含み、カテゴリで絞り込み"""
+        index.update(scrape("2026-01-03T10:00:00", {"B001": (40, 950.0)}, category="PC"))
+
+        assert index.history("B001", start=date(2026, 1, 2))["current_rank"] == [3, 4, 40]
+        assert index.history("B001", end=date(2026, 1, 2))["current_rank"] == [5, 3]
+        assert index.history("B001", category="家電")["current_rank"] == [5, 3, 4]
+        assert index.history("B001", category="本")["timestamp"] == []
+
+    def test_update_ignores_seen_timestamps(self, index):
+        """前回の観測以前の時刻の行は追加しない（再取り込みで重複しない）"""
+        assert (
+            index.update(scrape("2026-01-02T10:00:00", {"B001": (1, 100.0), "B002": (7, 500.0)}))
+            == 0
+        )
+        assert index.update(scrape("2026-01-02T10:00:00", {"B003": (1, 100.0)})) == 1
+
+        assert index.history("B001")["current_rank"] == [5, 3, 4]
+        assert index.size == 6
+
+    def test_detail(self, index):
+        """最新の観測値と全期間の要約"""
+        index.update(
+            pd.DataFrame({"asin": ["B001"], "timestamp": ["2026-01-04T10:00:00"]}),
+            pd.Series([12.5]),
+        )
+
+        detail = index.detail("B001")
+
+        assert detail["name"] == "商品B001"
+        assert detail["timestamp"] == "2026-01-04T10:00:00"
+        assert detail["current_rank"] is None
+        assert detail["trend_score"] == 12.5
+        assert detail["observations"] == 4
+        assert detail["first_seen"] == "2026-01-01T10:00:00"
+        assert (detail["best_rank"], detail["min_price"], detail["max_price"]) == (3, 900.0, 1000.0)
+        assert index.detail("B999") is None
+
+    def test_compact(self, index):
+        """差分を本体にまとめても同じ時系列"""
+        before = {asin: index.history(asin) for asin in ("B001", "B002")}
+
+        index.compact()
+        index.update(scrape("2026-01-04T10:00:00", {"B003": (1, 100.0)}))
+
+        assert index.delta_size == 1
+        assert {asin: index.history(asin) for asin in ("B001", "B002")} == before
+        assert index.history("B003")["current_rank"] == [1]
+
+    def test_save_and_load(self, index, tmp_path: Path):
+        """保存した本体・差分から同じ時系列を返す"""
+        index.compact()
+        index.update(scrape("2026-01-04T10:00:00", {"B002": (2, 480.0)}))
+        path = index.save(tmp_path / "product_series.npz")
+
+        loaded = ProductSeriesIndex.load(path)
+
+        assert loaded.delta_size == 1
+        assert loaded.history("B002") == index.history("B002")
+        assert loaded.detail("B001") == index.detail("B001")
+        assert loaded.update(scrape("2026-01-04T10:00:00", {"B002": (2, 480.0)})) == 0
+        assert len(ProductSeriesIndex.load(tmp_path / "missing.npz")) == 0
+
+    def test_from_history(self, tmp_path: Path):
+        """履歴ストアの全観測値から構築し、トレンドスコアも計算"""
+        store = HistoryStore(tmp_path / "history.db")
+        store.add_rows(scrape("2026-01-01T10:00:00", {"B001": (5, 1000.0)}).to_dict("records"))
+        store.add_rows(scrape("2026-01-02T10:00:00", {"B001": (3, 900.0)}).to_dict("records"))
+
+        index = ProductSeriesIndex.from_history(store)
+
+        assert index.delta_size == 0
+        series = index.history("B001")
+        assert series["current_rank"] == [5, 3]
+        assert all(score is not None for score in series["trend_score"])
+
+
+def test_cached_index(index, tmp_path: Path):
+    """ファイルが更新されるまで読み込み済みの状態を使い回す"""
+    path = index.save(tmp_path / "product_series.npz")
+
+    first = cached_index(path)
+    assert cached_index(path) is first
+
+    index.update(scrape("2026-01-04T10:00:00", {"B003": (1, 100.0)}))
+    index.save(path)
+    assert product_history("B003", path=path)["current_rank"] == [1]
+    assert len(cached_index(tmp_path / "missing.npz")) == 0
@@ -5,12 +5,15 @@ reporter.pyモジュールのテスト
 HTMLレポート生成機能のテスト
 """
 
+import json
+from datetime import datetime
 from pathlib import Path
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 
-from reporter import HTMLReportGenerator
+from analyzer import TrendItem
+from reporter import HTMLReportGenerator, ReportPipeline, build_report_view
 
 
 class TestHTMLReportGenerator:
@@ -53,7 +56,9 @@ class TestHTMLReportGenerator:
         assert output_dir.exists()
         assert generator.output_dir == output_dir
 
-    def test_generate_creates_html_file(self, generator, sample_trends, sample_category_trends, tmp_path):
+    def test_generate_creates_html_file(
+        self, generator, sample_trends, sample_category_trends, tmp_path
+    ):
         """HTMLファイルが正常に生成される"""
         filepath = generator.generate(sample_trends, sample_category_trends)
 
@@ -69,7 +74,7 @@ class TestHTMLReportGenerator:
 
         # 基本構造の確認
         assert "<!DOCTYPE html>" in content
-        assert "<html lang=\"ja\">" in content
+        assert '<html lang="ja">' in content
         assert "EcomTrendAI" in content
         assert "トレンドレポート" in content
 
@@ -180,6 +185,42 @@ class TestHTMLReportGenerator:
         assert 'target="_blank"' in content
         assert "amazon.co.jp" in content
 
+    def test_generate_with_rank_history(self, generator):
+        """ランク履歴を渡すとスパークラインが埋め込まれる"""
+        import pandas as pd
+
+        trend = MagicMock()
+        trend.asin = "B001"
+        trend.name = "推移あり商品"
+        trend.price = 1000.0
+        trend.rating = 4.5
+        trend.affiliate_url = "https://amazon.co.jp/dp/B001?tag=test"
+        trend.category = "テスト"
+        trend.rank_change_percent = 50.0
+        trend.trend_score = 70.0
+        history = pd.DataFrame(
+            {
+                "asin": ["B001", "B001", "B001"],
+                "timestamp": ["2026-01-01", "2026-01-02", "2026-01-03"],
+                "current_rank": [30, 12, 4],
+            }
+        )
+
+        filepath = generator.generate([trend], {}, rank_history=history)
+        content = filepath.read_text(encoding="utf-8")
+
+        assert "<th>推移</th>" in content
+        assert '<svg class="sparkline"' in content
+
+    def test_generate_without_rank_history_has_no_sparkline_column(
+        self, generator, sample_trends, sample_category_trends
+    ):
+        """ランク履歴なしでは推移列を表示しない"""
+        content = generator.generate(sample_trends, sample_category_trends).read_text(
+            encoding="utf-8"
+        )
+        assert "<th>推移</th>" not in content
+
     def test_footer_disclaimer(self, generator, sample_trends, sample_category_trends):
         """フッターの免責事項が含まれる"""
         filepath = generator.generate(sample_trends, sample_category_trends)
@@ -189,5 +230,133 @@ class TestHTMLReportGenerator:
         assert "アフィリエイト" in content
 
 
+class TestReportPipeline:
+    """ReportPipelineのテスト"""
+
+    @pytest.fixture
+    def sample_trends(self) -> list[TrendItem]:
+        """サンプルトレンドデータ"""
+        return [
+            TrendItem(
+                asin=f"B00{i}",
+                name=f"商品{i}",
+                category="家電" if i % 2 == 0 else "ゲーム",
+                rank_change_percent=100.0 - i * 10,
+                current_rank=i + 1,
+                price=None if i == 0 else 1000.0 * i,
+                review_count=100,
+                rating=4.5,
+                affiliate_url=f"https://amazon.co.jp/dp/B00{i}?tag=test",
+                trend_score=80.0 - i,
+            )
+            for i in range(4)
+        ]
+
+    def test_build_report_view_formats_once(self, sample_trends):
+        """同一アイテムは一度だけフォーマットされる"""
+        category_trends = {"家電": [sample_trends[0], sample_trends[2]]}
+        view = build_report_view(sample_trends, category_trends)
+
+        assert view.category_trends["家電"][0] is view.trends[0]
+        assert view.trends[0].price_label == ""
+        assert view.trends[1].price_label == "¥1,000"
+        assert view.trends[1].rating_label == "★4.5"
+        assert view.trends[1].change_label == "+90%"
+
+    def test_rank_drop_labels(self, tmp_path, sample_trends):
+        """下落は符号付きで表示し、HTMLでは negative クラス"""
+        sample_trends[1].rank_change_percent = -50.0
+        view = build_report_view(sample_trends, {})
+
+        assert view.trends[1].change_label == "-50%"
+        assert (view.trends[0].change_class, view.trends[1].change_class) == (
+            "positive",
+            "negative",
+        )
+
+        html = (
+            ReportPipeline(output_dir=tmp_path, formats=["html"])
+            .run(sample_trends, {})
+            .paths["html"]
+        )
+        content = html.read_text(encoding="utf-8")
+        assert '<td class="negative">-50%</td>' in content
+        assert "+-" not in content
+
+    def test_run_all_formats(self, tmp_path, sample_trends):
+        """全形式のレポートが生成される"""
+        pipeline = ReportPipeline(output_dir=tmp_path, formats=["md", "html", "csv", "json", "txt"])
+        result = pipeline.run(
+            sample_trends, {"家電": sample_trends[:2]}, datetime(2026, 1, 6, 9, 0)
+        )
+
+        assert set(result.paths) == {"md", "html", "csv", "json", "txt"}
+        assert all(p.exists() for p in result.paths.values())
+        assert result.paths["md"].name == "trends_20260106.md"
+        assert result.paths["txt"].name == "trends_20260106_summary.txt"
+        assert set(result.timings) == {"view", "md", "html", "csv", "json", "txt"}
+        assert result.total_seconds >= 0
+
+        data = json.loads(result.paths["json"].read_text(encoding="utf-8"))
+        assert data["count"] == 4
+        assert data["trends"][0]["asin"] == "B000"
+        assert "家電" in data["categories"]
+
+        csv_lines = result.paths["csv"].read_text(encoding="utf-8-sig").splitlines()
+        assert len(csv_lines) == 5
+
+        assert "2026年01月06日 09:00" in result.paths["md"].read_text(encoding="utf-8")
+        assert "2026年01月06日 09:00" in result.paths["html"].read_text(encoding="utf-8")
+
+    def test_run_with_price_drops(self, tmp_path, sample_trends):
+        """値下がりセクションをMD / HTML / JSONに出力"""
+        import pandas as pd
+
+        drops = pd.DataFrame(
+            {
+                "asin": ["B009", "B008"],
+                "name": ["値下がり商品", "中央値比"],
+                "category": ["家電", "本"],
+                "price": [9800.0, 500.0],
+                "previous_price": [12800.0, 520.0],
+                "drop_percent": [23.44, 3.85],
+                "median_drop_percent": [None, 20.0],
+                "is_lowest": [True, False],
+            }
+        )
+        pipeline = ReportPipeline(output_dir=tmp_path, formats=["md", "html", "json"])
+        result = pipeline.run(sample_trends, {}, price_drops=drops)
+
+        markdown = result.paths["md"].read_text(encoding="utf-8")
+        assert "## 値下がり商品" in markdown
+        assert "¥9,800（前回 ¥12,800） | 下落率: -23% | 最安値" in markdown
+        assert "下落率: -20%" in markdown
+        assert "値下がり商品</a>" in result.paths["html"].read_text(encoding="utf-8")
+
+        data = json.loads(result.paths["json"].read_text(encoding="utf-8"))
+        assert [d["asin"] for d in data["price_drops"]] == ["B009", "B008"]
+        assert data["price_drops"][0]["median_drop_percent"] is None
+        assert "値下がり商品" not in ReportPipeline(output_dir=tmp_path / "none").run(
+            sample_trends, {}
+        ).paths["html"].read_text(encoding="utf-8")
+
+    def test_run_formats_view_once(self, tmp_path, sample_trends):
+        """ビュー構築は形式数に関わらず一度だけ"""
+        pipeline = ReportPipeline(output_dir=tmp_path, formats=["md", "html", "csv"])
+        with patch("reporter.build_report_view", wraps=build_report_view) as mock_build:
+            pipeline.run(sample_trends, {})
+        assert mock_build.call_count == 1
+
+    def test_default_formats(self, tmp_path, sample_trends):
+        """デフォルトはMarkdownとHTML"""
+        result = ReportPipeline(output_dir=tmp_path).run(sample_trends, {})
+        assert set(result.paths) == {"md", "html"}
+
+    def test_unknown_format_raises(self, tmp_path):
+        """未対応形式はエラー"""
+        with pytest.raises(ValueError):
+            ReportPipeline(output_dir=tmp_path, formats=["pdf"])
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+scoring.pyモジュールのテスト
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scoring import (
+    BUILTIN_SCORES,
+    ScoreDefinition,
+    ScoreExpressionError,
+    ScoreRegistry,
+    compile_expression,
+)
+
+
+@pytest.fixture
+def products() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "asin": ["B001", "B002", "B003", "B004"],
+            "rank_change_percent": [150.0, 40.0, None, 80.0],
+            "review_count": [1000, 0, 50, None],
+            "rating": [4.5, 3.0, 5.0, None],
+            "price": [1980.0, 500.0, None, 12000.0],
+            "velocity": [5.0, None, -2.0, 1.0],
+            "ewma_rank": [10.0, None, 3.0, 0.0],
+        }
+    )
+
+
+class TestCompileExpression:
+    """式の検証・コンパイルのテスト"""
+
+    def test_vectorized_evaluation(self):
+        """配列をまとめて評価し、定数の式は行数分に広げる"""
+        expression = compile_expression("where(price > 1000, log10(price), 0) + 1")
+
+        assert expression.names == {"price"}
+        result = expression({"price": np.array([100.0, 10000.0])}, 2)
+        assert result.tolist() == [1.0, 5.0]
+        assert compile_expression("2 ** 3")({}, 3).tolist() == [8.0, 8.0, 8.0]
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "__import__('os')",
+            "price.__class__",
+            "[price][0]",
+            "open('x')",
+            "lambda: 1",
+            "unknown_feature * 2",
+            "'text'",
+            "0 < price < 10",
+            "minimum(price, b=1)",
+            "minimum(price)",
+            "price +",
+        ],
+    )
+    def test_rejects_unsafe_or_invalid(self, source):
+        """許可されていない構文・名前・関数、誤った引数は読み込み時にエラー"""
+        with pytest.raises(ScoreExpressionError):
+            compile_expression(source)
+
+
+class TestScoreRegistry:
+    """ScoreRegistryのテスト"""
+
+    def test_default_matches_row_formula(self, products):
+        """既定のスコアは1行分の計算式と同じ"""
+        from analyzer import TrendAnalyzer
+
+        analyzer = TrendAnalyzer(data_dir=Path("."))
+        expected = [analyzer.calculate_trend_score(row) for _, row in products.iterrows()]
+
+        assert BUILTIN_SCORES.compute(products)["default"].tolist() == expected
+
+    def test_custom_scores_in_one_pass(self, products):
+        """カスタムスコアを既定のスコアと一緒に求め、共通の式は1回だけ評価する"""
+        registry = ScoreRegistry()
+        registry.register(
+            ScoreDefinition.from_dict(
+                {
+                    "name": "bargain",
+                    "terms": [
+                        {
+                            "name": "rank",
+                            "expr": "minimum(rank_change_percent / 2, 50)",
+                            "weight": 2.0,
+                        },
+                        {"name": "cheap", "expr": "-log10(price + 1)", "weight": 3.0},
+                    ],
+                }
+            )
+        )
+
+        terms = registry.terms(products)
+        scores = registry.compute(products)
+
+        assert list(scores.columns) == ["default", "bargain"]
+        assert terms["bargain"]["rank"] is terms["default"]["rank_change"]
+        expected = 2.0 * np.minimum(
+            products["rank_change_percent"].fillna(0) / 2, 50
+        ) - 3.0 * np.log10(products["price"].fillna(0) + 1)
+        assert scores["bargain"].tolist() == expected.round(2).tolist()
+
+    def test_available_for_plan(self):
+        """プラン指定のないスコアは全プランで使える"""
+        registry = ScoreRegistry()
+        registry.register(
+            ScoreDefinition.from_dict(
+                {"name": "pro_only", "plans": ["pro"], "terms": [{"expr": "rating"}]}
+            )
+        )
+
+        assert registry.available_for("free") == ["default"]
+        assert registry.available_for("pro") == ["default", "pro_only"]
+
+    def test_load(self, tmp_path: Path, products):
+        """設定ファイルから既定の重みとカスタムスコアを読み込む"""
+        path = tmp_path / "scores.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "default": {"weights": {"reviews": 0.0, "rating": 0.0, "momentum": 0.0}},
+                    "scores": [
+                        {"name": "reviews_only", "terms": [{"expr": "log1p(review_count)"}]}
+                    ],
+                }
+            ),
+            encoding="utf-8",
+        )
+
+        registry = ScoreRegistry.load(path)
+
+        assert registry.names() == ["default", "reviews_only"]
+        assert registry.compute(products)["default"].tolist() == [50.0, 20.0, 0.0, 40.0]
+
+    def test_load_rejects_invalid(self, tmp_path: Path):
+        """不正な式・既定のスコアの上書き・未知の構成要素はエラー"""
+        path = tmp_path / "scores.json"
+        for data in (
+            {"scores": [{"name": "bad", "terms": [{"expr": "exec('1')"}]}]},
+            {"scores": [{"name": "default", "terms": [{"expr": "rating"}]}]},
+            {"default": {"weights": {"price": 1.0}}},
+        ):
+            path.write_text(json.dumps(data), encoding="utf-8")
+            with pytest.raises(ScoreExpressionError):
+                ScoreRegistry.load(path)
+
+    def test_missing_file(self, tmp_path: Path):
+        """設定ファイルがなければ既定のスコアのみ"""
+        assert ScoreRegistry.load(tmp_path / "scores.json").names() == ["default"]
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+search.pyモジュールのテスト
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from search import ProductSearchIndex, cached_index, name_grams, query_grams, split_query
+
+PRODUCTS = pd.DataFrame(
+    {
+        "asin": ["B001", "B002", "B003", "B004", "B005"],
+        "name": [
+            "ワイヤレスイヤホン Bluetooth 5.3 ブラック",
+            "有線イヤホン",
+            "ワイヤレスマウス 静音",
+            "Nintendo Switch 有機ELモデル",
+            "イヤホンケース",
+        ],
+        "category": ["家電", "家電", "PC", "ゲーム", "家電"],
+        "price": [3980, 1200, 1980, 37980, 800],
+        "rating": [4.3, 3.8, 4.1, 4.7, None],
+        "current_rank": [12, 3, 40, 1, 250],
+    }
+)
+
+
+@pytest.fixture
+def index() -> ProductSearchIndex:
+    index = ProductSearchIndex()
+    index.update(PRODUCTS)
+    return index
+
+
+def asins(results: list[dict]) -> list[str]:
+    return [r["asin"] for r in results]
+
+
+def test_split_query():
+    """全角空白で区切り、商品名と同じく正規化"""
+    assert split_query("ワイヤレス　ＥＡＲ-Ｐｈｏｎｅ  ") == ["ワイヤレス", "earphone"]
+    assert split_query("  ") == []
+
+
+def test_query_grams_match_name_grams():
+    """2文字の語は2-gram、3文字以上の語は3-gramで、商品名の索引と同じハッシュ値"""
+    hashes, _ = name_grams(["財布"])
+
+    assert set(query_grams(["財布"])) <= set(hashes)
+    assert len(query_grams(["ワイヤレスイヤホン"])) == 3  # ワイヤ・レスイ・ヤホン
+    assert len(query_grams(["ワイヤレス"])) == 2  # ワイヤ・ヤレス（末尾）
+
+
+class TestProductSearchIndex:
+    """ProductSearchIndexのテスト"""
+
+    def test_search_ranks_by_coverage_then_rank(self, index):
+        """商品名に占める検索語の割合が高い順、同点はランク順"""
+        results = index.search("イヤホン")
+
+        assert asins(results) == ["B002", "B005", "B001"]
+        assert results[0] == {
+            "asin": "B002",
+            "name": "有線イヤホン",
+            "category": "家電",
+            "price": 1200.0,
+            "rating": 3.8,
+            "current_rank": 3,
+            "score": 0.667,
+        }
+        assert results[1]["rating"] is None
+
+    def test_search_all_terms(self, index):
+        """空白区切りの語をすべて含む商品だけ（1文字の語は商品名で確かめる）"""
+        assert asins(index.search("ワイヤレス イヤホン")) == ["B001"]
+        assert asins(index.search("ワイヤレス 静")) == ["B003"]
+        assert asins(index.search("ｎｉｎｔｅｎｄｏ")) == ["B004"]
+        assert index.search("イヤホンマウス") == []
+        assert index.search("黒") == []
+
+    def test_single_character_terms(self, index):
+        """1文字の語だけでも商品名で確かめて検索できる"""
+        assert asins(index.search("静")) == ["B003"]
+        assert asins(index.search("線 有")) == ["B002"]
+        assert asins(index.search("ス", category="家電")) == ["B005", "B001"]
+
+    def test_filters(self, index):
+        """カテゴリ・価格・評価で絞り込み"""
+        assert asins(index.search("イヤホン", category="家電", max_price=1500)) == ["B002", "B005"]
+        assert asins(index.search("イヤホン", min_price=1000, min_rating=4.0)) == ["B001"]
+        assert asins(index.search("ワイヤレス", category="PC")) == ["B003"]
+        assert index.search("イヤホン", category="本") == []
+        assert asins(index.search("イヤホン", limit=1)) == ["B002"]
+
+    def test_multiple_categories(self, index, tmp_path: Path):
+        """複数カテゴリに掲載された商品は、どのカテゴリでも絞り込める"""
+        index.update(
+            pd.DataFrame(
+                {
+                    "asin": ["B001", "B001"],
+                    "name": ["ワイヤレスイヤホン Bluetooth 5.3 ブラック"] * 2,
+                    "category": ["オーディオ", "家電"],
+                }
+            )
+        )
+
+        for loaded in (index, ProductSearchIndex.load(index.save(tmp_path / "search_index.npz"))):
+            assert asins(loaded.search("ワイヤレス", category="家電")) == ["B001"]
+            results = loaded.search("ワイヤレス", category="オーディオ")
+            assert [(r["asin"], r["category"]) for r in results] == [("B001", "オーディオ")]
+            assert asins(loaded.search("ワイヤレス", category="PC")) == ["B003"]
+
+    def test_update_only_new_and_renamed(self, index):
+        """索引に追加するのは新しいASINと商品名の変わったASINだけ（属性は毎回更新）"""
+        assert index.update(PRODUCTS.assign(current_rank=[1, 2, 3, 4, 5])) == 0
+        assert index.search("イヤホン")[-1]["current_rank"] == 1
+
+        renamed = pd.DataFrame(
+            {"asin": ["B002", "B006"], "name": ["有線ヘッドホン", "ワイヤレスヘッドホン"]}
+        )
+        assert index.update(renamed) == 2
+        assert asins(index.search("イヤホン")) == ["B005", "B001"]
+        assert asins(index.search("ヘッドホン")) == ["B002", "B006"]
+        assert len(index) == 6
+
+    def test_compact(self, index):
+        """差分を本体にまとめても結果は同じ"""
+        index.update(pd.DataFrame({"asin": ["B002"], "name": ["有線ヘッドホン"]}))
+        before = index.search("ホン")
+
+        index.compact()
+
+        assert index.delta_size == 0
+        assert index.search("ホン") == before
+
+    def test_large_posting_lists(self):
+        """転置リストの長さが違っても同じ絞り込み結果（二分探索・ブール配列）"""
+        rng = np.random.default_rng(0)
+        names = [f"イヤホン {i}" for i in range(300)] + ["ワイヤレスイヤホン", "ワイヤレス充電器"]
+        index = ProductSearchIndex(capacity=16)
+        index.update(
+            pd.DataFrame(
+                {
+                    "asin": [f"A{i:03d}" for i in range(len(names))],
+                    "name": names,
+                    "current_rank": rng.permutation(len(names)),
+                }
+            )
+        )
+        index.compact()
+
+        assert asins(index.search("ワイヤレス イヤホン")) == ["A300"]
+        assert len(index.search("イヤホン", limit=1000)) == 301
+        results = index.search("イヤホン 12", limit=100)
+        assert len(results) == 13  # 12, 112, 120〜129, 212
+        assert results[0]["asin"] == "A012"
+
+    def test_save_and_load(self, index, tmp_path: Path):
+        """保存した本体・差分から同じ結果を返す"""
+        index.update(
+            pd.DataFrame({"asin": ["B006"], "name": ["ワイヤレスヘッドホン"], "category": ["家電"]})
+        )
+        path = index.save(tmp_path / "search_index.npz")
+
+        loaded = ProductSearchIndex.load(path)
+
+        assert len(loaded) == 6
+        for query in ("イヤホン", "ワイヤレス", "ヘッドホン"):
+            assert loaded.search(query) == index.search(query)
+        assert loaded.update(PRODUCTS) == 0
+        assert len(ProductSearchIndex.load(tmp_path / "missing.npz")) == 0
+
+
+def test_cached_index(index, tmp_path: Path):
+    """ファイルが更新されるまで読み込み済みの索引を使い回す"""
+    path = index.save(tmp_path / "search_index.npz")
+
+    first = cached_index(path)
+    assert cached_index(path) is first
+
+    index.update(pd.DataFrame({"asin": ["B006"], "name": ["ワイヤレスヘッドホン"]}))
+    index.save(path)
+    assert asins(cached_index(path).search("ヘッドホン")) == ["B006"]
+    assert len(cached_index(tmp_path / "missing.npz")) == 0
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+seasonality.pyモジュールのテスト
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from seasonality import SeasonalProfiles, time_slots
+
+
+def run(day: pd.Timestamp, asins: list[str], category: str) -> pd.DataFrame:
+    """1回分の収集データ（10時）"""
+    return pd.DataFrame(
+        {
+            "asin": asins,
+            "category": category,
+            "timestamp": day.strftime("%Y-%m-%dT10:00:00"),
+        }
+    )
+
+
+@pytest.fixture
+def profiles() -> SeasonalProfiles:
+    """
+    4週間分のプロファイル
+
+    おもちゃは金・土曜だけスコアが20高く、家電は曜日によらず一定
+    """
+    profiles = SeasonalProfiles()
+    for day in pd.date_range("2026-01-05", periods=28):
+        bonus = 20.0 if day.dayofweek in (4, 5) else 0.0
+        profiles.update(run(day, ["T1", "T2"], "おもちゃ"), [30.0 + bonus, 40.0 + bonus])
+        profiles.update(run(day, ["E1"], "家電"), [30.0])
+    return profiles
+
+
+def test_time_slots():
+    """曜日は0〜6、時間帯は7〜30、欠損は-1"""
+    weekday, hour = time_slots(pd.Series(["2026-01-03T10:00:00", None, "2026-01-05T23:30:00"]))
+
+    assert weekday.tolist() == [5, -1, 0]
+    assert hour.tolist() == [17, -1, 30]
+
+
+class TestSeasonalProfiles:
+    """SeasonalProfilesのテスト"""
+
+    def test_strength(self, profiles):
+        """曜日で上下するカテゴリほど説明率が高く、時間帯が1つなら0"""
+        strength = profiles.strength().set_index("key")
+
+        assert strength.index.tolist() == ["おもちゃ", "家電"]
+        assert strength.loc["おもちゃ", "weekday_strength"] > 0.5
+        assert strength.loc["おもちゃ", "peak_weekday"] == "金"
+        assert strength.loc["家電", "weekday_strength"] == 0.0
+        assert strength["hour_strength"].tolist() == [0.0, 0.0]
+
+    def test_profile(self, profiles):
+        """枠ごとの季節成分は件数で0に寄せる"""
+        profile = profiles.profile("おもちゃ").set_index("slot")
+
+        # 平均は 35 + 20×2/7、金曜の枠は平均 55（8件、prior=5）
+        expected = (55 - (35 + 40 / 7)) * 8 / 13
+        assert profile.loc["金", "offset"] == pytest.approx(expected, abs=0.01)
+        assert profile.loc["金", "count"] == 8.0
+        assert profile.loc["10時", "offset"] == 0.0
+        assert profiles.profile("未登録")["offset"].eq(0).all()
+
+    def test_deseasonalize(self, profiles):
+        """曜日の季節成分を除き、未知のASINはカテゴリの成分を使う"""
+        saturday = run(pd.Timestamp("2026-02-07"), ["T1", "X9", "E1"], "おもちゃ")
+        saturday.loc[2, "category"] = "家電"
+        scores = pd.Series([60.0, 60.0, 30.0])
+
+        offsets = profiles.offsets(saturday)
+        adjusted = profiles.deseasonalize(saturday, scores)
+
+        category = profiles.profile("おもちゃ").set_index("slot").loc["土", "offset"]
+        assert offsets[1] == pytest.approx(category, abs=0.01)
+        assert 0 < offsets[0] < 20
+        assert offsets[2] == 0.0
+        assert adjusted.tolist() == (scores - offsets).round(2).tolist()
+
+    def test_max_count(self):
+        """件数の上限を超えると平均を保ったまま件数を縮める"""
+        profiles = SeasonalProfiles(asin_max_count=10)
+        for day in pd.date_range("2026-01-05", periods=21):
+            profiles.update(run(day, ["A"], "本"), [float(day.dayofweek)])
+
+        table = profiles.tables["asin"]
+        count = table.count[0, :7]
+        assert count.sum() == pytest.approx(10.0)
+        np.testing.assert_allclose(table.total[0, :7] / count, np.arange(7))
+
+    def test_asin_in_several_categories(self):
+        """複数カテゴリに載ったASINは収集1回につき1件（スコアの平均）、カテゴリ別は行ごと"""
+        profiles = SeasonalProfiles()
+        for day in pd.date_range("2026-01-05", periods=7):
+            both = pd.concat(
+                [run(day, ["A", "B"], "本"), run(day, ["A"], "文房具")], ignore_index=True
+            )
+            profiles.update(both, [10.0, 20.0, 30.0])
+
+        table = profiles.tables["asin"]
+        position = table.positions["A"]
+        assert table.count[position, :7].sum() == 7.0
+        assert table.total[position, :7].sum() == pytest.approx(7 * 20.0)
+        assert profiles.tables["category"].count[:, :7].sum() == 21.0
+
+    def test_save_and_load(self, profiles, tmp_path: Path):
+        """保存した状態から同じ季節成分を求める"""
+        path = profiles.save(tmp_path / "seasonality.npz")
+        loaded = SeasonalProfiles.load(path)
+        df = run(pd.Timestamp("2026-02-06"), ["T1", "E1"], "おもちゃ")
+
+        np.testing.assert_array_equal(loaded.offsets(df), profiles.offsets(df))
+        assert len(SeasonalProfiles.load(tmp_path / "missing.npz")) == 0
+
+    def test_analyzer_deseasonalizes(self, profiles, tmp_path: Path):
+        """分析では金・土曜のおもちゃのスコアを割り引く"""
+        from analyzer import TrendAnalyzer
+
+        df = pd.DataFrame(
+            {
+                "asin": ["T1", "E1"],
+                "name": ["おもちゃ", "家電"],
+                "category": ["おもちゃ", "家電"],
+                "current_rank": [1, 2],
+                "rank_change_percent": [60.0, 50.0],
+                "timestamp": "2026-02-07T10:00:00",
+            }
+        )
+
+        plain = TrendAnalyzer(data_dir=tmp_path).analyze_dataframe(df)
+        adjusted = TrendAnalyzer(data_dir=tmp_path, seasonality=profiles).analyze_dataframe(df)
+
+        assert [t.asin for t in plain] == ["T1", "E1"]
+        assert [t.asin for t in adjusted] == ["E1", "T1"]
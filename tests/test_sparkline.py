@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+sparkline.pyモジュールのテスト
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sparkline import (
+    COLOR_DOWN,
+    COLOR_UP,
+    build_rank_matrix,
+    render_sparklines,
+    sparklines_for_asins,
+)
+
+
+@pytest.fixture
+def history() -> pd.DataFrame:
+    """3時点分のランク履歴"""
+    return pd.DataFrame(
+        {
+            "asin": ["A", "B", "A", "B", "A"],
+            "timestamp": [
+                "2026-01-01T10:00:00",
+                "2026-01-01T10:00:00",
+                "2026-01-02T10:00:00",
+                "2026-01-02T10:00:00",
+                "2026-01-03T10:00:00",
+            ],
+            "current_rank": [10, 1, 5, 3, 1],
+        }
+    )
+
+
+class TestBuildRankMatrix:
+    """build_rank_matrixのテスト"""
+
+    def test_matrix_shape_and_order(self, history):
+        """ASIN順・時刻順の行列になる"""
+        matrix = build_rank_matrix(history, ["B", "A", "C"])
+
+        assert matrix.shape == (3, 3)
+        np.testing.assert_array_equal(matrix[1], [10, 5, 1])
+        assert np.isnan(matrix[0, 2])
+        assert np.isnan(matrix[2]).all()
+
+    def test_max_points(self, history):
+        """直近N時点に絞られる"""
+        matrix = build_rank_matrix(history, ["A"], max_points=2)
+        np.testing.assert_array_equal(matrix[0], [5, 1])
+
+    def test_empty_history(self):
+        """履歴がない場合は空の列"""
+        assert build_rank_matrix(pd.DataFrame(), ["A"]).shape == (1, 0)
+
+
+class TestRenderSparklines:
+    """render_sparklinesのテスト"""
+
+    def test_render_svg(self):
+        """SVGパスが生成される"""
+        svgs = render_sparklines(np.array([[10.0, 5.0, 1.0]]))
+
+        assert len(svgs) == 1
+        assert svgs[0].startswith("<svg")
+        assert 'd="M0,95 L500,' in svgs[0]
+        assert COLOR_UP in svgs[0]
+
+    def test_rank_down_color(self):
+        """ランク下降は下降色"""
+        svgs = render_sparklines(np.array([[1.0, 5.0]]))
+        assert COLOR_DOWN in svgs[0]
+
+    def test_gap_starts_new_segment(self):
+        """欠損の後は新しいセグメントになる"""
+        svgs = render_sparklines(np.array([[1.0, 2.0, np.nan, 3.0, 4.0]]))
+        assert svgs[0].count("M") == 2
+
+    def test_insufficient_points(self):
+        """有効点が2点未満なら空文字列"""
+        svgs = render_sparklines(np.array([[np.nan, 3.0, np.nan], [1.0, 1.0, 1.0]]))
+        assert svgs[0] == ""
+        assert svgs[1] != ""
+
+    def test_batch_1000(self):
+        """1000件を一括生成"""
+        rng = np.random.default_rng(0)
+        matrix = rng.integers(1, 100, size=(1000, 30)).astype(float)
+        svgs = render_sparklines(matrix)
+        assert len(svgs) == 1000
+        assert all(svgs)
+
+
+def test_sparklines_for_asins(history):
+    """ASINごとのSVG辞書"""
+    result = sparklines_for_asins(history, ["A", "B", "A", "Z"])
+    assert set(result) == {"A", "B"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
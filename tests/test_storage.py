@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+storage.pyモジュールのテスト
+"""
+
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from storage import PYARROW_AVAILABLE, RAW_COLUMNS
+
+pytestmark = pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow not installed")
+
+
+def make_frame(
+    run_at: datetime, categories=("家電&カメラ", "ゲーム"), per_category: int = 3
+) -> pd.DataFrame:
+    """1 run分の生データ"""
+    rows = []
+    for category in categories:
+        for i in range(per_category):
+            rows.append(
+                {
+                    "asin": f"B{category[:1]}{i}",
+                    "name": f"{category}商品{i}",
+                    "category": category,
+                    "current_rank": i + 1,
+                    "previous_rank": i + 10,
+                    "rank_change": 9,
+                    "rank_change_percent": 90.0 - i,
+                    "price": 1980.0 + i,
+                    "currency": "JPY",
+                    "review_count": 100 * (i + 1),
+                    "rating": 4.5,
+                    "timestamp": run_at.isoformat(),
+                    "source": "test",
+                }
+            )
+    return pd.DataFrame(rows, columns=RAW_COLUMNS)
+
+
+@pytest.fixture
+def store(tmp_path: Path):
+    """3 run分を書き込んだストア"""
+    from storage import ColumnarStore
+
+    store = ColumnarStore(root=tmp_path / "columnar")
+    for day in (1, 2, 3):
+        run_at = datetime(2026, 1, day, 10, 0, 0)
+        store.write_frame(make_frame(run_at), run_at)
+    return store
+
+
+class TestColumnarStore:
+    """ColumnarStoreのテスト"""
+
+    def test_partition_layout(self, store):
+        """日付・カテゴリ別のディレクトリに保存される"""
+        files = sorted(p.relative_to(store.root).as_posix() for p in store.root.rglob("*.parquet"))
+        assert len(files) == 6
+        assert files[0].startswith("date=2026-01-01/category=")
+        assert files[0].endswith("/part-20260101_100000.parquet")
+
+    def test_schema(self, store):
+        """明示スキーマで保存され、カテゴリ列はカテゴリ型で読める"""
+        df = store.read()
+        assert list(df.columns) == RAW_COLUMNS
+        assert len(df) == 18
+        assert df["current_rank"].dtype == "int32"
+        assert df["price"].dtype == "float32"
+        assert isinstance(df["category"].dtype, pd.CategoricalDtype)
+        assert isinstance(df["source"].dtype, pd.CategoricalDtype)
+        assert set(df["category"]) == {"家電&カメラ", "ゲーム"}
+
+    def test_read_pruned(self, store):
+        """日付・カテゴリ・列で絞り込める"""
+        df = store.read(
+            columns=["asin", "category", "current_rank"],
+            date_from=date(2026, 1, 2),
+            categories=["ゲーム"],
+        )
+        assert list(df.columns) == ["asin", "category", "current_rank"]
+        assert len(df) == 6
+        assert set(df["category"]) == {"ゲーム"}
+
+    def test_latest_runs(self, store):
+        """直近のrunのみ読み込む"""
+        assert store.list_runs() == ["20260101_100000", "20260102_100000", "20260103_100000"]
+        df = store.read_latest_runs(2)
+        assert len(df) == 12
+        assert df["timestamp"].min() == pd.Timestamp("2026-01-02 10:00:00")
+
+    def test_iter_runs(self, store):
+        """runごとに分割して読み込んでも行順は read_runs と同じ"""
+        runs = store.list_runs()[-2:]
+
+        chunks = list(
+            store.iter_runs(runs, columns=["asin", "category", "timestamp"], batch_rows=2)
+        )
+
+        assert max(len(c) for c in chunks) == 2
+        expected = store.read_runs(runs, columns=["asin", "category", "timestamp"])
+        actual = pd.concat(chunks, ignore_index=True)
+        assert actual["asin"].tolist() == expected["asin"].tolist()
+        assert actual["category"].astype(str).tolist() == expected["category"].astype(str).tolist()
+
+    def test_iter_runs_orders_by_timestamp(self, tmp_path: Path):
+        """run内はパーティション順ではなく収集時刻順"""
+        from storage import ColumnarStore
+
+        store = ColumnarStore(root=tmp_path / "columnar")
+        run_at = datetime(2026, 1, 1, 10, 0, 0)
+        # パス順では ゲーム → 家電&カメラ だが、収集は 家電&カメラ が先
+        frame = pd.concat(
+            [
+                make_frame(run_at, categories=("家電&カメラ",)),
+                make_frame(datetime(2026, 1, 1, 10, 0, 3), categories=("ゲーム",)),
+            ]
+        )
+        store.write_frame(frame, run_at)
+
+        chunks = list(store.iter_runs(store.list_runs(), batch_rows=4))
+
+        expected = store.read_runs(store.list_runs())
+        assert pd.concat(chunks, ignore_index=True)["asin"].tolist() == expected["asin"].tolist()
+        assert chunks[0]["category"].astype(str).tolist() == ["家電&カメラ"] * 3 + ["ゲーム"]
+
+    def test_feather(self, tmp_path: Path):
+        """Featherでも同じように読み書きできる"""
+        from storage import ColumnarStore
+
+        store = ColumnarStore(root=tmp_path / "feather", file_format="feather")
+        run_at = datetime(2026, 1, 1, 10, 0, 0)
+        store.write_frame(make_frame(run_at), run_at)
+        assert len(list(store.root.rglob("*.feather"))) == 2
+        assert len(store.read(categories=["家電&カメラ"])) == 3
+
+    def test_invalid_format(self, tmp_path: Path):
+        """未対応フォーマットはValueError"""
+        from storage import ColumnarStore
+
+        with pytest.raises(ValueError):
+            ColumnarStore(root=tmp_path, file_format="orc")
+
+
+def test_convert_csv_dir(tmp_path: Path):
+    """既存CSVをrun IDを引き継いで変換し、変換済みはスキップする"""
+    from storage import ColumnarStore, convert_csv_dir
+
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    for day in (5, 6):
+        run_at = datetime(2026, 1, day, 9, 30, 0)
+        make_frame(run_at).to_csv(
+            raw_dir / f"products_{run_at:%Y%m%d_%H%M%S}.csv", index=False, encoding="utf-8-sig"
+        )
+
+    store = ColumnarStore(root=tmp_path / "columnar")
+    assert convert_csv_dir(store, raw_dir) == 2
+    assert convert_csv_dir(store, raw_dir) == 0
+    assert store.list_runs() == ["20260105_093000", "20260106_093000"]
+    assert len(store.read()) == 12
+
+
+def test_analyzer_reads_store(store):
+    """TrendAnalyzerは列指向ストアから分析できる"""
+    from analyzer import TrendAnalyzer
+
+    analyzer = TrendAnalyzer(store=store)
+    trends = analyzer.analyze_trends(top_n=5)
+    assert len(trends) == 5
+    scores = [t.trend_score for t in trends]
+    assert scores == sorted(scores, reverse=True)
+
+    by_category = analyzer.analyze_by_category()
+    assert set(by_category) == {"家電&カメラ", "ゲーム"}
+
+    history = analyzer.load_historical_data(days=2)
+    assert len(history) == 12
+
+    trends, by_category = analyzer.analyze_history(days=2, top_n=5, category_top_n=3)
+    assert trends == analyzer.analyze_dataframe(history, top_n=5)
+    assert by_category == analyzer.analyze_dataframe_by_category(history, top_n=3)
+
+
+def test_raw_files_by_day(store):
+    """列指向ストアのルートも日付ごとにグループ化して読み込める"""
+    from analyzer import read_raw_files
+    from archive import group_raw_files_by_day
+
+    days = group_raw_files_by_day(store.root)
+
+    assert list(days) == ["20260101", "20260102", "20260103"]
+    assert all(len(files) == 2 for files in days.values())
+    df = read_raw_files(days["20260102"])
+    assert len(df) == 6
+    assert (df["timestamp"] == pd.Timestamp("2026-01-02 10:00:00")).all()
+
+
+def test_archive_and_backfill_read_store(store, tmp_path: Path):
+    """アーカイブ・バックフィルは列指向ストアからも生成できる"""
+    from archive import ReportArchiveBuilder
+    from backfill import run_backfill
+
+    builder = ReportArchiveBuilder(data_dir=store.root, archive_dir=tmp_path / "archive")
+    assert builder.build().rebuilt_days == ["20260101", "20260102", "20260103"]
+    assert len(builder.build().skipped_days) == 3
+
+    result = run_backfill(store.root, tmp_path / "backfill", workers=1, formats=("json",))
+    assert [d.day for d in result.days] == ["20260101", "20260102", "20260103"]
+    assert result.rows == 18
+
+
+def test_export_rows_from_store(store, monkeypatch):
+    """履歴ストアがない列指向モードでは、エクスポートを列指向ストアから読み出す"""
+    from config import config
+    from exporter import iter_history_rows
+
+    monkeypatch.setattr(config.paths, "data_dir", store.root.parent)
+    monkeypatch.setattr(config.paths, "columnar_data_dir", store.root)
+    monkeypatch.setattr(config.storage, "raw_format", "parquet")
+
+    rows = list(iter_history_rows(date_from=date(2026, 1, 2), category="ゲーム"))
+
+    assert len(rows) == 6
+    assert rows[0]["timestamp"] == "2026-01-02T10:00:00"
+    assert rows[0]["current_rank"] == 1
+    assert {row["category"] for row in rows} == {"ゲーム"}
+
+
+def test_data_saver_columnar(tmp_path: Path):
+    """DataSaverの列指向保存モード"""
+    from scraper import DataSaver, ProductData
+
+    products = [
+        ProductData(**row, affiliate_url=f"https://amazon.co.jp/dp/{row['asin']}")
+        for row in make_frame(datetime(2026, 1, 5, 10, 0, 0)).to_dict("records")
+    ]
+    saver = DataSaver(output_dir=tmp_path / "raw", storage_format="parquet")
+    root = saver.save_to_columnar(
+        products, datetime(2026, 1, 5, 10, 0, 0), root=tmp_path / "columnar"
+    )
+
+    assert root == tmp_path / "columnar"
+    assert len(list(root.rglob("part-20260105_100000.parquet"))) == 2
+    assert not list((tmp_path / "raw").glob("*.csv"))
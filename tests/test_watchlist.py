@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+watchlist.pyモジュールのテスト
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from auth import AuthService, SubscriptionPlan
+from watchlist import (
+    MAX_WATCHES,
+    AhoCorasick,
+    Watchlist,
+    WatchlistMatcher,
+    WatchlistStore,
+    append_alerts,
+    clean_watches,
+    recent_alerts,
+)
+
+SCRAPE = pd.DataFrame(
+    {
+        "asin": ["B001", "B002", "B003", "B004"],
+        "name": [
+            "ワイヤレスイヤホン Bluetooth",
+            "有線イヤホン",
+            "Nintendo Switch 有機ELモデル",
+            "電動歯ブラシ",
+        ],
+        "category": ["家電", "家電", "ゲーム", "ビューティー"],
+        "current_rank": [1, 2, 3, 4],
+        "previous_rank": [1.0, None, None, 9.0],
+        "price": [3980.0, 1200.0, 37980.0, 2980.0],
+        "timestamp": "2026-01-01T10:00:00",
+    }
+)
+
+
+def test_clean_watches():
+    """空白・重複を除き、上限と短すぎるキーワードはValueError"""
+    assert clean_watches([" B001", "B001", "", "B002"], "asin") == ["B001", "B002"]
+    with pytest.raises(ValueError):
+        clean_watches([f"B{i:03d}" for i in range(MAX_WATCHES + 1)], "asin")
+    with pytest.raises(ValueError):
+        clean_watches(["イヤホン", "【黒】"], "keyword")
+
+
+def test_aho_corasick():
+    """重なり合うキーワード・接尾辞のキーワードもすべて見つける"""
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+
+    assert automaton.find("ushers") == {0, 1, 3}
+    assert automaton.find("ahishe") == {0, 1, 2}
+    assert automaton.find("xyz") == set()
+    assert AhoCorasick([]).find("abc") == set()
+
+
+class TestWatchlistMatcher:
+    """WatchlistMatcherのテスト"""
+
+    def test_match(self):
+        """ASINは毎回、キーワード・カテゴリはランキングに新しく入った商品だけ"""
+        matcher = WatchlistMatcher(
+            [
+                Watchlist("u1", asins=["B001"], keywords=["イヤホン"]),
+                Watchlist(
+                    "u2", keywords=["ｎｉｎｔｅｎｄｏ　switch", "歯ブラシ"], categories=["家電"]
+                ),
+            ]
+        )
+
+        alerts = matcher.match(SCRAPE)
+
+        assert alerts[["user_id", "asin", "kind", "watch"]].values.tolist() == [
+            ["u1", "B001", "asin", "B001"],
+            ["u2", "B002", "category", "家電"],
+            ["u1", "B002", "keyword", "イヤホン"],
+            ["u2", "B003", "keyword", "ｎｉｎｔｅｎｄｏ　switch"],
+        ]
+        assert alerts.loc[1, "price"] == 1200.0
+
+    def test_one_alert_per_user_and_asin(self):
+        """同じユーザー・ASINの一致はASIN・カテゴリ・キーワードの順に1件だけ"""
+        matcher = WatchlistMatcher(
+            [Watchlist("u1", asins=["B002"], keywords=["イヤホン", "有線"], categories=["家電"])]
+        )
+
+        alerts = matcher.match(SCRAPE)
+
+        assert alerts[["asin", "kind"]].values.tolist() == [["B002", "asin"]]
+
+    def test_same_keyword_from_many_users(self):
+        """同じキーワードは1つにまとめ、登録した全ユーザーに通知"""
+        matcher = WatchlistMatcher([Watchlist(f"u{i}", keywords=["イヤホン"]) for i in range(100)])
+
+        assert len(matcher.automaton) == 1
+        assert len(matcher.match(SCRAPE)) == 100
+
+    def test_empty(self):
+        assert WatchlistMatcher([]).match(SCRAPE).empty
+
+    def test_from_store_only_realtime_alert_users(self, tmp_path: Path):
+        """リアルタイムアラートを使えるプラン（PRO以上）のユーザーだけ"""
+        auth = AuthService(users_file=tmp_path / "users.json")
+        free, pro = auth.create_user("free@example.com"), auth.create_user("pro@example.com")
+        auth.update_subscription(
+            pro.user_id, SubscriptionPlan.PRO, "sub_test", datetime.now() + timedelta(days=30)
+        )
+        store = WatchlistStore(tmp_path / "watchlists.json")
+        for user in (free, pro):
+            store.set(user.user_id, asins=["B001"])
+
+        matcher = WatchlistMatcher.from_store(store, auth)
+
+        assert matcher.match(SCRAPE)["user_id"].tolist() == [pro.user_id]
+
+
+class TestWatchlistStore:
+    """WatchlistStoreのテスト"""
+
+    def test_set_and_load(self, tmp_path: Path):
+        """置き換えて保存し、読み直しても同じ"""
+        store = WatchlistStore(tmp_path / "watchlists.json")
+        store.set("u1", asins=["B001"], keywords=["イヤホン"])
+        store.set("u1", categories=["家電"])
+
+        loaded = WatchlistStore(tmp_path / "watchlists.json").get("u1")
+
+        assert (loaded.asins, loaded.keywords, loaded.categories) == ([], [], ["家電"])
+        assert WatchlistStore(tmp_path / "watchlists.json").get("u2").asins == []
+
+    def test_delete(self, tmp_path: Path):
+        store = WatchlistStore(tmp_path / "watchlists.json")
+        store.set("u1", asins=["B001"])
+
+        assert store.delete("u1")
+        assert not store.delete("u1")
+        assert len(WatchlistStore(tmp_path / "watchlists.json")) == 0
+
+
+def test_recent_alerts(tmp_path: Path):
+    """ユーザーの通知を新しい順に、最新の時刻から数えた期間だけ返す"""
+    path = tmp_path / "watch_alerts.csv"
+    matcher = WatchlistMatcher(
+        [Watchlist("u1", asins=["B001", "B002"]), Watchlist("u2", asins=["B001"])]
+    )
+    append_alerts(matcher.match(SCRAPE), path)
+    append_alerts(matcher.match(SCRAPE.assign(timestamp="2026-01-02T10:00:00").head(1)), path)
+
+    alerts = recent_alerts("u1", hours=48, path=path)
+
+    assert alerts[["timestamp", "asin"]].values.tolist() == [
+        ["2026-01-02T10:00:00", "B001"],
+        ["2026-01-01T10:00:00", "B002"],
+        ["2026-01-01T10:00:00", "B001"],
+    ]
+    assert recent_alerts("u1", hours=1, path=path)["asin"].tolist() == ["B001"]
+    assert recent_alerts("u1", path=tmp_path / "missing.csv").empty